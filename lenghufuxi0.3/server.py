@@ -20,19 +20,10 @@ def after_request(response):
 # SQLite数据库文件路径 - 存储到项目文件夹内
 DB_FILE = os.path.join(BASE_DIR, 'quiz_database.db')
 
-# 数据文件路径（保留，用于兼容旧数据）
-DATA_FILE = os.path.join(BASE_DIR, 'quiz_data.json')
-
-# 初始化数据文件（保留，用于兼容旧数据）
-def init_data():
-    if not os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump({
-                'rankings': []
-            }, f, ensure_ascii=False, indent=2)
-
-# 初始化SQLite数据库
-init_data()
+# 旧版本的排行榜文件不再读写，其中的记录用 lenghufuxi0.61/migrate_legacy_json.py 导入数据库
+LEGACY_DATA_FILE = os.path.join(BASE_DIR, 'quiz_data.json')
+if os.path.exists(LEGACY_DATA_FILE):
+    print('发现旧的排行榜文件 quiz_data.json，请用 lenghufuxi0.61/migrate_legacy_json.py 导入数据库')
 
 # 创建SQLite数据库连接
 def get_db_connection():
@@ -134,16 +125,6 @@ def init_database():
 # 初始化数据库
 init_database()
 
-# 加载数据（保留，用于兼容旧数据）
-def load_data():
-    with open(DATA_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-# 保存数据（保留，用于兼容旧数据）
-def save_data(data):
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
 # 根路径返回quiz-system.html
 @app.route('/')
 def index():
@@ -217,12 +198,6 @@ def clear_rankings():
     # 重置所有用户积分
     cursor.execute('UPDATE users SET totalScore = 0')
     
-    # 同时更新旧的数据文件
-    clear_data = {
-        'rankings': []
-    }
-    save_data(clear_data)
-    
     conn.commit()
     conn.close()
     return jsonify({'status': 'success', 'message': '排行榜已清空'})
@@ -243,72 +218,6 @@ def submit_score():
     # 更新用户积分
     cursor.execute('UPDATE users SET totalScore = totalScore + ? WHERE name = ?', (ranking_data['score'], ranking_data['name']))
     
-    # 同时更新旧的数据文件（兼容旧系统）
-    data = load_data()
-    # 按用户名聚合积分
-    # 创建用户积分映射
-    user_scores = {}
-    
-    # 先添加现有排名数据
-    for record in data['rankings']:
-        username = record['name']
-        if username not in user_scores:
-            user_scores[username] = {
-                'name': username,
-                'totalScore': record.get('totalScore', record['score']),
-                'correctCount': record.get('correctCount', record['correctCount']),
-                'lastTime': record['time'],
-                'lastDate': record['date']
-            }
-        else:
-            # 如果已有记录，保留较高的总分
-            if record.get('totalScore', record['score']) > user_scores[username]['totalScore']:
-                user_scores[username] = {
-                    'name': username,
-                    'totalScore': record.get('totalScore', record['score']),
-                    'correctCount': record.get('correctCount', record['correctCount']),
-                    'lastTime': record['time'],
-                    'lastDate': record['date']
-                }
-    
-    # 添加新的排名数据
-    username = ranking_data['name']
-    if username not in user_scores:
-        # 新用户，直接添加
-        user_scores[username] = {
-            'name': username,
-            'totalScore': ranking_data['score'],
-            'correctCount': ranking_data['correctCount'],
-            'lastTime': ranking_data['time'],
-            'lastDate': ranking_data['date']
-        }
-    else:
-        # 现有用户，累计积分
-        user_scores[username]['totalScore'] += ranking_data['score']
-        user_scores[username]['correctCount'] += ranking_data['correctCount']
-        user_scores[username]['lastTime'] = ranking_data['time']
-        user_scores[username]['lastDate'] = ranking_data['date']
-    
-    # 转换为排名列表格式
-    new_rankings = []
-    for username, data in user_scores.items():
-        new_rankings.append({
-            'name': data['name'],
-            'score': data['totalScore'],  # 使用累计总分
-            'correctCount': data['correctCount'],
-            'time': data['lastTime'],
-            'date': data['lastDate']
-        })
-    
-    # 按得分降序排序，得分相同则按时间升序
-    new_rankings.sort(key=lambda x: (-x['score'], x['time']))
-    
-    # 只保留前20名
-    new_rankings = new_rankings[:20]
-    
-    # 保存更新后的排名
-    save_data({'rankings': new_rankings})
-    
     conn.commit()
     conn.close()
     
@@ -1259,5 +1168,4 @@ if __name__ == '__main__':
     parser.add_argument('--port', type=int, default=8081, help='服务器端口')
     args = parser.parse_args()
     
-    init_data()
     app.run(host='0.0.0.0', port=args.port, debug=True)
@@ -1,15 +1,15 @@
+import argparse
 import sqlite3
-import os
 
-DB_FILE = os.path.join(os.path.dirname(__file__), 'quiz.db')
+from db_config import DB_FILE, add_db_argument
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_FILE)
+def get_db_connection(db_file=DB_FILE):
+    conn = sqlite3.connect(db_file)
     conn.row_factory = sqlite3.Row
     return conn
 
-def add_science_knowledge():
-    conn = get_db_connection()
+def add_science_knowledge(db_file=DB_FILE):
+    conn = get_db_connection(db_file)
     cursor = conn.cursor()
     
     science_data = [
@@ -146,4 +146,7 @@ def add_science_knowledge():
     print(f'成功添加 {len(science_data)} 条科学百科知识')
 
 if __name__ == '__main__':
-    add_science_knowledge()
+    parser = argparse.ArgumentParser(description='向科学百科表添加示例知识')
+    add_db_argument(parser)
+    args = parser.parse_args()
+    add_science_knowledge(args.db)
@@ -0,0 +1,177 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+
+# 音效精灵：把shengyin/中的几个MP3打包成一个文件，页面只请求一次，按清单中的字节偏移切出各段解码播放。
+# 每段仍是完整的MP3帧序列（各文件的采样率、码率不同，不能拼成一条连续的音频流），
+# 打包时去掉ID3标签、编码器信息帧和结尾的静音帧，内容相同的文件只保留一份
+
+SOUND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shengyin')
+
+# 页面中的音频元素ID和对应的文件
+SOUNDS = {
+    'correct-sound': 'correct.mp3',
+    'wrong-sound': 'wrong.mp3',
+    'next-question-sound': 'next.mp3',
+    'submit-success-sound': 'submit.mp3',
+    'button-click-sound': 'button.mp3'
+}
+
+# 用ffmpeg重新编码时的码率（音效不需要256kbps立体声）
+REENCODE_BITRATE = '96k'
+
+# MPEG音频帧头中的码率（kbps）和采样率表
+BITRATES = {
+    'v1': (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    'v2': (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+}
+SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+class SpriteError(Exception):
+    pass
+
+
+class Frame:
+    def __init__(self, offset, size, sample_rate, samples, silent):
+        self.offset = offset
+        self.size = size
+        self.sample_rate = sample_rate
+        self.samples = samples
+        self.silent = silent  # 所有声道的part2_3_length都为0：数字静音
+
+
+# 跳过文件开头的ID3v2标签（有的文件叠了多个）和标签后的填充
+def _audio_start(data):
+    pos = 0
+    while True:
+        if data[pos:pos + 3] == b'ID3' and len(data) >= pos + 10:
+            size = (data[pos + 6] << 21) | (data[pos + 7] << 14) | (data[pos + 8] << 7) | data[pos + 9]
+            footer = 10 if data[pos + 5] & 0x10 else 0
+            pos += 10 + size + footer
+            continue
+        if pos < len(data) and data[pos] == 0:
+            pos += 1
+            continue
+        return pos
+
+
+# 读取side info中各声道的part2_3_length，判断是否为静音帧
+def _is_silent(data, offset, lsf, channels):
+    if lsf:
+        length, pos, granules, skip = (9 if channels == 1 else 17), 8 + (1 if channels == 1 else 2), 1, 63
+    else:
+        length, pos, granules, skip = (17 if channels == 1 else 32), 9 + (5 if channels == 1 else 3) + 4 * channels, 2, 59
+    side = data[offset:offset + length]
+    bits = int.from_bytes(side, 'big')
+    width = len(side) * 8
+    for _ in range(granules * channels):
+        if (bits >> (width - pos - 12)) & 0xfff:
+            return False
+        pos += skip
+    return True
+
+
+def parse_frames(data):
+    frames = []
+    pos = _audio_start(data)
+    while pos + 4 <= len(data):
+        header = struct.unpack('>I', data[pos:pos + 4])[0]
+        version, layer = (header >> 19) & 3, (header >> 17) & 3
+        bitrate_index, rate_index = (header >> 12) & 15, (header >> 10) & 3
+        if (header >> 21) != 0x7ff or version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            break  # 不是Layer III帧：文件结尾的ID3v1/APE标签或垃圾数据
+        lsf = version != 3  # MPEG 2/2.5
+        bitrate = BITRATES['v2' if lsf else 'v1'][bitrate_index] * 1000
+        sample_rate = SAMPLE_RATES[version][rate_index]
+        size = (72 if lsf else 144) * bitrate // sample_rate + ((header >> 9) & 1)
+        if pos + size > len(data):
+            break
+        channels = 1 if (header >> 6) & 3 == 3 else 2
+        side_offset = pos + 4 + (0 if (header >> 16) & 1 else 2)
+        frames.append(Frame(pos, size, sample_rate, 576 if lsf else 1152,
+                            _is_silent(data, side_offset, lsf, channels)))
+        pos += size
+    if not frames:
+        raise SpriteError('没有找到MP3音频帧')
+    # 第一帧是Xing/Info编码器信息帧时去掉（里面的帧数、长度对切出的片段不再准确）
+    first = data[frames[0].offset:frames[0].offset + frames[0].size]
+    if b'Xing' in first[:64] or b'Info' in first[:64]:
+        frames.pop(0)
+    return frames
+
+
+# 去掉标签和结尾静音后的音频数据（开头的静音帧保留：后面的帧可能引用它们的比特储备区）
+def strip_mp3(data):
+    frames = parse_frames(data)
+    while len(frames) > 1 and frames[-1].silent:
+        frames.pop()
+    audio = data[frames[0].offset:frames[-1].offset + frames[-1].size]
+    duration = sum(frame.samples / frame.sample_rate for frame in frames)
+    return audio, duration
+
+
+# 用ffmpeg把音效重新编码成较低码率，没有ffmpeg时返回None
+def reencode(path, bitrate=REENCODE_BITRATE):
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        return None
+    with tempfile.TemporaryDirectory() as workdir:
+        output = os.path.join(workdir, 'out.mp3')
+        subprocess.run([ffmpeg, '-v', 'error', '-i', path, '-map_metadata', '-1', '-codec:a', 'libmp3lame',
+                        '-b:a', bitrate, output], check=True)
+        with open(output, 'rb') as f:
+            return f.read()
+
+
+# 打包音效，返回 (精灵文件内容, {元素ID: {'offset', 'length', 'duration'}})
+def build_sprite(sound_dir=SOUND_DIR, sounds=SOUNDS, bitrate=None):
+    parts = []
+    clips = {}
+    seen = {}  # {内容哈希: 片段信息}
+    offset = 0
+    for name, filename in sounds.items():
+        path = os.path.join(sound_dir, filename)
+        with open(path, 'rb') as f:
+            data = f.read()
+        if bitrate:
+            smaller = reencode(path, bitrate)
+            if smaller is not None and len(smaller) < len(data):
+                data = smaller
+        audio, duration = strip_mp3(data)
+        digest = hashlib.sha1(audio).hexdigest()
+        if digest not in seen:
+            seen[digest] = {'offset': offset, 'length': len(audio), 'duration': round(duration, 3)}
+            parts.append(audio)
+            offset += len(audio)
+        clips[name] = dict(seen[digest])
+    return b''.join(parts), clips
+
+
+def sources_size(sound_dir=SOUND_DIR, sounds=SOUNDS):
+    return sum(os.path.getsize(os.path.join(sound_dir, filename)) for filename in sounds.values())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='把shengyin/中的音效打包成一个音频精灵文件')
+    parser.add_argument('--output', default=os.path.join(SOUND_DIR, 'sprite.mp3'), help='精灵文件输出路径')
+    parser.add_argument('--bitrate', help=f'先用ffmpeg重新编码（例如 {REENCODE_BITRATE}），没有ffmpeg时忽略')
+    args = parser.parse_args()
+
+    if args.bitrate and shutil.which('ffmpeg') is None:
+        print('没有找到ffmpeg，不重新编码')
+    sprite, clips = build_sprite(bitrate=args.bitrate)
+    with open(args.output, 'wb') as f:
+        f.write(sprite)
+    manifest = os.path.splitext(args.output)[0] + '.json'
+    with open(manifest, 'w', encoding='utf-8') as f:
+        json.dump(clips, f, ensure_ascii=False, indent=2)
+    for name, clip in clips.items():
+        print(f'{name:<22} 偏移 {clip["offset"]:>7}  长度 {clip["length"]:>7}  时长 {clip["duration"]:.2f}s')
+    before = sources_size()
+    print(f'{len(SOUNDS)} 个文件 {before / 1024:.1f}KB -> 1 个文件 {len(sprite) / 1024:.1f}KB')
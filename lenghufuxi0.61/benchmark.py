@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# 热点函数的微基准测试（不经过HTTP，直接调用函数和视图）
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(SCRIPT_DIR, 'benchmark_baseline.json')
+
+CATEGORIES = ['物理', '化学', '生物', '地理', '能源', '机械', '天文']
+THEMES = ['声音', '力', '光', '电', '热', '机械', '酸', '细胞', '气候', '太阳能', '行星']
+
+
+# 在临时目录中导入server，避免修改项目中的数据库文件
+def load_server(workdir):
+    # 基准测试中不记录慢查询，避免打印和EXPLAIN影响计时
+    os.environ.setdefault('LENGHU_SLOW_QUERY_MS', str(10 ** 9))
+    os.environ['LENGHU_DB'] = os.path.join(workdir, 'quiz_database.db')
+    os.chdir(workdir)
+    sys.path.insert(0, SCRIPT_DIR)
+    import server
+    return server
+
+
+def make_knowledge_points(count, seed=42):
+    rng = random.Random(seed)
+    points = []
+    for i in range(count):
+        theme = rng.choice(THEMES)
+        points.append({
+            'id': i + 1,
+            'title': f'{theme}知识点{i}',
+            'content': f'{theme}相关的知识内容{i}，' + '说明文字' * rng.randint(5, 30),
+            'category': rng.choice(CATEGORIES)
+        })
+    return points
+
+
+def fill_rankings(server, rows, users=3000, seed=42):
+    rng = random.Random(seed)
+    conn = server.get_db_connection()
+    conn.execute('DELETE FROM rankings')
+    batch = []
+    for i in range(rows):
+        batch.append((f'学生{rng.randrange(users)}', rng.randint(0, 10), rng.randint(0, 10),
+                      rng.randint(30, 600), f'2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T08:00:00'))
+        if len(batch) >= 50000:
+            conn.executemany('INSERT INTO rankings (name, score, correctCount, time, date) VALUES (?, ?, ?, ?, ?)', batch)
+            batch = []
+    if batch:
+        conn.executemany('INSERT INTO rankings (name, score, correctCount, time, date) VALUES (?, ?, ?, ?, ?)', batch)
+    conn.commit()
+    conn.close()
+
+
+# 生成大量章节、用户和权限记录，返回一个普通用户的ID
+def fill_permissions(server, users, chapters_per_course=100, permissions_per_user=20, seed=42):
+    rng = random.Random(seed)
+    conn = server.get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id FROM chapters WHERE level = 1')
+    course_ids = [row[0] for row in cursor.fetchall()]
+    cursor.executemany('INSERT INTO chapters (name, code, level, parent_id) VALUES (?, ?, 2, ?)',
+                       [(f'课程{c}-{i}', f'B-{c}-{i}', c) for c in course_ids for i in range(chapters_per_course)])
+    cursor.execute('SELECT id FROM chapters WHERE level = 2')
+    chapter_ids = [row[0] for row in cursor.fetchall()]
+    cursor.executemany('INSERT OR IGNORE INTO users (username, password, name, totalScore) VALUES (?, ?, ?, 0)',
+                       [(f'bench{i}', '123456', f'基准用户{i}') for i in range(users)])
+    cursor.execute("SELECT id FROM users WHERE username LIKE 'bench%'")
+    user_ids = [row[0] for row in cursor.fetchall()]
+    cursor.executemany('INSERT OR IGNORE INTO user_course_permissions (user_id, chapter_id) VALUES (?, ?)',
+                       [(u, c) for u in user_ids for c in rng.sample(chapter_ids, permissions_per_user)])
+    conn.commit()
+    conn.close()
+    return user_ids[len(user_ids) // 2]
+
+
+def run_case(name, func, rounds, warmup=1):
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    result = {
+        'rounds': rounds,
+        'min': min(times),
+        'max': max(times),
+        'mean': statistics.mean(times),
+        'median': statistics.median(times),
+        'stddev': statistics.stdev(times) if len(times) > 1 else 0.0
+    }
+    print(f"{name:<45} median {result['median'] * 1000:>10.3f}ms  min {result['min'] * 1000:>10.3f}ms  "
+          f"max {result['max'] * 1000:>10.3f}ms  rounds {rounds}")
+    return result
+
+
+# 每个用例为 (名称, 函数, 轮数, [准备步骤])，准备步骤包含它依赖的前置步骤，按顺序列出
+def build_cases(server, quick):
+    cases = []
+
+    for size, rounds in ((100, 50), (10000, 5), (100000, 3)):
+        if quick and size > 10000:
+            continue
+        points = make_knowledge_points(size)
+
+        def generate(points=points):
+            random.seed(0)
+            server.generate_questions_from_knowledge_points(points)
+        cases.append((f'generate_questions[{size}]', generate, rounds, []))
+
+    ranking_rows = 100000 if quick else 1000000
+
+    def setup_rankings():
+        fill_rankings(server, ranking_rows)
+
+    def rankings():
+        with server.app.test_request_context('/api/rankings'):
+            server.get_rankings()
+    cases.append((f'get_rankings[{ranking_rows}]', rankings, 5, [setup_rankings]))
+
+    # 归档后只剩最近一个月的记录在热表中（生成的记录都在2026年内）
+    def setup_rollup():
+        conn = server.get_db_connection()
+        server.rollup_rankings(conn, now=datetime(2027, 1, 1))
+        conn.close()
+    cases.append((f'get_rankings_rolled_up[{ranking_rows}]', rankings, 5, [setup_rankings, setup_rollup]))
+
+    users = 2000 if quick else 10000
+    state = {}
+
+    def setup_permissions():
+        state['user_id'] = fill_permissions(server, users)
+
+    def available_chapters():
+        with server.app.test_request_context(f"/api/user-available-chapters?user_id={state['user_id']}"):
+            server.get_user_available_chapters()
+    cases.append((f'user_available_chapters[{users * 20}]', available_chapters, 20, [setup_permissions]))
+
+    return cases
+
+
+# 与基线比较，返回变慢超过容忍度的用例
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            continue
+        ratio = result['median'] / base['median'] if base['median'] else 1.0
+        status = '变慢' if ratio > 1 + tolerance else ('变快' if ratio < 1 - tolerance else '持平')
+        print(f'{name:<45} 基线 {base["median"] * 1000:>10.3f}ms  当前 {result["median"] * 1000:>10.3f}ms  '
+              f'{ratio:>6.2f}x  {status}')
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='题目生成器和排行榜SQL的微基准测试')
+    parser.add_argument('--only', help='只运行名称包含该字符串的用例')
+    parser.add_argument('--quick', action='store_true', help='使用较小的数据规模')
+    parser.add_argument('--save', action='store_true', help='把本次结果保存为基线')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='基线文件路径')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的变慢比例，默认20%%')
+    parser.add_argument('--output', help='把本次结果另存为JSON文件')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='lenghu_bench_', ignore_cleanup_errors=True) as workdir:
+        server = load_server(workdir)
+        try:
+            results = {}
+            done = set()  # 已执行的准备步骤，多个用例共用时只执行一次
+            for name, func, rounds, setups in build_cases(server, args.quick):
+                if args.only and args.only not in name:
+                    continue
+                for setup in setups:
+                    if setup not in done:
+                        setup()
+                        done.add(setup)
+                results[name] = run_case(name, func, rounds)
+        finally:
+            # 关闭数据库连接并离开临时目录后才能删除它
+            server.db_writer.stop()
+            server.db_pool.close_all()
+            os.chdir(SCRIPT_DIR)
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'quick': args.quick,
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.save:
+        baseline = {'results': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update({key: value for key, value in report.items() if key != 'results'})
+        baseline.setdefault('results', {}).update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f'基线已保存到 {args.baseline}')
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print('\n与基线比较：')
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"性能回退：{', '.join(regressions)}")
+            sys.exit(1)
+        print('没有发现性能回退')
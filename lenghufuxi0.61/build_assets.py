@@ -0,0 +1,473 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import urllib.request
+
+from audio_sprite import build_sprite
+
+# 静态资源构建：把页面中的内联CSS/JS拆成单独的文件，压缩后按内容哈希命名，输出到dist/。
+# 带哈希的文件内容不会变，服务器可以让浏览器永久缓存（Cache-Control: immutable），
+# 页面改动后只需要重新下载HTML和变化的文件
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+DIST_DIR = os.path.join(SOURCE_DIR, 'dist')
+ASSETS_DIR = os.path.join(DIST_DIR, 'assets')
+MANIFEST_FILE = os.path.join(DIST_DIR, 'manifest.json')
+REPORT_FILE = os.path.join(DIST_DIR, 'build-report.json')
+
+# 需要构建的页面
+PAGES = ('quiz-system.html', 'edit-knowledge.html')
+
+# 页面引用的外部样式和脚本
+LINKED_ASSETS = ('quiz-style.css', 'quiz-script.js')
+
+# 本地化的socket.io客户端（教室经常没有外网），随代码一起提交；升级时用 --fetch-vendor 重新下载
+VENDOR_DIR = os.path.join(SOURCE_DIR, 'vendor')
+SOCKET_IO_URL = 'https://cdn.socket.io/4.8.1/socket.io.min.js'
+SOCKET_IO_FILE = os.path.join(VENDOR_DIR, 'socket.io.min.js')
+SOCKET_IO_SRC = 'vendor/socket.io.min.js'
+
+# service worker脚本，以及它预缓存的页面（页面外壳和音效，供断网时使用）
+SERVICE_WORKER = 'sw.js'
+OFFLINE_PAGES = ('quiz-system.html',)
+
+# 页面中的音效精灵清单占位，构建时填入精灵文件路径和各段音效的偏移
+SOUND_SPRITE_TAG = '<script id="sound-sprite" type="application/json">null</script>'
+
+# 文件名中的哈希长度
+HASH_LENGTH = 10
+
+# 估算加载时间用的网络条件（教室Wi-Fi）
+BANDWIDTH_KBPS = 2000
+RTT_MS = 50
+
+# 正则表达式字面量可能出现的位置：前一个有效字符是这些符号或关键字之后
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw',
+                  'yield', 'await', 'instanceof'}
+
+
+def _is_word(ch):
+    return ch.isalnum() or ch in '_$' or ord(ch) > 127
+
+
+# 两个片段之间去掉空白后是否会改变含义
+def _needs_space(prev, next_):
+    if _is_word(prev) and _is_word(next_):
+        return True
+    if prev == next_ and prev in '+-':
+        return True
+    if prev.isdigit() and next_ == '.':
+        return True
+    return prev == '/' or next_ == '/'
+
+
+# 保守的JS压缩：去掉注释和多余空白，保留换行（不改变自动分号插入的结果），
+# 字符串、模板字符串和正则表达式原样保留
+def minify_js(source):
+    out = []
+    i = 0
+    n = len(source)
+    pending = ''  # 待输出的空白：''、' '或'\n'
+    last_word = ''  # 最近一个标识符，用于判断'/'是否开始正则
+    templates = []  # 模板字符串中${...}的花括号深度
+
+    def emit(text):
+        nonlocal pending
+        if pending and out:
+            prev = out[-1][-1]
+            if pending == '\n':
+                out.append('\n')
+            elif _needs_space(prev, text[0]):
+                out.append(' ')
+        pending = ''
+        out.append(text)
+
+    def last_char():
+        for chunk in reversed(out):
+            stripped = chunk.rstrip()
+            if stripped:
+                return stripped[-1]
+        return ''
+
+    def read_template(start):
+        # 从反引号或'}'之后读到下一个反引号或'${'
+        j = start
+        while j < n:
+            if source[j] == '\\':
+                j += 2
+                continue
+            if source[j] == '`':
+                return j + 1, False
+            if source.startswith('${', j):
+                return j + 2, True
+            j += 1
+        return n, False
+
+    while i < n:
+        ch = source[i]
+        if ch in ' \t\r\n':
+            j = i
+            while j < n and source[j] in ' \t\r\n':
+                j += 1
+            if '\n' in source[i:j]:
+                pending = '\n'
+            elif pending != '\n':
+                pending = ' '
+            i = j
+            continue
+        if source.startswith('//', i):
+            j = source.find('\n', i)
+            i = n if j == -1 else j
+            continue
+        if source.startswith('/*', i):
+            j = source.find('*/', i + 2)
+            end = n if j == -1 else j + 2
+            if pending != '\n':
+                pending = '\n' if '\n' in source[i:end] else ' '
+            i = end
+            continue
+        if ch in '\'"':
+            j = i + 1
+            while j < n and source[j] != ch:
+                if source[j] == '\\':
+                    j += 1
+                elif source[j] == '\n':
+                    break
+                j += 1
+            emit(source[i:j + 1])
+            last_word = ''
+            i = j + 1
+            continue
+        if ch == '`':
+            end, opened = read_template(i + 1)
+            emit(source[i:end])
+            if opened:
+                templates.append(0)
+            last_word = ''
+            i = end
+            continue
+        if templates and ch == '{':
+            templates[-1] += 1
+        if templates and ch == '}':
+            if templates[-1] == 0:
+                templates.pop()
+                end, opened = read_template(i + 1)
+                emit(source[i:end])
+                if opened:
+                    templates.append(0)
+                last_word = ''
+                i = end
+                continue
+            templates[-1] -= 1
+        if ch == '/':
+            prev = last_char()
+            if not prev or prev in REGEX_PRECEDERS or last_word in REGEX_KEYWORDS:
+                j = i + 1
+                in_class = False
+                while j < n and source[j] != '\n':
+                    c = source[j]
+                    if c == '\\':
+                        j += 2
+                        continue
+                    if c == '[':
+                        in_class = True
+                    elif c == ']':
+                        in_class = False
+                    elif c == '/' and not in_class:
+                        break
+                    j += 1
+                j += 1
+                while j < n and _is_word(source[j]):
+                    j += 1  # 标志位
+                emit(source[i:j])
+                last_word = ''
+                i = j
+                continue
+        if _is_word(ch):
+            j = i
+            while j < n and _is_word(source[j]):
+                j += 1
+            last_word = source[i:j]
+            emit(last_word)
+            i = j
+            continue
+        emit(ch)
+        last_word = ''
+        i += 1
+    return ''.join(out).strip() + '\n'
+
+
+# CSS压缩：去掉注释和多余空白，字符串原样保留
+def minify_css(source):
+    parts = re.split(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', source)
+    out = []
+    for index, part in enumerate(parts):
+        if index % 2:
+            out.append(part)
+            continue
+        part = re.sub(r'/\*.*?\*/', '', part, flags=re.S)
+        part = re.sub(r'\s+', ' ', part)
+        part = re.sub(r'\s*([{};,>])\s*', r'\1', part)
+        part = re.sub(r':\s+', ':', part)
+        part = part.replace(';}', '}')
+        out.append(part)
+    return ''.join(out).strip() + '\n'
+
+
+# HTML只去掉行首缩进和空行（textarea、pre中的内容不动）
+def minify_html(source):
+    out = []
+    preserve = False
+    for line in source.splitlines():
+        stripped = line.strip()
+        if preserve:
+            out.append(line)
+        elif stripped:
+            out.append(stripped)
+        if re.search(r'<(textarea|pre)\b', line) and not re.search(r'</(textarea|pre)>', line):
+            preserve = True
+        elif preserve and re.search(r'</(textarea|pre)>', line):
+            preserve = False
+    return '\n'.join(out) + '\n'
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def gzip_size(data):
+    return len(gzip.compress(data, 9))
+
+
+class Build:
+    def __init__(self, dist_dir=DIST_DIR):
+        self.dist_dir = dist_dir
+        self.assets_dir = os.path.join(dist_dir, 'assets')
+        self.manifest = {}  # {逻辑名称: assets/带哈希的文件名}
+        self.sound_clips = {}  # {音频元素ID: 在音效精灵中的偏移}
+
+    # 写出一个带哈希的资源文件，返回页面中引用的路径
+    def emit_asset(self, name, data):
+        stem, ext = os.path.splitext(name)
+        if stem.endswith('.min'):
+            stem, ext = stem[:-4], '.min' + ext
+        filename = f'{stem}.{content_hash(data)}{ext}'
+        with open(os.path.join(self.assets_dir, filename), 'wb') as f:
+            f.write(data)
+        self.manifest[name] = f'assets/{filename}'
+        return self.manifest[name]
+
+    def linked_asset(self, name):
+        if name not in self.manifest:
+            with open(os.path.join(SOURCE_DIR, name), encoding='utf-8') as f:
+                source = f.read()
+            minified = minify_css(source) if name.endswith('.css') else minify_js(source)
+            self.emit_asset(name, minified.encode('utf-8'))
+        return self.manifest[name]
+
+    # 缺少本地的socket.io客户端时构建失败，不能输出依赖CDN的页面
+    def vendor_socket_io(self):
+        if 'socket.io.min.js' not in self.manifest:
+            if not os.path.exists(SOCKET_IO_FILE):
+                raise FileNotFoundError(f'没有找到 {os.path.relpath(SOCKET_IO_FILE, SOURCE_DIR)}，'
+                                        f'运行 python build_assets.py --fetch-vendor 下载')
+            with open(SOCKET_IO_FILE, 'rb') as f:
+                self.emit_asset('socket.io.min.js', f.read())
+        return self.manifest['socket.io.min.js']
+
+    # 音效打包成一个精灵文件，返回 (路径, 各段音效的偏移)
+    def sound_sprite(self):
+        if 'sounds.mp3' not in self.manifest:
+            data, self.sound_clips = build_sprite()
+            self.emit_asset('sounds.mp3', data)
+        return self.manifest['sounds.mp3'], self.sound_clips
+
+    def build_page(self, page):
+        with open(os.path.join(SOURCE_DIR, page), encoding='utf-8') as f:
+            html = f.read()
+        stem = os.path.splitext(page)[0]
+        warnings = []
+
+        # 内联样式和脚本合并成一个文件
+        styles = re.findall(r'<style[^>]*>(.*?)</style>', html, flags=re.S)
+        if styles:
+            href = self.emit_asset(f'{stem}.css', minify_css('\n'.join(styles)).encode('utf-8'))
+            html = re.sub(r'\s*<style[^>]*>.*?</style>', '', html, flags=re.S)
+            html = html.replace('</head>', f'    <link rel="stylesheet" href="{href}">\n</head>', 1)
+        scripts = re.findall(r'<script>(.*?)</script>', html, flags=re.S)
+        if scripts:
+            src = self.emit_asset(f'{stem}.js', minify_js(';\n'.join(scripts)).encode('utf-8'))
+            # 第一个内联脚本的位置换成外部脚本，其余的删除
+            html = re.sub(r'<script>.*?</script>', lambda m: f'<script src="{src}"></script>', html, count=1,
+                          flags=re.S)
+            html = re.sub(r'\s*<script>.*?</script>', '', html, flags=re.S)
+
+        # 外部样式和脚本换成带哈希的文件
+        for name in LINKED_ASSETS:
+            pattern = r'(href|src)="%s(\?[^"]*)?"' % re.escape(name)
+            if re.search(pattern, html):
+                path = self.linked_asset(name)
+                html = re.sub(pattern, lambda m: f'{m.group(1)}="{path}"', html)
+
+        # 音效改为预加载一个精灵文件，<audio>元素只在精灵不可用时才下载
+        if SOUND_SPRITE_TAG in html:
+            url, clips = self.sound_sprite()
+            config = json.dumps({'url': url, 'clips': clips}, separators=(',', ':'))
+            html = html.replace(SOUND_SPRITE_TAG, SOUND_SPRITE_TAG.replace('null', config))
+            html = html.replace('</head>', f'    <link rel="preload" href="{url}" as="fetch" crossorigin>\n</head>', 1)
+            for element_id in clips:
+                html = re.sub(r'(<audio id="%s"[^>]*)preload="auto"' % re.escape(element_id), r'\1preload="none"',
+                              html)
+
+        # 本地的socket.io客户端换成带哈希的文件（CDN地址也换掉，页面不依赖外网）
+        for src in (SOCKET_IO_SRC, SOCKET_IO_URL):
+            if f'src="{src}"' in html:
+                html = html.replace(f'src="{src}"', f'src="{self.vendor_socket_io()}"')
+
+        with open(os.path.join(self.dist_dir, page), 'w', encoding='utf-8') as f:
+            f.write(minify_html(html))
+        return warnings
+
+    # 把dist/中页面引用的本地资源写入service worker的预缓存列表，缓存版本随这些文件的内容变化
+    def build_service_worker(self, pages=OFFLINE_PAGES):
+        with open(os.path.join(SOURCE_DIR, SERVICE_WORKER), encoding='utf-8') as f:
+            source = f.read()
+        urls = ['/']
+        digest = hashlib.sha256(source.encode('utf-8'))
+        for page in pages:
+            for path in page_resources(self.dist_dir, page)[0]:
+                if f'/{path}' in urls:
+                    continue
+                urls.append(f'/{path}')
+                with open(os.path.join(self.dist_dir, path), 'rb') as f:
+                    digest.update(f.read())
+        version = digest.hexdigest()[:HASH_LENGTH]
+        source = re.sub(r"const CACHE_VERSION = '[^']*';", lambda m: f"const CACHE_VERSION = '{version}';", source)
+        source = re.sub(r'const PRECACHE_URLS = \[.*?\];', lambda m: f'const PRECACHE_URLS = {json.dumps(urls)};',
+                        source, flags=re.S)
+        with open(os.path.join(self.dist_dir, SERVICE_WORKER), 'w', encoding='utf-8') as f:
+            f.write(minify_js(source))
+        return urls
+
+    def run(self, pages=PAGES):
+        if os.path.isdir(self.dist_dir):
+            shutil.rmtree(self.dist_dir)
+        os.makedirs(self.assets_dir)
+        warnings = []
+        for page in pages:
+            warnings += self.build_page(page)
+        # 没有页面引用的独立脚本也输出，供其他页面按manifest引用
+        for name in LINKED_ASSETS:
+            self.linked_asset(name)
+        self.build_service_worker([page for page in OFFLINE_PAGES if page in pages])
+        with open(os.path.join(self.dist_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        return warnings
+
+
+# 页面及其引用的本地样式、脚本和音频（外部URL只计请求数）
+def page_resources(directory, page):
+    with open(os.path.join(directory, page), encoding='utf-8') as f:
+        html = f.read()
+    local, remote = [page], []
+    for ref in re.findall(r'<(?:link[^>]+href|script[^>]+src)="([^"]+)"', html):
+        if re.match(r'https?://', ref):
+            remote.append(ref)
+        else:
+            local.append(ref.split('?')[0])
+    # 没有设置preload="none"的<audio>元素在页面加载时就下载第一个音源（其余为备用）
+    for attrs, body in re.findall(r'<audio([^>]*)>(.*?)</audio>', html, flags=re.S):
+        sources = re.findall(r'<source[^>]+src="([^"]+)"', body)
+        if sources and 'preload="none"' not in attrs:
+            (remote if re.match(r'https?://', sources[0]) else local).append(sources[0])
+    return local, remote
+
+
+# 统计页面重量，并按带宽和往返时间估算首次和再次访问的加载时间
+def measure_page(directory, page, cached_assets, bandwidth_kbps=BANDWIDTH_KBPS, rtt_ms=RTT_MS):
+    local, remote = page_resources(directory, page)
+    files = []
+    for path in local:
+        with open(os.path.join(directory, path), 'rb') as f:
+            data = f.read()
+        files.append({'path': path, 'bytes': len(data), 'gzip_bytes': gzip_size(data)})
+
+    def load(entries, requests):
+        transfer = sum(entry['gzip_bytes'] for entry in entries)
+        # HTML之后的资源并行下载，按两轮往返估算
+        rounds = 1 + (1 if requests > 1 else 0)
+        return transfer, round(rounds * rtt_ms + transfer * 8 / bandwidth_kbps, 1)
+
+    first_bytes, first_ms = load(files, len(files) + len(remote))
+    # 再次访问：带哈希的资源直接用缓存，其余的资源要重新请求（至少一次条件请求往返）
+    revalidated = [entry for entry in files if not (cached_assets and entry['path'].startswith('assets/'))]
+    repeat_bytes, repeat_ms = load(revalidated, len(revalidated) + len(remote))
+    return {
+        'files': files,
+        'external': remote,
+        'requests': len(files) + len(remote),
+        'bytes': sum(entry['bytes'] for entry in files),
+        'gzip_bytes': first_bytes,
+        'first_load_ms': first_ms,
+        'repeat_requests': len(revalidated) + len(remote),
+        'repeat_gzip_bytes': repeat_bytes,
+        'repeat_load_ms': repeat_ms
+    }
+
+
+def report(pages=PAGES, dist_dir=DIST_DIR, bandwidth_kbps=BANDWIDTH_KBPS, rtt_ms=RTT_MS):
+    result = {'bandwidth_kbps': bandwidth_kbps, 'rtt_ms': rtt_ms, 'pages': {}}
+    for page in pages:
+        result['pages'][page] = {
+            'before': measure_page(SOURCE_DIR, page, False, bandwidth_kbps, rtt_ms),
+            'after': measure_page(dist_dir, page, True, bandwidth_kbps, rtt_ms)
+        }
+    return result
+
+
+def print_report(result):
+    print(f"估算条件：带宽 {result['bandwidth_kbps']}kbps，往返 {result['rtt_ms']}ms（外部CDN资源不计大小）")
+    for page, sides in result['pages'].items():
+        print(f'\n{page}')
+        for label, key in (('构建前', 'before'), ('构建后', 'after')):
+            m = sides[key]
+            print(f"  {label}  请求 {m['requests']:>2}  原始 {m['bytes'] / 1024:>7.1f}KB  gzip {m['gzip_bytes'] / 1024:>6.1f}KB  "
+                  f"首次 {m['first_load_ms']:>7.1f}ms  再次 {m['repeat_gzip_bytes'] / 1024:>6.1f}KB "
+                  f"{m['repeat_load_ms']:>7.1f}ms")
+
+
+def fetch_vendor():
+    os.makedirs(VENDOR_DIR, exist_ok=True)
+    with urllib.request.urlopen(SOCKET_IO_URL, timeout=30) as response:
+        data = response.read()
+    with open(SOCKET_IO_FILE, 'wb') as f:
+        f.write(data)
+    print(f'已下载 {SOCKET_IO_URL} -> {os.path.relpath(SOCKET_IO_FILE, SOURCE_DIR)}（{len(data)} 字节）')
+
+
+# 命令行入口
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='构建带内容哈希的压缩静态资源，输出到dist/')
+    parser.add_argument('--fetch-vendor', action='store_true', help='先下载socket.io客户端到vendor/')
+    parser.add_argument('--bandwidth-kbps', type=int, default=BANDWIDTH_KBPS, help='估算加载时间用的带宽')
+    parser.add_argument('--rtt-ms', type=int, default=RTT_MS, help='估算加载时间用的往返时间')
+    args = parser.parse_args()
+
+    if args.fetch_vendor:
+        fetch_vendor()
+    build = Build()
+    for warning in build.run():
+        print(f'警告: {warning}', file=sys.stderr)
+    result = report(bandwidth_kbps=args.bandwidth_kbps, rtt_ms=args.rtt_ms)
+    with open(REPORT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f'已生成 {len(build.manifest)} 个资源文件:')
+    for name, path in build.manifest.items():
+        print(f'  {name} -> dist/{path}')
+    print_report(result)
@@ -0,0 +1,32 @@
+import argparse
+import os
+
+# 数据库文件路径的统一配置：服务器和所有脚本都从这里取路径，
+# 优先级为 命令行 --db > 环境变量 LENGHU_DB > 程序目录下的 quiz_database.db
+
+DB_ENV = 'LENGHU_DB'
+
+DEFAULT_DB_NAME = 'quiz_database.db'
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def db_path(path=None):
+    return os.path.abspath(path or os.environ.get(DB_ENV) or os.path.join(BASE_DIR, DEFAULT_DB_NAME))
+
+
+# 不带 --db 参数时使用的路径
+DB_FILE = db_path()
+
+
+def add_db_argument(parser):
+    parser.add_argument('--db', default=DB_FILE, type=db_path,
+                        help=f'数据库文件路径（默认取环境变量{DB_ENV}，否则为程序目录下的{DEFAULT_DB_NAME}）')
+
+
+# 在完整解析命令行之前取出 --db（服务器导入时就要打开数据库），没有时返回None
+def cli_db_path(argv=None):
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--db')
+    args, _ = parser.parse_known_args(argv)
+    return args.db
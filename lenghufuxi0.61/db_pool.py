@@ -0,0 +1,113 @@
+import pathlib
+import sqlite3
+import threading
+
+from sql_profiler import TimedConnection, get_statement_cache_stats
+
+# 数据库连接池：连接在请求之间复用，连接上的预编译语句缓存也随之保留
+
+# 池中保留的空闲连接数，超出的连接在归还时直接关闭
+POOL_SIZE = 16
+
+# 每个连接缓存的预编译语句数（sqlite3默认128）
+STATEMENT_CACHE_SIZE = 512
+
+# 等待数据库锁的时间（秒）
+BUSY_TIMEOUT = 10.0
+
+
+# close()时归还到连接池，而不是真正关闭
+class PooledConnection(TimedConnection):
+    pool = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            super().close()
+
+    def close_connection(self):
+        super().close()
+
+
+class ConnectionPool:
+    def __init__(self, database, size=POOL_SIZE, cached_statements=STATEMENT_CACHE_SIZE, readonly=False,
+                 timeout=BUSY_TIMEOUT):
+        self.database = database
+        self.size = size
+        self.cached_statements = cached_statements
+        self.readonly = readonly  # 只读连接（mode=ro），写操作会报attempt to write a readonly database
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.idle = []
+        self.created = 0
+        self.reused = 0
+
+    def _connect(self):
+        if self.readonly:
+            database, uri = pathlib.Path(self.database).absolute().as_uri() + '?mode=ro', True
+        else:
+            database, uri = self.database, False
+        conn = sqlite3.connect(database, factory=PooledConnection, check_same_thread=False, uri=uri,
+                               timeout=self.timeout, cached_statements=self.cached_statements)
+        conn.statement_cache_size = self.cached_statements
+        conn.pool = self
+        with self.lock:
+            self.created += 1
+        return conn
+
+    def acquire(self):
+        with self.lock:
+            if self.idle:
+                self.reused += 1
+                conn = self.idle.pop()
+            else:
+                conn = None
+        if conn is None:
+            conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # 归还连接：未提交的修改回滚（与关闭连接时的行为相同）
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close_connection()
+            return
+        with self.lock:
+            if len(self.idle) < self.size and conn not in self.idle:
+                self.idle.append(conn)
+                return
+        if conn not in self.idle:
+            conn.close_connection()
+
+    def close_all(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn in idle:
+            conn.close_connection()
+
+    def stats(self):
+        with self.lock:
+            return {'size': self.size, 'idle': len(self.idle), 'created': self.created, 'reused': self.reused,
+                    'cached_statements': self.cached_statements, 'readonly': self.readonly}
+
+    # 供/metrics输出的指标
+    def collect_metrics(self):
+        stats = self.stats()
+        cache = get_statement_cache_stats()
+        return [
+            '# HELP lenghu_db_pool_connections 连接池中的连接数',
+            '# TYPE lenghu_db_pool_connections gauge',
+            f'lenghu_db_pool_connections{{state="idle"}} {stats["idle"]}',
+            '# HELP lenghu_db_pool_connections_total 连接池新建和复用连接的次数',
+            '# TYPE lenghu_db_pool_connections_total counter',
+            f'lenghu_db_pool_connections_total{{result="created"}} {stats["created"]}',
+            f'lenghu_db_pool_connections_total{{result="reused"}} {stats["reused"]}',
+            '# HELP lenghu_sql_statement_cache_total 预编译语句缓存的命中和未命中次数（估算：按每个连接的LRU模拟）',
+            '# TYPE lenghu_sql_statement_cache_total counter',
+            f'lenghu_sql_statement_cache_total{{result="hit"}} {cache["hits"]}',
+            f'lenghu_sql_statement_cache_total{{result="miss"}} {cache["misses"]}'
+        ]
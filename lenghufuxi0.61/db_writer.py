@@ -0,0 +1,291 @@
+import queue
+import sqlite3
+import threading
+import time
+import traceback
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from metrics import record_sql_time, take_sql_time
+from sql_profiler import TimedConnection
+
+# 单一写线程：所有写操作排队交给同一个连接执行，不再有多个连接争抢SQLite的写锁。
+# 队列中同时等待的写操作合并到一个事务里提交，每个操作用一个保存点隔开，
+# 一个操作失败只回滚它自己；调用方通过Future等待提交完成后的结果。
+# 每个操作在写线程中的SQL耗时（提交的耗时由同一事务中的操作平分）随结果交给调用方，计入调用方请求的SQL耗时
+
+# 队列长度上限，队列满时调用方最多等待QUEUE_WAIT秒
+QUEUE_SIZE = 1000
+QUEUE_WAIT = 5.0
+
+# 每个事务最多合并的写操作数
+BATCH_SIZE = 50
+
+# 等待写锁的时间（秒），其他进程（维护脚本等）写库时不会立即报database is locked
+BUSY_TIMEOUT = 10.0
+
+# 调用方等待结果的默认时间（秒）。超时时还在排队的写操作被取消，不会再执行；
+# 已经开始执行的写操作再等同样的时间，仍未完成时它可能稍后生效
+CALL_TIMEOUT = 30.0
+
+
+class WriteQueueFull(Exception):
+    pass
+
+
+class WriteTimeout(Exception):
+    pass
+
+
+# 写线程的连接：合并事务期间commit()不生效，rollback()只回滚当前操作
+class WriterConnection(TimedConnection):
+    batching = False
+
+    def commit(self):
+        if not self.batching:
+            super().commit()
+
+    def rollback(self):
+        if self.batching:
+            self.execute('ROLLBACK TO write_task')
+        else:
+            super().rollback()
+
+    def close(self):
+        pass  # 连接由写线程持有
+
+
+class _Task:
+    def __init__(self, func, args, kwargs, exclusive):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.exclusive = exclusive  # 单独执行，可以自己提交（维护任务、批量导入等）
+        self.future = Future()
+        self.queued_at = time.perf_counter()
+        self.sql_time = 0.0
+
+
+def _execute(conn, statement, parameters):
+    return conn.execute(statement, parameters).lastrowid
+
+
+class DatabaseWriter:
+    def __init__(self, database, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE, timeout=BUSY_TIMEOUT):
+        self.database = database
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = None
+        self.conn = None
+        self.pending = []  # 取批次时多取出的单独执行的任务（或停止标记None）
+        self.lock = threading.Lock()
+        self.tasks = 0
+        self.failures = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.wait_seconds = 0.0
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self._loop, name='db-writer', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        if self.thread and self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, factory=WriterConnection, timeout=self.timeout,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # 提交一个写操作 func(conn, *args, **kwargs)，返回Future
+    def submit(self, func, *args, exclusive=False, **kwargs):
+        task = _Task(func, args, kwargs, exclusive)
+        if threading.current_thread() is self.thread:
+            # 写操作中再次调用写线程时直接执行，避免自己等待自己（SQL耗时已计入外层操作）
+            task.future.sql_time = 0.0
+            task.future.set_result(func(self.conn, *args, **kwargs))
+            return task.future
+        try:
+            self.queue.put(task, timeout=QUEUE_WAIT)
+        except queue.Full:
+            with self.lock:
+                self.rejected += 1
+            raise WriteQueueFull('服务器繁忙，请稍后重试')
+        return task.future
+
+    # 提交写操作并等待结果，写操作抛出的异常在这里重新抛出。
+    # 超时时取消还在排队的写操作，调用方可以放心重试；已经开始执行的要等它完成，结果才确定
+    def call(self, func, *args, exclusive=False, timeout=CALL_TIMEOUT, **kwargs):
+        future = self.submit(func, *args, exclusive=exclusive, **kwargs)
+        try:
+            try:
+                return future.result(timeout)
+            except FutureTimeout:
+                if future.cancel():
+                    raise WriteTimeout('服务器繁忙，写操作排队超时，已取消（没有写入），请稍后重试')
+            try:
+                return future.result(timeout)
+            except FutureTimeout:
+                raise WriteTimeout('写操作执行超时，可能稍后仍会生效，请先刷新确认再决定是否重试')
+        finally:
+            record_sql_time(getattr(future, 'sql_time', 0.0))
+
+    # 执行一条写语句，返回新插入行的ID
+    def execute(self, statement, parameters=()):
+        return self.call(_execute, statement, parameters)
+
+    # 取出下一批连续的普通写操作；返回None表示停止
+    def _next_batch(self):
+        task = self.pending.pop() if self.pending else self.queue.get()
+        if task is None or task.exclusive:
+            return task and [task]
+        batch = [task]
+        while len(batch) < self.batch_size:
+            try:
+                task = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if task is None or task.exclusive:
+                self.pending.append(task)
+                break
+            batch.append(task)
+        return batch
+
+    def _loop(self):
+        self.conn = self._connect()
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                sqlite3.Connection.close(self.conn)
+                return
+            started = time.perf_counter()
+            if batch[0].exclusive:
+                outcomes = self._run_exclusive(batch[0])
+            else:
+                outcomes = self._run_batch(batch)
+            if not outcomes:
+                continue  # 整批都已被调用方取消
+            with self.lock:
+                self.batches += 1
+                self.largest_batch = max(self.largest_batch, len(outcomes))
+                for task, result, error in outcomes:
+                    self.tasks += 1
+                    self.wait_seconds += started - task.queued_at
+            # 事务提交后再通知调用方
+            for task, result, error in outcomes:
+                task.future.sql_time = task.sql_time
+                if error is None:
+                    task.future.set_result(result)
+                else:
+                    with self.lock:
+                        self.failures += 1
+                    task.future.set_exception(error)
+
+    # 标记任务开始执行；调用方已经因超时取消的任务返回False，不再执行
+    def _start(self, task):
+        if task.future.set_running_or_notify_cancel():
+            return True
+        with self.lock:
+            self.cancelled += 1
+        return False
+
+    def _run_exclusive(self, task):
+        conn = self.conn
+        if not self._start(task):
+            return []
+        take_sql_time()
+        try:
+            result = task.func(conn, *task.args, **task.kwargs)
+            if conn.in_transaction:
+                self._timed_commit()
+            return [(task, result, None)]
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            return [(task, None, e)]
+        finally:
+            task.sql_time = take_sql_time()
+
+    def _timed_commit(self):
+        started = time.perf_counter()
+        self.conn.commit()
+        record_sql_time(time.perf_counter() - started)
+
+    def _run_batch(self, batch):
+        conn = self.conn
+        outcomes = []
+        batch = [task for task in batch if self._start(task)]
+        if not batch:
+            return outcomes
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.batching = True
+            for task in batch:
+                conn.execute('SAVEPOINT write_task')
+                take_sql_time()
+                try:
+                    result = task.func(conn, *task.args, **task.kwargs)
+                except Exception as e:
+                    conn.execute('ROLLBACK TO write_task')
+                    outcomes.append((task, None, e))
+                else:
+                    outcomes.append((task, result, None))
+                task.sql_time = take_sql_time()
+                conn.execute('RELEASE write_task')
+            conn.batching = False
+            take_sql_time()
+            self._timed_commit()
+            commit_time = take_sql_time() / len(batch)
+            for task in batch:
+                task.sql_time += commit_time
+            return outcomes
+        except sqlite3.Error as e:
+            # 整个事务失败（磁盘已满、锁等待超时等），所有操作都不生效
+            conn.batching = False
+            print(f'写事务失败:\n{traceback.format_exc()}')
+            if conn.in_transaction:
+                conn.rollback()
+            return [(task, None, e) for task in batch]
+
+    def stats(self):
+        with self.lock:
+            return {
+                'queued': self.queue.qsize(),
+                'tasks': self.tasks,
+                'failures': self.failures,
+                'batches': self.batches,
+                'largest_batch': self.largest_batch,
+                'rejected': self.rejected,
+                'cancelled': self.cancelled,
+                'avg_wait_ms': round(self.wait_seconds / self.tasks * 1000, 3) if self.tasks else 0.0
+            }
+
+    # 供/metrics输出的指标
+    def collect_metrics(self):
+        stats = self.stats()
+        with self.lock:
+            wait_seconds = self.wait_seconds
+        return [
+            '# HELP lenghu_db_write_queue_length 等待写线程执行的写操作数',
+            '# TYPE lenghu_db_write_queue_length gauge',
+            f'lenghu_db_write_queue_length {stats["queued"]}',
+            '# HELP lenghu_db_writes_total 写线程执行的写操作数',
+            '# TYPE lenghu_db_writes_total counter',
+            f'lenghu_db_writes_total{{status="success"}} {stats["tasks"] - stats["failures"]}',
+            f'lenghu_db_writes_total{{status="error"}} {stats["failures"]}',
+            f'lenghu_db_writes_total{{status="rejected"}} {stats["rejected"]}',
+            f'lenghu_db_writes_total{{status="cancelled"}} {stats["cancelled"]}',
+            '# HELP lenghu_db_write_transactions_total 写线程提交的事务数',
+            '# TYPE lenghu_db_write_transactions_total counter',
+            f'lenghu_db_write_transactions_total {stats["batches"]}',
+            '# HELP lenghu_db_write_wait_seconds_total 写操作在队列中等待的累计时间',
+            '# TYPE lenghu_db_write_wait_seconds_total counter',
+            f'lenghu_db_write_wait_seconds_total {wait_seconds!r}'
+        ]
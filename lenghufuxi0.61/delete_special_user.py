@@ -1,7 +1,14 @@
+import argparse
 import sqlite3
 
+from db_config import add_db_argument
+
+parser = argparse.ArgumentParser(description='删除名字中带?的用户')
+add_db_argument(parser)
+args = parser.parse_args()
+
 # 连接数据库
-conn = sqlite3.connect('quiz_database.db')
+conn = sqlite3.connect(args.db)
 cursor = conn.cursor()
 
 # 删除用户名为????的用户
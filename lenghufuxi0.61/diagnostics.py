@@ -0,0 +1,349 @@
+import argparse
+import json
+import os
+import pathlib
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+import statements
+from rankings_archive import ANONYMOUS_NAME, HOT_DAYS
+from db_config import DB_FILE, add_db_argument
+from knowledge_shards import KnowledgeShards, SCHEMA_PREFIX, attached_shards, knowledge_source
+
+# 数据库诊断：以只读方式检查服务器使用的数据库，替代原来的check_*.py脚本。
+# 所有检查都在SQL中计数，只取少量样例，内存占用与表的大小无关；--json 输出供定时任务使用，
+# 有error级别的问题时退出码为1
+
+# 每项问题最多列出的样例数
+SAMPLE_LIMIT = 10
+
+# 全表扫描的表超过这个行数时报警告
+SCAN_WARN_ROWS = 1000
+
+# 空闲页超过总页数的比例时建议VACUUM
+FREELIST_WARN_RATIO = 0.25
+
+# 引用关系：(表, 列, 被引用的表)。knowledge.chapter_id是后加的列，没有外键约束
+REFERENCES = (
+    ('knowledge', 'chapter_id', 'chapters'),
+    ('chapters', 'parent_id', 'chapters'),
+    ('user_course_permissions', 'user_id', 'users'),
+    ('user_course_permissions', 'chapter_id', 'chapters'),
+    ('user_quiz_times', 'user_id', 'users'),
+    ('user_quiz_times', 'chapter_id', 'chapters'),
+    ('pk_challenges', 'challenger_id', 'users'),
+    ('pk_challenges', 'opponent_id', 'users'),
+    ('boss_challenges', 'creator_id', 'users'),
+    ('boss_participants', 'boss_id', 'boss_challenges'),
+    ('boss_participants', 'user_id', 'users'),
+    ('knowledge_mastery', 'user_id', 'users'),
+    ('knowledge_mastery', 'knowledge_id', 'knowledge')
+)
+
+# 检查结果的级别，按严重程度排列
+LEVELS = ('ok', 'warning', 'error')
+
+
+def connect(path):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f'数据库文件不存在: {path}')
+    uri = pathlib.Path(path).absolute().as_uri() + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True)
+    # 按课程拆分出去的知识点库一并检查
+    KnowledgeShards(path).view(conn.cursor())
+    return conn
+
+
+def _tables(cursor):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _columns(cursor, table):
+    cursor.execute(f'PRAGMA table_info({table})')
+    return [row[1] for row in cursor.fetchall()]
+
+
+def _count(cursor, query, params=()):
+    cursor.execute(query, params)
+    return cursor.fetchone()[0]
+
+
+def _worst(levels):
+    return max(levels, key=LEVELS.index, default='ok')
+
+
+# SQLite自身的完整性检查（quick_check不检查索引内容与表是否一致，速度快得多）
+def check_integrity(cursor, sample_limit=SAMPLE_LIMIT):
+    cursor.execute(f'PRAGMA quick_check({sample_limit})')
+    messages = [row[0] for row in cursor]
+    ok = messages == ['ok']
+    return {'status': 'ok' if ok else 'error', 'messages': [] if ok else messages}
+
+
+# 引用完整性：引用列不为空、被引用的行却不存在
+def check_references(cursor, sample_limit=SAMPLE_LIMIT):
+    tables = set(_tables(cursor))
+    checks = [(table, column, parent) for table, column, parent in REFERENCES
+              if table in tables and parent in tables and column in _columns(cursor, table)]
+    # 分片中的知识点同样引用主库的章节；引用知识点的表要在所有库中查找
+    checks += [(f'{schema}.knowledge', 'chapter_id', 'chapters') for schema in attached_shards(cursor)]
+    knowledge = knowledge_source(cursor)
+    results = []
+    for table, column, parent in checks:
+        orphan_sql = f'''
+            FROM {table} t LEFT JOIN {knowledge if parent == 'knowledge' else parent} p ON p.id = t.{column}
+            WHERE t.{column} IS NOT NULL AND p.id IS NULL
+        '''
+        orphans = _count(cursor, f'SELECT COUNT(*) {orphan_sql}')
+        result = {'table': table, 'column': column, 'references': parent, 'orphans': orphans}
+        if orphans:
+            cursor.execute(f'SELECT DISTINCT t.{column} {orphan_sql} LIMIT ?', (sample_limit,))
+            result['missing_ids'] = [row[0] for row in cursor]
+        results.append(result)
+    return {'status': 'error' if any(r['orphans'] for r in results) else 'ok', 'references': results}
+
+
+# 各表的行数和占用空间（SQLite编译了dbstat时才有字节数）
+def check_sizes(cursor):
+    page_size = _count(cursor, 'PRAGMA page_size')
+    page_count = _count(cursor, 'PRAGMA page_count')
+    freelist = _count(cursor, 'PRAGMA freelist_count')
+    try:
+        cursor.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name')
+        table_bytes = dict(cursor.fetchall())
+    except sqlite3.Error:
+        table_bytes = {}
+    tables = [{'table': table, 'rows': _count(cursor, f'SELECT COUNT(*) FROM "{table}"'),
+               'bytes': table_bytes.get(table)} for table in _tables(cursor)]
+    ratio = freelist / page_count if page_count else 0
+    result = {
+        'status': 'warning' if ratio > FREELIST_WARN_RATIO else 'ok',
+        'file_bytes': page_size * page_count,
+        'free_bytes': page_size * freelist,
+        'tables': tables
+    }
+    shards = [{'schema': schema, 'rows': _count(cursor, f'SELECT COUNT(*) FROM {schema}.knowledge'),
+               'file_bytes': os.path.getsize(path)} for schema, path in attached_shards(cursor).items()]
+    if shards:
+        result['knowledge_shards'] = shards
+    return result
+
+
+def _indexed_columns(cursor, table):
+    # 每个索引的第一列，以及作为rowid别名的INTEGER PRIMARY KEY
+    cursor.execute(f'PRAGMA table_info({table})')
+    leading = {row[1] for row in cursor.fetchall() if row[5] == 1}
+    cursor.execute(f'PRAGMA index_list({table})')
+    for index in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f'PRAGMA index_info("{index}")')
+        columns = sorted(cursor.fetchall())
+        if columns:
+            leading.add(columns[0][2])
+    return leading
+
+
+# 索引覆盖：引用列没有以它开头的索引；登记表中的查询在大表上全表扫描
+def check_indexes(cursor, scan_warn_rows=SCAN_WARN_ROWS):
+    tables = set(_tables(cursor))
+    unindexed = []
+    for table, column, _ in REFERENCES:
+        if table in tables and column in _columns(cursor, table) and column not in _indexed_columns(cursor, table):
+            unindexed.append({'table': table, 'column': column})
+
+    scans = {}  # {表: {语句名}}
+    unprepared = []
+    for name, statement in sorted({**statements.REGISTRY, **statements.helper_statements()}.items()):
+        if name.startswith(('ENABLE_', 'CREATE_', 'ADD_')):
+            continue
+        try:
+            cursor.execute('EXPLAIN QUERY PLAN ' + statement, (None,) * statement.count('?'))
+        except sqlite3.Error as e:
+            unprepared.append({'statement': name, 'error': str(e)})
+            continue
+        for detail in [row[3] for row in cursor.fetchall()]:
+            words = detail.split()
+            # "SCAN rankings" 是全表扫描；"SCAN t USING INDEX ..." 按索引顺序读，不算
+            if len(words) >= 2 and words[0] == 'SCAN' and 'USING' not in words and words[1] in tables:
+                scans.setdefault(words[1], set()).add(name)
+    full_scans = [{'table': table, 'rows': _count(cursor, f'SELECT COUNT(*) FROM "{table}"'), 'statements': sorted(names)}
+                  for table, names in sorted(scans.items())]
+
+    level = 'warning' if unindexed or unprepared or any(s['rows'] >= scan_warn_rows for s in full_scans) else 'ok'
+    return {'status': level, 'unindexed_references': unindexed, 'full_scans': full_scans, 'unprepared': unprepared}
+
+
+# 排行榜一致性：记录字段有效；汇总表与各学期归档表的合计一致；热表中没有积压的旧记录
+def check_leaderboard(cursor, now=None, sample_limit=SAMPLE_LIMIT):
+    tables = set(_tables(cursor))
+    if 'rankings' not in tables:
+        return {'status': 'error', 'message': '没有rankings表'}
+    result = {}
+    invalid_sql = '''
+        FROM rankings
+        WHERE name IS NULL OR name = '' OR score IS NULL OR score < 0
+           OR correctCount IS NULL OR correctCount < 0 OR date IS NULL
+    '''
+    result['invalid_rows'] = _count(cursor, f'SELECT COUNT(*) {invalid_sql}')
+    if result['invalid_rows']:
+        cursor.execute(f'SELECT id {invalid_sql} LIMIT ?', (sample_limit,))
+        result['invalid_ids'] = [row[0] for row in cursor]
+    result['anonymous_rows'] = _count(cursor, 'SELECT COUNT(*) FROM rankings WHERE name = ?', (ANONYMOUS_NAME,))
+
+    # 归档任务没有按时运行时，热表里会留下超过保留期的记录
+    now = now or datetime.now()
+    cutoff = (now - timedelta(days=HOT_DAYS + 1)).isoformat()
+    result['stale_hot_rows'] = _count(cursor, 'SELECT COUNT(*) FROM rankings WHERE date < ?', (cutoff,))
+
+    levels = ['error' if result['invalid_rows'] else 'ok', 'warning' if result['stale_hot_rows'] else 'ok']
+    if 'rankings_summary' in tables:
+        archives = sorted(table for table in tables if table.startswith('rankings_archive_'))
+        archived = ' UNION ALL '.join(f'SELECT name, score FROM {table}' for table in archives) \
+            or 'SELECT NULL AS name, NULL AS score WHERE 0'
+        mismatch_sql = f'''
+            FROM (
+                SELECT name, SUM(total) AS archived_score, SUM(quizzes) AS archived_count,
+                       SUM(summary_score) AS summary_score, SUM(summary_count) AS summary_count
+                FROM (
+                    SELECT name, score AS total, 1 AS quizzes, 0 AS summary_score, 0 AS summary_count
+                    FROM ({archived}) WHERE name != ?
+                    UNION ALL
+                    SELECT name, 0, 0, total_score, quiz_count FROM rankings_summary
+                )
+                GROUP BY name
+            )
+            WHERE archived_score != summary_score OR archived_count != summary_count
+        '''
+        result['archive_tables'] = len(archives)
+        result['summary_mismatches'] = _count(cursor, f'SELECT COUNT(*) {mismatch_sql}', (ANONYMOUS_NAME,))
+        if result['summary_mismatches']:
+            cursor.execute(f'''
+                SELECT name, archived_score, summary_score, archived_count, summary_count {mismatch_sql} LIMIT ?
+            ''', (ANONYMOUS_NAME, sample_limit))
+            columns = [column[0] for column in cursor.description]
+            result['mismatched'] = [dict(zip(columns, row)) for row in cursor]
+        levels.append('error' if result['summary_mismatches'] else 'ok')
+    result['status'] = _worst(levels)
+    return result
+
+
+# 知识点分片：课程拆分后仍留在主库、或不在所属课程分片中的知识点（按章节出题时查不到）
+def check_shards(cursor, sample_limit=SAMPLE_LIMIT):
+    shards = {int(schema[len(SCHEMA_PREFIX):]): schema for schema in attached_shards(cursor)}
+    if not shards:
+        return {'status': 'ok', 'shards': []}
+    # 每个章节所属的课程（一级章节）
+    courses = '''
+        WITH RECURSIVE course (chapter_id, course_id, depth) AS (
+            SELECT id, id, 0 FROM main.chapters WHERE parent_id IS NULL
+            UNION ALL
+            SELECT c.id, course.course_id, course.depth + 1 FROM main.chapters c
+            JOIN course ON c.parent_id = course.chapter_id WHERE course.depth < 32
+        )
+    '''
+    sharded = ', '.join(str(course_id) for course_id in shards)
+    results = []
+    for course_id, schema in [(None, 'main')] + sorted(shards.items()):
+        if course_id is None:
+            wrong = f'c.course_id IN ({sharded})'
+        else:
+            wrong = f'c.course_id IS NOT {course_id}'
+        misplaced_sql = f'FROM {schema}.knowledge k LEFT JOIN course c ON c.chapter_id = k.chapter_id WHERE {wrong}'
+        misplaced = _count(cursor, f'{courses} SELECT COUNT(*) {misplaced_sql}')
+        result = {'database': schema, 'rows': _count(cursor, f'SELECT COUNT(*) FROM {schema}.knowledge'),
+                  'misplaced': misplaced}
+        if misplaced:
+            cursor.execute(f'{courses} SELECT k.id {misplaced_sql} LIMIT ?', (sample_limit,))
+            result['misplaced_ids'] = [row[0] for row in cursor]
+        results.append(result)
+    if any(result['misplaced'] for result in results):
+        return {'status': 'error', 'shards': results,
+                'message': '有知识点不在所属课程的库中，请运行 python knowledge_shards.py rebalance'}
+    return {'status': 'ok', 'shards': results}
+
+
+CHECKS = {
+    'integrity': check_integrity,
+    'references': check_references,
+    'sizes': check_sizes,
+    'indexes': check_indexes,
+    'leaderboard': check_leaderboard,
+    'shards': check_shards
+}
+
+
+def run_checks(conn, names=None):
+    cursor = conn.cursor()
+    report = {'checks': {}}
+    for name in names or CHECKS:
+        started_at = time.perf_counter()
+        try:
+            result = CHECKS[name](cursor)
+        except sqlite3.Error as e:
+            result = {'status': 'error', 'message': str(e)}
+        result['seconds'] = round(time.perf_counter() - started_at, 3)
+        report['checks'][name] = result
+    report['status'] = _worst(result['status'] for result in report['checks'].values())
+    return report
+
+
+def print_report(report):
+    print(f"数据库: {report['database']}  结果: {report['status']}")
+    for name, result in report['checks'].items():
+        print(f"\n[{result['status']}] {name}（{result['seconds']}s）")
+        if 'message' in result:
+            print(f"  {result['message']}")
+        for message in result.get('messages', []):
+            print(f'  {message}')
+        for ref in result.get('references', []):
+            missing = f"，缺失的ID（部分）: {ref['missing_ids']}" if ref['orphans'] else ''
+            print(f"  {ref['table']}.{ref['column']} -> {ref['references']}: {ref['orphans']} 条悬空{missing}")
+        if 'tables' in result:
+            print(f"  文件 {result['file_bytes'] / 1024:.1f}KB，空闲 {result['free_bytes'] / 1024:.1f}KB")
+            for table in result['tables']:
+                size = f"  {table['bytes'] / 1024:.1f}KB" if table['bytes'] is not None else ''
+                print(f"  {table['table']:<32} {table['rows']:>9} 行{size}")
+            for shard in result.get('knowledge_shards', []):
+                print(f"  {shard['schema'] + '.knowledge':<32} {shard['rows']:>9} 行  文件 {shard['file_bytes'] / 1024:.1f}KB")
+        for item in result.get('unindexed_references', []):
+            print(f"  缺少索引: {item['table']}.{item['column']}")
+        for scan in result.get('full_scans', []):
+            print(f"  全表扫描 {scan['table']}（{scan['rows']} 行）: {', '.join(scan['statements'])}")
+        for item in result.get('unprepared', []):
+            print(f"  无法编译 {item['statement']}: {item['error']}")
+        for shard in result.get('shards', []):
+            misplaced = f"，不在所属课程库中的（部分）: {shard['misplaced_ids']}" if shard['misplaced'] else ''
+            print(f"  {shard['database']}.knowledge: {shard['rows']} 行，{shard['misplaced']} 条放错库{misplaced}")
+        if name == 'leaderboard' and 'invalid_rows' in result:
+            print(f"  无效记录 {result['invalid_rows']}，匿名记录 {result['anonymous_rows']}，"
+                  f"超过{HOT_DAYS}天未归档 {result['stale_hot_rows']}")
+            if 'summary_mismatches' in result:
+                print(f"  汇总表与 {result['archive_tables']} 个归档表不一致的用户: {result['summary_mismatches']}")
+            for row in result.get('mismatched', []):
+                print(f'    {row}')
+
+
+# 命令行入口：python diagnostics.py [--db 路径] [--check references --check leaderboard] [--json]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='检查数据库的完整性、引用关系、表大小、索引、排行榜一致性和知识点分片')
+    add_db_argument(parser)
+    parser.add_argument('--check', action='append', choices=list(CHECKS), help='只运行指定的检查（可重复）')
+    parser.add_argument('--json', action='store_true', help='输出JSON')
+    args = parser.parse_args()
+
+    try:
+        conn = connect(args.db)
+    except FileNotFoundError as e:
+        report = {'database': args.db, 'status': 'error', 'message': str(e), 'checks': {}}
+    else:
+        report = dict(run_checks(conn, args.check), database=args.db)
+        conn.close()
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    elif 'message' in report:
+        print(report['message'])
+    else:
+        print_report(report)
+    sys.exit(1 if report['status'] == 'error' else 0)
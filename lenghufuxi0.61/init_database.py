@@ -1,15 +1,15 @@
+import argparse
 import sqlite3
-import os
 
-DB_FILE = os.path.join(os.path.dirname(__file__), 'quiz.db')
+from db_config import DB_FILE, add_db_argument
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_FILE)
+def get_db_connection(db_file=DB_FILE):
+    conn = sqlite3.connect(db_file)
     conn.row_factory = sqlite3.Row
     return conn
 
-def init_database():
-    conn = get_db_connection()
+def init_database(db_file=DB_FILE):
+    conn = get_db_connection(db_file)
     cursor = conn.cursor()
     
     # 创建用户表
@@ -151,4 +151,7 @@ def init_database():
     print('数据库表初始化完成！')
 
 if __name__ == '__main__':
-    init_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='创建数据库表')
+    add_db_argument(parser)
+    args = parser.parse_args()
+    init_database(args.db)
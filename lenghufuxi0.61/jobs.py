@@ -0,0 +1,205 @@
+import heapq
+import random
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timedelta
+
+# 进程内的定时任务：按间隔运行，带随机抖动，记录每个任务的运行历史
+
+# 每个任务保留的运行记录条数
+HISTORY_SIZE = 20
+
+
+class Job:
+    def __init__(self, name, func, interval, jitter=0.1, off_hours=None, initial_delay=None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter  # 间隔的随机浮动比例，避免多个任务同时运行
+        self.off_hours = off_hours  # (开始小时, 结束小时)，只在该时段内运行
+        self.initial_delay = initial_delay
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.total_seconds = 0.0
+        self.last_success_at = None
+        self.next_run_at = None
+        self.running = False
+
+    def next_delay(self, rng):
+        return self.interval * (1 + rng.uniform(-self.jitter, self.jitter))
+
+    def in_window(self, now):
+        if not self.off_hours:
+            return True
+        start, end = self.off_hours
+        hour = datetime.fromtimestamp(now).hour
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    # 距离下一次进入运行时段的秒数
+    def seconds_until_window(self, now):
+        current = datetime.fromtimestamp(now)
+        start = current.replace(hour=self.off_hours[0], minute=0, second=0, microsecond=0)
+        if start <= current:
+            start += timedelta(days=1)
+        return (start - current).total_seconds()
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'interval': self.interval,
+            'off_hours': list(self.off_hours) if self.off_hours else None,
+            'runs': self.runs,
+            'failures': self.failures,
+            'skipped': self.skipped,
+            'running': self.running,
+            'last_success_at': self.last_success_at,
+            'next_run_at': self.next_run_at,
+            'history': list(self.history)
+        }
+
+
+class JobRunner:
+    def __init__(self, seed=None):
+        self.jobs = {}
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.queue = []  # [(next_run_at, name)]
+        self.thread = None
+        self.stopping = False
+
+    def add(self, name, func, interval, jitter=0.1, off_hours=None, initial_delay=None):
+        job = Job(name, func, interval, jitter, off_hours, initial_delay)
+        with self.lock:
+            self.jobs[name] = job
+            self._schedule(job, time.time(), initial_delay)
+        return job
+
+    def _schedule(self, job, now, delay=None):
+        job.next_run_at = now + (delay if delay is not None else job.next_delay(self.rng))
+        heapq.heappush(self.queue, (job.next_run_at, job.name))
+        self.wakeup.notify()
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stopping = False
+        self.thread = threading.Thread(target=self._loop, name='job-runner', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        with self.lock:
+            self.stopping = True
+            self.wakeup.notify()
+        if self.thread:
+            self.thread.join(timeout)
+
+    def _loop(self):
+        while True:
+            with self.lock:
+                while not self.stopping:
+                    now = time.time()
+                    if self.queue and self.queue[0][0] <= now:
+                        break
+                    self.wakeup.wait(self.queue[0][0] - now if self.queue else None)
+                if self.stopping:
+                    return
+                _, name = heapq.heappop(self.queue)
+                job = self.jobs.get(name)
+            if job is None or job.next_run_at > time.time():
+                continue  # 任务已被重新安排
+            self._execute(job, scheduled=True)
+
+    # 运行一次任务；scheduled为True时按时段检查并安排下一次运行
+    def _execute(self, job, scheduled=False):
+        started_at = time.time()
+        if scheduled and not job.in_window(started_at):
+            # 不在运行时段内，推迟到下一个时段开始后
+            with self.lock:
+                job.skipped += 1
+                self._schedule(job, started_at, job.seconds_until_window(started_at) + self.rng.uniform(0, 600))
+            return None
+
+        with self.lock:
+            if job.running:
+                if scheduled:
+                    self._schedule(job, started_at)
+                return None
+            job.running = True
+        start = time.perf_counter()
+        record = {'started_at': started_at}
+        try:
+            record['result'] = job.func()
+            record['status'] = 'success'
+        except Exception as e:
+            record['status'] = 'error'
+            record['error'] = f'{type(e).__name__}: {e}'
+            print(f'后台任务 {job.name} 运行失败:\n{traceback.format_exc()}')
+        record['duration'] = round(time.perf_counter() - start, 4)
+
+        with self.lock:
+            job.running = False
+            job.runs += 1
+            job.total_seconds += record['duration']
+            if record['status'] == 'success':
+                job.last_success_at = started_at
+            else:
+                job.failures += 1
+            job.history.append(record)
+            if scheduled:
+                self._schedule(job, time.time())
+        return record
+
+    # 立即运行（不受时段限制，不影响原有的安排）
+    def run_now(self, name):
+        job = self.jobs.get(name)
+        if job is None:
+            raise KeyError(name)
+        return self._execute(job)
+
+    # 在单独的线程中立即运行，调用方不等待结果（结果记入运行历史）；任务正在运行时返回False
+    def run_in_background(self, name):
+        job = self.jobs.get(name)
+        if job is None:
+            raise KeyError(name)
+        with self.lock:
+            if job.running:
+                return False
+        threading.Thread(target=self._execute, args=(job,), name=f'job-{name}', daemon=True).start()
+        return True
+
+    def status(self):
+        with self.lock:
+            return [job.to_dict() for job in self.jobs.values()]
+
+    # 供/metrics输出的指标
+    def collect_metrics(self):
+        with self.lock:
+            jobs = sorted(self.jobs.values(), key=lambda job: job.name)
+            lines = [
+                '# HELP lenghu_job_runs_total 后台任务运行次数',
+                '# TYPE lenghu_job_runs_total counter'
+            ]
+            for job in jobs:
+                lines.append(f'lenghu_job_runs_total{{job="{job.name}",status="success"}} {job.runs - job.failures}')
+                lines.append(f'lenghu_job_runs_total{{job="{job.name}",status="error"}} {job.failures}')
+                lines.append(f'lenghu_job_runs_total{{job="{job.name}",status="skipped"}} {job.skipped}')
+            lines += [
+                '# HELP lenghu_job_duration_seconds_total 后台任务累计运行耗时',
+                '# TYPE lenghu_job_duration_seconds_total counter'
+            ]
+            for job in jobs:
+                lines.append(f'lenghu_job_duration_seconds_total{{job="{job.name}"}} {job.total_seconds!r}')
+            lines += [
+                '# HELP lenghu_job_last_success_timestamp_seconds 后台任务最近一次成功运行的时间',
+                '# TYPE lenghu_job_last_success_timestamp_seconds gauge'
+            ]
+            for job in jobs:
+                lines.append(f'lenghu_job_last_success_timestamp_seconds{{job="{job.name}"}} {job.last_success_at or 0}')
+        return lines
@@ -0,0 +1,226 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sqlite3
+import time
+
+from db_config import DB_FILE, add_db_argument
+from knowledge_shards import KnowledgeShards
+
+# 每批校验和写入的行数
+BATCH_SIZE = 5000
+
+# 每次从文件读取的字符数
+READ_SIZE = 1 << 16
+
+# 最多返回的错误条数
+MAX_ERRORS = 20
+
+SUPPORTED_FORMATS = ('json', 'ndjson', 'csv')
+
+
+# 根据文件名推断格式
+def detect_format(filename):
+    ext = os.path.splitext(filename or '')[1].lower()
+    if ext in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    if ext == '.csv':
+        return 'csv'
+    return 'json'
+
+
+# 把二进制流包装成文本流（兼容带BOM的UTF-8文件）
+def open_text_stream(stream):
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+
+# 逐条解析JSON数组，不把整个文件读进内存
+def iter_json_array(text_stream):
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    started = False
+    while True:
+        # 跳过空白和分隔逗号
+        while pos < len(buf) and buf[pos] in ' \t\r\n,':
+            pos += 1
+        if pos >= len(buf):
+            chunk = text_stream.read(READ_SIZE)
+            if not chunk:
+                if started:
+                    raise ValueError('JSON数组没有正常结束')
+                return
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        if not started:
+            if buf[pos] != '[':
+                raise ValueError('JSON文件必须是知识点数组')
+            started = True
+            pos += 1
+            continue
+        if buf[pos] == ']':
+            return
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # 当前对象被分块截断，继续读取
+            chunk = text_stream.read(READ_SIZE)
+            if not chunk:
+                raise
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        yield obj
+        pos = end
+
+
+# 逐行解析NDJSON
+def iter_ndjson(text_stream):
+    for line in text_stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+# 逐行解析CSV（第一行为表头）
+def iter_csv(text_stream):
+    for row in csv.DictReader(text_stream):
+        yield row
+
+
+def iter_records(stream, fmt):
+    text_stream = open_text_stream(stream)
+    if fmt == 'ndjson':
+        return iter_ndjson(text_stream)
+    if fmt == 'csv':
+        return iter_csv(text_stream)
+    return iter_json_array(text_stream)
+
+
+# 校验单条记录，返回 (行数据, 错误信息)
+def validate_record(record, chapter_ids, course_codes, default_chapter_id):
+    if not isinstance(record, dict):
+        return None, '记录必须是对象'
+
+    title = str(record.get('title') or '').strip()
+    content = str(record.get('content') or '').strip()
+    category = str(record.get('category') or '').strip()
+    if not all([title, content, category]):
+        return None, '缺少标题、内容或分类'
+
+    course_code = record.get('course_code') or None
+    chapter_id = record.get('chapter_id')
+    if chapter_id in (None, ''):
+        # 没有章节ID时按课程代码查找，最后使用默认章节
+        chapter_id = course_codes.get(course_code, default_chapter_id)
+    try:
+        chapter_id = int(chapter_id) if chapter_id is not None else None
+    except (TypeError, ValueError):
+        return None, f'章节ID无效: {chapter_id}'
+    if chapter_id is not None and chapter_id not in chapter_ids:
+        return None, f'章节不存在: {chapter_id}'
+
+    image = record.get('image') or ''
+    return (title, content, category, image, course_code, chapter_id), None
+
+
+def _insert_rows(conn, rows):
+    with conn:
+        conn.executemany('''
+            INSERT INTO knowledge (title, content, category, image, course_code, chapter_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', rows)
+
+
+# 校验并写入一批数据
+def _flush_batch(insert_rows, batch, lookups, seen, affected, result):
+    chapter_ids, course_codes, default_chapter_id = lookups
+    rows = []
+    for row_no, record in batch:
+        row, error = validate_record(record, chapter_ids, course_codes, default_chapter_id)
+        if error:
+            result['invalid'] += 1
+            if len(result['errors']) < MAX_ERRORS:
+                result['errors'].append({'row': row_no, 'message': error})
+            continue
+        key = (row[0], row[5])
+        if key in seen:
+            result['duplicates'] += 1
+            continue
+        seen.add(key)
+        rows.append(row)
+
+    if rows:
+        insert_rows(rows)
+        result['inserted'] += len(rows)
+        affected.update(row[5] for row in rows)
+
+
+# 批量导入知识点，按 (title, chapter_id) 去重。
+# 默认在conn上按批提交；insert_rows(rows)可以改变写入方式（服务器按课程交给各库的写线程），
+# knowledge_table为去重时读取的已有知识点（知识点拆分到多个库时为跨库视图）
+def import_knowledge(conn, stream, fmt='json', default_chapter_id=None, batch_size=BATCH_SIZE,
+                     insert_rows=None, knowledge_table='knowledge'):
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f'不支持的格式: {fmt}')
+
+    started_at = time.perf_counter()
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT id, code FROM chapters')
+    chapter_rows = cursor.fetchall()
+    chapter_ids = {row[0] for row in chapter_rows}
+    course_codes = {row[1]: row[0] for row in chapter_rows if row[1]}
+
+    # 已有的知识点一次性读入，用于去重
+    cursor.execute(f'SELECT title, chapter_id FROM {knowledge_table}')
+    seen = {(row[0], row[1]) for row in cursor.fetchall()}
+
+    insert_rows = insert_rows or (lambda rows: _insert_rows(conn, rows))
+    lookups = (chapter_ids, course_codes, default_chapter_id)
+    affected = set()
+    result = {'total': 0, 'inserted': 0, 'duplicates': 0, 'invalid': 0, 'errors': []}
+
+    batch = []
+    for record in iter_records(stream, fmt):
+        result['total'] += 1
+        batch.append((result['total'], record))
+        if len(batch) >= batch_size:
+            _flush_batch(insert_rows, batch, lookups, seen, affected, result)
+            batch = []
+    if batch:
+        _flush_batch(insert_rows, batch, lookups, seen, affected, result)
+
+    result['chapter_ids'] = sorted(c for c in affected if c is not None)
+    result['elapsed'] = round(time.perf_counter() - started_at, 3)
+    return result
+
+
+# 命令行入口（服务器运行中请改用 /api/knowledge/import，命令行导入不会刷新服务器内的章节缓存）
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='批量导入知识点（JSON / NDJSON / CSV）')
+    parser.add_argument('file', help='要导入的文件，例如 knowledge-base.json')
+    parser.add_argument('--format', choices=SUPPORTED_FORMATS, help='文件格式，默认按扩展名判断')
+    parser.add_argument('--chapter-id', type=int, help='记录中没有章节时使用的默认章节ID')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='每批写入的行数')
+    add_db_argument(parser)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    shards = KnowledgeShards(args.db)
+    try:
+        with open(args.file, 'rb') as f:
+            summary = import_knowledge(conn, f, args.format or detect_format(args.file), args.chapter_id,
+                                       args.batch_size, knowledge_table=shards.view(conn.cursor()))
+        # 先写入主库，再把属于已拆分课程的知识点移到对应的分片
+        if shards.sharded_courses():
+            summary['moved'] = shards.rebalance(conn)
+    finally:
+        conn.close()
+
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
@@ -0,0 +1,512 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+
+from db_config import DB_FILE, add_db_argument
+from db_writer import DatabaseWriter
+from search_index import COPY_LOG, init_change_log, sync_search_index, index_record, remove_record
+
+# 按课程拆分知识点：题库很大的课程可以把知识点移到单独的数据库文件（knowledge_shards/course_<课程ID>.db），
+# 读连接在用到时才ATTACH。每个分片有自己的写线程，导入一门课程的大批知识点时不占用主库的写线程，
+# 其他课程照常出题、答题。知识点按所在章节的一级章节（课程）路由，没有拆分的课程仍在主库的knowledge表中。
+# 知识点ID统一从主库knowledge表的自增序列中分配，各库之间不重复，掌握度和全文检索引用的ID不受影响。
+# 拆分、合并用命令行执行（python knowledge_shards.py split --course 1），执行前请先停止服务器
+
+SHARD_DIR_NAME = 'knowledge_shards'
+
+SHARD_FILE_RE = re.compile(r'course_(\d+)\.db')
+
+# 分片ATTACH到连接上时使用的名称前缀
+SCHEMA_PREFIX = 'course_'
+
+# 跨库查询用的临时视图
+VIEW_NAME = 'all_knowledge'
+
+# 知识点表的列（旧数据库的列顺序与新建的不同，跨库读写时按名称列出）
+COLUMNS = ('id', 'title', 'content', 'category', 'image', 'course_code', 'chapter_id')
+
+# 拆分、合并时每个事务移动的行数
+MOVE_BATCH = 5000
+
+CREATE_SHARD_TABLE = '''
+    CREATE TABLE IF NOT EXISTS knowledge (
+        id INTEGER PRIMARY KEY,
+        title TEXT,
+        content TEXT,
+        category TEXT,
+        image TEXT,
+        course_code TEXT,
+        chapter_id INTEGER
+    )
+'''
+
+CREATE_SHARD_INDEX = 'CREATE INDEX IF NOT EXISTS idx_knowledge_chapter ON knowledge (chapter_id)'
+
+# 按库查询的语句，{schema} 为 main 或分片的附加名，{table} 为 main.knowledge 或跨库视图
+SELECT_KNOWLEDGE_BY_CHAPTER = 'SELECT * FROM {schema}.knowledge WHERE chapter_id = ?'
+
+SELECT_KNOWLEDGE_BY_COURSE = '''
+    SELECT k.* FROM {schema}.knowledge k
+    JOIN main.chapters c ON k.chapter_id = c.id
+    WHERE c.parent_id = ?
+'''
+
+SELECT_ALL_KNOWLEDGE = 'SELECT * FROM {table}'
+
+SELECT_KNOWLEDGE_CHAPTER_ID = 'SELECT chapter_id FROM {schema}.knowledge WHERE id = ?'
+
+COUNT_KNOWLEDGE = 'SELECT COUNT(*) FROM {schema}.knowledge'
+
+# 写入时连接的主库就是所在的库，不需要写库名
+INSERT_KNOWLEDGE = '''
+    INSERT INTO knowledge (title, content, category, image, course_code, chapter_id)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_KNOWLEDGE_WITH_ID = '''
+    INSERT INTO knowledge (id, title, content, category, image, course_code, chapter_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+DELETE_KNOWLEDGE = 'DELETE FROM knowledge WHERE id = ?'
+
+# 连接上的临时视图
+SELECT_TEMP_VIEW = "SELECT sql FROM sqlite_temp_master WHERE type = 'view' AND name = ?"
+
+# 从主库knowledge表的自增序列中预留ID
+INIT_KNOWLEDGE_SEQUENCE = '''
+    INSERT INTO main.sqlite_sequence (name, seq)
+    SELECT 'knowledge', 0 WHERE NOT EXISTS (SELECT 1 FROM main.sqlite_sequence WHERE name = 'knowledge')
+'''
+
+RESERVE_KNOWLEDGE_IDS = '''
+    UPDATE main.sqlite_sequence SET seq = MAX(seq, (SELECT COALESCE(MAX(id), 0) FROM main.knowledge)) + ?
+    WHERE name = 'knowledge'
+'''
+
+SELECT_KNOWLEDGE_SEQUENCE = "SELECT seq FROM main.sqlite_sequence WHERE name = 'knowledge'"
+
+# 章节和课程
+SELECT_CHAPTER_PARENTS = 'SELECT id, parent_id FROM main.chapters'
+
+SELECT_COURSE = 'SELECT 1 FROM main.chapters WHERE id = ? AND parent_id IS NULL'
+
+SELECT_CHAPTER_NAME = 'SELECT name FROM main.chapters WHERE id = ?'
+
+# 在库之间移动知识点：本批的ID先放入临时表，{source}/{target} 为库名，{where} 为筛选条件
+CLEAR_MOVING = 'DELETE FROM temp.moving'
+
+SELECT_MOVING_BATCH = 'INSERT INTO temp.moving SELECT id FROM {source}.knowledge WHERE {where} LIMIT ?'
+
+COPY_MOVING = '''
+    INSERT OR REPLACE INTO {target}.knowledge ({columns})
+    SELECT {columns} FROM {source}.knowledge WHERE id IN (SELECT id FROM temp.moving)
+'''
+
+DELETE_MOVING = 'DELETE FROM {source}.knowledge WHERE id IN (SELECT id FROM temp.moving)'
+
+# 各分片所含章节（rebalance时使用的临时表）
+CLEAR_SHARD_CHAPTERS = 'DELETE FROM temp.shard_chapters'
+
+INSERT_SHARD_CHAPTER = 'INSERT INTO temp.shard_chapters (chapter_id, course_id) VALUES (?, ?)'
+
+# 供登记表测试编译、诊断工具检查查询计划（使用临时表的语句不在其中）
+STATEMENTS = {
+    'SELECT_KNOWLEDGE_BY_CHAPTER': SELECT_KNOWLEDGE_BY_CHAPTER.format(schema='main'),
+    'SELECT_KNOWLEDGE_BY_COURSE': SELECT_KNOWLEDGE_BY_COURSE.format(schema='main'),
+    'SELECT_KNOWLEDGE_CHAPTER_ID': SELECT_KNOWLEDGE_CHAPTER_ID.format(schema='main'),
+    'COUNT_KNOWLEDGE': COUNT_KNOWLEDGE.format(schema='main'),
+    'INSERT_KNOWLEDGE': INSERT_KNOWLEDGE,
+    'INSERT_KNOWLEDGE_WITH_ID': INSERT_KNOWLEDGE_WITH_ID,
+    'DELETE_KNOWLEDGE': DELETE_KNOWLEDGE,
+    'SELECT_TEMP_VIEW': SELECT_TEMP_VIEW,
+    'INIT_KNOWLEDGE_SEQUENCE': INIT_KNOWLEDGE_SEQUENCE,
+    'RESERVE_KNOWLEDGE_IDS': RESERVE_KNOWLEDGE_IDS,
+    'SELECT_KNOWLEDGE_SEQUENCE': SELECT_KNOWLEDGE_SEQUENCE,
+    'SELECT_CHAPTER_PARENTS': SELECT_CHAPTER_PARENTS,
+    'SELECT_COURSE': SELECT_COURSE,
+    'SELECT_CHAPTER_NAME': SELECT_CHAPTER_NAME
+}
+
+
+def shard_dir(database):
+    return os.path.join(os.path.dirname(os.path.abspath(database)), SHARD_DIR_NAME)
+
+
+def schema_name(course_id):
+    return f'{SCHEMA_PREFIX}{course_id}'
+
+
+# 连接上已附加的分片 {附加名: 文件路径}
+def attached_shards(cursor):
+    cursor.execute('PRAGMA database_list')
+    return {row[1]: row[2] for row in cursor.fetchall() if row[1].startswith(SCHEMA_PREFIX)}
+
+
+# 跨库读取知识点时使用的表：连接上建立过临时视图时为视图，否则为主库的knowledge表
+def knowledge_source(cursor):
+    cursor.execute(SELECT_TEMP_VIEW, (VIEW_NAME,))
+    return f'temp.{VIEW_NAME}' if cursor.fetchone() else 'main.knowledge'
+
+
+# 从主库knowledge表的自增序列中预留count个ID，返回第一个（在主库写线程中执行）
+def reserve_ids(conn, count):
+    cursor = conn.cursor()
+    cursor.execute(INIT_KNOWLEDGE_SEQUENCE)
+    cursor.execute(RESERVE_KNOWLEDGE_IDS, (count,))
+    cursor.execute(SELECT_KNOWLEDGE_SEQUENCE)
+    return cursor.fetchone()[0] - count + 1
+
+
+def _insert_rows(conn, statement, rows):
+    conn.cursor().executemany(statement, rows)
+
+
+def _delete_rows(conn, knowledge_ids):
+    conn.cursor().executemany(DELETE_KNOWLEDGE, [(knowledge_id,) for knowledge_id in knowledge_ids])
+
+
+# 主库中的知识点：新增和更新索引在同一个写操作中完成
+def _insert_main(conn, row):
+    cursor = conn.cursor()
+    cursor.execute(INSERT_KNOWLEDGE, row)
+    knowledge_id = cursor.lastrowid
+    index_record(cursor, 'knowledge', knowledge_id, row[0], row[1], row[5])
+    return knowledge_id
+
+
+def _delete_main(conn, knowledge_id):
+    cursor = conn.cursor()
+    cursor.execute(SELECT_KNOWLEDGE_CHAPTER_ID.format(schema='main'), (knowledge_id,))
+    row = cursor.fetchone()
+    cursor.execute(DELETE_KNOWLEDGE, (knowledge_id,))
+    remove_record(cursor, 'knowledge', knowledge_id)
+    return row
+
+
+# 分片中的知识点：预留ID和编入索引在主库的同一个写操作中完成，返回ID
+def _reserve_and_index(conn, title, content, chapter_id):
+    knowledge_id = reserve_ids(conn, 1)
+    index_record(conn.cursor(), 'knowledge', knowledge_id, title, content, chapter_id)
+    return knowledge_id
+
+
+def _unindex(conn, knowledge_id):
+    remove_record(conn.cursor(), 'knowledge', knowledge_id)
+
+
+# 把source库中满足条件的知识点分批移到target库（保留ID），返回移动的行数。
+# 先写入目标再从来源删除，中途中断后重新执行不会丢数据
+def _move(conn, source, target, where, batch_size=MOVE_BATCH):
+    cursor = conn.cursor()
+    columns = ', '.join(COLUMNS)
+    cursor.execute('CREATE TEMP TABLE IF NOT EXISTS moving (id INTEGER PRIMARY KEY)')
+    moved = 0
+    while True:
+        cursor.execute(CLEAR_MOVING)
+        cursor.execute(SELECT_MOVING_BATCH.format(source=source, where=where), (batch_size,))
+        if cursor.rowcount <= 0:
+            conn.commit()
+            return moved
+        cursor.execute(COPY_MOVING.format(source=source, target=target, columns=columns))
+        cursor.execute(DELETE_MOVING.format(source=source))
+        moved += cursor.rowcount
+        conn.commit()
+
+
+class KnowledgeShards:
+    def __init__(self, database, main_writer=None, directory=None):
+        self.database = os.path.abspath(database)
+        self.directory = directory or shard_dir(database)
+        self.main_writer = main_writer
+        self.lock = threading.Lock()
+        self.shards = {}  # {课程ID: 分片文件路径}
+        self.scanned = None  # 上次扫描时目录的修改时间
+        self.courses = None  # {章节ID: 课程ID}
+        self.writers = {}  # {课程ID: DatabaseWriter}
+
+    # 已拆分的课程 {课程ID: 文件路径}，目录有变化时重新扫描
+    def sharded_courses(self, refresh=False):
+        try:
+            mtime = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            mtime = None
+        if refresh or mtime != self.scanned:
+            shards = {}
+            for name in os.listdir(self.directory) if mtime is not None else ():
+                match = SHARD_FILE_RE.fullmatch(name)
+                if match:
+                    shards[int(match.group(1))] = os.path.join(self.directory, name)
+            with self.lock:
+                self.shards, self.scanned = shards, mtime
+        return self.shards
+
+    # 章节增删或改变上级后调用
+    def invalidate(self):
+        self.courses = None
+
+    def _load_courses(self, cursor):
+        cursor.execute(SELECT_CHAPTER_PARENTS)
+        parents = {row[0]: row[1] for row in cursor.fetchall()}
+        courses = {}
+        for chapter_id in parents:
+            node, seen = chapter_id, set()
+            while parents.get(node) is not None and node not in seen:
+                seen.add(node)
+                node = parents[node]
+            courses[chapter_id] = node if node in parents else None
+        self.courses = courses
+        return courses
+
+    # 章节所属的课程（一级章节），章节不存在时为None
+    def course_of(self, cursor, chapter_id):
+        if chapter_id is None:
+            return None
+        courses = self.courses
+        if courses is None or chapter_id not in courses:
+            courses = self._load_courses(cursor)
+        return courses.get(chapter_id)
+
+    # 章节的知识点所在的分片（课程ID），在主库中时为None
+    def route(self, cursor, chapter_id):
+        shards = self.sharded_courses()
+        if not shards:
+            return None
+        course_id = self.course_of(cursor, chapter_id)
+        return course_id if course_id in shards else None
+
+    # 课程所在的库：已拆分的课程附加到连接上并返回附加名，否则返回main
+    def schema(self, cursor, course_id):
+        path = self.sharded_courses().get(course_id) if course_id is not None else None
+        if path is None:
+            return 'main'
+        name = schema_name(course_id)
+        if name not in attached_shards(cursor):
+            cursor.execute(f'ATTACH DATABASE ? AS {name}', (path,))
+        return name
+
+    # 所有知识点的跨库视图：附加全部分片并在连接上建立临时视图，没有分片时直接返回主库的表
+    def view(self, cursor):
+        shards = self.sharded_courses()
+        if not shards:
+            return 'main.knowledge'
+        columns = ', '.join(COLUMNS)
+        schemas = ['main'] + [self.schema(cursor, course_id) for course_id in sorted(shards)]
+        body = ' UNION ALL '.join(f'SELECT {columns} FROM {schema}.knowledge' for schema in schemas)
+        cursor.execute(SELECT_TEMP_VIEW, (VIEW_NAME,))
+        row = cursor.fetchone()
+        if row is None or not row[0].endswith(body):
+            cursor.execute(f'DROP VIEW IF EXISTS temp.{VIEW_NAME}')
+            cursor.execute(f'CREATE TEMP VIEW {VIEW_NAME} AS {body}')
+        return f'temp.{VIEW_NAME}'
+
+    # 传给全文检索的原文表
+    def search_tables(self, cursor):
+        return {'knowledge': self.view(cursor)}
+
+    def chapter_knowledge(self, cursor, chapter_id):
+        schema = self.schema(cursor, self.route(cursor, chapter_id))
+        cursor.execute(SELECT_KNOWLEDGE_BY_CHAPTER.format(schema=schema), (chapter_id,))
+        return [dict(row) for row in cursor.fetchall()]
+
+    # 一级章节下所有二级章节的知识点
+    def course_knowledge(self, cursor, course_id):
+        schema = self.schema(cursor, course_id if course_id in self.sharded_courses() else None)
+        cursor.execute(SELECT_KNOWLEDGE_BY_COURSE.format(schema=schema), (course_id,))
+        return [dict(row) for row in cursor.fetchall()]
+
+    def all_knowledge(self, cursor):
+        cursor.execute(SELECT_ALL_KNOWLEDGE.format(table=self.view(cursor)))
+        return [dict(row) for row in cursor.fetchall()]
+
+    # 分片中的知识点返回 (课程ID, 章节ID)，不在任何分片中时返回None
+    def _find_in_shards(self, cursor, knowledge_id):
+        for course_id in sorted(self.sharded_courses()):
+            cursor.execute(SELECT_KNOWLEDGE_CHAPTER_ID.format(schema=self.schema(cursor, course_id)), (knowledge_id,))
+            row = cursor.fetchone()
+            if row is not None:
+                return course_id, row[0]
+        return None
+
+    def writer(self, course_id):
+        if course_id is None:
+            return self.main_writer
+        path = self.sharded_courses()[course_id]
+        with self.lock:
+            writer = self.writers.get(course_id)
+            if writer is None or writer.database != path:
+                writer = DatabaseWriter(path)
+                writer.start()
+                self.writers[course_id] = writer
+        return writer
+
+    # 新增一条知识点，写入所属课程的库，返回新ID。
+    # 分片中的知识点跨两个库：先在主库预留ID并编入索引，再写入分片；写入分片失败时从索引中去掉。
+    # 去掉也失败时只留下一条找不到原文的索引项，检索时跳过，不会返回不存在的知识点
+    def add(self, cursor, title, content, category, chapter_id):
+        row = (title, content, category, None, None, chapter_id)
+        course_id = self.route(cursor, chapter_id)
+        if course_id is None:
+            return self.main_writer.call(_insert_main, row)
+        knowledge_id = self.main_writer.call(_reserve_and_index, title, content, chapter_id)
+        try:
+            self.writer(course_id).call(_insert_rows, INSERT_KNOWLEDGE_WITH_ID, [(knowledge_id,) + row])
+        except Exception:
+            self.main_writer.call(_unindex, knowledge_id)
+            raise
+        return knowledge_id
+
+    # 删除一条知识点，返回它的章节ID的元组 (chapter_id,)，不存在时返回None；
+    # 分片中的知识点删除后再从索引中去掉，后一步失败时分片的修改记录会让下次同步去掉索引项
+    def delete(self, cursor, knowledge_id):
+        found = self._find_in_shards(cursor, knowledge_id) if self.sharded_courses() else None
+        if found is None:
+            row = self.main_writer.call(_delete_main, knowledge_id)
+            return (row[0],) if row is not None else None
+        course_id, chapter_id = found
+        self.writer(course_id).call(_delete_rows, [knowledge_id])
+        self.main_writer.call(_unindex, knowledge_id)
+        return (chapter_id,)
+
+    # 批量导入时写入一批已校验的行 (title, content, category, image, course_code, chapter_id)：
+    # 按课程分组后同时交给各自的写线程，等全部提交后返回
+    def insert_rows(self, cursor, rows):
+        groups = {}
+        for row in rows:
+            groups.setdefault(self.route(cursor, row[5]), []).append(row)
+        futures = []
+        for course_id, group in groups.items():
+            if course_id is None:
+                futures.append(self.main_writer.submit(_insert_rows, INSERT_KNOWLEDGE, group))
+                continue
+            first_id = self.main_writer.call(reserve_ids, len(group))
+            futures.append(self.writer(course_id).submit(
+                _insert_rows, INSERT_KNOWLEDGE_WITH_ID, [(first_id + n,) + row for n, row in enumerate(group)]))
+        for future in futures:
+            future.result()
+
+    # 按主库和各分片的修改记录更新全文检索索引（在主库写线程中单独执行）；
+    # 之前拆分的分片还没有修改记录时补建，并重建知识点的索引
+    def sync_search(self, conn):
+        cursor = conn.cursor()
+        tables = self.search_tables(cursor)
+        schemas = [self.schema(cursor, course_id) for course_id in sorted(self.sharded_courses())]
+        for schema in schemas:
+            init_change_log(cursor, schema, {'knowledge': 'knowledge'})
+        return sync_search_index(conn, tables, ['main'] + schemas)
+
+    # 把不在所属课程库中的知识点移过去（拆分课程、章节改到其他课程下之后），
+    # leaving中的分片视为已取消拆分，其中的知识点移回主库。返回 [{'from', 'to', 'rows'}]
+    def rebalance(self, conn, leaving=()):
+        cursor = conn.cursor()
+        courses = self._load_courses(cursor)
+        shards = self.sharded_courses(refresh=True)
+        targets = [course_id for course_id in sorted(shards) if course_id not in leaving]
+        cursor.execute('CREATE TEMP TABLE IF NOT EXISTS shard_chapters (chapter_id INTEGER PRIMARY KEY, course_id INTEGER)')
+        cursor.execute(CLEAR_SHARD_CHAPTERS)
+        cursor.executemany(INSERT_SHARD_CHAPTER,
+                           [(chapter_id, course_id) for chapter_id, course_id in courses.items() if course_id in targets])
+        conn.commit()
+
+        moves = []
+        for source in [None] + sorted(shards):
+            for target in [None] + targets:
+                if target == source:
+                    continue
+                if target is None:
+                    where = 'chapter_id IS NULL OR chapter_id NOT IN (SELECT chapter_id FROM temp.shard_chapters)'
+                else:
+                    where = f'chapter_id IN (SELECT chapter_id FROM temp.shard_chapters WHERE course_id = {int(target)})'
+                rows = _move(conn, self.schema(cursor, source), self.schema(cursor, target), where)
+                if rows:
+                    moves.append({'from': source or 'main', 'to': target or 'main', 'rows': rows})
+        return moves
+
+    # 把一门课程拆分到单独的库
+    def split(self, conn, course_id):
+        cursor = conn.cursor()
+        cursor.execute(SELECT_COURSE, (course_id,))
+        if cursor.fetchone() is None:
+            raise ValueError(f'课程不存在（需要一级章节ID）: {course_id}')
+        os.makedirs(self.directory, exist_ok=True)
+        shard = sqlite3.connect(os.path.join(self.directory, f'{schema_name(course_id)}.db'))
+        shard.execute('PRAGMA journal_mode=WAL')
+        shard.execute(CREATE_SHARD_TABLE)
+        shard.execute(CREATE_SHARD_INDEX)
+        init_change_log(shard.cursor(), tables={'knowledge': 'knowledge'})
+        shard.commit()
+        shard.close()
+        return self.rebalance(conn)
+
+    # 把一门课程的知识点移回主库并删除分片文件
+    def merge(self, conn, course_id):
+        path = self.sharded_courses(refresh=True).get(course_id)
+        if path is None:
+            raise ValueError(f'课程没有拆分: {course_id}')
+        moves = self.rebalance(conn, leaving=(course_id,))
+        cursor = conn.cursor()
+        name = self.schema(cursor, course_id)
+        cursor.execute(COUNT_KNOWLEDGE.format(schema=name))
+        if cursor.fetchone()[0]:
+            raise RuntimeError(f'分片中还有知识点没有移回主库: {path}')
+        # 分片中还没有编入索引的修改转到主库的修改记录
+        init_change_log(cursor, name, {'knowledge': 'knowledge'})
+        cursor.execute(COPY_LOG.format(schema=name))
+        conn.commit()
+        cursor.execute(f'DETACH DATABASE {name}')
+        writer = self.writers.pop(course_id, None)
+        if writer is not None:
+            writer.stop()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        self.sharded_courses(refresh=True)
+        return moves
+
+    # 各库的知识点数和文件大小
+    def status(self, cursor):
+        cursor.execute(COUNT_KNOWLEDGE.format(schema='main'))
+        report = {'main_rows': cursor.fetchone()[0], 'shards': []}
+        for course_id, path in sorted(self.sharded_courses().items()):
+            cursor.execute(COUNT_KNOWLEDGE.format(schema=self.schema(cursor, course_id)))
+            rows = cursor.fetchone()[0]
+            cursor.execute(SELECT_CHAPTER_NAME, (course_id,))
+            chapter = cursor.fetchone()
+            report['shards'].append({'course_id': course_id, 'name': chapter[0] if chapter else None,
+                                     'path': path, 'rows': rows, 'file_bytes': os.path.getsize(path)})
+        return report
+
+
+# 命令行入口：python knowledge_shards.py {status,split,merge,rebalance} [--course 课程ID] [--db 路径]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='按课程把知识点拆分到单独的数据库文件（请先停止服务器）')
+    parser.add_argument('command', choices=('status', 'split', 'merge', 'rebalance'),
+                        help='status查看，split拆分课程，merge把课程移回主库，rebalance把放错库的知识点移到所属课程')
+    parser.add_argument('--course', type=int, help='课程（一级章节）ID，split和merge需要')
+    add_db_argument(parser)
+    args = parser.parse_args()
+    if args.command in ('split', 'merge') and args.course is None:
+        parser.error(f'{args.command} 需要 --course')
+
+    shards = KnowledgeShards(args.db)
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == 'split':
+            report = {'moved': shards.split(conn, args.course)}
+        elif args.command == 'merge':
+            report = {'moved': shards.merge(conn, args.course)}
+        elif args.command == 'rebalance':
+            report = {'moved': shards.rebalance(conn)}
+        else:
+            report = {}
+        report.update(shards.status(conn.cursor()))
+    except (ValueError, RuntimeError) as e:
+        print(json.dumps({'status': 'error', 'message': str(e)}, ensure_ascii=False))
+        sys.exit(1)
+    finally:
+        conn.close()
+    print(json.dumps(dict(report, status='success'), ensure_ascii=False, indent=2))
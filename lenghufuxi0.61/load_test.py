@@ -0,0 +1,397 @@
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+try:
+    import socketio
+except ImportError:
+    socketio = None
+
+# 到达曲线：burst=全班同时点击开始，ramp=在指定时间内均匀进入，poisson=按平均速率随机进入
+ARRIVAL_CURVES = ('burst', 'ramp', 'poisson')
+
+
+# 汇总所有学生的请求耗时和错误
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}  # {操作名: [耗时秒]}
+        self.errors = {}  # {操作名: 错误次数}
+        self.error_samples = []
+
+    def record(self, name, elapsed, error=None):
+        with self.lock:
+            self.samples.setdefault(name, []).append(elapsed)
+            if error:
+                self.errors[name] = self.errors.get(name, 0) + 1
+                if len(self.error_samples) < 50:
+                    self.error_samples.append({'operation': name, 'error': error})
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    # 最近秩法
+    index = max(0, math.ceil(q * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+# 模拟一名学生的完整流程
+class Student:
+    def __init__(self, index, args, recorder, pk_board, boss_id):
+        self.index = index
+        self.args = args
+        self.recorder = recorder
+        self.pk_board = pk_board
+        self.boss_id = boss_id
+        self.rng = random.Random(args.seed * 100003 + index)
+        self.session = requests.Session()
+        self.user = None
+        self.sio = None
+        self.pk_requests = []
+        self.pk_event = threading.Event()
+        self.pk_started = None
+        self.pk_started_event = threading.Event()
+        self.pk_progress = threading.Condition()
+        self.pk_question = 0
+        self.pk_done = False
+
+    def call(self, name, method, path, **kwargs):
+        start = time.perf_counter()
+        error = None
+        data = None
+        try:
+            response = self.session.request(method, self.args.url + path, timeout=self.args.timeout, **kwargs)
+            if response.status_code >= 400:
+                error = f'HTTP {response.status_code}'
+            try:
+                data = response.json()
+            except ValueError:
+                data = None
+        except requests.RequestException as e:
+            error = type(e).__name__
+        self.recorder.record(name, time.perf_counter() - start, error)
+        return data if error is None else None
+
+    def login(self):
+        username = f'{self.args.prefix}{self.index:04d}'
+        credentials = {'username': username, 'password': '123456'}
+        self.call('register', 'POST', '/api/register', json=dict(credentials, name=username))
+        result = self.call('login', 'POST', '/api/login', json=credentials)
+        if result and result.get('user'):
+            self.user = result['user']
+        return self.user is not None
+
+    def connect_socket(self):
+        if socketio is None or self.args.no_socketio:
+            return
+        sio = socketio.Client(reconnection=False)
+
+        @sio.on('pk_challenge_request')
+        def on_pk_request(data):
+            self.pk_requests.append(data)
+            self.pk_event.set()
+
+        @sio.on('pk_challenge_started')
+        def on_pk_started(data):
+            self.pk_started = data
+            self.pk_started_event.set()
+
+        @sio.on('pk_next_question')
+        def on_pk_next_question(data):
+            with self.pk_progress:
+                self.pk_question = max(self.pk_question, data['question_index'])
+                self.pk_progress.notify_all()
+
+        @sio.on('pk_challenge_completed')
+        def on_pk_completed(data):
+            with self.pk_progress:
+                self.pk_done = True
+                self.pk_progress.notify_all()
+
+        start = time.perf_counter()
+        try:
+            sio.connect(self.args.url, wait_timeout=self.args.timeout)
+            # 等待服务器确认，确保PK发起时对方已在在线列表中
+            sio.call('join', {'user_id': self.user['id']}, timeout=self.args.timeout)
+            self.sio = sio
+            self.recorder.record('socket_connect', time.perf_counter() - start)
+        except Exception as e:
+            self.recorder.record('socket_connect', time.perf_counter() - start, type(e).__name__)
+
+    def browse(self):
+        user_id = self.user['id']
+        chapters = self.call('available_chapters', 'GET', f'/api/user-available-chapters?user_id={user_id}')
+        self.call('permissions', 'GET', f'/api/user-course-permissions/{user_id}')
+        if not chapters:
+            chapters = self.call('chapters', 'GET', '/api/chapters') or []
+        second_level = [c['id'] for c in chapters if c.get('level') == 2]
+        return self.rng.choice(second_level) if second_level else None
+
+    def quiz(self, chapter_id):
+        questions = self.call('generate_questions', 'POST', '/api/generate-questions',
+                              json={'chapter_id': chapter_id, 'count': 10}) or []
+        total = len(questions) or 10
+        correct = sum(1 for _ in range(total) if self.rng.random() < 0.7)
+        if chapter_id:
+            self.call('submit_quiz', 'POST', '/api/submit-quiz', json={
+                'user_id': self.user['id'],
+                'chapter_id': chapter_id,
+                'score': correct,
+                'correct_count': correct,
+                'total_questions': total
+            })
+        for _ in range(self.args.rankings_polls):
+            self.call('rankings', 'GET', '/api/rankings')
+            time.sleep(self.rng.uniform(0.1, 0.5))
+
+    # 偶数号学生向下一号发起PK，奇数号学生等待并接受
+    def pk(self):
+        if self.sio is None:
+            return
+        partner = self.index + 1 if self.index % 2 == 0 else self.index - 1
+        if partner >= self.args.students:
+            return
+        if self.index % 2 == 0:
+            partner_user = self.pk_board.wait_user(partner, self.args.timeout)
+            if partner_user is None:
+                return
+            result = self.call('pk_create', 'POST', '/api/pk-challenges', json={
+                'challenger_id': self.user['id'],
+                'opponent_id': partner_user['id']
+            })
+            if not result:
+                return
+            challenge_id = result['challenge_id']
+            self.sio.call('join_challenge', {'challenge_id': challenge_id}, timeout=self.args.timeout)
+            # 对手接受后，题目随pk_challenge_started下发
+            if not self.pk_started_event.wait(self.args.timeout):
+                self.recorder.record('pk_start_wait', self.args.timeout, 'timeout')
+                return
+            challenge = self.pk_started
+        else:
+            if not self.pk_event.wait(self.args.timeout):
+                self.recorder.record('pk_request_wait', self.args.timeout, 'timeout')
+                return
+            challenge_id = self.pk_requests[0]['challenge_id']
+            self.sio.call('join_challenge', {'challenge_id': challenge_id}, timeout=self.args.timeout)
+            result = self.call('pk_accept', 'POST', f'/api/pk-challenges/{challenge_id}/accept')
+            if not result:
+                return
+            challenge = result['challenge']
+        self.play_pk(challenge)
+        self.sio.emit('leave_challenge', {'challenge_id': challenge_id})
+
+    # 按题同步作答：答完一题后等待双方都完成，再进入下一题
+    def play_pk(self, challenge):
+        for index, question in enumerate(challenge['questions']):
+            start = time.perf_counter()
+            error = None
+            try:
+                result = self.sio.call('pk_answer', {
+                    'challenge_id': challenge['challenge_id'],
+                    'user_id': self.user['id'],
+                    'question_index': index,
+                    'choice': self.rng.randrange(len(question['options']))
+                }, timeout=self.args.timeout)
+                if result.get('status') != 'success':
+                    error = result.get('message')
+            except Exception as e:
+                error = type(e).__name__
+            self.recorder.record('pk_answer', time.perf_counter() - start, error)
+            if error:
+                return
+
+            start = time.perf_counter()
+            with self.pk_progress:
+                synced = self.pk_progress.wait_for(lambda: self.pk_done or self.pk_question > index,
+                                                   self.args.timeout)
+            self.recorder.record('pk_sync_wait', time.perf_counter() - start, None if synced else 'timeout')
+            if not synced or self.pk_done:
+                return
+
+    def boss(self):
+        if self.boss_id is None:
+            return
+        self.call('boss_list', 'GET', '/api/boss-challenges')
+        self.call('boss_participate', 'POST', f'/api/boss-challenges/{self.boss_id}/participate',
+                  json={'user_id': self.user['id']})
+        question_set = self.call('boss_questions', 'POST', '/api/generate-questions',
+                                 json={'source': 'science', 'hide_answers': True, 'count': 20})
+        if question_set:
+            self.answer_set('boss_answer', f'/api/boss-challenges/{self.boss_id}/answer', question_set, 3)
+
+    # 随机作答题目集中的前count道题，由服务器判分
+    def answer_set(self, name, path, question_set, count):
+        for index, question in enumerate(question_set['questions'][:count]):
+            self.call(name, 'POST', path, json={
+                'user_id': self.user['id'],
+                'set_id': question_set['set_id'],
+                'question_index': index,
+                'choice': self.rng.randrange(len(question['options']))
+            })
+
+    def run(self):
+        try:
+            if not self.login():
+                return False
+            self.connect_socket()
+            self.pk_board.publish(self.index, self.user)
+            chapter_id = self.browse()
+            self.quiz(chapter_id)
+            if not self.args.no_pk:
+                self.pk()
+            if not self.args.no_boss:
+                self.boss()
+            return True
+        finally:
+            if self.sio is not None:
+                self.sio.disconnect()
+
+
+# 学生之间交换用户信息，用于PK配对
+class PKBoard:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.users = {}
+
+    def publish(self, index, user):
+        with self.cond:
+            self.users[index] = user
+            self.cond.notify_all()
+
+    def wait_user(self, index, timeout):
+        with self.cond:
+            self.cond.wait_for(lambda: index in self.users, timeout)
+            return self.users.get(index)
+
+
+# 计算每名学生的开始时间（相对开始的秒数）
+def arrival_offsets(args):
+    rng = random.Random(args.seed)
+    if args.arrival == 'burst':
+        return [0.0] * args.students
+    if args.arrival == 'ramp':
+        step = args.ramp_seconds / max(1, args.students - 1)
+        return [i * step for i in range(args.students)]
+    offsets = []
+    t = 0.0
+    for _ in range(args.students):
+        offsets.append(t)
+        t += rng.expovariate(args.rate)
+    return offsets
+
+
+# 由一名管理员账号创建本轮压测使用的BOSS
+def create_boss(args):
+    try:
+        session = requests.Session()
+        credentials = {'username': f'{args.prefix}boss', 'password': '123456'}
+        session.post(args.url + '/api/register', json=dict(credentials, name=f'{args.prefix}boss'), timeout=args.timeout)
+        user = session.post(args.url + '/api/login', json=credentials, timeout=args.timeout).json()['user']
+        result = session.post(args.url + '/api/boss-challenges', json={
+            'creator_id': user['id'],
+            'boss_name': f'压测BOSS-{args.seed}',
+            'boss_hp': args.students * 3
+        }, timeout=args.timeout).json()
+        return result.get('boss_id')
+    except (requests.RequestException, ValueError, KeyError):
+        return None
+
+
+def build_report(args, recorder, results, started_at, duration):
+    operations = {}
+    total_requests = 0
+    total_errors = 0
+    for name, samples in sorted(recorder.samples.items()):
+        values = sorted(samples)
+        errors = recorder.errors.get(name, 0)
+        total_requests += len(values)
+        total_errors += errors
+        operations[name] = {
+            'count': len(values),
+            'errors': errors,
+            'error_rate': round(errors / len(values), 4),
+            'mean_ms': round(sum(values) / len(values) * 1000, 2),
+            'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+            'max_ms': round(values[-1] * 1000, 2)
+        }
+    return {
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'started_at': started_at,
+        'duration_s': round(duration, 3),
+        'students': {'total': args.students, 'completed': sum(results), 'failed': len(results) - sum(results)},
+        'totals': {
+            'requests': total_requests,
+            'errors': total_errors,
+            'error_rate': round(total_errors / total_requests, 4) if total_requests else 0.0,
+            'throughput_rps': round(total_requests / duration, 2) if duration else 0.0
+        },
+        'operations': operations,
+        'error_samples': recorder.error_samples
+    }
+
+
+def run(args):
+    recorder = Recorder()
+    pk_board = PKBoard()
+    boss_id = None if args.no_boss else create_boss(args)
+    offsets = arrival_offsets(args)
+    results = [False] * args.students
+
+    def worker(index):
+        time.sleep(offsets[index])
+        try:
+            results[index] = Student(index, args, recorder, pk_board, boss_id).run()
+        except Exception as e:
+            recorder.record('student', 0.0, f'{type(e).__name__}: {e}')
+
+    started_at = datetime.now().isoformat()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.students)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return build_report(args, recorder, results, started_at, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='模拟一个班级的学生同时使用冷湖知识复习系统')
+    parser.add_argument('--url', default='http://localhost:9000', help='后端API地址')
+    parser.add_argument('--students', type=int, default=40, help='模拟的学生人数')
+    parser.add_argument('--arrival', choices=ARRIVAL_CURVES, default='burst', help='学生进入的到达曲线')
+    parser.add_argument('--ramp-seconds', type=float, default=30.0, help='ramp曲线的总时长（秒）')
+    parser.add_argument('--rate', type=float, default=2.0, help='poisson曲线每秒平均进入的人数')
+    parser.add_argument('--rankings-polls', type=int, default=3, help='每名学生轮询排行榜的次数')
+    parser.add_argument('--seed', type=int, default=1, help='随机种子，相同种子产生相同的负载')
+    parser.add_argument('--prefix', default='loadtest_', help='压测账号的用户名前缀')
+    parser.add_argument('--timeout', type=float, default=30.0, help='单个请求的超时时间（秒）')
+    parser.add_argument('--no-pk', action='store_true', help='不进行PK对战')
+    parser.add_argument('--no-boss', action='store_true', help='不参加BOSS挑战')
+    parser.add_argument('--no-socketio', action='store_true', help='不建立SocketIO连接（同时跳过PK）')
+    parser.add_argument('--output', default='load_report.json', help='报告输出文件')
+    args = parser.parse_args()
+
+    if socketio is None and not args.no_socketio:
+        print('未安装 python-socketio 客户端，将跳过SocketIO连接和PK对战')
+
+    report = run(args)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    totals = report['totals']
+    print(f"完成 {report['students']['completed']}/{args.students} 名学生，用时 {report['duration_s']} 秒")
+    print(f"请求 {totals['requests']} 次，错误率 {totals['error_rate']:.2%}，吞吐量 {totals['throughput_rps']} 次/秒")
+    for name, op in report['operations'].items():
+        print(f"  {name:<20} {op['count']:>6} 次  p50 {op['p50_ms']:>8}ms  p95 {op['p95_ms']:>8}ms  "
+              f"p99 {op['p99_ms']:>8}ms  错误 {op['errors']}")
+    print(f'报告已保存到 {args.output}')
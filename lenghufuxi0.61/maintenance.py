@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta
+
+# 数据库维护任务：过期未完成的挑战、把已结束的挑战归档到冷表、整理数据库
+
+# 未被接受的PK挑战的有效期
+PK_PENDING_TTL = timedelta(minutes=10)
+
+# 进行中的PK挑战的最长时间
+PK_ACTIVE_TTL = timedelta(hours=2)
+
+# BOSS挑战的最长时间
+BOSS_ACTIVE_TTL = timedelta(hours=24)
+
+# 已结束的挑战保留在热表中的天数
+ARCHIVE_AFTER = timedelta(days=7)
+
+# 每批归档的行数
+ARCHIVE_BATCH_SIZE = 500
+
+# 热表 -> (冷表, 子表, 子表外键)
+ARCHIVE_TABLES = {
+    'pk_challenges': ('pk_challenges_archive', None, None),
+    'boss_challenges': ('boss_challenges_archive', 'boss_participants', 'boss_id')
+}
+
+# 以下语句中 {table} 为热表名（或子表名），{archive_table} 为对应的冷表名
+EXPIRE_CHALLENGES = '''
+    UPDATE {table}
+    SET status = 'expired', completed_at = ?
+    WHERE status = ? AND created_at < ?
+    RETURNING id
+'''
+
+SELECT_ARCHIVABLE = '''
+    SELECT id FROM {table}
+    WHERE status IN ('completed', 'expired') AND created_at < ?
+      AND COALESCE(completed_at, created_at) < ?
+    LIMIT ?
+'''
+
+# {key} 为挑战ID所在的列（热表为id，子表为外键），{placeholders} 为本批挑战ID的占位符
+COPY_TO_ARCHIVE = '''
+    INSERT INTO {archive_table} ({columns}) SELECT {columns} FROM {table}
+    WHERE {key} IN ({placeholders})
+'''
+
+DELETE_ARCHIVED = 'DELETE FROM {table} WHERE {key} IN ({placeholders})'
+
+# 供登记表测试编译、诊断工具检查查询计划
+STATEMENTS = {
+    f'{name}:{table}': statement.format(table=table, archive_table=archive_table, columns='id', key='id',
+                                        placeholders='?')
+    for table, (archive_table, _, _) in ARCHIVE_TABLES.items()
+    for name, statement in (('EXPIRE_CHALLENGES', EXPIRE_CHALLENGES), ('SELECT_ARCHIVABLE', SELECT_ARCHIVABLE),
+                            ('COPY_TO_ARCHIVE', COPY_TO_ARCHIVE), ('DELETE_ARCHIVED', DELETE_ARCHIVED))
+}
+
+
+def _columns(cursor, table):
+    cursor.execute(f'PRAGMA table_info({table})')
+    return [row[1] for row in cursor.fetchall()]
+
+
+# 冷表与热表列相同（不带约束），热表新增列时同步补到冷表
+def _ensure_archive_table(cursor, table, archive_table):
+    columns = _columns(cursor, table)
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS {archive_table} AS SELECT * FROM {table} WHERE 0')
+    archived = set(_columns(cursor, archive_table))
+    for column in columns:
+        if column not in archived:
+            cursor.execute(f'ALTER TABLE {archive_table} ADD COLUMN {column}')
+    return columns
+
+
+def init_maintenance_tables(cursor):
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_pk_challenges_status ON pk_challenges (status, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_boss_challenges_status ON boss_challenges (status, created_at)')
+    for table, (archive_table, child_table, _) in ARCHIVE_TABLES.items():
+        _ensure_archive_table(cursor, table, archive_table)
+        if child_table:
+            _ensure_archive_table(cursor, child_table, f'{child_table}_archive')
+
+
+# 把超时的挑战标记为expired；expired_pk_ids为本次过期的PK挑战ID，调用方据此关闭内存中的对战
+def expire_challenges(conn, now=None):
+    now = now or datetime.now()
+    cursor = conn.cursor()
+    result = {'expired_pk_ids': []}
+    for key, table, status, ttl in (('pk_pending', 'pk_challenges', 'pending', PK_PENDING_TTL),
+                                    ('pk_active', 'pk_challenges', 'active', PK_ACTIVE_TTL),
+                                    ('boss_active', 'boss_challenges', 'active', BOSS_ACTIVE_TTL)):
+        cursor.execute(EXPIRE_CHALLENGES.format(table=table), (now.isoformat(), status, (now - ttl).isoformat()))
+        ids = [row[0] for row in cursor.fetchall()]
+        result[key] = len(ids)
+        if table == 'pk_challenges':
+            result['expired_pk_ids'] += ids
+    conn.commit()
+    return result
+
+
+# 把一批（最多batch_size个）已结束超过ARCHIVE_AFTER的挑战（及参与记录）移到冷表，不提交，返回移动的行数
+def archive_batch(conn, table, now, batch_size=ARCHIVE_BATCH_SIZE):
+    archive_table, child_table, child_key = ARCHIVE_TABLES[table]
+    cutoff = (now - ARCHIVE_AFTER).isoformat()
+    cursor = conn.cursor()
+    columns = ', '.join(_ensure_archive_table(cursor, table, archive_table))
+    cursor.execute(SELECT_ARCHIVABLE.format(table=table), (cutoff, cutoff, batch_size))
+    ids = [row[0] for row in cursor.fetchall()]
+    if not ids:
+        return 0
+    placeholders = ','.join('?' * len(ids))
+    cursor.execute(COPY_TO_ARCHIVE.format(archive_table=archive_table, table=table, columns=columns, key='id',
+                                          placeholders=placeholders), ids)
+    if child_table:
+        child_columns = ', '.join(_ensure_archive_table(cursor, child_table, f'{child_table}_archive'))
+        cursor.execute(COPY_TO_ARCHIVE.format(archive_table=f'{child_table}_archive', table=child_table,
+                                              columns=child_columns, key=child_key, placeholders=placeholders), ids)
+        cursor.execute(DELETE_ARCHIVED.format(table=child_table, key=child_key, placeholders=placeholders), ids)
+    cursor.execute(DELETE_ARCHIVED.format(table=table, key='id', placeholders=placeholders), ids)
+    return len(ids)
+
+
+# 分批把已结束超过ARCHIVE_AFTER的挑战（及参与记录）移到冷表，每批一个事务
+def archive_challenges(conn, now=None, batch_size=ARCHIVE_BATCH_SIZE):
+    now = now or datetime.now()
+    result = {}
+    for table in ARCHIVE_TABLES:
+        moved = 0
+        while True:
+            count = archive_batch(conn, table, now, batch_size)
+            conn.commit()
+            moved += count
+            if count < batch_size:
+                break
+        result[table] = moved
+    return result
+
+
+# 更新查询规划器的统计信息，并回收空闲页
+def optimize_database(conn, vacuum=True):
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.commit()
+    if vacuum:
+        conn.execute('VACUUM')
+    return {'analyzed': True, 'vacuumed': vacuum}
@@ -0,0 +1,149 @@
+import random
+import time
+
+# 按 用户×知识点 记录答题情况，并据此加权抽取知识点（薄弱的知识点更容易被抽到）
+
+# 指数衰减正确率的平滑系数：越大越看重最近的答题
+DECAY_ALPHA = 0.3
+
+# 没有答过的知识点的初始正确率
+PRIOR_ACCURACY = 0.5
+
+# 已完全掌握的知识点仍保留的最小权重
+MIN_WEIGHT = 0.1
+
+# 按知识点取用户的掌握记录，{placeholders} 为知识点ID的占位符
+SELECT_MASTERY_FOR_KNOWLEDGE = '''
+    SELECT knowledge_id, attempts, correct, accuracy FROM knowledge_mastery
+    WHERE user_id = ? AND knowledge_id IN ({placeholders})
+'''
+
+UPSERT_MASTERY = '''
+    INSERT INTO knowledge_mastery (user_id, knowledge_id, attempts, correct, accuracy, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (user_id, knowledge_id) DO UPDATE SET
+        attempts = excluded.attempts,
+        correct = excluded.correct,
+        accuracy = excluded.accuracy,
+        updated_at = excluded.updated_at
+'''
+
+SELECT_USER_MASTERY = 'SELECT knowledge_id, accuracy FROM knowledge_mastery WHERE user_id = ?'
+
+# 供登记表测试编译、诊断工具检查查询计划
+STATEMENTS = {
+    'SELECT_MASTERY_FOR_KNOWLEDGE': SELECT_MASTERY_FOR_KNOWLEDGE.format(placeholders='?'),
+    'UPSERT_MASTERY': UPSERT_MASTERY,
+    'SELECT_USER_MASTERY': SELECT_USER_MASTERY
+}
+
+
+def init_mastery_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS knowledge_mastery (
+            user_id INTEGER,
+            knowledge_id INTEGER,
+            attempts INTEGER DEFAULT 0,
+            correct INTEGER DEFAULT 0,
+            accuracy REAL,
+            updated_at INTEGER,
+            PRIMARY KEY (user_id, knowledge_id)
+        ) WITHOUT ROWID
+    ''')
+
+
+# 客户端提交的知识点ID：整数或整数字符串，其他值（包括布尔值、超出SQLite整数范围的值）返回None
+def parse_knowledge_id(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        knowledge_id = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return knowledge_id if -2 ** 63 <= knowledge_id < 2 ** 63 else None
+
+
+# 批量记录一次答题中每道题的对错，answers: [{'knowledge_id': int, 'correct': bool}]，
+# answers不是列表时不记录，知识点ID无效的记录跳过，不影响其他记录
+def record_answers(cursor, user_id, answers, now=None):
+    now = int(now if now is not None else time.time())
+    results = {}
+    for answer in answers if isinstance(answers, list) else []:
+        knowledge_id = parse_knowledge_id(answer.get('knowledge_id')) if isinstance(answer, dict) else None
+        if knowledge_id is None:
+            continue
+        results.setdefault(knowledge_id, []).append(1 if answer.get('correct') else 0)
+    if not results:
+        return 0
+
+    ids = list(results)
+    cursor.execute(SELECT_MASTERY_FOR_KNOWLEDGE.format(placeholders=','.join('?' * len(ids))), [user_id] + ids)
+    existing = {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+
+    rows = []
+    for knowledge_id, outcomes in results.items():
+        attempts, correct, accuracy = existing.get(knowledge_id, (0, 0, PRIOR_ACCURACY))
+        for outcome in outcomes:
+            accuracy = (1 - DECAY_ALPHA) * accuracy + DECAY_ALPHA * outcome
+        rows.append((user_id, knowledge_id, attempts + len(outcomes), correct + sum(outcomes), accuracy, now))
+
+    cursor.executemany(UPSERT_MASTERY, rows)
+    return len(rows)
+
+
+# 读取用户所有知识点的掌握程度 {knowledge_id: accuracy}
+def get_user_mastery(cursor, user_id):
+    cursor.execute(SELECT_USER_MASTERY, (user_id,))
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def weight_for(accuracy):
+    if accuracy is None:
+        accuracy = PRIOR_ACCURACY
+    return MIN_WEIGHT + (1.0 - accuracy)
+
+
+# Vose别名法：O(n)建表，之后每次抽取O(1)
+class AliasSampler:
+    def __init__(self, weights, rng=None):
+        self.rng = rng or random
+        n = len(weights)
+        total = float(sum(weights))
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in large + small:
+            self.prob[i] = 1.0
+
+    def draw(self):
+        i = self.rng.randrange(len(self.prob))
+        return i if self.rng.random() < self.prob[i] else self.alias[i]
+
+
+# 按掌握程度加权抽取count个知识点，尽量不重复
+def pick_weak_points(knowledge_points, mastery, count, rng=None):
+    if not knowledge_points:
+        return []
+    sampler = AliasSampler([weight_for(mastery.get(kp.get('id'))) for kp in knowledge_points], rng)
+    distinct = len(knowledge_points) >= count
+    picked = []
+    seen = set()
+    for _ in range(count):
+        index = sampler.draw()
+        # 知识点足够多时，重复抽到的最多重抽3次
+        retries = 3
+        while distinct and index in seen and retries:
+            index = sampler.draw()
+            retries -= 1
+        seen.add(index)
+        picked.append(knowledge_points[index])
+    return picked
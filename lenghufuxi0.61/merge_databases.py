@@ -0,0 +1,233 @@
+import argparse
+import json
+import os
+import pathlib
+import sqlite3
+import sys
+import time
+
+from db_config import DB_FILE, add_db_argument
+from diagnostics import REFERENCES
+from knowledge_shards import KnowledgeShards
+
+# 合并数据库：把旧脚本写入的quiz.db等文件并入服务器使用的数据库。
+# 源库以只读方式ATTACH，每张表用一条INSERT…SELECT批量写入；
+# 同一行按业务键判断（自增ID在两个库中各自分配，不能直接比较），引用列按已合并的行换成目标库中的ID。
+# 两边都有但内容不同的行保留目标库的版本，列入冲突报告。
+# 知识点按课程拆分到分片时，与目标库所有库中的知识点比较；新知识点先写入主库，合并后移到所属课程的分片
+
+# (表, 判断是同一行的列, 比较内容时忽略的列)，按引用关系排序：被引用的表在前
+MERGE_TABLES = (
+    ('users', ('name',), ()),
+    ('chapters', ('name', 'level', 'parent_id'), ()),
+    ('knowledge', ('title', 'chapter_id'), ()),
+    ('science_encyclopedia', ('title',), ('created_at',)),
+    ('rankings', ('name', 'score', 'correctCount', 'time', 'date'), ()),
+    ('user_course_permissions', ('user_id', 'chapter_id'), ()),
+    ('user_quiz_times', ('user_id', 'chapter_id'), ()),
+    ('pk_challenges', ('challenger_id', 'opponent_id', 'created_at'), ()),
+    ('boss_challenges', ('creator_id', 'boss_name', 'created_at'), ()),
+    ('boss_participants', ('boss_id', 'user_id'), ()),
+    ('knowledge_mastery', ('user_id', 'knowledge_id'), ())
+)
+
+# 每张表最多列出的冲突样例数
+SAMPLE_LIMIT = 10
+
+
+def _tables(cursor, schema):
+    cursor.execute(f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _columns(cursor, schema, table):
+    cursor.execute(f'PRAGMA {schema}.table_info({table})')
+    return [row[1] for row in cursor.fetchall()]
+
+
+def _same(columns, left='d', right='i'):
+    return ' AND '.join(f'{left}."{column}" IS {right}."{column}"' for column in columns) or '1'
+
+
+# 合并一张表，返回该表的统计；existing为判断行是否已存在时读取的表（默认主库的同名表）
+def merge_table(cursor, table, keys, ignored, sample_limit=SAMPLE_LIMIT, existing=None):
+    existing = existing or f'main.{table}'
+    if table not in _tables(cursor, 'main'):
+        # 目标库没有这张表：按源库的建表语句创建
+        cursor.execute("SELECT sql FROM src.sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        cursor.execute(cursor.fetchone()[0])
+    source_columns = _columns(cursor, 'src', table)
+    target_columns = set(_columns(cursor, 'main', table))
+    has_id = 'id' in source_columns and 'id' in target_columns
+    columns = [column for column in source_columns if column in target_columns and column != 'id']
+    if not all(key in columns for key in keys):
+        return {'status': 'skipped', 'message': f'缺少用于比较的列 {keys}'}
+    refs = [(column, parent) for t, column, parent in REFERENCES if t == table and column in columns]
+    self_ref = any(parent == table for _, parent in refs)
+    compared = [column for column in columns if column not in keys and column not in ignored]
+
+    # 临时索引：按业务键查找目标库中的行（事务结束前删除）
+    index = f'merge_{table}_keys'
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS main.{index} ON {table} ({", ".join(keys)})')
+
+    result = {'source_rows': 0, 'inserted': 0, 'identical': 0, 'conflicts': 0, 'rejected': 0, 'unmapped': 0}
+    samples = []
+    while True:
+        # 源库中还没处理的行，引用列换成目标库的ID；自引用的表（章节）一轮处理一层
+        selects = [f's."{column}"' for column in columns]
+        joins = []
+        unmapped = []
+        for n, (column, parent) in enumerate(refs):
+            selects[columns.index(column)] = f'm{n}.dst_id'
+            joins.append(f'LEFT JOIN temp.id_map m{n} ON m{n}.tbl = \'{parent}\' AND m{n}.src_id = s."{column}"')
+            unmapped.append(f'(s."{column}" IS NOT NULL AND m{n}.dst_id IS NULL)')
+        where = ["s.id NOT IN (SELECT src_id FROM temp.handled WHERE tbl = ?)"] if has_id else []
+        if self_ref:
+            where.append('NOT (' + ' OR '.join(unmapped) + ')')
+        cursor.execute('DROP TABLE IF EXISTS temp.incoming')
+        cursor.execute(f'''
+            CREATE TEMP TABLE incoming AS
+            SELECT {'s.id' if has_id else 'NULL'} AS src_id,
+                   {' OR '.join(unmapped) or '0'} AS unmapped,
+                   {', '.join(f'{expr} AS "{column}"' for expr, column in zip(selects, columns))}
+            FROM src.{table} s {' '.join(joins)}
+            {'WHERE ' + ' AND '.join(where) if where else ''}
+        ''', (table,) if has_id else ())
+        cursor.execute('SELECT COUNT(*), COALESCE(SUM(unmapped), 0) FROM temp.incoming')
+        incoming, unmapped_rows = cursor.fetchone()
+        if incoming == 0:
+            break
+        result['source_rows'] += incoming
+        result['unmapped'] += unmapped_rows
+
+        match = f'EXISTS (SELECT 1 FROM {existing} d WHERE {_same(keys)})'
+        cursor.execute(f'''
+            SELECT COUNT(*), COALESCE(SUM(EXISTS (SELECT 1 FROM {existing} d WHERE {_same(keys + tuple(compared))})), 0)
+            FROM temp.incoming i WHERE NOT i.unmapped AND {match}
+        ''')
+        matched, identical = cursor.fetchone()
+        result['identical'] += identical
+        result['conflicts'] += matched - identical
+        if matched > identical and len(samples) < sample_limit:
+            cursor.execute(f'''
+                SELECT i.src_id, {', '.join(f'i."{column}"' for column in keys + tuple(compared))}
+                FROM temp.incoming i
+                WHERE NOT i.unmapped AND {match}
+                  AND NOT EXISTS (SELECT 1 FROM {existing} d WHERE {_same(keys + tuple(compared))})
+                LIMIT ?
+            ''', (sample_limit - len(samples),))
+            for row in cursor.fetchall():
+                key_values = dict(zip(keys, row[1:1 + len(keys)]))
+                cursor.execute(f'''
+                    SELECT {', '.join(f'"{column}"' for column in compared)} FROM {existing}
+                    WHERE {' AND '.join(f'"{key}" IS ?' for key in keys)} LIMIT 1
+                ''', tuple(key_values.values()))
+                target = cursor.fetchone()
+                samples.append({
+                    'source_id': row[0],
+                    'key': key_values,
+                    'columns': [column for column, source, current in zip(compared, row[1 + len(keys):], target)
+                                if source != current]
+                })
+
+        # 目标库中没有的行一次写入；违反其他唯一约束（例如用户名重复）的行被忽略，计入rejected
+        cursor.execute(f'''
+            INSERT OR IGNORE INTO main.{table} ({', '.join(f'"{column}"' for column in columns)})
+            SELECT {', '.join(f'i."{column}"' for column in columns)} FROM temp.incoming i
+            WHERE NOT i.unmapped AND NOT {match}
+        ''')
+        inserted = cursor.rowcount
+        result['inserted'] += inserted
+        result['rejected'] += incoming - unmapped_rows - matched - inserted
+
+        if has_id:
+            # 记录源库ID到目标库ID的对应关系，供引用这张表的表换算
+            cursor.execute(f'''
+                INSERT OR IGNORE INTO temp.id_map (tbl, src_id, dst_id)
+                SELECT ?, i.src_id, (SELECT MIN(d.id) FROM {existing} d WHERE {_same(keys)})
+                FROM temp.incoming i WHERE NOT i.unmapped AND {match}
+            ''', (table,))
+            cursor.execute('INSERT OR IGNORE INTO temp.handled (tbl, src_id) SELECT ?, src_id FROM temp.incoming',
+                           (table,))
+        if not self_ref:
+            break
+
+    if self_ref:
+        # 父章节一直没能合并的章节
+        cursor.execute(f'''
+            SELECT COUNT(*) FROM src.{table} WHERE id NOT IN (SELECT src_id FROM temp.handled WHERE tbl = ?)
+        ''', (table,))
+        remaining = cursor.fetchone()[0]
+        result['source_rows'] += remaining
+        result['unmapped'] += remaining
+    cursor.execute(f'DROP INDEX main.{index}')
+    if samples:
+        result['conflict_samples'] = samples
+    return result
+
+
+# 把一个源库并入conn所在的目标库，dry_run时只统计不提交；
+# shards为目标库的KnowledgeShards，有拆分的课程时知识点与所有库比较，合并后移到所属的分片
+def merge_database(conn, source, dry_run=False, sample_limit=SAMPLE_LIMIT, shards=None):
+    cursor = conn.cursor()
+    existing = {'knowledge': shards.view(cursor)} if shards is not None else {}
+    cursor.execute('ATTACH DATABASE ? AS src', (pathlib.Path(source).absolute().as_uri() + '?mode=ro',))
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('CREATE TEMP TABLE IF NOT EXISTS id_map (tbl TEXT, src_id INTEGER, dst_id INTEGER, '
+                       'PRIMARY KEY (tbl, src_id))')
+        cursor.execute('CREATE TEMP TABLE IF NOT EXISTS handled (tbl TEXT, src_id INTEGER, PRIMARY KEY (tbl, src_id))')
+        cursor.execute('DELETE FROM temp.id_map')
+        cursor.execute('DELETE FROM temp.handled')
+        source_tables = _tables(cursor, 'src')
+        report = {'source': source, 'tables': {}}
+        for table, keys, ignored in MERGE_TABLES:
+            if table in source_tables:
+                report['tables'][table] = merge_table(cursor, table, keys, ignored, sample_limit, existing.get(table))
+        report['skipped_tables'] = sorted(source_tables - {table for table, _, _ in MERGE_TABLES})
+        cursor.execute('DROP TABLE IF EXISTS temp.incoming')
+        cursor.execute('ROLLBACK' if dry_run else 'COMMIT')
+    except Exception:
+        if conn.in_transaction:
+            cursor.execute('ROLLBACK')
+        raise
+    finally:
+        cursor.execute('DETACH DATABASE src')
+    if shards is not None and shards.sharded_courses() and not dry_run:
+        report['moved'] = shards.rebalance(conn)
+
+    # 核对：源库的每一行都有去处
+    report['verified'] = all(
+        result.get('status') == 'skipped' or result['source_rows'] == sum(
+            result[key] for key in ('inserted', 'identical', 'conflicts', 'rejected', 'unmapped'))
+        for result in report['tables'].values())
+    report['conflicts'] = sum(result.get('conflicts', 0) for result in report['tables'].values())
+    return report
+
+
+# 命令行入口：python merge_databases.py quiz.db [其他库 ...] [--db 目标库] [--dry-run]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='把其他数据库文件中的数据合并到服务器使用的数据库')
+    parser.add_argument('sources', nargs='+', help='要并入的数据库文件（例如 quiz.db）')
+    add_db_argument(parser)
+    parser.add_argument('--dry-run', action='store_true', help='只统计和报告冲突，不写入')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(pathlib.Path(args.db).absolute().as_uri(), uri=True, isolation_level=None)
+    shards = KnowledgeShards(args.db)
+    reports = []
+    for source in args.sources:
+        if not os.path.exists(source):
+            reports.append({'source': source, 'status': 'skipped', 'message': '文件不存在'})
+            continue
+        if os.path.samefile(source, args.db):
+            reports.append({'source': source, 'status': 'skipped', 'message': '与目标库是同一个文件'})
+            continue
+        started_at = time.perf_counter()
+        report = merge_database(conn, source, args.dry_run, shards=shards)
+        report['seconds'] = round(time.perf_counter() - started_at, 3)
+        report['status'] = 'success' if report['verified'] else 'error'
+        reports.append(report)
+    conn.close()
+    print(json.dumps({'target': args.db, 'dry_run': args.dry_run, 'sources': reports}, ensure_ascii=False, indent=2))
+    sys.exit(0 if all(report['status'] != 'error' for report in reports) else 1)
@@ -0,0 +1,176 @@
+import bisect
+import threading
+import time
+
+from flask import request, g
+
+# 延迟直方图的桶边界（秒）
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 输出的分位数
+QUANTILES = (0.5, 0.95, 0.99)
+
+_lock = threading.Lock()
+_local = threading.local()
+
+
+# 固定桶直方图，记录次数、总和和各桶计数
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    # 按桶线性插值估算分位数（与Prometheus的histogram_quantile相同的算法）
+    def quantile(self, q):
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+
+# 单个路由的统计数据
+class RouteStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency = Histogram()
+        self.sql = Histogram()
+
+
+# {(method, route): RouteStats}
+route_stats = {}
+
+# 其他模块注册的指标收集函数，每个返回若干行Prometheus文本
+collectors = []
+
+
+# 累加当前线程（当前请求）的SQL耗时
+def record_sql_time(elapsed):
+    _local.sql_time = getattr(_local, 'sql_time', 0.0) + elapsed
+
+
+# 取出并清零当前线程累计的SQL耗时（写线程按写操作分别统计，再交给调用方的请求）
+def take_sql_time():
+    elapsed = getattr(_local, 'sql_time', 0.0)
+    _local.sql_time = 0.0
+    return elapsed
+
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+    _local.sql_time = 0.0
+
+
+def _after_request(response):
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    key = (request.method, route)
+    with _lock:
+        stats = route_stats.get(key)
+        if stats is None:
+            stats = route_stats[key] = RouteStats()
+        stats.requests += 1
+        if response.status_code >= 500:
+            stats.errors += 1
+        stats.latency.observe(elapsed)
+        stats.sql.observe(getattr(_local, 'sql_time', 0.0))
+    return response
+
+
+# 注册请求计时钩子
+def init_metrics(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+
+def register_collector(collector):
+    collectors.append(collector)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_float(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+
+def _histogram_lines(name, labels, histogram):
+    lines = []
+    cumulative = 0
+    for bound, bucket_count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+        cumulative += bucket_count
+        lines.append(f'{name}_bucket{{{labels},le="{_format_float(bound)}"}} {cumulative}')
+    lines.append(f'{name}_sum{{{labels}}} {_format_float(histogram.sum)}')
+    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+    return lines
+
+
+# 生成Prometheus文本格式的指标
+def render_prometheus():
+    with _lock:
+        snapshot = sorted(route_stats.items())
+        lines = [
+            '# HELP lenghu_http_requests_total 每个路由的请求总数',
+            '# TYPE lenghu_http_requests_total counter'
+        ]
+        for (method, route), stats in snapshot:
+            labels = f'method="{method}",route="{_escape(route)}"'
+            lines.append(f'lenghu_http_requests_total{{{labels}}} {stats.requests}')
+
+        lines += [
+            '# HELP lenghu_http_request_errors_total 每个路由返回5xx的次数',
+            '# TYPE lenghu_http_request_errors_total counter'
+        ]
+        for (method, route), stats in snapshot:
+            labels = f'method="{method}",route="{_escape(route)}"'
+            lines.append(f'lenghu_http_request_errors_total{{{labels}}} {stats.errors}')
+
+        lines += [
+            '# HELP lenghu_http_request_duration_seconds 请求处理耗时',
+            '# TYPE lenghu_http_request_duration_seconds histogram'
+        ]
+        for (method, route), stats in snapshot:
+            labels = f'method="{method}",route="{_escape(route)}"'
+            lines += _histogram_lines('lenghu_http_request_duration_seconds', labels, stats.latency)
+
+        lines += [
+            '# HELP lenghu_http_request_duration_quantile_seconds 由直方图估算的请求耗时分位数',
+            '# TYPE lenghu_http_request_duration_quantile_seconds gauge'
+        ]
+        for (method, route), stats in snapshot:
+            labels = f'method="{method}",route="{_escape(route)}"'
+            for q in QUANTILES:
+                value = _format_float(stats.latency.quantile(q))
+                lines.append(f'lenghu_http_request_duration_quantile_seconds{{{labels},quantile="{q}"}} {value}')
+
+        lines += [
+            '# HELP lenghu_http_request_sql_seconds 每个请求中执行SQL的耗时',
+            '# TYPE lenghu_http_request_sql_seconds histogram'
+        ]
+        for (method, route), stats in snapshot:
+            labels = f'method="{method}",route="{_escape(route)}"'
+            lines += _histogram_lines('lenghu_http_request_sql_seconds', labels, stats.sql)
+
+    for collector in collectors:
+        lines += collector()
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from db_config import DB_FILE, add_db_argument
+
+# 旧版本（lenghufuxi0.2–4.0）的排行榜除了写数据库，还在每次提交时整体读写quiz_data.json。
+# 这个工具把文件中的记录流式读出，分批导入rankings表并累加users.totalScore，最后核对数量；
+# 导入成功后把文件改名为 quiz_data.json.migrated，旧服务器不再读写它
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_FILE = os.path.join(BASE_DIR, 'quiz_data.json')
+
+# 导入后的文件名后缀
+MIGRATED_SUFFIX = '.migrated'
+
+# 每个事务导入的记录数
+BATCH_SIZE = 500
+
+# 每次从文件读取的字节数
+CHUNK_SIZE = 64 * 1024
+
+# 每条记录必须有的字段
+REQUIRED_FIELDS = ('name', 'score', 'correctCount', 'time', 'date')
+
+
+class LegacyFormatError(Exception):
+    pass
+
+
+# 逐条读出 {"rankings": [...]} 中的记录，内存中只保留当前的数据块
+def iter_rankings(path, chunk_size=CHUNK_SIZE):
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        eof = False
+
+        def fill():
+            nonlocal buffer, eof
+            chunk = f.read(chunk_size)
+            if chunk:
+                buffer += chunk
+            else:
+                eof = True
+
+        # 定位 "rankings" 数组的开头
+        while True:
+            key = buffer.find('"rankings"')
+            start = buffer.find('[', key) if key >= 0 else -1
+            if start >= 0:
+                buffer = buffer[start + 1:]
+                break
+            if eof:
+                raise LegacyFormatError('文件中没有rankings数组')
+            fill()
+
+        while True:
+            pos = 0
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            buffer = buffer[pos:]
+            if buffer.startswith(']'):
+                return
+            if not buffer:
+                if eof:
+                    raise LegacyFormatError('rankings数组没有结束')
+                fill()
+                continue
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # 记录被数据块截断：读入更多内容再解析
+                if eof:
+                    raise LegacyFormatError('rankings数组中有无法解析的记录')
+                fill()
+                continue
+            buffer = buffer[end:]
+            yield record
+
+
+def valid_record(record):
+    if not isinstance(record, dict) or any(record.get(field) is None for field in REQUIRED_FIELDS):
+        return False
+    return isinstance(record['name'], str) and record['name'] != '' and all(
+        isinstance(record[field], (int, float)) for field in ('score', 'correctCount', 'time'))
+
+
+def _table_exists(cursor, name):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cursor.fetchone() is not None
+
+
+# 数据库中已有该用户的排行榜记录（包括已归档汇总的）时返回其总分，否则返回None。
+# 旧服务器同时写了数据库和JSON文件，这些用户的分数已经在数据库中，再导入会重复计分
+def existing_score(cursor, name, has_summary):
+    cursor.execute('SELECT COUNT(*), COALESCE(SUM(score), 0) FROM rankings WHERE name = ?', (name,))
+    count, score = cursor.fetchone()
+    if has_summary:
+        cursor.execute('SELECT quiz_count, total_score FROM rankings_summary WHERE name = ?', (name,))
+        row = cursor.fetchone()
+        if row is not None:
+            count, score = count + row[0], score + row[1]
+    return score if count else None
+
+
+def _totals(cursor):
+    cursor.execute('SELECT COUNT(*), COALESCE(SUM(score), 0) FROM rankings')
+    rankings, score = cursor.fetchone()
+    cursor.execute('SELECT COALESCE(SUM(totalScore), 0) FROM users')
+    return rankings, score, cursor.fetchone()[0]
+
+
+# 分批导入，每批一个事务。JSON中每个用户一条记录，score是该用户的累计总分；
+# 数据库中已有记录的用户跳过并列入conflicts，因此重复执行不会重复导入
+def migrate(conn, path, batch_size=BATCH_SIZE):
+    cursor = conn.cursor()
+    has_summary = _table_exists(cursor, 'rankings_summary')
+    before = _totals(cursor)
+    report = {'read': 0, 'imported': 0, 'skipped': 0, 'invalid': 0,
+              'imported_score': 0, 'users_updated': 0, 'conflicts': []}
+    imported_names = set()  # 本次导入的用户（文件中同名的多条记录都导入）
+    batch = []
+
+    def flush():
+        for record in batch:
+            cursor.execute('''
+                INSERT INTO rankings (name, score, correctCount, time, date)
+                VALUES (?, ?, ?, ?, ?)
+            ''', tuple(record[field] for field in REQUIRED_FIELDS))
+            cursor.execute('UPDATE users SET totalScore = totalScore + ? WHERE name = ?',
+                           (record['score'], record['name']))
+            report['users_updated'] += cursor.rowcount
+            report['imported_score'] += record['score']
+        conn.commit()
+        report['imported'] += len(batch)
+        batch.clear()
+
+    for record in iter_rankings(path):
+        report['read'] += 1
+        if not valid_record(record):
+            report['invalid'] += 1
+            continue
+        name = record['name']
+        if name not in imported_names:
+            score = existing_score(cursor, name, has_summary)
+            if score is not None:
+                report['skipped'] += 1
+                report['conflicts'].append({'name': name, 'json_score': record['score'], 'db_score': score})
+                continue
+            imported_names.add(name)
+        batch.append(record)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    # 核对：文件中的记录都有去处，数据库增加的行数和分数与导入的一致
+    after = _totals(cursor)
+    report['verified'] = (
+        report['read'] == report['imported'] + report['skipped'] + report['invalid']
+        and after[0] - before[0] == report['imported']
+        and after[1] - before[1] == report['imported_score']
+    )
+    report['rankings_before'], report['rankings_after'] = before[0], after[0]
+    report['users_score_delta'] = after[2] - before[2]
+    return report
+
+
+# 命令行入口：python migrate_legacy_json.py --json 旧目录/quiz_data.json --db 旧目录/quiz_database.db
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='把旧版本quiz_data.json中的排行榜导入SQLite数据库')
+    parser.add_argument('--json', default=DATA_FILE, help='quiz_data.json路径')
+    add_db_argument(parser)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='每个事务导入的记录数')
+    parser.add_argument('--keep', action='store_true', help='导入后保留quiz_data.json（默认改名为.migrated）')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.json):
+        print(json.dumps({'status': 'skipped', 'message': f'{args.json} 不存在'}, ensure_ascii=False))
+        sys.exit(0)
+
+    conn = sqlite3.connect(args.db)
+    started_at = time.perf_counter()
+    try:
+        report = migrate(conn, args.json, args.batch_size)
+    except LegacyFormatError as e:
+        print(json.dumps({'status': 'error', 'message': str(e)}, ensure_ascii=False))
+        sys.exit(1)
+    finally:
+        conn.close()
+    report['seconds'] = round(time.perf_counter() - started_at, 3)
+    report['status'] = 'success' if report['verified'] else 'error'
+    if report['verified'] and not args.keep:
+        os.replace(args.json, args.json + MIGRATED_SUFFIX)
+        report['renamed_to'] = args.json + MIGRATED_SUFFIX
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    sys.exit(0 if report['verified'] else 1)
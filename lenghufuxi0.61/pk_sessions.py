@@ -0,0 +1,95 @@
+import threading
+import time
+
+# PK对战的内存状态：接受挑战时生成一次题目集，双方共用；按题同步，双方都答完当前题才进入下一题
+
+# 未完成的对战最多保留的时间（秒）
+SESSION_TTL = 2 * 3600
+
+
+class PKSession:
+    def __init__(self, challenge_id, challenger_id, opponent_id, question_set, now=None):
+        self.challenge_id = challenge_id
+        self.challenger_id = challenger_id
+        self.opponent_id = opponent_id
+        self.set_id = question_set['set_id']
+        self.questions = question_set['questions']
+        # 答案键只保存在会话里，随会话一起存在，不受题目集答案键存储淘汰的影响
+        self.answer_key = bytes(question_set['answers'])
+        self.created_at = now if now is not None else time.time()
+        # 同一场对战的作答按顺序处理（判分、写库、推送）
+        self.lock = threading.Lock()
+        self.answers = {challenger_id: [], opponent_id: []}  # {user_id: [每题是否答对]}
+
+    @property
+    def total_questions(self):
+        return len(self.questions)
+
+    # 双方都已作答的题数，即当前进行到的题号
+    @property
+    def current_question(self):
+        return min(len(answers) for answers in self.answers.values())
+
+    @property
+    def completed(self):
+        return self.current_question >= self.total_questions
+
+    def score(self, user_id):
+        return sum(self.answers[user_id])
+
+    # 按会话的答案键判分，题号越界视为答错
+    def grade(self, question_index, choice):
+        if not isinstance(question_index, int) or not 0 <= question_index < len(self.answer_key):
+            return False
+        return self.answer_key[question_index] == choice
+
+    # 记录一次作答，返回是否进入了下一题；不是当前题或重复作答时抛出ValueError
+    def record(self, user_id, question_index, correct):
+        if user_id not in self.answers:
+            raise ValueError('不是该对战的玩家')
+        answers = self.answers[user_id]
+        if question_index != len(answers) or question_index != self.current_question:
+            raise ValueError('请等待对手完成当前题目')
+        if question_index >= self.total_questions:
+            raise ValueError('题目已全部完成')
+        answers.append(bool(correct))
+        return self.current_question > question_index
+
+    def to_dict(self):
+        return {
+            'challenge_id': self.challenge_id,
+            'challenger_id': self.challenger_id,
+            'opponent_id': self.opponent_id,
+            'set_id': self.set_id,
+            'questions': self.questions,
+            'total_questions': self.total_questions,
+            'current_question': self.current_question,
+            'challenger_score': self.score(self.challenger_id),
+            'opponent_score': self.score(self.opponent_id)
+        }
+
+
+class PKSessionStore:
+    def __init__(self, ttl=SESSION_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.sessions = {}  # {challenge_id: PKSession}
+
+    def add(self, session):
+        with self.lock:
+            # 顺便清理超时未完成的对战
+            expired_before = time.time() - self.ttl
+            for challenge_id in [key for key, value in self.sessions.items() if value.created_at < expired_before]:
+                del self.sessions[challenge_id]
+            self.sessions[session.challenge_id] = session
+
+    def get(self, challenge_id):
+        with self.lock:
+            return self.sessions.get(challenge_id)
+
+    def remove(self, challenge_id):
+        with self.lock:
+            self.sessions.pop(challenge_id, None)
+
+    def __len__(self):
+        return len(self.sessions)
@@ -0,0 +1,125 @@
+import hashlib
+import hmac
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+# 带种子的题目集：同一个种子和同一批知识点总是生成相同的题目，
+# 正确答案只保存在服务器端（答案键），客户端拿到的题目不含答案
+
+# 答案键最多保存的题目集数量，超出后淘汰最久未使用的
+MAX_SETS = 20000
+
+# 答案键的有效期（秒）
+SET_TTL = 2 * 3600
+
+_system_random = random.SystemRandom()
+
+# 派生种子用的密钥，每次启动随机生成；题目由种子决定，种子不能被客户端猜到或指定
+_seed_secret = os.urandom(32)
+
+
+def new_seed():
+    return _system_random.randrange(1, 2 ** 31)
+
+
+# 由服务器密钥和给定的字段派生种子：相同字段在本次运行中总是得到相同的种子
+def derive_seed(*parts):
+    digest = hmac.new(_seed_secret, '|'.join(str(part) for part in parts).encode('utf-8'), hashlib.sha256).digest()
+    return int.from_bytes(digest[:4], 'big') % (2 ** 31 - 1) + 1
+
+
+# 由种子、来源和知识点ID计算题目集ID，相同输入得到相同ID
+def make_set_id(seed, source, knowledge_ids, count):
+    digest = hashlib.sha1(f'{seed}|{source}|{count}|'.encode('utf-8'))
+    digest.update(','.join(str(knowledge_id) for knowledge_id in knowledge_ids).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+# 去掉答案和解析后返回给客户端
+def strip_answers(questions):
+    return [{key: value for key, value in question.items() if key not in ('answer', 'explanation')}
+            for question in questions]
+
+
+# 题号必须是 [0, count) 中的整数（不接受布尔值）
+def valid_index(question_index, count):
+    return isinstance(question_index, int) and not isinstance(question_index, bool) and 0 <= question_index < count
+
+
+# 答案键存储：LRU + TTL，每个题目集只保存答案下标组成的bytes、各用户已经作答的题号，
+# 以及题目集的归属（如BOSS题目集为 ('boss', boss_id, user_id)，普通题目集为None）
+class AnswerKeyStore:
+    def __init__(self, max_sets=MAX_SETS, ttl=SET_TTL):
+        self.max_sets = max_sets
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.keys = OrderedDict()  # {set_id: (expires_at, bytes, {user_id: {已作答的题号}}, owner)}
+
+    def put(self, set_id, answers, owner=None, now=None):
+        now = now if now is not None else time.time()
+        answers = bytes(answers)
+        with self.lock:
+            # 同一题目集再次生成时（相同种子）保留已作答记录，不能借此重新作答
+            entry = self.keys.get(set_id)
+            answered = entry[2] if entry is not None and entry[1] == answers and entry[3] == owner else {}
+            self.keys[set_id] = (now + self.ttl, answers, answered, owner)
+            self.keys.move_to_end(set_id)
+            while len(self.keys) > self.max_sets:
+                self.keys.popitem(last=False)
+
+    def _entry(self, set_id, now):
+        entry = self.keys.get(set_id)
+        if entry is None:
+            return None
+        if entry[0] < now:
+            del self.keys[set_id]
+            return None
+        self.keys.move_to_end(set_id)
+        return entry
+
+    def get(self, set_id, now=None):
+        now = now if now is not None else time.time()
+        with self.lock:
+            entry = self._entry(set_id, now)
+            return entry[1] if entry is not None else None
+
+    # 题目集的归属，题目集不存在或已过期时返回None
+    def owner(self, set_id, now=None):
+        now = now if now is not None else time.time()
+        with self.lock:
+            entry = self._entry(set_id, now)
+            return entry[3] if entry is not None else None
+
+    # 登记用户作答了某题：第一次返回True，重复作答返回False，题目集不存在或已过期时返回None；
+    # 题号不是题目集中的整数下标时抛出ValueError，不登记
+    def claim(self, set_id, user_id, question_index, now=None):
+        now = now if now is not None else time.time()
+        with self.lock:
+            entry = self._entry(set_id, now)
+            if entry is None:
+                return None
+            if not valid_index(question_index, len(entry[1])):
+                raise ValueError('题号无效')
+            answered = entry[2].setdefault(str(user_id), set())
+            if question_index in answered:
+                return False
+            answered.add(question_index)
+            return True
+
+    # 判分：返回True/False，题目集不存在或已过期时返回None
+    def grade(self, set_id, question_index, choice):
+        answers = self.get(set_id)
+        if answers is None:
+            return None
+        if not valid_index(question_index, len(answers)):
+            return False
+        return answers[question_index] == choice
+
+    def __contains__(self, set_id):
+        return self.get(set_id) is not None
+
+    def __len__(self):
+        return len(self.keys)
@@ -0,0 +1,346 @@
+# 题目生成用的模板：题型、按类别和主题的错误选项、应用/实例题的选项。
+# 只在第一次生成题目时导入（服务器启动后由后台线程预先加载）
+
+# 为不同类型的知识点准备具体的错误选项模板（与知识点高度相关但错误）
+ERROR_TEMPLATES = {
+    '物理': {
+        '声音': [
+            '声音在真空中传播速度最快',
+            '声音的传播需要介质，但介质越稀薄传播越快',
+            '声音在固体中的传播速度比在空气中慢',
+            '声音的响度只与声源的振幅有关，与距离无关'
+        ],
+        '力': [
+            '力可以脱离物体而独立存在',
+            '力的三要素是大小、方向和作用点，但方向不影响力的作用效果',
+            '相互接触的两个物体之间一定有力的作用',
+            '物体受力运动，不受力静止'
+        ],
+        '光': [
+            '光在同种均匀介质中沿直线传播，但在水中会弯曲',
+            '光的传播速度是3×10⁸m/s，在任何介质中都相同',
+            '光从空气斜射入水中时，折射角大于入射角',
+            '平面镜成像是实像，像与物大小相等'
+        ],
+        '电': [
+            '电流方向与电子定向移动方向相同',
+            '串联电路中各用电器两端的电压一定相等',
+            '并联电路中各支路的电流一定相等',
+            '导体的电阻与电压和电流有关'
+        ],
+        '热': [
+            '物体温度越高，内能越大，热量越多',
+            '热传递的实质是温度的传递',
+            '比热容大的物体吸收的热量一定多',
+            '水的沸点一定是100℃'
+        ],
+        '机械': [
+            '使用任何机械都能省力',
+            '机械效率越高，做的有用功越多',
+            '功率越大，做功越快，做的功也越多',
+            '动能和势能可以相互转化，但总能量会减少'
+        ],
+        '默认': [
+            '该现象只存在于地球表面',
+            '该原理与温度变化无关',
+            '该过程不需要任何能量参与',
+            '该现象在真空中无法发生'
+        ]
+    },
+    '化学': {
+        '物质': [
+            '混合物是由不同种分子构成的纯净物',
+            '化合物是由同种元素组成的纯净物',
+            '单质是由不同种元素组成的纯净物',
+            '氧化物是由两种元素组成的化合物，其中一种是氧元素'
+        ],
+        '反应': [
+            '化合反应一定是氧化反应',
+            '分解反应的生成物一定有单质',
+            '置换反应一定有金属单质参加',
+            '复分解反应一定有沉淀、气体或水生成'
+        ],
+        '溶液': [
+            '饱和溶液一定是浓溶液，不饱和溶液一定是稀溶液',
+            '溶液是均一、稳定、无色透明的液体',
+            '溶解度随温度升高而增大的物质，其饱和溶液降温后一定有晶体析出',
+            '溶液的质量等于溶质质量加上溶剂质量'
+        ],
+        '酸碱盐': [
+            '酸溶液一定显酸性，碱性溶液一定是碱溶液',
+            'pH=7的溶液一定是中性溶液',
+            '酸碱中和反应的产物一定是盐和水',
+            '盐溶液一定显中性'
+        ],
+        '默认': [
+            '该反应在任何条件下都能进行',
+            '该物质在任何溶剂中都能溶解',
+            '该过程不需要催化剂参与',
+            '该现象与压强变化无关'
+        ]
+    },
+    '生物': {
+        '细胞': [
+            '所有细胞都有细胞壁、细胞膜、细胞质和细胞核',
+            '植物细胞都有叶绿体，能进行光合作用',
+            '动物细胞都有中心体，参与细胞分裂',
+            '细胞核是遗传信息库，遗传信息主要存在于细胞质中'
+        ],
+        '新陈代谢': [
+            '光合作用只在白天进行，呼吸作用只在晚上进行',
+            '光合作用和呼吸作用的原料和产物完全相同',
+            '植物只能进行光合作用，动物只能进行呼吸作用',
+            '新陈代谢是生物体与外界环境进行物质和能量交换的过程，不需要酶参与'
+        ],
+        '遗传': [
+            '基因位于DNA上，DNA位于染色体上，染色体位于细胞核中',
+            '生物的性状都是由基因决定的，与环境无关',
+            '显性基因控制的性状一定能表现出来',
+            '隐性基因控制的性状永远不能表现出来'
+        ],
+        '生态': [
+            '生态系统中，生产者、消费者、分解者缺一不可',
+            '食物链越长，能量损失越多，最高级消费者获得的能量越多',
+            '生态系统具有一定的自我调节能力，但这种能力是无限的',
+            '生物圈是最大的生态系统，包括地球上所有的生物及其生存环境'
+        ],
+        '默认': [
+            '该生物过程在任何温度下都能进行',
+            '该现象与光照强度无关',
+            '该过程不需要水分参与',
+            '该生物特征在所有物种中都相同'
+        ]
+    },
+    '地理': {
+        '地球': [
+            '地球是一个正球体，赤道半径与极半径相等',
+            '地球自转产生昼夜长短变化，公转产生昼夜交替',
+            '地球自西向东自转，从北极上空看是顺时针方向',
+            '地球公转轨道是正圆形，公转速度恒定不变'
+        ],
+        '气候': [
+            '纬度越高，气温越低，降水越多',
+            '沿海地区降水多，内陆地区降水少',
+            '山地迎风坡降水多，背风坡降水少',
+            '气候是短时间内的大气状况，天气是长期的平均状况'
+        ],
+        '地形': [
+            '平原海拔一般在200米以下，地面平坦开阔',
+            '高原海拔一般在500米以上，地面起伏很大',
+            '山地海拔一般在500米以上，坡度较陡，沟谷较深',
+            '盆地四周高，中间低，但内部一定是平原'
+        ],
+        '人口': [
+            '人口自然增长率等于出生率减去死亡率',
+            '人口密度越大，人口分布越均匀',
+            '发达国家人口增长快，发展中国家人口增长慢',
+            '人口迁移的主要原因是经济因素'
+        ],
+        '默认': [
+            '该地理现象在任何纬度都相同',
+            '该地形特征与板块运动无关',
+            '该气候类型不受海洋影响',
+            '该地区的人口分布与地形无关'
+        ]
+    },
+    '能源': {
+        '传统能源': [
+            '煤炭是不可再生能源，但燃烧不产生任何污染物',
+            '石油是可再生能源，储量丰富，取之不尽',
+            '天然气燃烧产物只有二氧化碳，对环境无污染',
+            '化石能源的利用不会导致温室效应'
+        ],
+        '新能源': [
+            '太阳能是可再生能源，但只能在白天使用',
+            '风能是可再生能源，但发电成本很高',
+            '核能是可再生能源，但核废料处理困难',
+            '生物质能是可再生能源，但燃烧会产生大量污染物'
+        ],
+        '节能': [
+            '提高能源利用效率就是减少能源消耗',
+            '节约能源就是减少能源浪费，不影响生活质量',
+            '开发新能源比节约能源更重要',
+            '能源危机可以通过开发新能源完全解决'
+        ],
+        '默认': [
+            '该能源在任何地区都能开发利用',
+            '该能源技术已经完全成熟',
+            '该能源的使用不会对环境造成任何影响',
+            '该能源的储量是无限的'
+        ]
+    },
+    '机械': {
+        '简单机械': [
+            '杠杆一定省力，省力杠杆的动力臂小于阻力臂',
+            '定滑轮可以省力，动滑轮可以改变力的方向',
+            '滑轮组既能省力又能改变力的方向，但机械效率很低',
+            '斜面越陡，越省力，但机械效率越高'
+        ],
+        '功和能': [
+            '做功越多，功率越大',
+            '功率越大，做功越多',
+            '机械效率越高，做的有用功越多',
+            '动能和势能可以相互转化，总能量保持不变'
+        ],
+        '压强': [
+            '压强越大，压力越大',
+            '压力越大，压强越大',
+            '液体压强与液体密度和深度有关，与容器形状无关',
+            '大气压随高度增加而增大'
+        ],
+        '浮力': [
+            '浮力大小与物体浸入液体的深度有关',
+            '物体漂浮时受到的浮力大于物体沉底时受到的浮力',
+            '密度大的物体受到的浮力大，密度小的物体受到的浮力小',
+            '物体受到的浮力方向总是竖直向上'
+        ],
+        '默认': [
+            '该机械原理在任何条件下都适用',
+            '该机械效率可以达到100%',
+            '该机械的使用不需要任何能量输入',
+            '该机械的设计与材料无关'
+        ]
+    },
+    '默认': {
+        '通用': [
+            '该现象在任何条件下都会发生',
+            '该原理只适用于特定环境',
+            '该过程不需要任何条件支持',
+            '该结果不受任何因素影响'
+        ]
+    }
+}
+
+
+# 参考网上常见的题目类型模板
+QUESTION_TEMPLATES = [
+    # 概念理解型
+    {
+        'pattern': '以下关于"{title}"的说法，正确的是：',
+        'type': 'concept'
+    },
+    # 特征描述型
+    {
+        'pattern': '"{title}"的主要特征不包括：',
+        'type': 'feature'
+    },
+    # 应用判断型
+    {
+        'pattern': '下列现象中，与"{title}"无关的是：',
+        'type': 'application'
+    },
+    # 原因分析型
+    {
+        'pattern': '"{title}"产生的主要原因是：',
+        'type': 'reason'
+    },
+    # 区别比较型
+    {
+        'pattern': '与其他选项相比，"{title}"的独特之处在于：',
+        'type': 'comparison'
+    },
+    # 影响因素型
+    {
+        'pattern': '影响"{title}"的因素不包括：',
+        'type': 'factor'
+    },
+    # 实例识别型
+    {
+        'pattern': '下列实例中，属于"{title}"应用的是：',
+        'type': 'example'
+    },
+    # 原理说明型
+    {
+        'pattern': '"{title}"的工作原理是：',
+        'type': 'principle'
+    }
+]
+
+
+# 为不同类型的题目准备具体的选项模板
+OPTION_TEMPLATES = {
+    '物理': {
+        'application': [
+            '苹果落地',
+            '气球上升',
+            '汽车刹车',
+            '钢笔吸水'
+        ],
+        'example': [
+            '使用杠杆撬动石头',
+            '利用滑轮提升重物',
+            '乘坐电梯上楼',
+            '用斜面搬运货物'
+        ]
+    },
+    '化学': {
+        'application': [
+            '铁生锈',
+            '食物腐败',
+            '酒精挥发',
+            '蜡烛燃烧'
+        ],
+        'example': [
+            '实验室制取氧气',
+            '工业炼铁',
+            '光合作用',
+            '海水淡化'
+        ]
+    },
+    '生物': {
+        'application': [
+            '植物向光生长',
+            '人体出汗',
+            '种子萌发',
+            '候鸟迁徙'
+        ],
+        'example': [
+            '试管婴儿技术',
+            '转基因作物',
+            '克隆技术',
+            '人工授粉'
+        ]
+    },
+    '地理': {
+        'application': [
+            '四季更替',
+            '昼夜长短变化',
+            '潮汐现象',
+            '极光形成'
+        ],
+        'example': [
+            '修建梯田',
+            '南水北调',
+            '三北防护林',
+            '西气东输'
+        ]
+    },
+    '能源': {
+        'application': [
+            '太阳能热水器',
+            '风力发电站',
+            '核电站',
+            '火力发电厂'
+        ],
+        'example': [
+            '使用太阳能路灯',
+            '安装家用光伏板',
+            '推广电动汽车',
+            '建设水电站'
+        ]
+    },
+    '机械': {
+        'application': [
+            '使用螺丝刀拧螺丝',
+            '用剪刀剪东西',
+            '骑自行车上坡',
+            '用锤子敲钉子'
+        ],
+        'example': [
+            '塔吊吊运重物',
+            '自行车链条传动',
+            '汽车方向盘控制',
+            '电梯升降系统'
+        ]
+    }
+}
@@ -0,0 +1,186 @@
+import argparse
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from db_config import DB_FILE, add_db_argument
+
+# 排行榜分区：rankings只保留最近的记录（热表），更早的记录按学期移到归档表，
+# 同时累加到按用户名汇总的rankings_summary中；排行榜查询只合并热表和汇总表
+
+# 热表保留的天数
+HOT_DAYS = 30
+
+# 每批移动的行数
+BATCH_SIZE = 5000
+
+# 不计入排行榜的用户名
+ANONYMOUS_NAME = '匿名用户'
+
+# 合并热表和汇总表的排行榜查询
+RANKINGS_SQL = '''
+    SELECT
+        name,
+        SUM(total_score) as total_score,
+        SUM(total_correct) as total_correct,
+        SUM(total_time) as total_time,
+        MIN(first_date) as first_date,
+        SUM(quiz_count) as quiz_count
+    FROM (
+        SELECT name, SUM(score) as total_score, SUM(correctCount) as total_correct, SUM(time) as total_time,
+               MIN(date) as first_date, COUNT(*) as quiz_count
+        FROM rankings
+        WHERE name != ?
+        GROUP BY name
+        UNION ALL
+        SELECT name, total_score, total_correct, total_time, first_date, quiz_count
+        FROM rankings_summary
+    )
+    GROUP BY name
+    ORDER BY total_score DESC, total_time ASC
+    LIMIT ?
+'''
+
+# 一批待归档的旧记录
+SELECT_ROLLUP_BATCH = '''
+    SELECT id, name, score, correctCount, time, date FROM rankings
+    WHERE date < ?
+    ORDER BY date
+    LIMIT ?
+'''
+
+# 写入归档表，{table} 为按学期的归档表名
+INSERT_ARCHIVE_ROWS = '''
+    INSERT OR REPLACE INTO {table} (id, name, score, correctCount, time, date)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+# 把一批记录累加到汇总表，{placeholders} 为记录ID的占位符
+ROLLUP_SUMMARY = '''
+    INSERT INTO rankings_summary (name, total_score, total_correct, total_time, first_date, quiz_count)
+    SELECT name, SUM(score), SUM(correctCount), SUM(time), MIN(date), COUNT(*)
+    FROM rankings
+    WHERE id IN ({placeholders}) AND name != ?
+    GROUP BY name
+    ON CONFLICT (name) DO UPDATE SET
+        total_score = total_score + excluded.total_score,
+        total_correct = total_correct + excluded.total_correct,
+        total_time = total_time + excluded.total_time,
+        first_date = MIN(first_date, excluded.first_date),
+        quiz_count = quiz_count + excluded.quiz_count
+'''
+
+DELETE_ROLLED_UP = 'DELETE FROM rankings WHERE id IN ({placeholders})'
+
+# 供登记表测试编译、诊断工具检查查询计划（按学期的归档表名不固定，INSERT_ARCHIVE_ROWS不在其中）
+STATEMENTS = {
+    'RANKINGS_SQL': RANKINGS_SQL,
+    'SELECT_ROLLUP_BATCH': SELECT_ROLLUP_BATCH,
+    'ROLLUP_SUMMARY': ROLLUP_SUMMARY.format(placeholders='?'),
+    'DELETE_ROLLED_UP': DELETE_ROLLED_UP.format(placeholders='?')
+}
+
+
+def init_rankings_archive(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rankings_summary (
+            name TEXT PRIMARY KEY,
+            total_score INTEGER DEFAULT 0,
+            total_correct INTEGER DEFAULT 0,
+            total_time INTEGER DEFAULT 0,
+            first_date TEXT,
+            quiz_count INTEGER DEFAULT 0
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_rankings_date ON rankings (date)')
+
+
+# 学期：2-7月为春季学期(1)，8月到次年1月为秋季学期(2)
+def term_of(date):
+    try:
+        year, month = int(date[:4]), int(date[5:7])
+    except (TypeError, ValueError):
+        return 'unknown'
+    if month >= 8:
+        return f'{year}_2'
+    if month < 2:
+        return f'{year - 1}_2'
+    return f'{year}_1'
+
+
+def archive_table(term):
+    return f'rankings_archive_{term}'
+
+
+def _ensure_archive_table(cursor, term):
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {archive_table(term)} (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            score INTEGER,
+            correctCount INTEGER,
+            time INTEGER,
+            date TEXT
+        )
+    ''')
+
+
+# 把一批（最多batch_size行）早于cutoff的记录移到归档表并累加到汇总表，不提交；
+# 各学期移动的行数累加到terms，返回本批移动的行数
+def rollup_batch(conn, cutoff, terms, batch_size=BATCH_SIZE):
+    cursor = conn.cursor()
+    cursor.execute(SELECT_ROLLUP_BATCH, (cutoff, batch_size))
+    rows = cursor.fetchall()
+    if not rows:
+        return 0
+
+    by_term = {}
+    for row in rows:
+        by_term.setdefault(term_of(row[5]), []).append(tuple(row))
+    for term, term_rows in by_term.items():
+        _ensure_archive_table(cursor, term)
+        cursor.executemany(INSERT_ARCHIVE_ROWS.format(table=archive_table(term)), term_rows)
+
+    ids = [row[0] for row in rows]
+    placeholders = ','.join('?' * len(ids))
+    cursor.execute(ROLLUP_SUMMARY.format(placeholders=placeholders), ids + [ANONYMOUS_NAME])
+    cursor.execute(DELETE_ROLLED_UP.format(placeholders=placeholders), ids)
+    # 本批写完之后再累加，执行失败时不计入
+    for term, term_rows in by_term.items():
+        terms[term] = terms.get(term, 0) + len(term_rows)
+    return len(rows)
+
+
+# 分批把早于hot_days天的记录移到归档表并累加到汇总表，每批一个事务
+def rollup_rankings(conn, now=None, hot_days=HOT_DAYS, batch_size=BATCH_SIZE):
+    now = now or datetime.now()
+    cutoff = (now - timedelta(days=hot_days)).isoformat()
+    moved = 0
+    terms = {}
+    while True:
+        count = rollup_batch(conn, cutoff, terms, batch_size)
+        conn.commit()
+        moved += count
+        if count < batch_size:
+            return {'moved': moved, 'terms': terms}
+
+
+def top_rankings(cursor, limit=50):
+    cursor.execute(RANKINGS_SQL, (ANONYMOUS_NAME, limit))
+    return [dict(row) for row in cursor.fetchall()]
+
+
+# 命令行入口：手动执行归档
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='把旧的排行榜记录移到归档表并汇总')
+    add_db_argument(parser)
+    parser.add_argument('--hot-days', type=int, default=HOT_DAYS, help='热表保留的天数')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='每批移动的行数')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    init_rankings_archive(conn.cursor())
+    started_at = time.perf_counter()
+    result = rollup_rankings(conn, hot_days=args.hot_days, batch_size=args.batch_size)
+    conn.close()
+    print(f"完成：移动 {result['moved']} 行，按学期 {result['terms']}，用时 {time.perf_counter() - started_at:.1f} 秒")
@@ -0,0 +1,208 @@
+import argparse
+import sqlite3
+import time
+from datetime import datetime
+
+from db_config import DB_FILE, add_db_argument
+
+# 间隔重复调度（SM-2算法），按 用户×章节 记录下次复习时间
+
+DAY_SECONDS = 86400
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+
+# 批量重算时每批处理的行数
+CHUNK_SIZE = 10000
+
+# 为user_quiz_times补充的列
+SCHEDULE_COLUMNS = [
+    ('due_at', 'INTEGER'),
+    ('last_quiz_at', 'INTEGER'),
+    ('ease', f'REAL DEFAULT {DEFAULT_EASE}'),
+    ('repetitions', 'INTEGER DEFAULT 0')
+]
+
+SELECT_SCHEDULE = '''
+    SELECT ease, repetitions, interval_days FROM user_quiz_times
+    WHERE user_id = ? AND chapter_id = ?
+'''
+
+UPSERT_SCHEDULE = '''
+    INSERT INTO user_quiz_times (user_id, chapter_id, last_quiz_time, next_available_time, interval_days,
+                                 due_at, last_quiz_at, ease, repetitions)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (user_id, chapter_id) DO UPDATE SET
+        last_quiz_time = excluded.last_quiz_time,
+        next_available_time = excluded.next_available_time,
+        interval_days = excluded.interval_days,
+        due_at = excluded.due_at,
+        last_quiz_at = excluded.last_quiz_at,
+        ease = excluded.ease,
+        repetitions = excluded.repetitions
+'''
+
+SELECT_DUE_ITEMS = '''
+    SELECT uqt.chapter_id, c.name AS chapter_name, c.parent_id, uqt.due_at, uqt.interval_days,
+           uqt.ease, uqt.repetitions, uqt.last_quiz_at
+    FROM user_quiz_times uqt
+    LEFT JOIN chapters c ON c.id = uqt.chapter_id
+    WHERE uqt.user_id = ? AND uqt.due_at <= ?
+    ORDER BY uqt.due_at
+    LIMIT ?
+'''
+
+SELECT_SCHEDULE_CHUNK = '''
+    SELECT id, last_quiz_time, next_available_time, interval_days, due_at, last_quiz_at, ease, repetitions
+    FROM user_quiz_times
+    WHERE id > ?
+    ORDER BY id
+    LIMIT ?
+'''
+
+UPDATE_SCHEDULE = '''
+    UPDATE user_quiz_times
+    SET last_quiz_at = ?, interval_days = ?, ease = ?, repetitions = ?, due_at = ?
+    WHERE id = ?
+'''
+
+# 供登记表测试编译、诊断工具检查查询计划
+STATEMENTS = {
+    'SELECT_SCHEDULE': SELECT_SCHEDULE,
+    'UPSERT_SCHEDULE': UPSERT_SCHEDULE,
+    'SELECT_DUE_ITEMS': SELECT_DUE_ITEMS,
+    'SELECT_SCHEDULE_CHUNK': SELECT_SCHEDULE_CHUNK,
+    'UPDATE_SCHEDULE': UPDATE_SCHEDULE
+}
+
+
+def init_schedule_columns(cursor):
+    for column, column_type in SCHEDULE_COLUMNS:
+        try:
+            cursor.execute(f'ALTER TABLE user_quiz_times ADD COLUMN {column} {column_type}')
+        except sqlite3.OperationalError:
+            pass  # 如果列已存在，忽略错误
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_quiz_times_due ON user_quiz_times (user_id, due_at)')
+
+
+# 由正确率换算SM-2的回答质量（0-5）
+def quality_from_score(correct_count, total_questions):
+    if not total_questions:
+        return 0
+    ratio = max(0.0, min(1.0, correct_count / total_questions))
+    return int(round(ratio * 5))
+
+
+# SM-2：返回新的 (ease, repetitions, interval_days)
+def sm2_update(ease, repetitions, interval_days, quality):
+    ease = ease or DEFAULT_EASE
+    repetitions = repetitions or 0
+    if quality < 3:
+        repetitions = 0
+        interval_days = 1
+    else:
+        repetitions += 1
+        if repetitions == 1:
+            interval_days = 1
+        elif repetitions == 2:
+            interval_days = 6
+        else:
+            interval_days = max(1, int(round((interval_days or 1) * ease)))
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return ease, repetitions, interval_days
+
+
+# 提交答题后更新该章节的复习计划，返回下次复习时间（epoch秒）
+def schedule_review(cursor, user_id, chapter_id, correct_count, total_questions, now=None):
+    now = int(now if now is not None else time.time())
+    cursor.execute(SELECT_SCHEDULE, (user_id, chapter_id))
+    row = cursor.fetchone()
+    ease, repetitions, interval_days = (row[0], row[1], row[2]) if row else (DEFAULT_EASE, 0, 0)
+
+    quality = quality_from_score(correct_count, total_questions)
+    ease, repetitions, interval_days = sm2_update(ease, repetitions, interval_days, quality)
+    due_at = now + interval_days * DAY_SECONDS
+
+    cursor.execute(UPSERT_SCHEDULE, (user_id, chapter_id, datetime.fromtimestamp(now).isoformat(), datetime.fromtimestamp(due_at).isoformat(),
+          interval_days, due_at, now, ease, repetitions))
+    return due_at
+
+
+# 查询用户到期需要复习的章节（走 (user_id, due_at) 索引）
+def get_due_items(cursor, user_id, now=None, limit=20):
+    now = int(now if now is not None else time.time())
+    cursor.execute(SELECT_DUE_ITEMS, (user_id, now, limit))
+    items = []
+    for row in cursor.fetchall():
+        item = dict(row)
+        item['overdue_seconds'] = now - item['due_at']
+        items.append(item)
+    return items
+
+
+def _parse_iso(value):
+    if not value:
+        return None
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+# 重算一批（id > progress['last_id'] 的chunk_size行）记录的间隔和下次复习时间，不提交：
+# 旧记录（只有ISO字符串）换算为epoch，参数缺失的补默认值，due_at 统一为 last_quiz_at + interval_days；
+# 处理进度（last_id、total、updated）累加到progress，返回本批处理的行数
+def recompute_batch(conn, progress, chunk_size=CHUNK_SIZE):
+    cursor = conn.cursor()
+    cursor.execute(SELECT_SCHEDULE_CHUNK, (progress.get('last_id', 0), chunk_size))
+    rows = cursor.fetchall()
+    if not rows:
+        return 0
+
+    changes = []
+    for row_id, last_quiz_time, next_available_time, interval_days, due_at, last_quiz_at, ease, repetitions in rows:
+        new_last = last_quiz_at or _parse_iso(last_quiz_time)
+        new_interval = max(1, interval_days or 1)
+        new_ease = max(MIN_EASE, ease or DEFAULT_EASE)
+        new_repetitions = repetitions or 0
+        if new_last is not None:
+            new_due = new_last + new_interval * DAY_SECONDS
+        else:
+            new_due = due_at or _parse_iso(next_available_time) or 0
+        if (new_last, new_interval, new_ease, new_repetitions, new_due) != \
+                (last_quiz_at, interval_days, ease, repetitions, due_at):
+            changes.append((new_last, new_interval, new_ease, new_repetitions, new_due, row_id))
+
+    if changes:
+        cursor.executemany(UPDATE_SCHEDULE, changes)
+
+    progress['last_id'] = rows[-1][0]
+    progress['total'] = progress.get('total', 0) + len(rows)
+    progress['updated'] = progress.get('updated', 0) + len(changes)
+    return len(rows)
+
+
+# 分批重算所有记录的复习计划，每批一个事务
+def recompute_schedules(conn, chunk_size=CHUNK_SIZE, progress=None):
+    state = {'last_id': 0, 'total': 0, 'updated': 0}
+    while recompute_batch(conn, state, chunk_size):
+        conn.commit()
+        if progress:
+            progress(state['total'], state['updated'])
+    return {'total': state['total'], 'updated': state['updated']}
+
+
+# 命令行入口：夜间批量任务
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='批量重算复习计划（SM-2）')
+    add_db_argument(parser)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='每批处理的行数')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    init_schedule_columns(conn.cursor())
+    started_at = time.perf_counter()
+    result = recompute_schedules(conn, args.chunk_size,
+                                 lambda total, updated: print(f'已处理 {total} 行，更新 {updated} 行'))
+    conn.close()
+    print(f"完成：共 {result['total']} 行，更新 {result['updated']} 行，用时 {time.perf_counter() - started_at:.1f} 秒")
@@ -0,0 +1,81 @@
+import random
+import threading
+
+SELECT_MAX_ID = 'SELECT MAX(id) FROM science_encyclopedia'
+
+SELECT_NEW_IDS = 'SELECT id, category, difficulty FROM science_encyclopedia WHERE id > ?'
+
+# {placeholders} 为抽中记录ID的占位符
+SELECT_BY_IDS = 'SELECT * FROM science_encyclopedia WHERE id IN ({placeholders})'
+
+# 供登记表测试编译、诊断工具检查查询计划
+STATEMENTS = {
+    'SELECT_MAX_ID': SELECT_MAX_ID,
+    'SELECT_NEW_IDS': SELECT_NEW_IDS,
+    'SELECT_BY_IDS': SELECT_BY_IDS.format(placeholders='?')
+}
+
+
+# 科学百科随机抽样：内存中保存紧凑的ID数组，按主键取数据，耗时与表大小无关
+class EncyclopediaSampler:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.max_id = 0
+        self.ids = []
+        self.by_filter = {}  # {(category, difficulty): [id]}，category或difficulty为None表示不限
+
+    def _add(self, row_id, category, difficulty):
+        self.ids.append(row_id)
+        for key in ((category, None), (None, difficulty), (category, difficulty)):
+            self.by_filter.setdefault(key, []).append(row_id)
+        if row_id > self.max_id:
+            self.max_id = row_id
+
+    # 读取比已知最大ID更新的记录（首次调用时读取全部）
+    def _sync(self, cursor):
+        cursor.execute(SELECT_MAX_ID)
+        max_id = cursor.fetchone()[0] or 0
+        if self.loaded and max_id <= self.max_id:
+            return
+        cursor.execute(SELECT_NEW_IDS, (self.max_id,))
+        rows = cursor.fetchall()
+        with self.lock:
+            for row_id, category, difficulty in rows:
+                if row_id > self.max_id:
+                    self._add(row_id, category, difficulty)
+            self.loaded = True
+
+    # 新增记录后调用，避免下一次请求再查询
+    def add(self, row_id, category, difficulty):
+        with self.lock:
+            if self.loaded and row_id > self.max_id:
+                self._add(row_id, category, difficulty)
+
+    # 重新加载（记录被外部删除时使用）
+    def reset(self):
+        with self.lock:
+            self.loaded = False
+            self.max_id = 0
+            self.ids = []
+            self.by_filter = {}
+
+    def sample(self, cursor, count=20, category=None, difficulty=None, seed=None):
+        self._sync(cursor)
+        with self.lock:
+            if category is None and difficulty is None:
+                pool = self.ids
+            else:
+                pool = self.by_filter.get((category, difficulty), [])
+            rng = random.Random(seed) if seed is not None else random
+            chosen = rng.sample(pool, min(count, len(pool)))
+        if not chosen:
+            return []
+
+        placeholders = ','.join('?' * len(chosen))
+        cursor.execute(SELECT_BY_IDS.format(placeholders=placeholders), chosen)
+        rows = {row['id']: dict(row) for row in cursor.fetchall()}
+        if len(rows) < len(chosen):
+            # 有记录已被删除，下次请求重新加载ID数组
+            self.reset()
+        return [rows[row_id] for row_id in chosen if row_id in rows]
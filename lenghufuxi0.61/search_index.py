@@ -0,0 +1,308 @@
+import html
+import re
+
+# 全文检索：知识点和科学百科共用一个FTS5索引
+# 中文没有空格分词，入库前把连续的中文切成二元组（最后一个字单独保留），再交给unicode61分词器。
+# 原文表上的触发器把新增、修改、删除的记录ID写入search_index_log（其他脚本直接写库也会记录），
+# sync_search_index按记录重新编入这些ID
+
+SOURCES = {
+    'knowledge': 'SELECT id, title, content, chapter_id FROM {table}',
+    'science': 'SELECT id, title, content, NULL AS chapter_id FROM {table}'
+}
+
+# 各来源的原文表，调用时可以用tables参数替换（例如知识点拆分到多个库后的跨库视图）
+SOURCE_TABLES = {'knowledge': 'knowledge', 'science': 'science_encyclopedia'}
+
+# 修改后需要重新编入索引的列
+INDEXED_COLUMNS = {'knowledge': 'id, title, content, chapter_id', 'science': 'id, title, content'}
+
+# 排序时标题的权重
+TITLE_WEIGHT = 5.0
+
+SNIPPET_LENGTH = 60
+
+BATCH_SIZE = 2000
+
+INSERT_INDEX_ROW = '''
+    INSERT INTO search_index (title, content, source, ref_id, chapter_id)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+DELETE_INDEX_RECORD = 'DELETE FROM search_index WHERE source = ? AND ref_id = ?'
+
+# {placeholders} 为一批记录ID的占位符
+DELETE_INDEX_RECORDS = 'DELETE FROM search_index WHERE source = ? AND ref_id IN ({placeholders})'
+
+DELETE_INDEX_SOURCE = 'DELETE FROM search_index WHERE source = ?'
+
+# 按ID重新读取原文，{select} 为SOURCES中的查询
+SELECT_CHANGED_ROWS = '{select} WHERE id IN ({placeholders})'
+
+# 修改记录：{schema} 为日志所在的库（分片有自己的日志），ref_id为NULL表示重建整个来源
+CREATE_SEARCH_LOG = '''
+    CREATE TABLE IF NOT EXISTS {schema}.search_index_log (
+        id INTEGER PRIMARY KEY,
+        source TEXT,
+        ref_id INTEGER
+    )
+'''
+
+# 触发器和原文表在同一个库中，{table} 不带库名
+LOG_INSERT_TRIGGER = '''
+    CREATE TRIGGER IF NOT EXISTS {schema}.search_log_{source}_insert AFTER INSERT ON {table} BEGIN
+        INSERT INTO search_index_log (source, ref_id) VALUES ('{source}', NEW.id);
+    END
+'''
+
+LOG_UPDATE_TRIGGER = '''
+    CREATE TRIGGER IF NOT EXISTS {schema}.search_log_{source}_update AFTER UPDATE OF {columns} ON {table} BEGIN
+        INSERT INTO search_index_log (source, ref_id) VALUES ('{source}', OLD.id), ('{source}', NEW.id);
+    END
+'''
+
+LOG_DELETE_TRIGGER = '''
+    CREATE TRIGGER IF NOT EXISTS {schema}.search_log_{source}_delete AFTER DELETE ON {table} BEGIN
+        INSERT INTO search_index_log (source, ref_id) VALUES ('{source}', OLD.id);
+    END
+'''
+
+SELECT_LOG_TRIGGER = "SELECT 1 FROM {schema}.sqlite_master WHERE type = 'trigger' AND name = ?"
+
+INSERT_LOG_REBUILD = 'INSERT INTO {schema}.search_index_log (source, ref_id) VALUES (?, NULL)'
+
+SELECT_LOG_MAX = 'SELECT MAX(id) FROM {schema}.search_index_log'
+
+SELECT_LOG_CHANGES = 'SELECT DISTINCT source, ref_id FROM {schema}.search_index_log WHERE id <= ?'
+
+DELETE_LOG = 'DELETE FROM {schema}.search_index_log WHERE id <= ?'
+
+# 合并分片前把分片中还没处理的记录转到主库
+COPY_LOG = 'INSERT INTO main.search_index_log (source, ref_id) SELECT source, ref_id FROM {schema}.search_index_log'
+
+# 检索：{where} 为MATCH及筛选条件
+COUNT_MATCHES = 'SELECT COUNT(*) FROM search_index WHERE {where}'
+
+SELECT_MATCHES = '''
+    SELECT source, ref_id, chapter_id, bm25(search_index, ?, 1.0) AS score
+    FROM search_index
+    WHERE {where}
+    ORDER BY score
+    LIMIT ? OFFSET ?
+'''
+
+# {placeholders} 为命中记录ID的占位符
+SELECT_ORIGINALS = 'SELECT * FROM {table} WHERE id IN ({placeholders})'
+
+# 供登记表测试编译、诊断工具检查查询计划
+STATEMENTS = {
+    'INSERT_INDEX_ROW': INSERT_INDEX_ROW,
+    'DELETE_INDEX_RECORD': DELETE_INDEX_RECORD,
+    'DELETE_INDEX_RECORDS': DELETE_INDEX_RECORDS.format(placeholders='?'),
+    'DELETE_INDEX_SOURCE': DELETE_INDEX_SOURCE,
+    'INSERT_LOG_REBUILD': INSERT_LOG_REBUILD.format(schema='main'),
+    'SELECT_LOG_MAX': SELECT_LOG_MAX.format(schema='main'),
+    'SELECT_LOG_CHANGES': SELECT_LOG_CHANGES.format(schema='main'),
+    'DELETE_LOG': DELETE_LOG.format(schema='main'),
+    'COUNT_MATCHES': COUNT_MATCHES.format(where='search_index MATCH ?'),
+    'SELECT_MATCHES': SELECT_MATCHES.format(where='search_index MATCH ? AND source = ?'),
+    **{f'{name}:{source}': statement.format(table=table, placeholders='?')
+       for source, table in SOURCE_TABLES.items()
+       for name, statement in (('SOURCES', SOURCES[source]), ('SELECT_ORIGINALS', SELECT_ORIGINALS),
+                               ('SELECT_CHANGED_ROWS', SELECT_CHANGED_ROWS.format(select=SOURCES[source],
+                                                                                  placeholders='?')))}
+}
+
+_CJK_RE = re.compile(r'[㐀-䶿一-鿿豈-﫿]+')
+_WORD_RE = re.compile(r'[㐀-䶿一-鿿豈-﫿]+|\w+')
+
+
+def _cjk_tokens(run):
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)] + [run[-1]]
+
+
+# 把文本转换成索引用的词序列
+def tokenize(text):
+    tokens = []
+    for word in _WORD_RE.findall((text or '').lower()):
+        if _CJK_RE.fullmatch(word):
+            tokens.extend(_cjk_tokens(word))
+        else:
+            tokens.append(word)
+    return ' '.join(tokens)
+
+
+# 把用户输入转换成FTS5查询，多个词之间为AND关系
+def build_match_query(query):
+    parts = []
+    for word in _WORD_RE.findall((query or '').lower()):
+        if _CJK_RE.fullmatch(word):
+            if len(word) == 1:
+                parts.append(f'"{word}"*')
+            else:
+                bigrams = [word[i:i + 2] for i in range(len(word) - 1)]
+                parts.append('"' + ' '.join(bigrams) + '"')
+        else:
+            parts.append(f'"{word}"*')
+    return ' '.join(parts)
+
+
+def init_search_index(cursor):
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            title,
+            content,
+            source UNINDEXED,
+            ref_id UNINDEXED,
+            chapter_id UNINDEXED,
+            tokenize = 'unicode61'
+        )
+    ''')
+    init_change_log(cursor)
+
+
+# 在schema库中建立修改记录表和tables {来源: 原文表} 上的触发器；
+# 第一次建立某来源的触发器时，之前的修改没有记录，写入一条重建该来源的记录
+def init_change_log(cursor, schema='main', tables=None):
+    cursor.execute(CREATE_SEARCH_LOG.format(schema=schema))
+    for source, table in (tables or SOURCE_TABLES).items():
+        cursor.execute(SELECT_LOG_TRIGGER.format(schema=schema), (f'search_log_{source}_delete',))
+        if cursor.fetchone() is None:
+            cursor.execute(INSERT_LOG_REBUILD.format(schema=schema), (source,))
+        for statement in (LOG_INSERT_TRIGGER, LOG_UPDATE_TRIGGER, LOG_DELETE_TRIGGER):
+            cursor.execute(statement.format(schema=schema, source=source, table=table, columns=INDEXED_COLUMNS[source]))
+
+
+def _insert_rows(cursor, source, rows):
+    cursor.executemany(INSERT_INDEX_ROW, [(tokenize(row[1]), tokenize(row[2]), source, row[0], row[3]) for row in rows])
+
+
+# 新增或修改一条记录后更新索引
+def index_record(cursor, source, ref_id, title, content, chapter_id=None):
+    remove_record(cursor, source, ref_id)
+    _insert_rows(cursor, source, [(ref_id, title, content, chapter_id)])
+
+
+def remove_record(cursor, source, ref_id):
+    cursor.execute(DELETE_INDEX_RECORD, (source, ref_id))
+
+
+# 执行查询并把结果编入索引，返回编入的行数
+def _index_query(conn, source, statement, params=()):
+    read_cursor, cursor = conn.cursor(), conn.cursor()
+    read_cursor.execute(statement, params)
+    total = 0
+    while True:
+        rows = read_cursor.fetchmany(BATCH_SIZE)
+        if not rows:
+            return total
+        _insert_rows(cursor, source, rows)
+        total += len(rows)
+
+
+# 按修改记录更新索引：重新编入记录中的ID（已删除的只从索引中去掉），有重建记录的来源整个重建。
+# schemas为存有修改记录的库（主库和各分片），返回 {来源: 处理的记录数}
+def sync_search_index(conn, tables=None, schemas=('main',)):
+    tables = dict(SOURCE_TABLES, **(tables or {}))
+    cursor = conn.cursor()
+    rebuild, changed_ids, processed = set(), {}, []
+    for schema in schemas:
+        cursor.execute(SELECT_LOG_MAX.format(schema=schema))
+        last_id = cursor.fetchone()[0]
+        if last_id is None:
+            continue
+        processed.append((schema, last_id))
+        cursor.execute(SELECT_LOG_CHANGES.format(schema=schema), (last_id,))
+        for source, ref_id in cursor.fetchall():
+            if ref_id is None:
+                rebuild.add(source)
+            else:
+                changed_ids.setdefault(source, set()).add(ref_id)
+
+    changed = {}
+    for source, select_sql in SOURCES.items():
+        select_sql = select_sql.format(table=tables[source])
+        if source in rebuild:
+            cursor.execute(DELETE_INDEX_SOURCE, (source,))
+            changed[source] = _index_query(conn, source, select_sql)
+            continue
+        ids = sorted(changed_ids.get(source, ()))
+        for start in range(0, len(ids), BATCH_SIZE):
+            batch = ids[start:start + BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            cursor.execute(DELETE_INDEX_RECORDS.format(placeholders=placeholders), [source] + batch)
+            _index_query(conn, source, SELECT_CHANGED_ROWS.format(select=select_sql, placeholders=placeholders), batch)
+        if ids:
+            changed[source] = len(ids)
+
+    for schema, last_id in processed:
+        cursor.execute(DELETE_LOG.format(schema=schema), (last_id,))
+    conn.commit()
+    return changed
+
+
+# 从原文中截取包含关键词的片段，并用<mark>标出关键词
+def make_snippet(text, query, length=SNIPPET_LENGTH):
+    text = text or ''
+    words = [w for w in _WORD_RE.findall((query or '').lower()) if w]
+    lower = text.lower()
+    positions = [lower.find(w) for w in words if lower.find(w) >= 0]
+    start = max(0, min(positions) - length // 3) if positions else 0
+    fragment = text[start:start + length]
+    escaped = html.escape(fragment)
+    for word in sorted(set(words), key=len, reverse=True):
+        escaped = re.sub(re.escape(html.escape(word)), lambda m: f'<mark>{m.group(0)}</mark>', escaped,
+                         flags=re.IGNORECASE)
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + length < len(text) else ''
+    return prefix + escaped + suffix
+
+
+# 检索，返回 (总数, 当前页结果)
+def search(cursor, query, source=None, chapter_ids=None, limit=20, offset=0, tables=None):
+    match = build_match_query(query)
+    if not match:
+        return 0, []
+
+    where = ['search_index MATCH ?']
+    params = [match]
+    if source:
+        where.append('source = ?')
+        params.append(source)
+    if chapter_ids:
+        where.append(f"chapter_id IN ({','.join('?' * len(chapter_ids))})")
+        params.extend(chapter_ids)
+    where_sql = ' AND '.join(where)
+
+    cursor.execute(COUNT_MATCHES.format(where=where_sql), params)
+    total = cursor.fetchone()[0]
+
+    cursor.execute(SELECT_MATCHES.format(where=where_sql), [TITLE_WEIGHT] + params + [limit, offset])
+    hits = cursor.fetchall()
+
+    # 按来源批量取回原文
+    originals = {}
+    for name, table in dict(SOURCE_TABLES, **(tables or {})).items():
+        ids = [hit[1] for hit in hits if hit[0] == name]
+        if ids:
+            cursor.execute(SELECT_ORIGINALS.format(table=table, placeholders=','.join('?' * len(ids))), ids)
+            for row in cursor.fetchall():
+                originals[(name, row['id'])] = dict(row)
+
+    results = []
+    for source_name, ref_id, chapter_id, score in hits:
+        original = originals.get((source_name, ref_id))
+        if original is None:
+            continue
+        results.append({
+            'source': source_name,
+            'id': ref_id,
+            'chapter_id': chapter_id,
+            'title': original['title'],
+            'category': original.get('category'),
+            'snippet': make_snippet(original['content'], query),
+            'score': round(-score, 4)
+        })
+    return total, results
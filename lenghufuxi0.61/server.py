@@ -1,10 +1,43 @@
-from flask import Flask, request, jsonify, send_from_directory
+from startup import StartupTimer, schema_fingerprint, schema_is_current, record_schema
+
+# 启动计时从导入server.py开始
+startup = StartupTimer()
+
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_socketio import SocketIO, emit, join_room, leave_room
+import inspect
 import json
 import os
 import sqlite3
 import random
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
+from knowledge_import import import_knowledge, detect_format, SUPPORTED_FORMATS
+from metrics import init_metrics, render_prometheus, register_collector
+from sql_profiler import TimedConnection, get_top_statements, get_statement_cache_stats, slow_queries, render_stats_page
+from science_sampler import EncyclopediaSampler
+from search_index import init_search_index, index_record, search
+from scheduler import init_schedule_columns, schedule_review, get_due_items, recompute_batch
+from mastery import init_mastery_table, record_answers, get_user_mastery, pick_weak_points
+from question_sets import AnswerKeyStore, new_seed, derive_seed, make_set_id, strip_answers
+from pk_sessions import PKSession, PKSessionStore
+from jobs import JobRunner
+from maintenance import init_maintenance_tables, expire_challenges, archive_batch, optimize_database, ARCHIVE_TABLES
+from rankings_archive import init_rankings_archive, rollup_rankings, rollup_batch, top_rankings, HOT_DAYS
+from db_pool import ConnectionPool, BUSY_TIMEOUT
+from db_writer import DatabaseWriter
+from knowledge_shards import KnowledgeShards
+from build_assets import SOURCE_DIR, DIST_DIR, ASSETS_DIR
+from static_cache import StaticCache
+from db_config import db_path, cli_db_path, add_db_argument
+from submissions import init_submission_keys, apply_once, apply_batch, valid_key, purge_batch, MAX_SUBMISSIONS, KEY_TTL
+import statements as sql
+from statements import REGISTRY as SQL_REGISTRY
+
+startup.mark('imports')
+
+# 调试模式下重载器的父进程只监视文件变化、重启子进程，不提供服务，不需要建表和启动后台线程
+RELOADER_PARENT = __name__ == '__main__' and os.environ.get('WERKZEUG_RUN_MAIN') != 'true'
 
 # 获取当前目录的绝对路径
 BASE_DIR = os.path.abspath('.')
@@ -13,12 +46,27 @@ BASE_DIR = os.path.abspath('.')
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'lenghu_quiz_secret_key_2024'
 
+# 记录每个路由的请求数、错误数、耗时和SQL耗时
+init_metrics(app)
+
 # 创建SocketIO实例
 socketio = SocketIO(app, cors_allowed_origins='*')
 
 # 在线用户跟踪
 online_users = {}  # {user_id: {name: str, totalScore: int, sid: str}}
 
+# 按章节缓存的知识点列表
+knowledge_cache = {}  # {chapter_id: [knowledge dict]}
+
+# 科学百科随机抽样
+encyclopedia_sampler = EncyclopediaSampler()
+
+# 题目集答案键（PK和BOSS答题在服务器端判分）
+answer_keys = AnswerKeyStore()
+
+# 进行中的PK对战（共用的题目集和双方进度）
+pk_sessions = PKSessionStore()
+
 # 手动添加CORS支持
 @app.after_request
 def after_request(response):
@@ -30,188 +78,128 @@ def after_request(response):
         response.headers.add('Content-Type', 'application/json; charset=utf-8')
     return response
 
-# SQLite数据库文件路径 - 存储到项目文件夹内
-DB_FILE = os.path.join(BASE_DIR, 'quiz_database.db')
+# SQLite数据库文件路径：命令行 --db > 环境变量 LENGHU_DB > 项目文件夹内的 quiz_database.db
+DB_FILE = db_path(cli_db_path() if __name__ == '__main__' else None)
 
-# 数据文件路径（保留，用于兼容旧数据）
-DATA_FILE = os.path.join(BASE_DIR, 'quiz_data.json')
+# 只读连接池（连接及其预编译语句缓存在请求之间复用），只读的接口都从这里取连接
+db_pool = ConnectionPool(DB_FILE, readonly=True)
+register_collector(db_pool.collect_metrics)
 
-# 初始化数据文件（保留，用于兼容旧数据）
-def init_data():
-    if not os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump({
-                'rankings': []
-            }, f, ensure_ascii=False, indent=2)
+# 单一写线程：服务期间的写操作都交给它执行，避免多个连接争抢写锁
+db_writer = DatabaseWriter(DB_FILE)
+register_collector(db_writer.collect_metrics)
 
-# 初始化SQLite数据库
-init_data()
+# 按课程拆分的知识点库：没有拆分任何课程时所有知识点都在主库中
+knowledge_shards = KnowledgeShards(DB_FILE, db_writer)
 
-# 创建SQLite数据库连接
+# 从只读连接池取得连接，close()时归还
+def get_read_connection():
+    return db_pool.acquire()
+
+# 读写直连，只在启动时建表和命令行脚本中使用
 def get_db_connection():
-    conn = sqlite3.connect(DB_FILE)
+    conn = sqlite3.connect(DB_FILE, factory=TimedConnection, timeout=BUSY_TIMEOUT)
     conn.row_factory = sqlite3.Row
     return conn
 
+# 获取某个章节的知识点（带缓存）
+def get_chapter_knowledge(cursor, chapter_id):
+    knowledge = knowledge_cache.get(chapter_id)
+    if knowledge is None:
+        knowledge = knowledge_shards.chapter_knowledge(cursor, chapter_id)
+        knowledge_cache[chapter_id] = knowledge
+    return knowledge
+
+# 使章节知识点缓存失效，不指定章节时全部清空
+def invalidate_knowledge_cache(chapter_ids=None):
+    if chapter_ids is None:
+        knowledge_cache.clear()
+        return
+    for chapter_id in chapter_ids:
+        knowledge_cache.pop(chapter_id, None)
+
 # 创建数据库表
-def init_database():
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def create_tables(cursor):
+    # 使用WAL日志，读连接和写线程互不阻塞
+    cursor.execute(sql.ENABLE_WAL)
     
     # 创建用户表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE,
-            password TEXT,
-            name TEXT UNIQUE,
-            totalScore INTEGER DEFAULT 0
-        )
-    ''')
+    cursor.execute(sql.CREATE_USERS_TABLE)
     
     # 创建章节表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS chapters (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            code TEXT,
-            level INTEGER,
-            parent_id INTEGER,
-            FOREIGN KEY (parent_id) REFERENCES chapters (id) ON DELETE CASCADE
-        )
-    ''')
+    cursor.execute(sql.CREATE_CHAPTERS_TABLE)
     
     # 创建知识点表（添加章节关联）
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS knowledge (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT,
-            content TEXT,
-            category TEXT,
-            image TEXT,
-            course_code TEXT
-        )
-    ''')
+    cursor.execute(sql.CREATE_KNOWLEDGE_TABLE)
     
     # 为现有表添加code列（如果不存在）
     try:
-        cursor.execute('ALTER TABLE chapters ADD COLUMN code TEXT')
+        cursor.execute(sql.ADD_CHAPTERS_CODE_COLUMN)
     except:
         pass  # 如果列已存在，忽略错误
     
     # 为现有表添加chapter_id列（如果不存在）
     try:
-        cursor.execute('ALTER TABLE knowledge ADD COLUMN chapter_id INTEGER')
+        cursor.execute(sql.ADD_KNOWLEDGE_CHAPTER_ID_COLUMN)
         # 添加外键约束（注意：SQLite不支持直接添加外键约束到现有表）
     except:
         pass  # 如果列已存在，忽略错误
     
     # 为现有表添加course_code列（如果不存在）
     try:
-        cursor.execute('ALTER TABLE knowledge ADD COLUMN course_code TEXT')
+        cursor.execute(sql.ADD_KNOWLEDGE_COURSE_CODE_COLUMN)
     except:
         pass  # 如果列已存在，忽略错误
     
     # 创建排行榜表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS rankings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            score INTEGER,
-            correctCount INTEGER,
-            time INTEGER,
-            date TEXT
-        )
-    ''')
+    cursor.execute(sql.CREATE_RANKINGS_TABLE)
     
     # 创建用户课程权限表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS user_course_permissions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            chapter_id INTEGER,
-            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
-            FOREIGN KEY (chapter_id) REFERENCES chapters (id) ON DELETE CASCADE,
-            UNIQUE(user_id, chapter_id)
-        )
-    ''')
+    cursor.execute(sql.CREATE_USER_COURSE_PERMISSIONS_TABLE)
     
     # 创建用户答题时间记录表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS user_quiz_times (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            chapter_id INTEGER,
-            last_quiz_time TEXT,
-            next_available_time TEXT,
-            interval_days INTEGER DEFAULT 0,
-            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
-            FOREIGN KEY (chapter_id) REFERENCES chapters (id) ON DELETE CASCADE,
-            UNIQUE(user_id, chapter_id)
-        )
-    ''')
+    cursor.execute(sql.CREATE_USER_QUIZ_TIMES_TABLE)
+    
+    # 为答题时间记录表添加复习调度列和到期索引
+    init_schedule_columns(cursor)
     
     # 创建PK挑战表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS pk_challenges (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            challenger_id INTEGER,
-            opponent_id INTEGER,
-            status TEXT DEFAULT 'pending',
-            challenger_score INTEGER DEFAULT 0,
-            opponent_score INTEGER DEFAULT 0,
-            current_question INTEGER DEFAULT 0,
-            total_questions INTEGER DEFAULT 10,
-            created_at TEXT,
-            completed_at TEXT,
-            FOREIGN KEY (challenger_id) REFERENCES users (id) ON DELETE CASCADE,
-            FOREIGN KEY (opponent_id) REFERENCES users (id) ON DELETE CASCADE
-        )
-    ''')
+    cursor.execute(sql.CREATE_PK_CHALLENGES_TABLE)
+    
+    # 为PK挑战表添加题目种子列，双方用同一个种子生成相同的题目
+    try:
+        cursor.execute(sql.ADD_PK_QUESTION_SEED_COLUMN)
+    except:
+        pass  # 如果列已存在，忽略错误
     
     # 创建BOSS挑战表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS boss_challenges (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            creator_id INTEGER,
-            boss_name TEXT,
-            boss_hp INTEGER,
-            boss_max_hp INTEGER,
-            status TEXT DEFAULT 'active',
-            created_at TEXT,
-            completed_at TEXT,
-            FOREIGN KEY (creator_id) REFERENCES users (id) ON DELETE CASCADE
-        )
-    ''')
+    cursor.execute(sql.CREATE_BOSS_CHALLENGES_TABLE)
     
     # 创建BOSS挑战参与记录表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS boss_participants (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            boss_id INTEGER,
-            user_id INTEGER,
-            correct_count INTEGER DEFAULT 0,
-            received_reward INTEGER DEFAULT 0,
-            FOREIGN KEY (boss_id) REFERENCES boss_challenges (id) ON DELETE CASCADE,
-            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
-            UNIQUE(boss_id, user_id)
-        )
-    ''')
+    cursor.execute(sql.CREATE_BOSS_PARTICIPANTS_TABLE)
     
     # 创建科学百科知识表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS science_encyclopedia (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT,
-            content TEXT,
-            category TEXT,
-            difficulty TEXT DEFAULT 'easy',
-            created_at TEXT
-        )
-    ''')
+    cursor.execute(sql.CREATE_SCIENCE_ENCYCLOPEDIA_TABLE)
+    
+    # 创建知识点掌握程度表
+    init_mastery_table(cursor)
+    
+    # 创建全文检索索引
+    init_search_index(cursor)
+    
+    # 创建挑战表的状态索引和归档冷表
+    init_maintenance_tables(cursor)
+    
+    # 创建排行榜汇总表
+    init_rankings_archive(cursor)
     
+    # 创建批量补交的幂等键表
+    init_submission_keys(cursor)
+
+# 插入默认的课程和章节（表为空时）
+def seed_default_chapters(cursor):
     # 插入默认的第一级章节
-    cursor.execute('SELECT COUNT(*) FROM chapters WHERE level = 1')
+    cursor.execute(sql.COUNT_COURSES)
     if cursor.fetchone()[0] == 0:
         default_chapters = [
             {'name': '科学', 'level': 1},
@@ -223,15 +211,15 @@ def init_database():
             {'name': '科创', 'level': 1}
         ]
         for chapter in default_chapters:
-            cursor.execute('INSERT INTO chapters (name, code, level, parent_id) VALUES (?, ?, ?, ?)',
+            cursor.execute(sql.INSERT_CHAPTER,
                        (chapter['name'], chapter['name'], chapter['level'], None))
     
     # 插入默认的第二级章节（科学）
-    cursor.execute('SELECT id FROM chapters WHERE name = ? AND level = 1', ('科学',))
+    cursor.execute(sql.SELECT_COURSE_ID_BY_NAME, ('科学',))
     science_chapter = cursor.fetchone()
     if science_chapter:
         science_id = science_chapter[0]
-        cursor.execute('SELECT COUNT(*) FROM chapters WHERE parent_id = ?', (science_id,))
+        cursor.execute(sql.COUNT_CHILD_CHAPTERS, (science_id,))
         if cursor.fetchone()[0] == 0:
             default_subchapters = [
                 {'name': '基础科学', 'code': 'SC-001'},
@@ -240,360 +228,118 @@ def init_database():
                 {'name': '生物知识', 'code': 'SC-004'}
             ]
             for subchapter in default_subchapters:
-                cursor.execute('INSERT INTO chapters (name, code, level, parent_id) VALUES (?, ?, ?, ?)',
+                cursor.execute(sql.INSERT_CHAPTER,
                            (subchapter['name'], subchapter['code'], 2, science_id))
+
+# 表结构指纹：建表语句、create_tables，以及其他建表模块的源码（这些模块修改后会重新执行一次建表）
+def current_schema_fingerprint():
+    ddl = [statement for name, statement in sorted(SQL_REGISTRY.items())
+           if name.startswith(('ENABLE_', 'CREATE_', 'ADD_'))]
+    modules = [inspect.getmodule(func) for func in (init_schedule_columns, init_mastery_table, init_search_index,
+                                                      init_maintenance_tables, init_rankings_archive,
+                                                      init_submission_keys)]
+    return schema_fingerprint(create_tables, *modules, *ddl)
+
+# 初始化数据库：表结构指纹没有变化时跳过所有建表语句
+def init_database():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    fingerprint = current_schema_fingerprint()
+    startup.schema_skipped = schema_is_current(cursor, fingerprint)
+    if not startup.schema_skipped:
+        create_tables(cursor)
+        record_schema(cursor, fingerprint)
+    
+    seed_default_chapters(cursor)
     
     conn.commit()
     conn.close()
 
-# 初始化数据库
-init_database()
+startup.mark('app')
 
-# 基于知识点动态生成题目
-def generate_questions_from_knowledge_points(knowledge_points):
-    import random
+if not RELOADER_PARENT:
+    # 初始化数据库
+    init_database()
+    startup.mark('schema')
+
+# 按修改记录更新全文检索索引（包括其他脚本直接写入、修改的数据）
+def init_search():
+    conn = get_db_connection()
+    changed = knowledge_shards.sync_search(conn)
+    conn.close()
+    if changed:
+        print(f'全文检索索引已更新: {changed}')
+
+if not RELOADER_PARENT:
+    init_search()
+    startup.mark('search_index')
     
-    # 为不同类型的知识点准备具体的错误选项模板（与知识点高度相关但错误）
-    error_templates = {
-        '物理': {
-            '声音': [
-                '声音在真空中传播速度最快',
-                '声音的传播需要介质，但介质越稀薄传播越快',
-                '声音在固体中的传播速度比在空气中慢',
-                '声音的响度只与声源的振幅有关，与距离无关'
-            ],
-            '力': [
-                '力可以脱离物体而独立存在',
-                '力的三要素是大小、方向和作用点，但方向不影响力的作用效果',
-                '相互接触的两个物体之间一定有力的作用',
-                '物体受力运动，不受力静止'
-            ],
-            '光': [
-                '光在同种均匀介质中沿直线传播，但在水中会弯曲',
-                '光的传播速度是3×10⁸m/s，在任何介质中都相同',
-                '光从空气斜射入水中时，折射角大于入射角',
-                '平面镜成像是实像，像与物大小相等'
-            ],
-            '电': [
-                '电流方向与电子定向移动方向相同',
-                '串联电路中各用电器两端的电压一定相等',
-                '并联电路中各支路的电流一定相等',
-                '导体的电阻与电压和电流有关'
-            ],
-            '热': [
-                '物体温度越高，内能越大，热量越多',
-                '热传递的实质是温度的传递',
-                '比热容大的物体吸收的热量一定多',
-                '水的沸点一定是100℃'
-            ],
-            '机械': [
-                '使用任何机械都能省力',
-                '机械效率越高，做的有用功越多',
-                '功率越大，做功越快，做的功也越多',
-                '动能和势能可以相互转化，但总能量会减少'
-            ],
-            '默认': [
-                '该现象只存在于地球表面',
-                '该原理与温度变化无关',
-                '该过程不需要任何能量参与',
-                '该现象在真空中无法发生'
-            ]
-        },
-        '化学': {
-            '物质': [
-                '混合物是由不同种分子构成的纯净物',
-                '化合物是由同种元素组成的纯净物',
-                '单质是由不同种元素组成的纯净物',
-                '氧化物是由两种元素组成的化合物，其中一种是氧元素'
-            ],
-            '反应': [
-                '化合反应一定是氧化反应',
-                '分解反应的生成物一定有单质',
-                '置换反应一定有金属单质参加',
-                '复分解反应一定有沉淀、气体或水生成'
-            ],
-            '溶液': [
-                '饱和溶液一定是浓溶液，不饱和溶液一定是稀溶液',
-                '溶液是均一、稳定、无色透明的液体',
-                '溶解度随温度升高而增大的物质，其饱和溶液降温后一定有晶体析出',
-                '溶液的质量等于溶质质量加上溶剂质量'
-            ],
-            '酸碱盐': [
-                '酸溶液一定显酸性，碱性溶液一定是碱溶液',
-                'pH=7的溶液一定是中性溶液',
-                '酸碱中和反应的产物一定是盐和水',
-                '盐溶液一定显中性'
-            ],
-            '默认': [
-                '该反应在任何条件下都能进行',
-                '该物质在任何溶剂中都能溶解',
-                '该过程不需要催化剂参与',
-                '该现象与压强变化无关'
-            ]
-        },
-        '生物': {
-            '细胞': [
-                '所有细胞都有细胞壁、细胞膜、细胞质和细胞核',
-                '植物细胞都有叶绿体，能进行光合作用',
-                '动物细胞都有中心体，参与细胞分裂',
-                '细胞核是遗传信息库，遗传信息主要存在于细胞质中'
-            ],
-            '新陈代谢': [
-                '光合作用只在白天进行，呼吸作用只在晚上进行',
-                '光合作用和呼吸作用的原料和产物完全相同',
-                '植物只能进行光合作用，动物只能进行呼吸作用',
-                '新陈代谢是生物体与外界环境进行物质和能量交换的过程，不需要酶参与'
-            ],
-            '遗传': [
-                '基因位于DNA上，DNA位于染色体上，染色体位于细胞核中',
-                '生物的性状都是由基因决定的，与环境无关',
-                '显性基因控制的性状一定能表现出来',
-                '隐性基因控制的性状永远不能表现出来'
-            ],
-            '生态': [
-                '生态系统中，生产者、消费者、分解者缺一不可',
-                '食物链越长，能量损失越多，最高级消费者获得的能量越多',
-                '生态系统具有一定的自我调节能力，但这种能力是无限的',
-                '生物圈是最大的生态系统，包括地球上所有的生物及其生存环境'
-            ],
-            '默认': [
-                '该生物过程在任何温度下都能进行',
-                '该现象与光照强度无关',
-                '该过程不需要水分参与',
-                '该生物特征在所有物种中都相同'
-            ]
-        },
-        '地理': {
-            '地球': [
-                '地球是一个正球体，赤道半径与极半径相等',
-                '地球自转产生昼夜长短变化，公转产生昼夜交替',
-                '地球自西向东自转，从北极上空看是顺时针方向',
-                '地球公转轨道是正圆形，公转速度恒定不变'
-            ],
-            '气候': [
-                '纬度越高，气温越低，降水越多',
-                '沿海地区降水多，内陆地区降水少',
-                '山地迎风坡降水多，背风坡降水少',
-                '气候是短时间内的大气状况，天气是长期的平均状况'
-            ],
-            '地形': [
-                '平原海拔一般在200米以下，地面平坦开阔',
-                '高原海拔一般在500米以上，地面起伏很大',
-                '山地海拔一般在500米以上，坡度较陡，沟谷较深',
-                '盆地四周高，中间低，但内部一定是平原'
-            ],
-            '人口': [
-                '人口自然增长率等于出生率减去死亡率',
-                '人口密度越大，人口分布越均匀',
-                '发达国家人口增长快，发展中国家人口增长慢',
-                '人口迁移的主要原因是经济因素'
-            ],
-            '默认': [
-                '该地理现象在任何纬度都相同',
-                '该地形特征与板块运动无关',
-                '该气候类型不受海洋影响',
-                '该地区的人口分布与地形无关'
-            ]
-        },
-        '能源': {
-            '传统能源': [
-                '煤炭是不可再生能源，但燃烧不产生任何污染物',
-                '石油是可再生能源，储量丰富，取之不尽',
-                '天然气燃烧产物只有二氧化碳，对环境无污染',
-                '化石能源的利用不会导致温室效应'
-            ],
-            '新能源': [
-                '太阳能是可再生能源，但只能在白天使用',
-                '风能是可再生能源，但发电成本很高',
-                '核能是可再生能源，但核废料处理困难',
-                '生物质能是可再生能源，但燃烧会产生大量污染物'
-            ],
-            '节能': [
-                '提高能源利用效率就是减少能源消耗',
-                '节约能源就是减少能源浪费，不影响生活质量',
-                '开发新能源比节约能源更重要',
-                '能源危机可以通过开发新能源完全解决'
-            ],
-            '默认': [
-                '该能源在任何地区都能开发利用',
-                '该能源技术已经完全成熟',
-                '该能源的使用不会对环境造成任何影响',
-                '该能源的储量是无限的'
-            ]
-        },
-        '机械': {
-            '简单机械': [
-                '杠杆一定省力，省力杠杆的动力臂小于阻力臂',
-                '定滑轮可以省力，动滑轮可以改变力的方向',
-                '滑轮组既能省力又能改变力的方向，但机械效率很低',
-                '斜面越陡，越省力，但机械效率越高'
-            ],
-            '功和能': [
-                '做功越多，功率越大',
-                '功率越大，做功越多',
-                '机械效率越高，做的有用功越多',
-                '动能和势能可以相互转化，总能量保持不变'
-            ],
-            '压强': [
-                '压强越大，压力越大',
-                '压力越大，压强越大',
-                '液体压强与液体密度和深度有关，与容器形状无关',
-                '大气压随高度增加而增大'
-            ],
-            '浮力': [
-                '浮力大小与物体浸入液体的深度有关',
-                '物体漂浮时受到的浮力大于物体沉底时受到的浮力',
-                '密度大的物体受到的浮力大，密度小的物体受到的浮力小',
-                '物体受到的浮力方向总是竖直向上'
-            ],
-            '默认': [
-                '该机械原理在任何条件下都适用',
-                '该机械效率可以达到100%',
-                '该机械的使用不需要任何能量输入',
-                '该机械的设计与材料无关'
-            ]
-        },
-        '默认': {
-            '通用': [
-                '该现象在任何条件下都会发生',
-                '该原理只适用于特定环境',
-                '该过程不需要任何条件支持',
-                '该结果不受任何因素影响'
-            ]
-        }
-    }
+    # 建表完成后启动写线程
+    db_writer.start()
+
+# 后台定时任务（在启动服务器时开始运行）
+job_runner = JobRunner()
+register_collector(job_runner.collect_metrics)
+
+# 分批的维护任务：每一批作为一个普通写操作交给写线程（和请求的写操作合并在同一事务中，各自一个保存点），
+# 批次之间请求的写操作照常执行；step返回本批处理的行数，返回0时结束，返回处理的总行数
+def run_batches(step, *args):
+    total = 0
+    while True:
+        count = db_writer.call(step, *args)
+        if not count:
+            return total
+        total += count
+
+# 过期的PK挑战同时关闭内存中的对战，之后的作答不再判分
+def expire_challenges_job():
+    result = db_writer.call(expire_challenges)
+    for challenge_id in result.pop('expired_pk_ids'):
+        pk_sessions.remove(challenge_id)
+    return result
+
+def archive_challenges_job():
+    now = datetime.now()
+    return {table: run_batches(archive_batch, table, now) for table in ARCHIVE_TABLES}
+
+def rollup_rankings_job():
+    terms = {}
+    moved = run_batches(rollup_batch, (datetime.now() - timedelta(days=HOT_DAYS)).isoformat(), terms)
+    return {'moved': moved, 'terms': terms}
+
+def purge_submission_keys_job():
+    return {'deleted': run_batches(purge_batch, int(time.time()) - KEY_TTL)}
+
+# 重算所有复习计划（补齐旧记录的epoch时间和SM-2参数）
+def recompute_schedules_job():
+    progress = {'last_id': 0, 'total': 0, 'updated': 0}
+    run_batches(recompute_batch, progress)
+    return {'total': progress['total'], 'updated': progress['updated']}
+
+job_runner.add('expire_challenges', expire_challenges_job, interval=60)
+job_runner.add('archive_challenges', archive_challenges_job, interval=3600)
+job_runner.add('rollup_rankings', rollup_rankings_job, interval=3600)
+job_runner.add('purge_submission_keys', purge_submission_keys_job, interval=3600)
+# 其他脚本直接改库后不必重启，索引在一分钟内更新
+job_runner.add('sync_search_index', lambda: db_writer.call(knowledge_shards.sync_search, exclusive=True, timeout=None),
+               interval=60)
+job_runner.add('recompute_schedules', recompute_schedules_job, interval=24 * 3600, off_hours=(2, 5), initial_delay=0)
+# VACUUM不能在事务中执行，只有它单独占用写线程（在凌晨的低峰时段）
+job_runner.add('optimize_database', lambda: db_writer.call(optimize_database, exclusive=True, timeout=None),
+               interval=24 * 3600, off_hours=(2, 5), initial_delay=0)
+
+# 基于知识点动态生成题目（每个知识点生成questions_per_point道，传入rng时结果可复现）
+def generate_questions_from_knowledge_points(knowledge_points, questions_per_point=3, rng=None):
+    import random
+    rng = rng or random
     
-    # 参考网上常见的题目类型模板
-    question_templates = [
-        # 概念理解型
-        {
-            'pattern': '以下关于"{title}"的说法，正确的是：',
-            'type': 'concept'
-        },
-        # 特征描述型
-        {
-            'pattern': '"{title}"的主要特征不包括：',
-            'type': 'feature'
-        },
-        # 应用判断型
-        {
-            'pattern': '下列现象中，与"{title}"无关的是：',
-            'type': 'application'
-        },
-        # 原因分析型
-        {
-            'pattern': '"{title}"产生的主要原因是：',
-            'type': 'reason'
-        },
-        # 区别比较型
-        {
-            'pattern': '与其他选项相比，"{title}"的独特之处在于：',
-            'type': 'comparison'
-        },
-        # 影响因素型
-        {
-            'pattern': '影响"{title}"的因素不包括：',
-            'type': 'factor'
-        },
-        # 实例识别型
-        {
-            'pattern': '下列实例中，属于"{title}"应用的是：',
-            'type': 'example'
-        },
-        # 原理说明型
-        {
-            'pattern': '"{title}"的工作原理是：',
-            'type': 'principle'
-        }
-    ]
+    # 模板在第一次生成题目时才导入
+    from question_templates import ERROR_TEMPLATES as error_templates, QUESTION_TEMPLATES as question_templates, OPTION_TEMPLATES
     
-    # 为不同类型的题目准备具体的选项模板
-    option_templates = {
-        '物理': {
-            'application': [
-                '苹果落地',
-                '气球上升',
-                '汽车刹车',
-                '钢笔吸水'
-            ],
-            'example': [
-                '使用杠杆撬动石头',
-                '利用滑轮提升重物',
-                '乘坐电梯上楼',
-                '用斜面搬运货物'
-            ]
-        },
-        '化学': {
-            'application': [
-                '铁生锈',
-                '食物腐败',
-                '酒精挥发',
-                '蜡烛燃烧'
-            ],
-            'example': [
-                '实验室制取氧气',
-                '工业炼铁',
-                '光合作用',
-                '海水淡化'
-            ]
-        },
-        '生物': {
-            'application': [
-                '植物向光生长',
-                '人体出汗',
-                '种子萌发',
-                '候鸟迁徙'
-            ],
-            'example': [
-                '试管婴儿技术',
-                '转基因作物',
-                '克隆技术',
-                '人工授粉'
-            ]
-        },
-        '地理': {
-            'application': [
-                '四季更替',
-                '昼夜长短变化',
-                '潮汐现象',
-                '极光形成'
-            ],
-            'example': [
-                '修建梯田',
-                '南水北调',
-                '三北防护林',
-                '西气东输'
-            ]
-        },
-        '能源': {
-            'application': [
-                '太阳能热水器',
-                '风力发电站',
-                '核电站',
-                '火力发电厂'
-            ],
-            'example': [
-                '使用太阳能路灯',
-                '安装家用光伏板',
-                '推广电动汽车',
-                '建设水电站'
-            ]
-        },
-        '机械': {
-            'application': [
-                '使用螺丝刀拧螺丝',
-                '用剪刀剪东西',
-                '骑自行车上坡',
-                '用锤子敲钉子'
-            ],
-            'example': [
-                '塔吊吊运重物',
-                '自行车链条传动',
-                '汽车方向盘控制',
-                '电梯升降系统'
-            ]
-        }
-    }
+    # 实例选项在一次生成中会被逐个取出，每次调用使用一份副本
+    option_templates = {category: {kind: list(options) for kind, options in kinds.items()}
+                        for category, kinds in OPTION_TEMPLATES.items()}
     
     questions = []
     for kp in knowledge_points:
@@ -619,9 +365,9 @@ def generate_questions_from_knowledge_points(knowledge_points):
             suitable_errors = category_errors
         
         # 为每个知识点生成多个不同类型的题目
-        for i in range(min(3, len(question_templates))):
+        for i in range(min(questions_per_point, len(question_templates))):
             # 随机选择一个题目模板
-            template = random.choice(question_templates)
+            template = rng.choice(question_templates)
             question_type = template['type']
             
             # 生成题目文本
@@ -633,17 +379,17 @@ def generate_questions_from_knowledge_points(knowledge_points):
             # 生成错误选项
             unique_errors = []
             temp_errors = suitable_errors.copy()
-            random.shuffle(temp_errors)
+            rng.shuffle(temp_errors)
             
             # 根据题目类型生成不同的错误选项
             if question_type in ['application', 'example'] and category in option_templates:
                 # 对于应用和实例类型的题目，使用具体的实例作为选项
                 examples = option_templates[category].get(question_type, [])
-                random.shuffle(examples)
+                rng.shuffle(examples)
                 # 确保正确选项是相关的应用实例
                 if examples:
                     # 选择一个相关的实例作为正确选项
-                    correct_option = random.choice(examples)
+                    correct_option = rng.choice(examples)
                     # 生成错误选项
                     while len(unique_errors) < 3 and examples:
                         example = examples.pop()
@@ -660,7 +406,7 @@ def generate_questions_from_knowledge_points(knowledge_points):
                 # 如果错误选项仍然不够，使用默认错误选项
                 if len(unique_errors) < 3:
                     default_errors = error_templates['默认']['通用'].copy()
-                    random.shuffle(default_errors)
+                    rng.shuffle(default_errors)
                     for error in default_errors:
                         if error != correct_option and error not in unique_errors and len(unique_errors) < 3:
                             unique_errors.append(error)
@@ -669,7 +415,7 @@ def generate_questions_from_knowledge_points(knowledge_points):
             options = [correct_option] + unique_errors[:3]
             
             # 随机打乱选项顺序
-            random.shuffle(options)
+            rng.shuffle(options)
             correct_index = options.index(correct_option)
             
             # 创建题目对象
@@ -677,16 +423,39 @@ def generate_questions_from_knowledge_points(knowledge_points):
                 'question': question_text,
                 'options': options,
                 'answer': correct_index,
-                'explanation': kp['content']
+                'explanation': kp['content'],
+                'knowledge_id': kp.get('id')
             }
             
             questions.append(question)
     
     # 随机打乱题目顺序
-    random.shuffle(questions)
+    rng.shuffle(questions)
     
     return questions
 
+# 生成带种子的题目集：题目不含答案，答案键保存在服务器端；种子决定题目和答案，不返回给客户端。
+# keep_answers为True时答案随题目集返回（由调用方自己保存，如PK对战），不放入共享的答案键存储；
+# owner记录题目集的归属，判分时核对
+def build_question_set(knowledge_points, seed, source, count, keep_answers=False, owner=None):
+    rng = random.Random(seed)
+    knowledge_points = sorted(knowledge_points, key=lambda kp: kp['id'])
+    if len(knowledge_points) > count:
+        knowledge_points = rng.sample(knowledge_points, count)
+    set_id = make_set_id(seed, source, [kp['id'] for kp in knowledge_points], count)
+    questions = generate_questions_from_knowledge_points(knowledge_points, questions_per_point=1, rng=rng)[:count]
+    answers = bytes(question['answer'] for question in questions)
+    if source == 'science':
+        # 科学百科的ID不是知识点ID，不能用于记录掌握程度
+        for question in questions:
+            question.pop('knowledge_id', None)
+    question_set = {'status': 'success', 'set_id': set_id, 'questions': strip_answers(questions)}
+    if keep_answers:
+        question_set['answers'] = answers
+    else:
+        answer_keys.put(set_id, answers, owner)
+    return question_set
+
 # 用户登录API
 @app.route('/api/login', methods=['POST'])
 def login():
@@ -695,10 +464,10 @@ def login():
         username = data.get('username')
         password = data.get('password')
         
-        conn = get_db_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         
-        cursor.execute('SELECT * FROM users WHERE username = ? AND password = ?', (username, password))
+        cursor.execute(sql.SELECT_USER_BY_CREDENTIALS, (username, password))
         user = cursor.fetchone()
         
         conn.close()
@@ -731,27 +500,27 @@ def register():
         if not username or not password or not name:
             return jsonify({'status': 'error', 'message': '请填写完整信息'}), 400
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # 检查用户名是否已存在
-        cursor.execute('SELECT * FROM users WHERE username = ?', (username,))
-        if cursor.fetchone():
-            conn.close()
-            return jsonify({'status': 'error', 'message': '用户名已存在'}), 400
-        
-        # 检查姓名是否已存在
-        cursor.execute('SELECT * FROM users WHERE name = ?', (name,))
-        if cursor.fetchone():
-            conn.close()
-            return jsonify({'status': 'error', 'message': '姓名已存在'}), 400
-        
-        # 创建新用户
-        cursor.execute('INSERT INTO users (username, password, name, totalScore) VALUES (?, ?, ?, ?)',
-                   (username, password, name, 0))
+        # 检查和创建在同一个写操作中完成，并发注册同名用户时只有一个成功
+        def create_user(conn):
+            cursor = conn.cursor()
+            
+            # 检查用户名是否已存在
+            cursor.execute(sql.SELECT_USER_BY_USERNAME, (username,))
+            if cursor.fetchone():
+                return '用户名已存在'
+            
+            # 检查姓名是否已存在
+            cursor.execute(sql.SELECT_USER_BY_NAME, (name,))
+            if cursor.fetchone():
+                return '姓名已存在'
+            
+            # 创建新用户
+            cursor.execute(sql.INSERT_USER,
+                       (username, password, name, 0))
         
-        conn.commit()
-        conn.close()
+        error = db_writer.call(create_user)
+        if error:
+            return jsonify({'status': 'error', 'message': error}), 400
         
         return jsonify({'status': 'success', 'message': '注册成功'})
     except Exception as e:
@@ -761,10 +530,10 @@ def register():
 @app.route('/api/chapters', methods=['GET'])
 def get_chapters():
     try:
-        conn = get_db_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         
-        cursor.execute('SELECT * FROM chapters ORDER BY level, id')
+        cursor.execute(sql.SELECT_ALL_CHAPTERS)
         chapters = [dict(row) for row in cursor.fetchall()]
         
         conn.close()
@@ -781,34 +550,22 @@ def get_user_available_chapters():
         if not user_id:
             return jsonify({'status': 'error', 'message': '缺少用户ID'}), 400
         
-        conn = get_db_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         
         # 检查用户是否是管理员（这里简单判断：用户名为admin）
-        cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
+        cursor.execute(sql.SELECT_USER_BY_ID, (user_id,))
         user = cursor.fetchone()
         
         if user and user['username'] == 'admin':
             # 管理员可以访问所有章节
-            cursor.execute('SELECT * FROM chapters ORDER BY level, id')
+            cursor.execute(sql.SELECT_ALL_CHAPTERS)
             all_chapters = cursor.fetchall()
             conn.close()
             return jsonify([dict(chapter) for chapter in all_chapters])
         
         # 普通用户只能访问有权限的章节
-        cursor.execute('''
-            SELECT DISTINCT c.* 
-            FROM chapters c
-            LEFT JOIN user_course_permissions ucp ON c.id = ucp.chapter_id
-            WHERE ucp.user_id = ? OR c.id IN (
-                SELECT parent_id FROM user_course_permissions WHERE user_id = ?
-            ) OR c.id IN (
-                SELECT parent_id FROM chapters WHERE id IN (
-                    SELECT chapter_id FROM user_course_permissions WHERE user_id = ?
-                )
-            )
-            ORDER BY c.level, c.id
-        ''', (user_id, user_id, user_id))
+        cursor.execute(sql.SELECT_USER_AVAILABLE_CHAPTERS, (user_id, user_id, user_id))
         
         available_chapters = cursor.fetchall()
         
@@ -839,15 +596,13 @@ def get_knowledge():
     try:
         chapter_id = request.args.get('chapter_id', type=int)
         
-        conn = get_db_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         
         if chapter_id:
-            cursor.execute('SELECT * FROM knowledge WHERE chapter_id = ?', (chapter_id,))
+            knowledge = get_chapter_knowledge(cursor, chapter_id)
         else:
-            cursor.execute('SELECT * FROM knowledge')
-        
-        knowledge = [dict(row) for row in cursor.fetchall()]
+            knowledge = knowledge_shards.all_knowledge(cursor)
         
         conn.close()
         return jsonify(knowledge)
@@ -863,31 +618,41 @@ def generate_questions():
         second_level_id = data.get('second_level_id')
         chapter_id = data.get('chapter_id')
         count = data.get('count', 10)
-        
-        conn = get_db_connection()
+        user_id = data.get('user_id')
+        seed = data.get('seed')
+        source = data.get('source', 'knowledge')
+        # 指定种子或要求隐藏答案时，返回带set_id的题目集，答题由服务器判分。
+        # 种子总是由服务器随机生成：客户端指定的种子能反复拿到同一批题目，逐个试出答案
+        seeded = seed is not None or data.get('hide_answers', False)
+        if seeded:
+            seed = new_seed()
+        
+        conn = get_read_connection()
         cursor = conn.cursor()
         
         # 根据参数获取知识点
-        if chapter_id:
-            # 如果指定了章节ID，直接获取该章节的知识点
-            cursor.execute('SELECT * FROM knowledge WHERE chapter_id = ?', (chapter_id,))
-        elif second_level_id:
-            # 如果指定了二级章节ID，获取该章节的知识点
-            cursor.execute('SELECT * FROM knowledge WHERE chapter_id = ?', (second_level_id,))
+        if source == 'science':
+            # 从科学百科中抽取
+            knowledge_points = encyclopedia_sampler.sample(cursor, count, seed=seed)
+        elif chapter_id or second_level_id:
+            # 如果指定了章节ID或二级章节ID，直接获取该章节的知识点
+            knowledge_points = get_chapter_knowledge(cursor, chapter_id or second_level_id)
         elif first_level_id:
             # 如果指定了一级章节ID，获取该章节下所有二级章节的知识点
-            cursor.execute('''
-                SELECT k.* FROM knowledge k
-                JOIN chapters c ON k.chapter_id = c.id
-                WHERE c.parent_id = ?
-            ''', (first_level_id,))
+            knowledge_points = knowledge_shards.course_knowledge(cursor, first_level_id)
         else:
-            # 如果没有指定任何章节，获取所有知识点
-            cursor.execute('SELECT * FROM knowledge')
+            # 如果没有指定任何章节，获取所有知识点（包括拆分到各课程库中的）
+            knowledge_points = knowledge_shards.all_knowledge(cursor)
         
-        knowledge_points = [dict(row) for row in cursor.fetchall()]
+        # 登录用户按掌握程度抽题，薄弱的知识点更容易被抽到
+        mastery = get_user_mastery(cursor, user_id) if user_id and knowledge_points and not seeded else None
         conn.close()
         
+        if seeded:
+            if not knowledge_points:
+                return jsonify({'status': 'error', 'message': '没有可用的知识点'}), 404
+            return jsonify(build_question_set(knowledge_points, seed, source, count))
+        
         if not knowledge_points:
             # 如果没有知识点，返回默认题目
             return jsonify([
@@ -906,7 +671,11 @@ def generate_questions():
             ])
         
         # 使用已有的函数生成题目
-        questions = generate_questions_from_knowledge_points(knowledge_points)
+        if mastery is not None:
+            questions = generate_questions_from_knowledge_points(
+                pick_weak_points(knowledge_points, mastery, count), questions_per_point=1)
+        else:
+            questions = generate_questions_from_knowledge_points(knowledge_points)
         
         # 限制题目数量
         if len(questions) > count:
@@ -916,103 +685,164 @@ def generate_questions():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+# 保存一条排名记录（在写线程中执行），返回 (结果, HTTP状态码)
+def apply_ranking(conn, data):
+    name = data.get('name')
+    score = data.get('score')
+    correctCount = data.get('correctCount')
+    time = data.get('time')
+    date = data.get('date', datetime.now().isoformat())
+    user_id = data.get('user_id')
+    answers = data.get('answers')
+    
+    if not all([name, score is not None, correctCount is not None, time is not None]):
+        return {'status': 'error', 'message': '缺少必要参数'}, 400
+    
+    cursor = conn.cursor()
+    
+    # 插入排名数据
+    cursor.execute(sql.INSERT_RANKING, (name, score, correctCount, time, date))
+    
+    # 记录每个知识点的答题对错
+    if user_id and answers:
+        record_answers(cursor, user_id, answers)
+    
+    return {'status': 'success', 'message': '提交成功'}, 200
+
+# 保存一次答题结果（在写线程中执行），返回 (结果, HTTP状态码)
+def apply_quiz(conn, data):
+    user_id = data.get('user_id')
+    chapter_id = data.get('chapter_id')
+    score = data.get('score')
+    correct_count = data.get('correct_count')
+    total_questions = data.get('total_questions')
+    answers = data.get('answers')
+    
+    if not all([user_id, chapter_id, score is not None, correct_count is not None, total_questions]):
+        return {'status': 'error', 'message': '缺少必要参数'}, 400
+    
+    cursor = conn.cursor()
+    
+    # 获取用户信息
+    cursor.execute(sql.SELECT_USER_BY_ID, (user_id,))
+    user = cursor.fetchone()
+    
+    if not user:
+        return {'status': 'error', 'message': '用户不存在'}, 404
+    
+    # 更新用户总分
+    new_total_score = user['totalScore'] + score
+    cursor.execute(sql.UPDATE_USER_SCORE, (new_total_score, user_id))
+    
+    # 记录到排行榜
+    cursor.execute(sql.INSERT_RANKING, (user['name'], score, correct_count, total_questions, datetime.now().isoformat()))
+    
+    # 按SM-2算法更新该章节的复习计划
+    due_at = schedule_review(cursor, user_id, chapter_id, correct_count, total_questions)
+    
+    # 记录每个知识点的答题对错
+    if answers:
+        record_answers(cursor, user_id, answers)
+    
+    return {
+        'status': 'success',
+        'message': '答题结果已提交',
+        'new_total_score': new_total_score,
+        'next_available_time': datetime.fromtimestamp(due_at).isoformat()
+    }, 200
+
+# 批量提交中每种记录对应的处理函数
+SUBMISSION_HANDLERS = {
+    'submit': apply_ranking,
+    'submit-quiz': apply_quiz
+}
+
+# 单条提交：请求头带 Idempotency-Key 时按键去重，超时后重试不会重复计分
+def submit_once(handler):
+    key = request.headers.get('Idempotency-Key')
+    if key is None:
+        return db_writer.call(handler, request.json)
+    if not valid_key(key):
+        return {'status': 'error', 'message': 'Idempotency-Key格式不正确'}, 400
+    return db_writer.call(apply_once, key, handler, request.json)
+
 # 提交排名API
 @app.route('/api/submit', methods=['POST'])
 def submit_ranking():
     try:
-        data = request.json
-        name = data.get('name')
-        score = data.get('score')
-        correctCount = data.get('correctCount')
-        time = data.get('time')
-        date = data.get('date', datetime.now().isoformat())
-        
-        if not all([name, score is not None, correctCount is not None, time is not None]):
-            return jsonify({'status': 'error', 'message': '缺少必要参数'}), 400
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # 插入排名数据
-        cursor.execute('''
-            INSERT INTO rankings (name, score, correctCount, time, date)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (name, score, correctCount, time, date))
-        
-        conn.commit()
-        conn.close()
-        
-        return jsonify({'status': 'success', 'message': '提交成功'})
+        result, status_code = submit_once(apply_ranking)
+        return jsonify(result), status_code
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 # 提交答题结果
 @app.route('/api/submit-quiz', methods=['POST'])
 def submit_quiz():
+    try:
+        result, status_code = submit_once(apply_quiz)
+        return jsonify(result), status_code
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+# 批量提交答题记录：{"submissions": [{"key": 幂等键, "type": "submit"|"submit-quiz", "data": {...}}]}
+# 所有记录在一个事务中处理，每条记录单独返回结果，重复的键返回上次的结果且不重复计分
+@app.route('/api/submit-batch', methods=['POST'])
+def submit_batch():
     try:
         data = request.json
-        user_id = data.get('user_id')
-        chapter_id = data.get('chapter_id')
-        score = data.get('score')
-        correct_count = data.get('correct_count')
-        total_questions = data.get('total_questions')
-        
-        if not all([user_id, chapter_id, score is not None, correct_count is not None, total_questions]):
-            return jsonify({'status': 'error', 'message': '缺少必要参数'}), 400
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # 获取用户信息
-        cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
-        user = cursor.fetchone()
+        submissions = data.get('submissions') if isinstance(data, dict) else None
+        if not isinstance(submissions, list) or not submissions:
+            return jsonify({'status': 'error', 'message': '缺少提交记录'}), 400
+        if len(submissions) > MAX_SUBMISSIONS:
+            return jsonify({'status': 'error', 'message': f'一次最多提交{MAX_SUBMISSIONS}条记录'}), 400
+        
+        items = []
+        for item in submissions:
+            item = item if isinstance(item, dict) else {}
+            key = item.get('key')
+            handler = SUBMISSION_HANDLERS.get(item.get('type'))
+            payload = item.get('data')
+            if not valid_key(key) or not isinstance(payload, dict):
+                handler = None
+            items.append((key, handler, payload))
+        
+        outcomes = db_writer.call(apply_batch, items)
+        
+        results = []
+        summary = {'applied': 0, 'duplicates': 0, 'rejected': 0, 'failed': 0}
+        for (key, handler, payload), (result, status_code) in zip(items, outcomes):
+            if status_code >= 500:
+                summary['failed'] += 1
+            elif result.get('duplicate'):
+                summary['duplicates'] += 1
+            elif status_code >= 400:
+                summary['rejected'] += 1
+            else:
+                summary['applied'] += 1
+            results.append({'key': key, 'status_code': status_code, 'result': result})
         
-        if not user:
-            conn.close()
-            return jsonify({'status': 'error', 'message': '用户不存在'}), 404
+        return jsonify({'status': 'success', 'results': results, **summary})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+# 获取用户到期需要复习的章节
+@app.route('/api/due', methods=['GET'])
+def get_due():
+    try:
+        user_id = request.args.get('user_id', type=int)
+        now = request.args.get('now', type=int)
+        limit = min(request.args.get('limit', 20, type=int), 100)
         
-        # 更新用户总分
-        new_total_score = user['totalScore'] + score
-        cursor.execute('UPDATE users SET totalScore = ? WHERE id = ?', (new_total_score, user_id))
-        
-        # 记录到排行榜
-        cursor.execute('''
-            INSERT INTO rankings (name, score, correctCount, time, date)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user['name'], score, correct_count, total_questions, datetime.now().isoformat()))
-        
-        # 更新答题时间记录
-        cursor.execute('''
-            SELECT interval_days FROM user_quiz_times
-            WHERE user_id = ? AND chapter_id = ?
-        ''', (user_id, chapter_id))
-        quiz_time = cursor.fetchone()
-        
-        if quiz_time:
-            interval_days = quiz_time[0]
-            if interval_days < 7:
-                interval_days += 1
-            else:
-                interval_days = 1
-        else:
-            interval_days = 1
+        if not user_id:
+            return jsonify({'status': 'error', 'message': '缺少用户ID'}), 400
         
-        next_available_time = datetime.now() + timedelta(days=interval_days)
+        conn = get_read_connection()
+        cursor = conn.cursor()
         
-        cursor.execute('''
-            INSERT OR REPLACE INTO user_quiz_times (user_id, chapter_id, last_quiz_time, next_available_time, interval_days)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user_id, chapter_id, datetime.now().isoformat(), next_available_time.isoformat(), interval_days))
+        items = get_due_items(cursor, user_id, now, limit)
         
-        conn.commit()
         conn.close()
-        
-        return jsonify({
-            'status': 'success',
-            'message': '答题结果已提交',
-            'new_total_score': new_total_score,
-            'next_available_time': next_available_time.isoformat()
-        })
+        return jsonify(items)
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -1020,25 +850,11 @@ def submit_quiz():
 @app.route('/api/rankings', methods=['GET'])
 def get_rankings():
     try:
-        conn = get_db_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT 
-                name,
-                SUM(score) as total_score,
-                SUM(correctCount) as total_correct,
-                SUM(time) as total_time,
-                MIN(date) as first_date,
-                COUNT(*) as quiz_count
-            FROM rankings
-            WHERE name != '匿名用户'
-            GROUP BY name
-            ORDER BY total_score DESC, total_time ASC
-            LIMIT 50
-        ''')
-        
-        rankings = [dict(row) for row in cursor.fetchall()]
+        # 合并最近的记录和已归档记录的汇总
+        rankings = top_rankings(cursor, 50)
         
         conn.close()
         return jsonify(rankings)
@@ -1049,10 +865,10 @@ def get_rankings():
 @app.route('/api/users', methods=['GET'])
 def get_users():
     try:
-        conn = get_db_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         
-        cursor.execute('SELECT id, username, name, totalScore FROM users')
+        cursor.execute(sql.SELECT_ALL_USERS)
         users = [dict(row) for row in cursor.fetchall()]
         
         conn.close()
@@ -1067,26 +883,28 @@ def update_user_score(user_id):
         data = request.json
         score_change = data.get('score_change', 0)
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # 获取用户当前分数
-        cursor.execute('SELECT totalScore FROM users WHERE id = ?', (user_id,))
-        user = cursor.fetchone()
+        # 返回新分数，用户不存在时返回None
+        def change_score(conn):
+            cursor = conn.cursor()
+            
+            # 获取用户当前分数
+            cursor.execute(sql.SELECT_USER_SCORE, (user_id,))
+            user = cursor.fetchone()
+            
+            if not user:
+                return None
+            
+            current_score = user[0]
+            new_score = max(0, current_score + score_change)
+            
+            # 更新分数
+            cursor.execute(sql.UPDATE_USER_SCORE, (new_score, user_id))
+            return new_score
         
-        if not user:
-            conn.close()
+        new_score = db_writer.call(change_score)
+        if new_score is None:
             return jsonify({'status': 'error', 'message': '用户不存在'}), 404
         
-        current_score = user[0]
-        new_score = max(0, current_score + score_change)
-        
-        # 更新分数
-        cursor.execute('UPDATE users SET totalScore = ? WHERE id = ?', (new_score, user_id))
-        
-        conn.commit()
-        conn.close()
-        
         return jsonify({
             'status': 'success',
             'message': '分数更新成功',
@@ -1108,32 +926,96 @@ def add_knowledge():
         if not all([title, content, category]):
             return jsonify({'status': 'error', 'message': '请填写完整信息'}), 400
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        # 写入所属课程的库（课程拆分出去时由该分片的写线程写入），并更新全文检索索引
+        conn = get_read_connection()
+        try:
+            knowledge_shards.add(conn.cursor(), title, content, category, chapter_id)
+        finally:
+            conn.close()
+        invalidate_knowledge_cache([chapter_id])
         
-        cursor.execute('''
-            INSERT INTO knowledge (title, content, category, chapter_id)
-            VALUES (?, ?, ?, ?)
-        ''', (title, content, category, chapter_id))
+        return jsonify({'status': 'success', 'message': '知识点添加成功'})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+# 批量导入知识点（JSON数组 / NDJSON / CSV）
+@app.route('/api/knowledge/import', methods=['POST'])
+def import_knowledge_file():
+    try:
+        upload = request.files.get('file')
+        fmt = request.args.get('format') or detect_format(upload.filename if upload else '')
+        default_chapter_id = request.args.get('chapter_id', type=int)
+        
+        if fmt not in SUPPORTED_FORMATS:
+            return jsonify({'status': 'error', 'message': f'不支持的格式: {fmt}'}), 400
+        
+        # 在请求线程中逐批解析和校验，每批按课程交给主库或分片的写线程提交，
+        # 导入期间其他课程的出题和写操作不必等待整个导入结束
+        conn = get_read_connection()
+        try:
+            cursor = conn.cursor()
+            result = import_knowledge(conn, upload.stream if upload else request.stream, fmt, default_chapter_id,
+                                      knowledge_table=knowledge_shards.view(cursor),
+                                      insert_rows=lambda rows: knowledge_shards.insert_rows(cursor, rows))
+        finally:
+            conn.close()
+        db_writer.call(knowledge_shards.sync_search, exclusive=True, timeout=None)
         
-        conn.commit()
-        conn.close()
+        # 导入结束后统一刷新受影响章节的缓存
+        invalidate_knowledge_cache(result['chapter_ids'])
         
-        return jsonify({'status': 'success', 'message': '知识点添加成功'})
+        return jsonify({'status': 'success', 'message': f"成功导入 {result['inserted']} 条知识点", **result})
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
-# 删除知识点
-@app.route('/api/knowledge/<int:knowledge_id>', methods=['DELETE'])
-def delete_knowledge(knowledge_id):
+# 全文检索知识点和科学百科
+@app.route('/api/search', methods=['GET'])
+def search_content():
     try:
-        conn = get_db_connection()
+        query = (request.args.get('q') or '').strip()
+        source = request.args.get('source')
+        chapter_ids = request.args.getlist('chapter_id', type=int)
+        course_id = request.args.get('course_id', type=int)
+        page = max(1, request.args.get('page', 1, type=int))
+        page_size = min(max(1, request.args.get('page_size', 20, type=int)), 100)
+        
+        if not query:
+            return jsonify({'status': 'error', 'message': '请输入搜索内容'}), 400
+        if source and source not in ('knowledge', 'science'):
+            return jsonify({'status': 'error', 'message': '来源只能是knowledge或science'}), 400
+        
+        conn = get_read_connection()
         cursor = conn.cursor()
         
-        cursor.execute('DELETE FROM knowledge WHERE id = ?', (knowledge_id,))
+        # 按一级课程筛选时，展开为其下所有二级章节
+        if course_id:
+            cursor.execute(sql.SELECT_CHILD_CHAPTER_IDS, (course_id,))
+            chapter_ids = chapter_ids + [row[0] for row in cursor.fetchall()]
+            if not chapter_ids:
+                conn.close()
+                return jsonify({'total': 0, 'page': page, 'page_size': page_size, 'results': []})
+        
+        total, results = search(cursor, query, source, chapter_ids, page_size, (page - 1) * page_size,
+                                knowledge_shards.search_tables(cursor))
         
-        conn.commit()
         conn.close()
+        return jsonify({'total': total, 'page': page, 'page_size': page_size, 'results': results})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+# 删除知识点
+@app.route('/api/knowledge/<int:knowledge_id>', methods=['DELETE'])
+def delete_knowledge(knowledge_id):
+    try:
+        conn = get_read_connection()
+        try:
+            knowledge = knowledge_shards.delete(conn.cursor(), knowledge_id)
+        finally:
+            conn.close()
+        if knowledge:
+            invalidate_knowledge_cache([knowledge[0]])
         
         return jsonify({'status': 'success', 'message': '知识点删除成功'})
     except Exception as e:
@@ -1152,16 +1034,8 @@ def add_chapter():
         if not name:
             return jsonify({'status': 'error', 'message': '请填写章节名称'}), 400
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO chapters (name, code, level, parent_id)
-            VALUES (?, ?, ?, ?)
-        ''', (name, code, level, parent_id))
-        
-        conn.commit()
-        conn.close()
+        db_writer.execute(sql.INSERT_CHAPTER, (name, code, level, parent_id))
+        knowledge_shards.invalidate()
         
         return jsonify({'status': 'success', 'message': '章节添加成功'})
     except Exception as e:
@@ -1171,10 +1045,10 @@ def add_chapter():
 @app.route('/api/chapters/<int:chapter_id>', methods=['GET'])
 def get_chapter(chapter_id):
     try:
-        conn = get_db_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         
-        cursor.execute('SELECT * FROM chapters WHERE id = ?', (chapter_id,))
+        cursor.execute(sql.SELECT_CHAPTER_BY_ID, (chapter_id,))
         chapter = cursor.fetchone()
         
         if not chapter:
@@ -1199,24 +1073,27 @@ def update_chapter(chapter_id):
         if not name:
             return jsonify({'status': 'error', 'message': '请填写章节名称'}), 400
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        # 返回章节是否存在
+        def save_chapter(conn):
+            cursor = conn.cursor()
+            
+            # 检查章节是否存在
+            cursor.execute(sql.SELECT_CHAPTER_BY_ID, (chapter_id,))
+            if not cursor.fetchone():
+                return False
+            
+            # 更新章节
+            cursor.execute(sql.UPDATE_CHAPTER, (name, code, level, parent_id, chapter_id))
+            return True
         
-        # 检查章节是否存在
-        cursor.execute('SELECT * FROM chapters WHERE id = ?', (chapter_id,))
-        if not cursor.fetchone():
-            conn.close()
+        if not db_writer.call(save_chapter):
             return jsonify({'status': 'error', 'message': '章节不存在'}), 404
         
-        # 更新章节
-        cursor.execute('''
-            UPDATE chapters 
-            SET name = ?, code = ?, level = ?, parent_id = ? 
-            WHERE id = ?
-        ''', (name, code, level, parent_id, chapter_id))
-        
-        conn.commit()
-        conn.close()
+        # 章节可能换到了其他课程下：有拆分的课程时把它的知识点移到新课程所在的库
+        knowledge_shards.invalidate()
+        if knowledge_shards.sharded_courses():
+            db_writer.call(knowledge_shards.rebalance, exclusive=True, timeout=None)
+            invalidate_knowledge_cache()
         
         return jsonify({'status': 'success', 'message': '章节更新成功'})
     except Exception as e:
@@ -1226,13 +1103,9 @@ def update_chapter(chapter_id):
 @app.route('/api/chapters/<int:chapter_id>', methods=['DELETE'])
 def delete_chapter(chapter_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM chapters WHERE id = ?', (chapter_id,))
-        
-        conn.commit()
-        conn.close()
+        db_writer.execute(sql.DELETE_CHAPTER, (chapter_id,))
+        knowledge_shards.invalidate()
+        invalidate_knowledge_cache([chapter_id])
         
         return jsonify({'status': 'success', 'message': '章节删除成功'})
     except Exception as e:
@@ -1249,21 +1122,17 @@ def set_user_course_permissions():
         if not user_id:
             return jsonify({'status': 'error', 'message': '缺少用户ID'}), 400
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # 删除用户现有的权限
-        cursor.execute('DELETE FROM user_course_permissions WHERE user_id = ?', (user_id,))
-        
-        # 添加新的权限
-        for chapter_id in chapter_ids:
-            cursor.execute('''
-                INSERT INTO user_course_permissions (user_id, chapter_id)
-                VALUES (?, ?)
-            ''', (user_id, chapter_id))
+        def replace_permissions(conn):
+            cursor = conn.cursor()
+            
+            # 删除用户现有的权限
+            cursor.execute(sql.DELETE_USER_PERMISSIONS, (user_id,))
+            
+            # 添加新的权限
+            for chapter_id in chapter_ids:
+                cursor.execute(sql.INSERT_USER_PERMISSION, (user_id, chapter_id))
         
-        conn.commit()
-        conn.close()
+        db_writer.call(replace_permissions)
         
         return jsonify({'status': 'success', 'message': '权限设置成功'})
     except Exception as e:
@@ -1273,13 +1142,10 @@ def set_user_course_permissions():
 @app.route('/api/user-course-permissions/<int:user_id>', methods=['GET'])
 def get_user_course_permissions(user_id):
     try:
-        conn = get_db_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT chapter_id FROM user_course_permissions
-            WHERE user_id = ?
-        ''', (user_id,))
+        cursor.execute(sql.SELECT_USER_PERMISSIONS, (user_id,))
         
         permissions = [row[0] for row in cursor.fetchall()]
         
@@ -1292,10 +1158,10 @@ def get_user_course_permissions(user_id):
 @app.route('/api/user/<int:user_id>', methods=['GET'])
 def get_user_info(user_id):
     try:
-        conn = get_db_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         
-        cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
+        cursor.execute(sql.SELECT_USER_BY_ID, (user_id,))
         user = cursor.fetchone()
         
         if not user:
@@ -1324,15 +1190,19 @@ def get_online_users():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
-# 获取科学百科知识
+# 获取科学百科知识（随机抽取，可按分类和难度筛选，指定seed时结果可复现）
 @app.route('/api/science-encyclopedia', methods=['GET'])
 def get_science_encyclopedia():
     try:
-        conn = get_db_connection()
+        count = min(request.args.get('count', 20, type=int), 100)
+        category = request.args.get('category') or None
+        difficulty = request.args.get('difficulty') or None
+        seed = request.args.get('seed', type=int)
+        
+        conn = get_read_connection()
         cursor = conn.cursor()
         
-        cursor.execute('SELECT * FROM science_encyclopedia ORDER BY RANDOM() LIMIT 20')
-        items = [dict(row) for row in cursor.fetchall()]
+        items = encyclopedia_sampler.sample(cursor, count, category, difficulty, seed)
         
         conn.close()
         return jsonify(items)
@@ -1352,16 +1222,16 @@ def add_science_encyclopedia():
         if not all([title, content, category]):
             return jsonify({'status': 'error', 'message': '请填写完整信息'}), 400
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO science_encyclopedia (title, content, category, difficulty, created_at)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (title, content, category, difficulty, datetime.now().isoformat()))
+        def insert_science_item(conn):
+            cursor = conn.cursor()
+            
+            cursor.execute(sql.INSERT_SCIENCE_ITEM, (title, content, category, difficulty, datetime.now().isoformat()))
+            item_id = cursor.lastrowid
+            index_record(cursor, 'science', item_id, title, content)
+            return item_id
         
-        conn.commit()
-        conn.close()
+        item_id = db_writer.call(insert_science_item)
+        encyclopedia_sampler.add(item_id, category, difficulty)
         
         return jsonify({'status': 'success', 'message': '科学百科知识添加成功'})
     except Exception as e:
@@ -1378,23 +1248,14 @@ def create_pk_challenge():
         if not all([challenger_id, opponent_id]):
             return jsonify({'status': 'error', 'message': '缺少必要参数'}), 400
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         # 检查用户是否在线
         if opponent_id not in online_users:
-            conn.close()
             return jsonify({'status': 'error', 'message': '对方不在线'}), 400
         
-        # 创建PK挑战
-        cursor.execute('''
-            INSERT INTO pk_challenges (challenger_id, opponent_id, status, created_at)
-            VALUES (?, ?, 'pending', ?)
-        ''', (challenger_id, opponent_id, datetime.now().isoformat()))
-        
-        challenge_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        # 创建PK挑战；种子决定双方共用的题目集，只保存在服务器端
+        question_seed = new_seed()
+        challenge_id = db_writer.execute(sql.INSERT_PK_CHALLENGE,
+                                         (challenger_id, opponent_id, datetime.now().isoformat(), question_seed))
         
         # 通过WebSocket通知对手
         socketio.emit('pk_challenge_request', {
@@ -1407,145 +1268,174 @@ def create_pk_challenge():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+# 生成PK对战的题目集：所有知识点，没有知识点时使用科学百科；
+# 答案键随对战会话保存，对战进行中不会被共享答案键存储的LRU/TTL淘汰
+def build_pk_question_set(cursor, seed, count):
+    knowledge_points = knowledge_shards.all_knowledge(cursor)
+    if knowledge_points:
+        return build_question_set(knowledge_points, seed, 'knowledge', count, keep_answers=True)
+    science_items = encyclopedia_sampler.sample(cursor, count, seed=seed)
+    if science_items:
+        return build_question_set(science_items, seed, 'science', count, keep_answers=True)
+    return None
+
 # 接受PK挑战
 @app.route('/api/pk-challenges/<int:challenge_id>/accept', methods=['POST'])
 def accept_pk_challenge(challenge_id):
     try:
-        conn = get_db_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         
-        # 更新挑战状态
-        cursor.execute('''
-            UPDATE pk_challenges
-            SET status = 'active'
-            WHERE id = ?
-        ''', (challenge_id,))
-        
         # 获取挑战信息
-        cursor.execute('SELECT * FROM pk_challenges WHERE id = ?', (challenge_id,))
+        cursor.execute(sql.SELECT_PK_CHALLENGE, (challenge_id,))
         challenge = cursor.fetchone()
         
-        conn.commit()
-        conn.close()
-        
         if not challenge:
+            conn.close()
             return jsonify({'status': 'error', 'message': '挑战不存在'}), 404
         
-        # 通知双方开始挑战
-        socketio.emit('pk_challenge_started', {
-            'challenge_id': challenge_id,
-            'challenger_id': challenge['challenger_id'],
-            'opponent_id': challenge['opponent_id']
-        }, room=f'challenge_{challenge_id}')
+        # 重复接受时返回已有的对战
+        session = pk_sessions.get(challenge_id)
+        if session:
+            conn.close()
+            return jsonify({'status': 'success', 'message': '已接受挑战', 'challenge': session.to_dict()})
+        
+        if challenge['status'] != 'pending':
+            conn.close()
+            return jsonify({'status': 'error', 'message': '挑战已开始或已结束'}), 400
+        
+        # 只生成一次题目集，双方共用
+        question_seed = challenge['question_seed'] or new_seed()
+        question_set = build_pk_question_set(cursor, question_seed, challenge['total_questions'])
+        if not question_set:
+            conn.close()
+            return jsonify({'status': 'error', 'message': '没有可用的知识点'}), 404
+        
+        conn.close()
+        
+        session = PKSession(challenge_id, challenge['challenger_id'], challenge['opponent_id'], question_set)
+        
+        # 更新挑战状态：只有仍为pending时才更新，同时接受的请求中只有一个能开始对战并创建会话
+        def start_challenge(conn):
+            cursor = conn.cursor()
+            cursor.execute(sql.START_PK_CHALLENGE, (question_seed, session.total_questions, challenge_id))
+            if cursor.rowcount == 0:
+                return False
+            pk_sessions.add(session)
+            return True
+        
+        if not db_writer.call(start_challenge):
+            session = pk_sessions.get(challenge_id)
+            if session:
+                return jsonify({'status': 'success', 'message': '已接受挑战', 'challenge': session.to_dict()})
+            return jsonify({'status': 'error', 'message': '挑战已开始或已结束'}), 400
         
-        return jsonify({'status': 'success', 'message': '已接受挑战'})
+        # 通知双方开始挑战，并下发题目
+        payload = session.to_dict()
+        socketio.emit('pk_challenge_started', payload, room=f'challenge_{challenge_id}')
+        
+        return jsonify({'status': 'success', 'message': '已接受挑战', 'challenge': payload})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
-# 提交PK答案
-@app.route('/api/pk-challenges/<int:challenge_id>/answer', methods=['POST'])
-def submit_pk_answer(challenge_id):
-    try:
-        data = request.json
-        user_id = data.get('user_id')
-        is_correct = data.get('is_correct')
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # 获取挑战信息
-        cursor.execute('SELECT * FROM pk_challenges WHERE id = ?', (challenge_id,))
-        challenge = cursor.fetchone()
+# 处理一次PK作答（HTTP和WebSocket共用），返回 (结果, HTTP状态码)
+def apply_pk_answer(challenge_id, user_id, question_index, choice):
+    if not all([challenge_id, user_id]) or question_index is None or choice is None:
+        return {'status': 'error', 'message': '缺少必要参数'}, 400
+    
+    session = pk_sessions.get(challenge_id)
+    if not session:
+        return {'status': 'error', 'message': '对战不存在或已结束'}, 410
+    
+    with session.lock:
+        # 按对战会话保存的答案键判分
+        is_correct = session.grade(question_index, choice)
         
-        if not challenge:
-            conn.close()
-            return jsonify({'status': 'error', 'message': '挑战不存在'}), 404
+        try:
+            advanced = session.record(user_id, question_index, is_correct)
+        except ValueError as e:
+            return {'status': 'error', 'message': str(e)}, 400
         
-        # 更新分数
-        if user_id == challenge['challenger_id']:
-            if is_correct:
-                cursor.execute('''
-                    UPDATE pk_challenges
-                    SET challenger_score = challenger_score + 1
-                    WHERE id = ?
-                ''', (challenge_id,))
-        elif user_id == challenge['opponent_id']:
-            if is_correct:
-                cursor.execute('''
-                    UPDATE pk_challenges
-                    SET opponent_score = opponent_score + 1
-                    WHERE id = ?
-                ''', (challenge_id,))
-        
-        # 更新当前题目
-        cursor.execute('''
-            UPDATE pk_challenges
-            SET current_question = current_question + 1
-            WHERE id = ?
-        ''', (challenge_id,))
-        
-        # 获取更新后的挑战信息
-        cursor.execute('SELECT * FROM pk_challenges WHERE id = ?', (challenge_id,))
-        updated_challenge = cursor.fetchone()
-        
-        # 检查是否完成
-        completed = updated_challenge['current_question'] >= updated_challenge['total_questions']
+        challenger_score = session.score(session.challenger_id)
+        opponent_score = session.score(session.opponent_id)
+        completed = session.completed
         
+        winner_id = None
+        loser_id = None
         if completed:
             # 计算胜负
-            challenger_score = updated_challenge['challenger_score']
-            opponent_score = updated_challenge['opponent_score']
-            
-            winner_id = None
-            loser_id = None
-            
             if challenger_score > opponent_score:
-                winner_id = challenge['challenger_id']
-                loser_id = challenge['opponent_id']
+                winner_id = session.challenger_id
+                loser_id = session.opponent_id
             elif opponent_score > challenger_score:
-                winner_id = challenge['opponent_id']
-                loser_id = challenge['challenger_id']
-            
-            # 更新用户积分
-            if winner_id:
-                cursor.execute('''
-                    UPDATE users SET totalScore = totalScore + 3 WHERE id = ?
-                ''', (winner_id,))
-            
-            if loser_id:
-                cursor.execute('''
-                    UPDATE users SET totalScore = CASE WHEN totalScore > 1 THEN totalScore - 1 ELSE 0 END WHERE id = ?
-                ''', (loser_id,))
+                winner_id = session.opponent_id
+                loser_id = session.challenger_id
+        
+        def save_progress(conn):
+            cursor = conn.cursor()
             
-            # 更新挑战状态
-            cursor.execute('''
-                UPDATE pk_challenges
-                SET status = 'completed', completed_at = ?
-                WHERE id = ?
-            ''', (datetime.now().isoformat(), challenge_id))
+            # 更新分数和进度；挑战已被维护任务标记为过期时不再更新，也不结算积分
+            cursor.execute(sql.UPDATE_PK_PROGRESS, (challenger_score, opponent_score, session.current_question, challenge_id))
+            if cursor.rowcount == 0:
+                return False
             
-            # 通知双方结果
+            if completed:
+                # 更新用户积分
+                if winner_id:
+                    cursor.execute(sql.ADD_WINNER_SCORE, (winner_id,))
+                
+                if loser_id:
+                    cursor.execute(sql.DEDUCT_LOSER_SCORE, (loser_id,))
+                
+                # 更新挑战状态
+                cursor.execute(sql.COMPLETE_PK_CHALLENGE, (datetime.now().isoformat(), challenge_id))
+            return True
+        
+        if not db_writer.call(save_progress):
+            pk_sessions.remove(challenge_id)
+            return {'status': 'error', 'message': '对战已超时结束'}, 410
+        
+        result = {
+            'status': 'success',
+            'message': '答案已提交',
+            'correct': is_correct,
+            'completed': completed,
+            'question_index': question_index,
+            'current_question': session.current_question,
+            'challenger_score': challenger_score,
+            'opponent_score': opponent_score
+        }
+        
+        # 按题同步：通知房间内双方
+        room = f'challenge_{challenge_id}'
+        socketio.emit('pk_answer_submitted', dict(result, challenge_id=challenge_id, user_id=user_id), room=room)
+        if completed:
+            pk_sessions.remove(challenge_id)
             socketio.emit('pk_challenge_completed', {
                 'challenge_id': challenge_id,
-                'challenger_id': challenge['challenger_id'],
-                'opponent_id': challenge['opponent_id'],
+                'challenger_id': session.challenger_id,
+                'opponent_id': session.opponent_id,
                 'challenger_score': challenger_score,
                 'opponent_score': opponent_score,
                 'winner_id': winner_id,
                 'loser_id': loser_id
-            }, room=f'challenge_{challenge_id}')
-        
-        conn.commit()
-        conn.close()
+            }, room=room)
+        elif advanced:
+            socketio.emit('pk_next_question', {
+                'challenge_id': challenge_id,
+                'question_index': session.current_question
+            }, room=room)
         
-        return jsonify({
-            'status': 'success',
-            'message': '答案已提交',
-            'completed': completed,
-            'current_question': updated_challenge['current_question'],
-            'challenger_score': updated_challenge['challenger_score'],
-            'opponent_score': updated_challenge['opponent_score']
-        })
+        return result, 200
+
+# 提交PK答案
+@app.route('/api/pk-challenges/<int:challenge_id>/answer', methods=['POST'])
+def submit_pk_answer(challenge_id):
+    try:
+        data = request.json
+        result, status_code = apply_pk_answer(challenge_id, data.get('user_id'), data.get('question_index'),
+                                              data.get('choice'))
+        return jsonify(result), status_code
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -1561,17 +1451,8 @@ def create_boss_challenge():
         if not creator_id:
             return jsonify({'status': 'error', 'message': '创建者ID不能为空'}), 400
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO boss_challenges (creator_id, boss_name, boss_hp, boss_max_hp, status, created_at)
-            VALUES (?, ?, ?, ?, 'active', ?)
-        ''', (creator_id, boss_name, boss_hp, boss_hp, datetime.now().isoformat()))
-        
-        boss_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        boss_id = db_writer.execute(sql.INSERT_BOSS_CHALLENGE,
+                                    (creator_id, boss_name, boss_hp, boss_hp, datetime.now().isoformat()))
         
         # 通知所有客户端有新的BOSS挑战
         socketio.emit('new_boss_challenge', {'boss_id': boss_id, 'boss_name': boss_name})
@@ -1584,16 +1465,10 @@ def create_boss_challenge():
 @app.route('/api/boss-challenges', methods=['GET'])
 def get_boss_challenges():
     try:
-        conn = get_db_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT bc.*, u.name as creator_name
-            FROM boss_challenges bc
-            LEFT JOIN users u ON bc.creator_id = u.id
-            WHERE bc.status = 'active'
-            ORDER BY bc.created_at DESC
-        ''')
+        cursor.execute(sql.SELECT_ACTIVE_BOSS_CHALLENGES)
         
         bosses = [dict(row) for row in cursor.fetchall()]
         
@@ -1606,26 +1481,25 @@ def get_boss_challenges():
 @app.route('/api/boss-challenges/<int:boss_id>', methods=['DELETE'])
 def delete_boss_challenge(boss_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # 检查BOSS是否存在
-        cursor.execute('SELECT * FROM boss_challenges WHERE id = ?', (boss_id,))
-        boss = cursor.fetchone()
+        # 返回BOSS是否存在
+        def remove_boss(conn):
+            cursor = conn.cursor()
+            
+            # 检查BOSS是否存在
+            cursor.execute(sql.SELECT_BOSS_CHALLENGE, (boss_id,))
+            if not cursor.fetchone():
+                return False
+            
+            # 删除BOSS参与者记录
+            cursor.execute(sql.DELETE_BOSS_PARTICIPANTS, (boss_id,))
+            
+            # 删除BOSS挑战记录
+            cursor.execute(sql.DELETE_BOSS_CHALLENGE, (boss_id,))
+            return True
         
-        if not boss:
-            conn.close()
+        if not db_writer.call(remove_boss):
             return jsonify({'status': 'error', 'message': 'BOSS挑战不存在'}), 404
         
-        # 删除BOSS参与者记录
-        cursor.execute('DELETE FROM boss_participants WHERE boss_id = ?', (boss_id,))
-        
-        # 删除BOSS挑战记录
-        cursor.execute('DELETE FROM boss_challenges WHERE id = ?', (boss_id,))
-        
-        conn.commit()
-        conn.close()
-        
         return jsonify({'status': 'success', 'message': 'BOSS挑战删除成功'})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -1640,37 +1514,78 @@ def participate_boss_challenge(boss_id):
         if not user_id:
             return jsonify({'status': 'error', 'message': '用户ID不能为空'}), 400
         
-        conn = get_db_connection()
+        # 返回 (错误信息, 状态码)，成功时返回None
+        def join_boss(conn):
+            cursor = conn.cursor()
+            
+            # 检查BOSS是否存在
+            cursor.execute(sql.SELECT_BOSS_CHALLENGE, (boss_id,))
+            if not cursor.fetchone():
+                return 'BOSS挑战不存在', 404
+            
+            # 检查是否已参与
+            cursor.execute(sql.SELECT_BOSS_PARTICIPANT, (boss_id, user_id))
+            
+            if cursor.fetchone():
+                return '已参与此BOSS挑战', 400
+            
+            # 添加参与记录
+            cursor.execute(sql.INSERT_BOSS_PARTICIPANT, (boss_id, user_id))
+        
+        error = db_writer.call(join_boss)
+        if error:
+            return jsonify({'status': 'error', 'message': error[0]}), error[1]
+        
+        return jsonify({'status': 'success', 'message': '已参与BOSS挑战'})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+# 每个参与者的BOSS题目数量
+BOSS_QUESTION_COUNT = 20
+
+# BOSS题目集的归属：只能用这个BOSS发给这个用户的题目集答题
+def boss_set_owner(boss_id, user_id):
+    return ('boss', boss_id, str(user_id))
+
+# 获取BOSS题目：每个参与者在一个BOSS上只有一套题目（种子由BOSS和用户派生），
+# 重复获取返回同一套题目和已作答记录，不能靠重新出题反复扣血
+@app.route('/api/boss-challenges/<int:boss_id>/questions', methods=['POST'])
+def get_boss_questions(boss_id):
+    try:
+        data = request.json
+        user_id = data.get('user_id')
+        
+        if not user_id:
+            return jsonify({'status': 'error', 'message': '用户ID不能为空'}), 400
+        
+        conn = get_read_connection()
         cursor = conn.cursor()
         
-        # 检查BOSS是否存在
-        cursor.execute('SELECT * FROM boss_challenges WHERE id = ?', (boss_id,))
+        cursor.execute(sql.SELECT_BOSS_CHALLENGE, (boss_id,))
         boss = cursor.fetchone()
-        
         if not boss:
             conn.close()
             return jsonify({'status': 'error', 'message': 'BOSS挑战不存在'}), 404
         
-        # 检查是否已参与
-        cursor.execute('''
-            SELECT * FROM boss_participants
-            WHERE boss_id = ? AND user_id = ?
-        ''', (boss_id, user_id))
-        
-        if cursor.fetchone():
+        if boss['status'] != 'active':
             conn.close()
-            return jsonify({'status': 'error', 'message': '已参与此BOSS挑战'}), 400
+            return jsonify({'status': 'error', 'message': 'BOSS挑战已结束'}), 400
         
-        # 添加参与记录
-        cursor.execute('''
-            INSERT INTO boss_participants (boss_id, user_id)
-            VALUES (?, ?)
-        ''', (boss_id, user_id))
+        cursor.execute(sql.SELECT_BOSS_PARTICIPANT, (boss_id, user_id))
+        if not cursor.fetchone():
+            conn.close()
+            return jsonify({'status': 'error', 'message': '请先参与BOSS挑战'}), 403
         
-        conn.commit()
+        # 从科学百科中抽题
+        seed = derive_seed('boss', boss_id, user_id)
+        science_items = encyclopedia_sampler.sample(cursor, BOSS_QUESTION_COUNT, seed=seed)
         conn.close()
         
-        return jsonify({'status': 'success', 'message': '已参与BOSS挑战'})
+        if not science_items:
+            return jsonify({'status': 'error', 'message': '没有可用的知识点'}), 404
+        
+        return jsonify(build_question_set(science_items, seed, 'science', BOSS_QUESTION_COUNT,
+                                          owner=boss_set_owner(boss_id, user_id)))
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -1680,37 +1595,72 @@ def submit_boss_answer(boss_id):
     try:
         data = request.json
         user_id = data.get('user_id')
-        is_correct = data.get('is_correct')
+        set_id = data.get('set_id')
+        question_index = data.get('question_index')
+        choice = data.get('choice')
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        if not all([user_id, set_id]) or question_index is None or choice is None:
+            return jsonify({'status': 'error', 'message': '缺少必要参数'}), 400
         
-        # 获取BOSS信息
-        cursor.execute('SELECT * FROM boss_challenges WHERE id = ?', (boss_id,))
-        boss = cursor.fetchone()
+        # 只接受这个BOSS发给这个用户的题目集
+        if set_id not in answer_keys:
+            return jsonify({'status': 'error', 'message': '题目已过期，请重新开始'}), 410
+        if answer_keys.owner(set_id) != boss_set_owner(boss_id, user_id):
+            return jsonify({'status': 'error', 'message': '题目集不属于这个BOSS挑战'}), 403
+        
+        # 每道题每个用户只判分一次，不能试遍选项后重复提交正确答案刷血量和积分
+        try:
+            claimed = answer_keys.claim(set_id, user_id, question_index)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+        if claimed is None:
+            return jsonify({'status': 'error', 'message': '题目已过期，请重新开始'}), 410
+        if not claimed:
+            return jsonify({'status': 'error', 'message': '这道题已经作答过了'}), 409
+        
+        # 按服务器端的答案键判分
+        is_correct = answer_keys.grade(set_id, question_index, choice)
+        if is_correct is None:
+            return jsonify({'status': 'error', 'message': '题目已过期，请重新开始'}), 410
+        
+        # 读血量和扣血在同一个写操作中完成，并发答对时不会丢失扣血；返回 (BOSS, 新血量)
+        def hit_boss(conn):
+            cursor = conn.cursor()
+            
+            # 获取BOSS信息
+            cursor.execute(sql.SELECT_BOSS_CHALLENGE, (boss_id,))
+            boss = cursor.fetchone()
+            
+            if not boss or boss['status'] != 'active' or not is_correct:
+                return boss, None
+            
+            # 扣除BOSS血量
+            new_hp = max(0, boss['boss_hp'] - 1)
+            cursor.execute(sql.UPDATE_BOSS_HP, (new_hp, boss_id))
+            
+            # 更新用户正确答题数
+            cursor.execute(sql.INCREMENT_BOSS_CORRECT_COUNT, (boss_id, user_id))
+            
+            # 检查BOSS是否被击败
+            if new_hp <= 0:
+                # 更新BOSS状态
+                cursor.execute(sql.COMPLETE_BOSS_CHALLENGE, (datetime.now().isoformat(), boss_id))
+                
+                # 给所有参与者发放奖励
+                cursor.execute(sql.REWARD_BOSS_PARTICIPANTS, (boss_id,))
+                
+                cursor.execute(sql.MARK_BOSS_REWARDS, (boss_id,))
+            return boss, new_hp
+        
+        boss, new_hp = db_writer.call(hit_boss)
         
         if not boss:
-            conn.close()
             return jsonify({'status': 'error', 'message': 'BOSS挑战不存在'}), 404
         
         if boss['status'] != 'active':
-            conn.close()
             return jsonify({'status': 'error', 'message': 'BOSS挑战已结束'}), 400
         
         if is_correct:
-            # 扣除BOSS血量
-            new_hp = max(0, boss['boss_hp'] - 1)
-            cursor.execute('''
-                UPDATE boss_challenges SET boss_hp = ? WHERE id = ?
-            ''', (new_hp, boss_id))
-            
-            # 更新用户正确答题数
-            cursor.execute('''
-                UPDATE boss_participants
-                SET correct_count = correct_count + 1
-                WHERE boss_id = ? AND user_id = ?
-            ''', (boss_id, user_id))
-            
             # 通知所有客户端BOSS血量更新
             socketio.emit('boss_hp_update', {
                 'boss_id': boss_id,
@@ -1718,45 +1668,129 @@ def submit_boss_answer(boss_id):
                 'max_hp': boss['boss_max_hp']
             })
             
-            # 检查BOSS是否被击败
             if new_hp <= 0:
-                # 更新BOSS状态
-                cursor.execute('''
-                    UPDATE boss_challenges
-                    SET status = 'completed', completed_at = ?
-                    WHERE id = ?
-                ''', (datetime.now().isoformat(), boss_id))
-                
-                # 给所有参与者发放奖励
-                cursor.execute('''
-                    UPDATE users u
-                    SET totalScore = totalScore + 3
-                    WHERE id IN (SELECT user_id FROM boss_participants WHERE boss_id = ?)
-                ''', (boss_id))
-                
-                cursor.execute('''
-                    UPDATE boss_participants
-                    SET received_reward = 1
-                    WHERE boss_id = ?
-                ''', (boss_id,))
-                
                 # 通知所有客户端BOSS被击败
                 socketio.emit('boss_defeated', {
                     'boss_id': boss_id,
                     'boss_name': boss['boss_name']
                 })
         
-        conn.commit()
-        conn.close()
-        
         return jsonify({
             'status': 'success',
             'message': '答案已提交',
+            'correct': is_correct,
             'boss_defeated': new_hp <= 0 if is_correct else False
         })
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+# 带内容哈希的资源永久缓存（一年）
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+# 源文件和音效的缓存时间（未带哈希，浏览器到期后用条件请求重新验证）
+SOURCE_FILE_MAX_AGE = 3600
+
+# 前端页面、资源和音效都缓存在内存中（只缓存这些目录中的这几类文件，不暴露数据库和代码）
+static_files = StaticCache()
+static_files.add_directory(SOURCE_DIR, ('.html', '.css', '.js'))
+static_files.add_directory(os.path.join(SOURCE_DIR, 'shengyin'), ('.mp3',))
+static_files.add_directory(os.path.join(SOURCE_DIR, 'vendor'), ('.js',))
+static_files.add_directory(DIST_DIR, ('.html', '.js'))
+static_files.add_directory(ASSETS_DIR)
+register_collector(static_files.collect_metrics)
+
+def static_not_found():
+    return jsonify({'status': 'error', 'message': '文件不存在'}), 404
+
+# 前端页面：构建过则使用dist/中的版本；页面本身每次都重新验证，以取得最新的资源文件名
+@app.route('/', methods=['GET'])
+@app.route('/<page>.html', methods=['GET'])
+def serve_page(page='quiz-system'):
+    filename = f'{page}.html'
+    entry = static_files.get(os.path.join(DIST_DIR, filename)) or static_files.get(os.path.join(SOURCE_DIR, filename))
+    if entry is None:
+        return static_not_found()
+    return static_files.respond(entry, request, 'no-cache')
+
+# 构建出的带哈希资源
+@app.route('/assets/<path:filename>', methods=['GET'])
+def serve_asset(filename):
+    entry = static_files.get(os.path.join(ASSETS_DIR, filename))
+    if entry is None:
+        return static_not_found()
+    return static_files.respond(entry, request, f'public, max-age={ASSET_MAX_AGE}, immutable')
+
+# service worker脚本：构建过则使用dist/中带预缓存列表的版本，每次都重新验证以便及时更新
+@app.route('/sw.js', methods=['GET'])
+def serve_service_worker():
+    entry = static_files.get(os.path.join(DIST_DIR, 'sw.js')) or static_files.get(os.path.join(SOURCE_DIR, 'sw.js'))
+    if entry is None:
+        return static_not_found()
+    return static_files.respond(entry, request, 'no-cache')
+
+# 源文件中的样式、脚本和音效
+@app.route('/<path:filename>', methods=['GET'])
+def serve_source_file(filename):
+    entry = static_files.get(os.path.join(SOURCE_DIR, filename))
+    if entry is None:
+        return static_not_found()
+    return static_files.respond(entry, request, f'public, max-age={SOURCE_FILE_MAX_AGE}')
+
+# Prometheus指标
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+# 调试接口（/debug/下的所有路由）只允许从本机访问
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+@app.before_request
+def restrict_debug_routes():
+    if request.path.startswith('/debug/') and request.remote_addr not in LOCAL_ADDRESSES:
+        return jsonify({'status': 'error', 'message': '调试接口只允许从本机访问'}), 403
+
+# SQL语句统计和慢查询日志
+@app.route('/debug/sql-stats', methods=['GET'])
+def get_sql_stats():
+    limit = request.args.get('limit', 50, type=int)
+    order_by = request.args.get('order_by', 'total')
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'statements': get_top_statements(limit, order_by),
+            'slow_queries': list(slow_queries),
+            'statement_cache': get_statement_cache_stats(),
+            'pool': db_pool.stats(),
+            'writer': db_writer.stats()
+        })
+    return Response(render_stats_page(limit, order_by, db_pool.stats()), mimetype='text/html')
+
+# 后台任务的运行状态和历史
+@app.route('/debug/jobs', methods=['GET'])
+def get_jobs():
+    return jsonify(job_runner.status())
+
+# 立即运行一个后台任务；任务在后台线程中运行，结果在 GET /debug/jobs 的运行历史中查看
+@app.route('/debug/jobs/<name>/run', methods=['POST'])
+def run_job(name):
+    try:
+        if not job_runner.run_in_background(name):
+            return jsonify({'status': 'error', 'message': '任务正在运行'}), 409
+        return jsonify({'status': 'success', 'message': '任务已开始运行'}), 202
+    except KeyError:
+        return jsonify({'status': 'error', 'message': '任务不存在'}), 404
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+# 启动各阶段耗时和导入到第一个请求的时间
+@app.route('/debug/startup', methods=['GET'])
+def get_startup():
+    return jsonify(startup.report())
+
+@app.before_request
+def record_first_request():
+    if startup.first_request is None:
+        startup.mark_first_request()
+
 # WebSocket事件处理
 @socketio.on('connect')
 def handle_connect():
@@ -1779,9 +1813,9 @@ def handle_join(data):
         join_room(f'user_{user_id}')
         
         # 获取用户信息并添加到在线列表
-        conn = get_db_connection()
+        conn = get_read_connection()
         cursor = conn.cursor()
-        cursor.execute('SELECT id, name, totalScore FROM users WHERE id = ?', (user_id,))
+        cursor.execute(sql.SELECT_ONLINE_USER, (user_id,))
         user = cursor.fetchone()
         conn.close()
         
@@ -1807,6 +1841,38 @@ def handle_leave_challenge(data):
         leave_room(f'challenge_{challenge_id}')
         print(f'离开挑战房间: {challenge_id}')
 
+# PK作答（按题同步），结果通过回调返回给作答者
+@socketio.on('pk_answer')
+def handle_pk_answer(data):
+    try:
+        result, _ = apply_pk_answer(data.get('challenge_id'), data.get('user_id'), data.get('question_index'),
+                                    data.get('choice'))
+        return result
+    except Exception as e:
+        return {'status': 'error', 'message': str(e)}
+
+# 后台预加载题目模板和各章节的知识点缓存，第一次出题不用等待
+def warm_caches():
+    import question_templates  # 导入模块即完成加载
+    conn = get_read_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql.SELECT_ALL_CHAPTERS)
+        for chapter_id in [row['id'] for row in cursor.fetchall()]:
+            get_chapter_knowledge(cursor, chapter_id)
+    finally:
+        conn.close()
+
+register_collector(startup.collect_metrics)
+startup.mark('routes')
+
+if not RELOADER_PARENT:
+    # 静态文件和缓存在后台加载，不推迟开始接受请求的时间
+    startup.run_background('static_files', static_files.load)
+    static_files.start()
+    startup.run_background('warm_caches', warm_caches)
+    startup.log()
+
 # 运行服务器
 if __name__ == '__main__':
     import sys
@@ -1815,8 +1881,14 @@ if __name__ == '__main__':
     # 解析命令行参数
     parser = argparse.ArgumentParser(description='冷湖知识复习系统后端服务器')
     parser.add_argument('--port', type=int, default=9000, help='服务器端口')
+    parser.add_argument('--no-jobs', action='store_true', help='不运行后台定时任务')
+    add_db_argument(parser)
     args = parser.parse_args()
     
+    # 调试模式下会启动重载器，只在实际提供服务的子进程中运行后台任务
+    if not args.no_jobs and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        job_runner.start()
+    
     # 启动服务器
-    print(f'服务器启动在端口 {args.port}...')
+    print(f'服务器启动在端口 {args.port}，数据库 {DB_FILE}...')
     socketio.run(app, host='0.0.0.0', port=args.port, debug=True, allow_unsafe_werkzeug=True)
\ No newline at end of file
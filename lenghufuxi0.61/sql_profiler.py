@@ -0,0 +1,250 @@
+import html
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from metrics import record_sql_time
+
+# 慢查询阈值（毫秒），可通过环境变量调整
+SLOW_QUERY_MS = float(os.environ.get('LENGHU_SLOW_QUERY_MS', '50'))
+
+# 内存中保留的慢查询条数
+SLOW_LOG_SIZE = 200
+
+_lock = threading.Lock()
+
+# {规范化SQL: {'count': int, 'total': float, 'max': float, 'rows': int}}
+statement_stats = {}
+
+# 最近的慢查询
+slow_queries = deque(maxlen=SLOW_LOG_SIZE)
+
+# 每条规范化SQL第一次变慢时抓取的查询计划
+query_plans = {}
+
+# 预编译语句缓存的命中情况：是估算值，按每个连接上的LRU模拟sqlite3模块内部的语句缓存，不是从sqlite3读出的实际命中
+statement_cache = {'hits': 0, 'misses': 0}
+
+# sqlite3默认每个连接缓存的语句数
+DEFAULT_CACHED_STATEMENTS = 128
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+
+# 规范化SQL：去掉字面量和多余空白，使同一语句归为一类
+def normalize_sql(sql):
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(?...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def _explain(conn, sql, parameters):
+    try:
+        # 使用普通游标，避免EXPLAIN本身也被统计
+        cursor = sqlite3.Cursor(conn)
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, parameters)
+        return [row[-1] for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        return [f'EXPLAIN失败: {e}']
+
+
+# 统计耗时的游标：execute和随后的fetch都计入同一条语句
+class TimedCursor(sqlite3.Cursor):
+    _statement = None
+    _sql = None
+    _parameters = ()
+    _elapsed = 0.0
+    _logged = False
+
+    def _record(self, elapsed, rows=0):
+        record_sql_time(elapsed)
+        key = self._statement
+        if key is None:
+            return
+        self._elapsed += elapsed
+        with _lock:
+            stats = statement_stats[key]
+            stats['total'] += elapsed
+            stats['rows'] += rows
+            if self._elapsed > stats['max']:
+                stats['max'] = self._elapsed
+        if not self._logged and self._elapsed * 1000 >= SLOW_QUERY_MS:
+            self._logged = True
+            self._log_slow(key)
+
+    def _log_slow(self, key):
+        plan = query_plans.get(key)
+        if plan is None and isinstance(self._parameters, (tuple, list, dict)):
+            plan = query_plans[key] = _explain(self.connection, self._sql, self._parameters)
+        slow_queries.append({
+            'sql': key,
+            'elapsed_ms': round(self._elapsed * 1000, 2),
+            'time': datetime.now().isoformat(),
+            'plan': plan or []
+        })
+        print(f'慢查询 {self._elapsed * 1000:.1f}ms: {key}')
+
+    def _begin(self, sql, parameters):
+        key = normalize_sql(sql)
+        self._statement = key
+        self._sql = sql
+        self._parameters = parameters
+        self._elapsed = 0.0
+        self._logged = False
+        connection = self.connection
+        hit = connection.note_statement(sql) if isinstance(connection, TimedConnection) else False
+        with _lock:
+            stats = statement_stats.get(key)
+            if stats is None:
+                stats = statement_stats[key] = {'count': 0, 'total': 0.0, 'max': 0.0, 'rows': 0, 'cache_hits': 0}
+            stats['count'] += 1
+            if hit:
+                stats['cache_hits'] += 1
+                statement_cache['hits'] += 1
+            else:
+                statement_cache['misses'] += 1
+
+    def execute(self, sql, parameters=()):
+        self._begin(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._record(time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._begin(sql, None)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._record(time.perf_counter() - start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._record(time.perf_counter() - start, 1 if row is not None else 0)
+        return row
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._record(time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(size if size is not None else self.arraysize)
+        self._record(time.perf_counter() - start, len(rows))
+        return rows
+
+
+# 返回TimedCursor的连接，用作 sqlite3.connect(factory=...)
+class TimedConnection(sqlite3.Connection):
+    statement_cache_size = DEFAULT_CACHED_STATEMENTS
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.seen_statements = OrderedDict()
+
+    # 记录执行过的SQL，返回是否命中该连接的语句缓存
+    def note_statement(self, sql):
+        seen = self.seen_statements
+        if sql in seen:
+            seen.move_to_end(sql)
+            return True
+        seen[sql] = True
+        if len(seen) > self.statement_cache_size:
+            seen.popitem(last=False)
+        return False
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# 按总耗时排序的语句统计
+def get_top_statements(limit=50, order_by='total'):
+    with _lock:
+        items = [dict(stats, sql=sql) for sql, stats in statement_stats.items()]
+    for item in items:
+        item['avg_ms'] = round(item['total'] / item['count'] * 1000, 3) if item['count'] else 0.0
+        item['total_ms'] = round(item['total'] * 1000, 3)
+        item['max_ms'] = round(item['max'] * 1000, 3)
+        item['plan'] = query_plans.get(item['sql'], [])
+        del item['total'], item['max']
+    key = {'total': 'total_ms', 'avg': 'avg_ms', 'max': 'max_ms', 'count': 'count'}.get(order_by, 'total_ms')
+    items.sort(key=lambda item: item[key], reverse=True)
+    return items[:limit]
+
+
+def get_statement_cache_stats():
+    with _lock:
+        hits, misses = statement_cache['hits'], statement_cache['misses']
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': round(hits / total, 4) if total else 0.0, 'estimated': True}
+
+
+# 生成 /debug/sql-stats 页面
+def render_stats_page(limit=50, order_by='total', pool=None):
+    rows = []
+    for item in get_top_statements(limit, order_by):
+        plan = '<br>'.join(html.escape(line) for line in item['plan'])
+        rows.append(
+            f"<tr><td>{item['count']}</td><td>{item['total_ms']}</td><td>{item['avg_ms']}</td>"
+            f"<td>{item['max_ms']}</td><td>{item['rows']}</td><td>{item['cache_hits']}</td>"
+            f"<td><code>{html.escape(item['sql'])}</code></td><td>{plan}</td></tr>"
+        )
+    slow_rows = []
+    for entry in reversed(list(slow_queries)):
+        plan = '<br>'.join(html.escape(line) for line in entry['plan'])
+        slow_rows.append(
+            f"<tr><td>{entry['time']}</td><td>{entry['elapsed_ms']}</td>"
+            f"<td><code>{html.escape(entry['sql'])}</code></td><td>{plan}</td></tr>"
+        )
+    cache = get_statement_cache_stats()
+    summary = (f"语句缓存（估算，按每个连接的LRU模拟）：命中 {cache['hits']} 次，未命中 {cache['misses']} 次，"
+               f"命中率 {cache['hit_rate']:.1%}")
+    if pool:
+        summary += (f"；连接池：空闲 {pool['idle']}/{pool['size']}，新建 {pool['created']}，复用 {pool['reused']}，"
+                    f"每连接缓存 {pool['cached_statements']} 条语句")
+    return f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="UTF-8">
+<title>SQL统计</title>
+<style>
+body {{ font-family: sans-serif; margin: 20px; }}
+table {{ border-collapse: collapse; width: 100%; margin-bottom: 30px; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; text-align: left; vertical-align: top; font-size: 13px; }}
+th {{ background: #e8f0fe; }}
+</style>
+</head>
+<body>
+<h2>SQL语句统计（按 {html.escape(order_by)} 排序，前 {limit} 条）</h2>
+<p>{summary}</p>
+<table>
+<tr><th>次数</th><th>总耗时(ms)</th><th>平均(ms)</th><th>最大(ms)</th><th>行数</th><th>缓存命中(估算)</th><th>语句</th><th>查询计划</th></tr>
+{''.join(rows)}
+</table>
+<h2>慢查询（阈值 {SLOW_QUERY_MS}ms）</h2>
+<table>
+<tr><th>时间</th><th>耗时(ms)</th><th>语句</th><th>查询计划</th></tr>
+{''.join(slow_rows)}
+</table>
+</body>
+</html>
+"""
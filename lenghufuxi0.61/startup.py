@@ -0,0 +1,120 @@
+import hashlib
+import inspect
+import threading
+import time
+
+# 冷启动：记录启动各阶段的耗时（从导入server.py到第一个请求），
+# 并用表结构指纹判断建表语句是否需要重新执行
+
+# 保存表结构指纹的表
+SCHEMA_META_TABLE = 'schema_meta'
+
+
+class StartupTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.phases = []  # [(阶段, 秒)]，按完成顺序
+        self.background = {}  # {后台阶段: 秒}
+        self.first_request = None  # 导入到第一个请求的秒数
+        self.schema_skipped = None
+        self.lock = threading.Lock()
+
+    # 结束一个阶段：记录从上一个阶段结束到现在的时间
+    def mark(self, name):
+        now = time.perf_counter()
+        with self.lock:
+            self.phases.append((name, now - self.last))
+            self.last = now
+
+    # 在后台线程中运行的阶段单独计时，不计入启动时间
+    def run_background(self, name, func, *args):
+        def run():
+            started = time.perf_counter()
+            try:
+                func(*args)
+            except Exception as e:
+                print(f'后台加载失败 {name}: {e}')
+            with self.lock:
+                self.background[name] = time.perf_counter() - started
+
+        thread = threading.Thread(target=run, name=f'startup-{name}', daemon=True)
+        thread.start()
+        return thread
+
+    def mark_first_request(self):
+        with self.lock:
+            if self.first_request is not None:
+                return
+            self.first_request = time.perf_counter() - self.started
+        print(f'导入到第一个请求: {self.first_request * 1000:.1f}ms')
+
+    @property
+    def ready_seconds(self):
+        return self.last - self.started
+
+    def report(self):
+        with self.lock:
+            return {
+                'phases': [{'name': name, 'ms': round(seconds * 1000, 3)} for name, seconds in self.phases],
+                'ready_ms': round(self.ready_seconds * 1000, 3),
+                'background': {name: round(seconds * 1000, 3) for name, seconds in self.background.items()},
+                'first_request_ms': round(self.first_request * 1000, 3) if self.first_request is not None else None,
+                'schema_skipped': self.schema_skipped
+            }
+
+    def log(self):
+        phases = '，'.join(f'{name} {seconds * 1000:.1f}ms' for name, seconds in self.phases)
+        print(f'启动完成 {self.ready_seconds * 1000:.1f}ms: {phases}')
+
+    # 供/metrics输出的指标
+    def collect_metrics(self):
+        report = self.report()
+        lines = [
+            '# HELP lenghu_startup_phase_seconds 启动各阶段的耗时',
+            '# TYPE lenghu_startup_phase_seconds gauge'
+        ]
+        for phase in report['phases']:
+            lines.append(f'lenghu_startup_phase_seconds{{phase="{phase["name"]}"}} {phase["ms"] / 1000!r}')
+        for name, ms in report['background'].items():
+            lines.append(f'lenghu_startup_phase_seconds{{phase="{name}",background="true"}} {ms / 1000!r}')
+        if report['first_request_ms'] is not None:
+            lines += [
+                '# HELP lenghu_startup_first_request_seconds 导入server.py到第一个请求的时间',
+                '# TYPE lenghu_startup_first_request_seconds gauge',
+                f'lenghu_startup_first_request_seconds {report["first_request_ms"] / 1000!r}'
+            ]
+        return lines
+
+
+# 表结构指纹：建表语句文本和建表函数（或整个模块）的源码，任何一处修改指纹都会变化
+def schema_fingerprint(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        text = part if isinstance(part, str) else inspect.getsource(part)
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:16]
+
+
+def _schema_version(cursor):
+    cursor.execute('PRAGMA schema_version')
+    return cursor.fetchone()[0]
+
+
+# 数据库中保存的指纹与当前代码一致，并且之后没有其他程序改过表结构（schema_version不变）
+def schema_is_current(cursor, fingerprint):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SCHEMA_META_TABLE,))
+    if cursor.fetchone() is None:
+        return False
+    cursor.execute(f'SELECT key, value FROM {SCHEMA_META_TABLE}')
+    meta = dict(cursor.fetchall())
+    return meta.get('fingerprint') == fingerprint and meta.get('schema_version') == str(_schema_version(cursor))
+
+
+# 建表完成后保存指纹和当时的schema_version
+def record_schema(cursor, fingerprint):
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS {SCHEMA_META_TABLE} (key TEXT PRIMARY KEY, value TEXT)')
+    version = _schema_version(cursor)
+    cursor.executemany(f'INSERT OR REPLACE INTO {SCHEMA_META_TABLE} (key, value) VALUES (?, ?)',
+                       [('fingerprint', fingerprint), ('schema_version', str(version))])
@@ -0,0 +1,319 @@
+# SQL语句登记表：server.py中执行的每条语句都在这里定义为一个常量，
+# 同一条语句在所有请求中使用同一个字符串，可以命中连接上的预编译语句缓存
+
+# 建表和迁移
+ENABLE_WAL = 'PRAGMA journal_mode = WAL'
+
+CREATE_USERS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE,
+        password TEXT,
+        name TEXT UNIQUE,
+        totalScore INTEGER DEFAULT 0
+    )
+'''
+
+CREATE_CHAPTERS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS chapters (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        code TEXT,
+        level INTEGER,
+        parent_id INTEGER,
+        FOREIGN KEY (parent_id) REFERENCES chapters (id) ON DELETE CASCADE
+    )
+'''
+
+ADD_CHAPTERS_CODE_COLUMN = 'ALTER TABLE chapters ADD COLUMN code TEXT'
+
+CREATE_KNOWLEDGE_TABLE = '''
+    CREATE TABLE IF NOT EXISTS knowledge (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        content TEXT,
+        category TEXT,
+        image TEXT,
+        course_code TEXT
+    )
+'''
+
+ADD_KNOWLEDGE_CHAPTER_ID_COLUMN = 'ALTER TABLE knowledge ADD COLUMN chapter_id INTEGER'
+
+ADD_KNOWLEDGE_COURSE_CODE_COLUMN = 'ALTER TABLE knowledge ADD COLUMN course_code TEXT'
+
+CREATE_RANKINGS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS rankings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        score INTEGER,
+        correctCount INTEGER,
+        time INTEGER,
+        date TEXT
+    )
+'''
+
+CREATE_USER_COURSE_PERMISSIONS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS user_course_permissions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        chapter_id INTEGER,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+        FOREIGN KEY (chapter_id) REFERENCES chapters (id) ON DELETE CASCADE,
+        UNIQUE(user_id, chapter_id)
+    )
+'''
+
+CREATE_USER_QUIZ_TIMES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS user_quiz_times (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        chapter_id INTEGER,
+        last_quiz_time TEXT,
+        next_available_time TEXT,
+        interval_days INTEGER DEFAULT 0,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+        FOREIGN KEY (chapter_id) REFERENCES chapters (id) ON DELETE CASCADE,
+        UNIQUE(user_id, chapter_id)
+    )
+'''
+
+CREATE_PK_CHALLENGES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS pk_challenges (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        challenger_id INTEGER,
+        opponent_id INTEGER,
+        status TEXT DEFAULT 'pending',
+        challenger_score INTEGER DEFAULT 0,
+        opponent_score INTEGER DEFAULT 0,
+        current_question INTEGER DEFAULT 0,
+        total_questions INTEGER DEFAULT 10,
+        created_at TEXT,
+        completed_at TEXT,
+        FOREIGN KEY (challenger_id) REFERENCES users (id) ON DELETE CASCADE,
+        FOREIGN KEY (opponent_id) REFERENCES users (id) ON DELETE CASCADE
+    )
+'''
+
+ADD_PK_QUESTION_SEED_COLUMN = 'ALTER TABLE pk_challenges ADD COLUMN question_seed INTEGER'
+
+CREATE_BOSS_CHALLENGES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS boss_challenges (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        creator_id INTEGER,
+        boss_name TEXT,
+        boss_hp INTEGER,
+        boss_max_hp INTEGER,
+        status TEXT DEFAULT 'active',
+        created_at TEXT,
+        completed_at TEXT,
+        FOREIGN KEY (creator_id) REFERENCES users (id) ON DELETE CASCADE
+    )
+'''
+
+CREATE_BOSS_PARTICIPANTS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS boss_participants (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        boss_id INTEGER,
+        user_id INTEGER,
+        correct_count INTEGER DEFAULT 0,
+        received_reward INTEGER DEFAULT 0,
+        FOREIGN KEY (boss_id) REFERENCES boss_challenges (id) ON DELETE CASCADE,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+        UNIQUE(boss_id, user_id)
+    )
+'''
+
+CREATE_SCIENCE_ENCYCLOPEDIA_TABLE = '''
+    CREATE TABLE IF NOT EXISTS science_encyclopedia (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        content TEXT,
+        category TEXT,
+        difficulty TEXT DEFAULT 'easy',
+        created_at TEXT
+    )
+'''
+
+# 用户
+SELECT_USER_BY_CREDENTIALS = 'SELECT * FROM users WHERE username = ? AND password = ?'
+
+SELECT_USER_BY_USERNAME = 'SELECT * FROM users WHERE username = ?'
+
+SELECT_USER_BY_NAME = 'SELECT * FROM users WHERE name = ?'
+
+SELECT_USER_BY_ID = 'SELECT * FROM users WHERE id = ?'
+
+SELECT_ONLINE_USER = 'SELECT id, name, totalScore FROM users WHERE id = ?'
+
+SELECT_ALL_USERS = 'SELECT id, username, name, totalScore FROM users'
+
+SELECT_USER_SCORE = 'SELECT totalScore FROM users WHERE id = ?'
+
+INSERT_USER = 'INSERT INTO users (username, password, name, totalScore) VALUES (?, ?, ?, ?)'
+
+UPDATE_USER_SCORE = 'UPDATE users SET totalScore = ? WHERE id = ?'
+
+ADD_WINNER_SCORE = 'UPDATE users SET totalScore = totalScore + 3 WHERE id = ?'
+
+DEDUCT_LOSER_SCORE = 'UPDATE users SET totalScore = CASE WHEN totalScore > 1 THEN totalScore - 1 ELSE 0 END WHERE id = ?'
+
+REWARD_BOSS_PARTICIPANTS = '''
+    UPDATE users
+    SET totalScore = totalScore + 3
+    WHERE id IN (SELECT user_id FROM boss_participants WHERE boss_id = ?)
+'''
+
+# 章节
+COUNT_COURSES = 'SELECT COUNT(*) FROM chapters WHERE level = 1'
+
+SELECT_COURSE_ID_BY_NAME = 'SELECT id FROM chapters WHERE name = ? AND level = 1'
+
+COUNT_CHILD_CHAPTERS = 'SELECT COUNT(*) FROM chapters WHERE parent_id = ?'
+
+SELECT_ALL_CHAPTERS = 'SELECT * FROM chapters ORDER BY level, id'
+
+SELECT_CHAPTER_BY_ID = 'SELECT * FROM chapters WHERE id = ?'
+
+SELECT_CHILD_CHAPTER_IDS = 'SELECT id FROM chapters WHERE parent_id = ?'
+
+SELECT_USER_AVAILABLE_CHAPTERS = '''
+    SELECT DISTINCT c.*
+    FROM chapters c
+    LEFT JOIN user_course_permissions ucp ON c.id = ucp.chapter_id
+    WHERE ucp.user_id = ? OR c.id IN (
+        SELECT parent_id FROM user_course_permissions WHERE user_id = ?
+    ) OR c.id IN (
+        SELECT parent_id FROM chapters WHERE id IN (
+            SELECT chapter_id FROM user_course_permissions WHERE user_id = ?
+        )
+    )
+    ORDER BY c.level, c.id
+'''
+
+INSERT_CHAPTER = 'INSERT INTO chapters (name, code, level, parent_id) VALUES (?, ?, ?, ?)'
+
+UPDATE_CHAPTER = '''
+    UPDATE chapters
+    SET name = ?, code = ?, level = ?, parent_id = ?
+    WHERE id = ?
+'''
+
+DELETE_CHAPTER = 'DELETE FROM chapters WHERE id = ?'
+
+# 课程权限
+SELECT_USER_PERMISSIONS = '''
+    SELECT chapter_id FROM user_course_permissions
+    WHERE user_id = ?
+'''
+
+INSERT_USER_PERMISSION = '''
+    INSERT INTO user_course_permissions (user_id, chapter_id)
+    VALUES (?, ?)
+'''
+
+DELETE_USER_PERMISSIONS = 'DELETE FROM user_course_permissions WHERE user_id = ?'
+
+# 排行榜
+INSERT_RANKING = '''
+    INSERT INTO rankings (name, score, correctCount, time, date)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+# 科学百科
+INSERT_SCIENCE_ITEM = '''
+    INSERT INTO science_encyclopedia (title, content, category, difficulty, created_at)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+# PK挑战
+INSERT_PK_CHALLENGE = '''
+    INSERT INTO pk_challenges (challenger_id, opponent_id, status, created_at, question_seed)
+    VALUES (?, ?, 'pending', ?, ?)
+'''
+
+SELECT_PK_CHALLENGE = 'SELECT * FROM pk_challenges WHERE id = ?'
+
+START_PK_CHALLENGE = '''
+    UPDATE pk_challenges
+    SET status = 'active', question_seed = ?, total_questions = ?, current_question = 0
+    WHERE id = ? AND status = 'pending'
+'''
+
+UPDATE_PK_PROGRESS = '''
+    UPDATE pk_challenges
+    SET challenger_score = ?, opponent_score = ?, current_question = ?
+    WHERE id = ? AND status = 'active'
+'''
+
+COMPLETE_PK_CHALLENGE = '''
+    UPDATE pk_challenges
+    SET status = 'completed', completed_at = ?
+    WHERE id = ?
+'''
+
+# BOSS挑战
+INSERT_BOSS_CHALLENGE = '''
+    INSERT INTO boss_challenges (creator_id, boss_name, boss_hp, boss_max_hp, status, created_at)
+    VALUES (?, ?, ?, ?, 'active', ?)
+'''
+
+SELECT_ACTIVE_BOSS_CHALLENGES = '''
+    SELECT bc.*, u.name as creator_name
+    FROM boss_challenges bc
+    LEFT JOIN users u ON bc.creator_id = u.id
+    WHERE bc.status = 'active'
+    ORDER BY bc.created_at DESC
+'''
+
+SELECT_BOSS_CHALLENGE = 'SELECT * FROM boss_challenges WHERE id = ?'
+
+UPDATE_BOSS_HP = 'UPDATE boss_challenges SET boss_hp = ? WHERE id = ?'
+
+COMPLETE_BOSS_CHALLENGE = '''
+    UPDATE boss_challenges
+    SET status = 'completed', completed_at = ?
+    WHERE id = ?
+'''
+
+DELETE_BOSS_CHALLENGE = 'DELETE FROM boss_challenges WHERE id = ?'
+
+SELECT_BOSS_PARTICIPANT = '''
+    SELECT * FROM boss_participants
+    WHERE boss_id = ? AND user_id = ?
+'''
+
+INSERT_BOSS_PARTICIPANT = '''
+    INSERT INTO boss_participants (boss_id, user_id)
+    VALUES (?, ?)
+'''
+
+INCREMENT_BOSS_CORRECT_COUNT = '''
+    UPDATE boss_participants
+    SET correct_count = correct_count + 1
+    WHERE boss_id = ? AND user_id = ?
+'''
+
+MARK_BOSS_REWARDS = '''
+    UPDATE boss_participants
+    SET received_reward = 1
+    WHERE boss_id = ?
+'''
+
+DELETE_BOSS_PARTICIPANTS = 'DELETE FROM boss_participants WHERE boss_id = ?'
+
+
+# 所有已登记的语句 {名称: SQL}
+REGISTRY = {name: value for name, value in list(globals().items()) if name.isupper() and isinstance(value, str)}
+
+# 辅助模块自己执行的语句不在上面的登记表中，定义在各模块顶部并由各模块的STATEMENTS列出：
+# {模块.名称: SQL}，供登记表测试编译和诊断工具检查查询计划
+HELPER_MODULES = ('knowledge_shards', 'mastery', 'scheduler', 'rankings_archive', 'science_sampler', 'search_index',
+                  'submissions', 'maintenance')
+
+
+def helper_statements():
+    import importlib
+    return {f'{module_name}.{name}': statement
+            for module_name in HELPER_MODULES
+            for name, statement in importlib.import_module(module_name).STATEMENTS.items()}
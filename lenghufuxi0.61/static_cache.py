@@ -0,0 +1,225 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+from flask import Response
+from werkzeug.http import http_date
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 静态文件内存缓存：启动后把前端页面、资源和音效读入内存，并预先生成gzip/brotli压缩版本；
+# 后台线程定期检查文件修改时间，有变化才重新读取。请求处理时只查内存，不访问磁盘
+
+# 检查文件修改的间隔（秒）
+CHECK_INTERVAL = 2.0
+
+# 请求到达时文件还没加载完，最多等待的时间（秒）
+LOAD_TIMEOUT = 10.0
+
+# 需要压缩的类型和最小大小
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+MIN_COMPRESS_SIZE = 512
+
+# 内容编码的优先顺序
+ENCODINGS = ('br', 'gzip')
+
+mimetypes.add_type('text/javascript', '.js')
+
+
+class StaticFile:
+    def __init__(self, path, data, mtime):
+        self.path = path
+        self.data = data
+        self.mtime = mtime
+        self.last_modified = http_date(int(mtime))
+        self.etag = hashlib.sha1(data).hexdigest()[:16]
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if mimetype.startswith('text/') or mimetype == 'application/javascript':
+            mimetype += '; charset=utf-8'
+        self.mimetype = mimetype
+        self.variants = {}  # {编码: 压缩后的内容}，只保留比原文件小的
+        if len(data) >= MIN_COMPRESS_SIZE and mimetype.startswith(COMPRESSIBLE_TYPES):
+            compressed = {'gzip': gzip.compress(data, 9, mtime=0)}
+            if brotli is not None:
+                compressed['br'] = brotli.compress(data)
+            self.variants = {name: value for name, value in compressed.items() if len(value) < len(data)}
+
+    @property
+    def size(self):
+        return len(self.data) + sum(len(value) for value in self.variants.values())
+
+
+class StaticCache:
+    def __init__(self, check_interval=CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self.directories = []  # [(目录, 扩展名)]
+        self.files = {}  # {绝对路径: StaticFile}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopping = threading.Event()
+        self.loaded = threading.Event()
+        self.responses = {}  # {状态码: 次数}
+        self.bytes_sent = 0
+        self.reloads = 0
+
+    # 缓存目录中指定扩展名的文件（不含子目录）；目录不存在时等它出现后再加载。
+    # 已经加载过时立即读取，否则在load()时统一读取
+    def add_directory(self, directory, extensions=None):
+        directory = os.path.abspath(directory)
+        self.directories.append((directory, tuple(extensions) if extensions else None))
+        if self.loaded.is_set():
+            self._scan(directory, self.directories[-1][1])
+
+    def _scan(self, directory, extensions):
+        seen = set()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            entries = []
+        for entry in entries:
+            if not entry.is_file() or (extensions and not entry.name.endswith(extensions)):
+                continue
+            path = os.path.abspath(entry.path)
+            seen.add(path)
+            mtime = entry.stat().st_mtime
+            cached = self.files.get(path)
+            if cached is not None and cached.mtime == mtime:
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                continue
+            with self.lock:
+                self.files[path] = StaticFile(path, data, mtime)
+                if cached is not None:
+                    self.reloads += 1
+        # 删除已不存在的文件
+        with self.lock:
+            for path in [path for path in self.files if os.path.dirname(path) == directory and path not in seen]:
+                del self.files[path]
+
+    def refresh(self):
+        for directory, extensions in self.directories:
+            self._scan(directory, extensions)
+
+    # 第一次读取所有文件（可以在后台线程中执行，请求会等待加载完成）
+    def load(self):
+        try:
+            self.refresh()
+        finally:
+            self.loaded.set()
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._watch, name='static-files', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+
+    def _watch(self):
+        while not self.stopping.wait(self.check_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f'静态文件刷新失败: {e}')
+
+    def get(self, path):
+        if not self.loaded.is_set() and not self.loaded.wait(LOAD_TIMEOUT):
+            self.load()
+        return self.files.get(os.path.normpath(os.path.abspath(path)))
+
+    def _count(self, status, size):
+        with self.lock:
+            self.responses[status] = self.responses.get(status, 0) + 1
+            self.bytes_sent += size
+
+    # 按请求头生成响应：协商压缩编码、条件请求返回304、Range请求返回206
+    def respond(self, entry, request, cache_control):
+        headers = {
+            'Cache-Control': cache_control,
+            'Last-Modified': entry.last_modified,
+            'Accept-Ranges': 'bytes'
+        }
+        if entry.variants:
+            headers['Vary'] = 'Accept-Encoding'
+
+        # Range请求只对未压缩的内容处理（音频拖动进度、断点续传）
+        byte_range = request.range
+        if byte_range is not None and request.if_range.etag not in (None, entry.etag):
+            byte_range = None  # If-Range不匹配时返回完整内容
+        if byte_range is not None and request.if_range.date is not None \
+                and request.if_range.date.timestamp() < int(entry.mtime):
+            byte_range = None
+        encoding = None
+        if byte_range is None:
+            encoding = next((name for name in ENCODINGS
+                             if name in entry.variants and name in request.accept_encodings), None)
+        etag = f'{entry.etag}-{encoding}' if encoding else entry.etag
+        headers['ETag'] = f'"{etag}"'
+
+        # 条件请求：客户端的缓存仍然有效
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains_weak(etag) or request.if_none_match.contains_weak(entry.etag)
+        else:
+            since = request.if_modified_since
+            not_modified = since is not None and int(entry.mtime) <= since.timestamp()
+        if not_modified:
+            self._count(304, 0)
+            return Response(status=304, headers=headers)
+
+        if byte_range is not None:
+            length = len(entry.data)
+            bounds = byte_range.range_for_length(length)
+            if bounds is None:
+                headers['Content-Range'] = f'bytes */{length}'
+                self._count(416, 0)
+                return Response(status=416, headers=headers)
+            start, stop = bounds
+            headers['Content-Range'] = f'bytes {start}-{stop - 1}/{length}'
+            self._count(206, stop - start)
+            return Response(entry.data[start:stop], status=206, headers=headers, content_type=entry.mimetype)
+
+        data = entry.variants[encoding] if encoding else entry.data
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        self._count(200, len(data))
+        return Response(data, status=200, headers=headers, content_type=entry.mimetype)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'files': len(self.files),
+                'bytes': sum(entry.size for entry in self.files.values()),
+                'reloads': self.reloads,
+                'responses': dict(self.responses),
+                'bytes_sent': self.bytes_sent,
+                'brotli': brotli is not None
+            }
+
+    # 供/metrics输出的指标
+    def collect_metrics(self):
+        stats = self.stats()
+        lines = [
+            '# HELP lenghu_static_cache_bytes 内存中缓存的静态文件大小（含压缩版本）',
+            '# TYPE lenghu_static_cache_bytes gauge',
+            f'lenghu_static_cache_bytes {stats["bytes"]}',
+            '# HELP lenghu_static_responses_total 静态文件响应数',
+            '# TYPE lenghu_static_responses_total counter'
+        ]
+        for status, count in sorted(stats['responses'].items()):
+            lines.append(f'lenghu_static_responses_total{{status="{status}"}} {count}')
+        lines += [
+            '# HELP lenghu_static_sent_bytes_total 静态文件发送的字节数',
+            '# TYPE lenghu_static_sent_bytes_total counter',
+            f'lenghu_static_sent_bytes_total {stats["bytes_sent"]}'
+        ]
+        return lines
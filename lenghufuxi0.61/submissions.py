@@ -0,0 +1,122 @@
+import hashlib
+import json
+import time
+
+# 答题记录的幂等提交：每条记录带客户端生成的键，处理过的键保存当时的结果，
+# 同一条记录重复提交（断网重试、超时重发）时直接返回保存的结果，不会重复计分。
+# 去重表只存键的64位哈希（整数主键即rowid，不另建索引），超过保留期的键由后台任务删除
+
+# 一次批量提交最多包含的记录数
+MAX_SUBMISSIONS = 100
+
+# 幂等键的最大长度
+MAX_KEY_LENGTH = 64
+
+# 键的保留时间（秒）：离线设备可能几天后才补交
+KEY_TTL = 7 * 24 * 3600
+
+# 每批删除的过期键数
+PURGE_BATCH_SIZE = 1000
+
+SELECT_SUBMISSION_RESULT = 'SELECT status_code, result FROM submission_dedupe WHERE key_hash = ? AND created_at >= ?'
+
+SAVE_SUBMISSION_RESULT = '''
+    INSERT OR REPLACE INTO submission_dedupe (key_hash, status_code, result, created_at)
+    VALUES (?, ?, ?, ?)
+'''
+
+PURGE_SUBMISSION_KEYS = '''
+    DELETE FROM submission_dedupe WHERE key_hash IN (
+        SELECT key_hash FROM submission_dedupe WHERE created_at < ? LIMIT ?
+    )
+'''
+
+# 供登记表测试编译、诊断工具检查查询计划
+STATEMENTS = {
+    'SELECT_SUBMISSION_RESULT': SELECT_SUBMISSION_RESULT,
+    'SAVE_SUBMISSION_RESULT': SAVE_SUBMISSION_RESULT,
+    'PURGE_SUBMISSION_KEYS': PURGE_SUBMISSION_KEYS
+}
+
+
+def init_submission_keys(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS submission_dedupe (
+            key_hash INTEGER PRIMARY KEY,
+            status_code INTEGER,
+            result TEXT,
+            created_at INTEGER
+        )
+    ''')
+
+
+# 键的64位哈希（有符号，放得进SQLite的INTEGER主键）
+def key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+
+def valid_key(key):
+    return isinstance(key, str) and 0 < len(key) <= MAX_KEY_LENGTH
+
+
+# 未过期的键返回 (结果, HTTP状态码)，否则返回None
+def find_result(cursor, key, now=None, ttl=KEY_TTL):
+    now = int(now if now is not None else time.time())
+    cursor.execute(SELECT_SUBMISSION_RESULT, (key_hash(key), now - ttl))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return json.loads(row[1]), row[0]
+
+
+def save_result(cursor, key, result, status_code, now=None):
+    cursor.execute(SAVE_SUBMISSION_RESULT, (key_hash(key), status_code, json.dumps(result, ensure_ascii=False, separators=(',', ':')),
+          int(now if now is not None else time.time())))
+
+
+# 按幂等键执行 handler(conn, data)：处理过的键直接返回上次的结果（带duplicate标记）
+def apply_once(conn, key, handler, data, now=None):
+    cursor = conn.cursor()
+    saved = find_result(cursor, key, now)
+    if saved is not None:
+        result, status_code = saved
+        return dict(result, duplicate=True), status_code
+    result, status_code = handler(conn, data)
+    save_result(cursor, key, result, status_code, now)
+    return result, status_code
+
+
+# 在一个事务中处理一批记录，items: [(键, 处理函数, 数据)]，返回每条记录的 (结果, HTTP状态码)。
+# 每条记录一个保存点，出错的记录只回滚它自己，其余记录一起提交
+def apply_batch(conn, items, now=None):
+    results = []
+    for key, handler, data in items:
+        if handler is None:
+            results.append(({'status': 'error', 'message': '记录格式不正确'}, 400))
+            continue
+        conn.execute('SAVEPOINT submission')
+        try:
+            results.append(apply_once(conn, key, handler, data, now))
+        except Exception as e:
+            conn.execute('ROLLBACK TO submission')
+            results.append(({'status': 'error', 'message': str(e)}, 500))
+        conn.execute('RELEASE submission')
+    return results
+
+
+# 删除一批（最多batch_size个）早于cutoff的键，不提交，返回删除的个数
+def purge_batch(conn, cutoff, batch_size=PURGE_BATCH_SIZE):
+    cursor = conn.execute(PURGE_SUBMISSION_KEYS, (cutoff, batch_size))
+    return cursor.rowcount
+
+
+# 删除超过保留期的键，每批一个事务
+def purge_submission_keys(conn, now=None, ttl=KEY_TTL, batch_size=PURGE_BATCH_SIZE):
+    cutoff = int(now if now is not None else time.time()) - ttl
+    deleted = 0
+    while True:
+        count = purge_batch(conn, cutoff, batch_size)
+        conn.commit()
+        deleted += count
+        if count < batch_size:
+            return {'deleted': deleted}
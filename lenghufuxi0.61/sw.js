@@ -0,0 +1,92 @@
+// 离线缓存：安装时预缓存页面外壳和音效；带哈希的资源先查缓存，页面和公共接口先走网络、断网时用缓存。
+// 构建（python build_assets.py）时会换成dist/中带哈希的资源列表和对应的缓存版本
+const CACHE_VERSION = 'dev';
+const PRECACHE_URLS = [
+    '/',
+    '/quiz-system.html',
+    '/quiz-style.css',
+    '/vendor/socket.io.min.js',
+    '/shengyin/correct.mp3',
+    '/shengyin/wrong.mp3',
+    '/shengyin/next.mp3',
+    '/shengyin/submit.mp3',
+    '/shengyin/button.mp3'
+];
+
+const SHELL_CACHE = `lenghu-shell-${CACHE_VERSION}`;
+const RUNTIME_CACHE = `lenghu-runtime-${CACHE_VERSION}`;
+
+// 断网时可以用缓存的接口：只有所有用户看到的内容都一样的接口。
+// 教室里的设备多人共用，带用户信息的接口不缓存，以免断网时把上一个学生的数据给下一个学生
+const RUNTIME_API_PATHS = ['/api/chapters', '/api/knowledge', '/api/science-encyclopedia', '/api/rankings'];
+
+// 接口缓存最多保存的响应数，超出后删除最早的
+const MAX_RUNTIME_ENTRIES = 60;
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(SHELL_CACHE)
+            .then(cache => cache.addAll(PRECACHE_URLS))
+            .then(() => self.skipWaiting())
+    );
+});
+
+// 删除旧版本的外壳缓存和接口缓存（包括旧版本不分版本的 lenghu-runtime）
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(names => Promise.all(names
+                .filter(name => name.startsWith('lenghu-') && name !== SHELL_CACHE && name !== RUNTIME_CACHE)
+                .map(name => caches.delete(name))))
+            .then(() => self.clients.claim())
+    );
+});
+
+// 缓存超过上限时删除最早放入的条目
+function trimCache(cache, maxEntries) {
+    return cache.keys().then(keys => Promise.all(
+        keys.slice(0, Math.max(0, keys.length - maxEntries)).map(key => cache.delete(key))));
+}
+
+// 先走网络，成功时更新缓存；断网时返回缓存中的版本。maxEntries限制缓存的条目数
+function networkFirst(request, cacheName, maxEntries) {
+    return fetch(request)
+        .then(response => {
+            if (response.ok) {
+                const copy = response.clone();
+                caches.open(cacheName)
+                    .then(cache => cache.put(request, copy).then(() => maxEntries && trimCache(cache, maxEntries)));
+            }
+            return response;
+        })
+        .catch(error => caches.match(request).then(cached => {
+            if (cached) {
+                return cached;
+            }
+            throw error;
+        }));
+}
+
+// 带哈希的资源内容不会变，缓存中有就直接使用
+function cacheFirst(request, cacheName) {
+    return caches.match(request).then(cached => cached || networkFirst(request, cacheName));
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    // 只处理同源的GET请求；Range请求（音频拖动）直接交给浏览器
+    if (request.method !== 'GET' || url.origin !== self.location.origin || request.headers.has('range')) {
+        return;
+    }
+    if (url.pathname.startsWith('/api/')) {
+        // 其他接口和带用户ID的查询不经过缓存
+        if (RUNTIME_API_PATHS.includes(url.pathname) && !url.searchParams.has('user_id')) {
+            event.respondWith(networkFirst(request, RUNTIME_CACHE, MAX_RUNTIME_ENTRIES));
+        }
+    } else if (url.pathname.startsWith('/assets/')) {
+        event.respondWith(cacheFirst(request, SHELL_CACHE));
+    } else if (request.mode === 'navigate' || PRECACHE_URLS.includes(url.pathname)) {
+        event.respondWith(networkFirst(request, SHELL_CACHE));
+    }
+});
@@ -0,0 +1,84 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from db_pool import ConnectionPool, PooledConnection
+
+# 连接池：连接复用、空闲连接数上限、归还时回滚未提交的修改、只读连接
+
+
+class _Database:
+    def __enter__(self):
+        self.workdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.workdir, 'pool.db')
+        conn = sqlite3.connect(self.path)
+        conn.execute('CREATE TABLE items (name TEXT)')
+        conn.execute("INSERT INTO items (name) VALUES ('a')")
+        conn.commit()
+        conn.close()
+        self.pools = []
+        return self
+
+    def __exit__(self, *exc_info):
+        for pool in self.pools:
+            pool.close_all()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def pool(self, **kwargs):
+        pool = ConnectionPool(self.path, **kwargs)
+        self.pools.append(pool)
+        return pool
+
+
+def test_connections_are_reused_up_to_size():
+    with _Database() as db:
+        pool = db.pool(size=2)
+        first = pool.acquire()
+        assert isinstance(first, PooledConnection) and first.execute('SELECT name FROM items').fetchone()['name'] == 'a'
+        first.close()
+        assert pool.acquire() is first
+
+        connections = [first] + [pool.acquire() for _ in range(2)]
+        for conn in connections:
+            conn.close()
+        conn.close()  # 重复归还不会在池中出现两次
+        stats = pool.stats()
+        assert (stats['created'], stats['reused'], stats['idle']) == (3, 1, 2)
+
+        pool.close_all()
+        assert pool.stats()['idle'] == 0
+        try:
+            connections[0].execute('SELECT 1')
+        except sqlite3.ProgrammingError:
+            pass
+        else:
+            raise AssertionError('close_all后连接应当已关闭')
+
+
+def test_release_rolls_back_uncommitted_changes():
+    with _Database() as db:
+        pool = db.pool(size=1)
+        conn = pool.acquire()
+        conn.execute("INSERT INTO items (name) VALUES ('uncommitted')")
+        conn.close()
+
+        conn = pool.acquire()
+        assert not conn.in_transaction
+        assert [row['name'] for row in conn.execute('SELECT name FROM items')] == ['a']
+        conn.close()
+
+
+def test_readonly_pool_rejects_writes():
+    with _Database() as db:
+        pool = db.pool(readonly=True, cached_statements=8)
+        conn = pool.acquire()
+        assert conn.statement_cache_size == 8
+        try:
+            conn.execute("INSERT INTO items (name) VALUES ('b')")
+        except sqlite3.OperationalError as e:
+            assert 'readonly' in str(e)
+        else:
+            raise AssertionError('只读连接不能写入')
+        conn.close()
+        assert pool.stats()['readonly'] and pool.stats()['idle'] == 1
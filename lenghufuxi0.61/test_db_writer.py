@@ -0,0 +1,161 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+import db_writer
+from db_writer import DatabaseWriter, WriteQueueFull, WriteTimeout
+
+# 单一写线程：排队的写操作合并到一个事务，每个操作一个保存点；单独执行的任务、写线程内的重入调用、
+# 队列已满和调用方超时取消
+
+
+class _Writer:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+    def __enter__(self):
+        self.workdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.workdir, 'writer.db')
+        conn = sqlite3.connect(self.path)
+        conn.execute('CREATE TABLE items (name TEXT UNIQUE)')
+        conn.commit()
+        conn.close()
+        self.writer = DatabaseWriter(self.path, **self.kwargs)
+        self.writer.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.writer.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def names(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            return sorted(row[0] for row in conn.execute('SELECT name FROM items'))
+        finally:
+            conn.close()
+
+    # 让写线程停在一个单独执行的任务上，返回放行用的Event；之后提交的任务会合并成一批
+    def hold(self):
+        gate = threading.Event()
+        started = threading.Event()
+
+        def wait(conn):
+            started.set()
+            gate.wait(5)
+
+        self.writer.submit(wait, exclusive=True)
+        started.wait(5)
+        return gate
+
+
+def _insert(conn, name):
+    conn.execute('INSERT INTO items (name) VALUES (?)', (name,))
+    return name
+
+
+def _insert_then_fail(conn, name):
+    conn.execute('INSERT INTO items (name) VALUES (?)', (name,))
+    raise ValueError('写操作出错')
+
+
+def test_failed_task_keeps_batch_mates():
+    with _Writer() as db:
+        gate = db.hold()
+        futures = [db.writer.submit(_insert, 'a'), db.writer.submit(_insert_then_fail, 'b'),
+                   db.writer.submit(_insert, 'a'), db.writer.submit(_insert, 'c')]
+        gate.set()
+
+        assert futures[0].result(5) == 'a' and futures[3].result(5) == 'c'
+        for future, error in ((futures[1], ValueError), (futures[2], sqlite3.IntegrityError)):
+            try:
+                future.result(5)
+            except error:
+                continue
+            raise AssertionError(f'应当抛出{error.__name__}')
+
+        # 四个操作在一个事务中提交，失败的两个只回滚自己
+        assert db.names() == ['a', 'c']
+        stats = db.writer.stats()
+        assert (stats['batches'], stats['largest_batch'], stats['failures']) == (2, 4, 2)
+
+
+def test_rollback_inside_task_only_undoes_itself():
+    with _Writer() as db:
+        def insert_and_roll_back(conn):
+            conn.execute("INSERT INTO items (name) VALUES ('discarded')")
+            conn.rollback()
+            conn.commit()  # 合并事务期间commit()不生效
+            return 'done'
+
+        gate = db.hold()
+        futures = [db.writer.submit(_insert, 'kept'), db.writer.submit(insert_and_roll_back)]
+        gate.set()
+        assert [future.result(5) for future in futures] == ['kept', 'done']
+        assert db.names() == ['kept']
+
+
+def test_exclusive_task_commits_itself():
+    with _Writer() as db:
+        def import_in_chunks(conn):
+            for chunk in (('x1', 'x2'), ('x3',)):
+                conn.executemany('INSERT INTO items (name) VALUES (?)', [(name,) for name in chunk])
+                conn.commit()
+            return conn.in_transaction
+
+        assert db.writer.call(import_in_chunks, exclusive=True) is False
+        assert db.names() == ['x1', 'x2', 'x3']
+        assert db.writer.execute('INSERT INTO items (name) VALUES (?)', ('x4',)) == 4
+
+
+def test_reentrant_submit_runs_inline():
+    with _Writer() as db:
+        def outer(conn):
+            # 在写线程中再次调用写线程：直接执行，不会自己等待自己
+            inner = db.writer.call(_insert, 'inner', timeout=1)
+            conn.execute("INSERT INTO items (name) VALUES ('outer')")
+            return inner
+
+        assert db.writer.call(outer, timeout=5) == 'inner'
+        assert db.names() == ['inner', 'outer']
+
+
+def test_queue_full_is_rejected():
+    saved = db_writer.QUEUE_WAIT
+    db_writer.QUEUE_WAIT = 0.05
+    try:
+        with _Writer(queue_size=1) as db:
+            gate = db.hold()
+            queued = db.writer.submit(_insert, 'queued')
+            try:
+                db.writer.submit(_insert, 'rejected')
+            except WriteQueueFull:
+                pass
+            else:
+                raise AssertionError('队列已满时应当拒绝')
+            gate.set()
+            assert queued.result(5) == 'queued'
+            assert db.names() == ['queued'] and db.writer.stats()['rejected'] == 1
+    finally:
+        db_writer.QUEUE_WAIT = saved
+
+
+def test_timed_out_write_is_cancelled():
+    with _Writer() as db:
+        gate = db.hold()
+        started = time.perf_counter()
+        try:
+            db.writer.call(_insert, 'late', timeout=0.1)
+        except WriteTimeout:
+            pass
+        else:
+            raise AssertionError('应当超时')
+        assert time.perf_counter() - started < 1
+        gate.set()
+
+        # 取消的写操作不会在之后执行，重试只写入一次
+        assert db.writer.call(_insert, 'late', timeout=5) == 'late'
+        assert db.names() == ['late'] and db.writer.stats()['cancelled'] == 1
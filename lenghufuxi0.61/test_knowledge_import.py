@@ -0,0 +1,97 @@
+import io
+import json
+import sqlite3
+
+import knowledge_import
+from knowledge_import import import_knowledge, iter_records, detect_format
+
+# 知识点批量导入：流式解析JSON数组/NDJSON/CSV，按 (title, chapter_id) 去重，逐条校验
+
+
+def _connect():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE chapters (id INTEGER PRIMARY KEY, name TEXT, code TEXT, level INTEGER, parent_id INTEGER)')
+    conn.execute('''
+        CREATE TABLE knowledge (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT, content TEXT, category TEXT, image TEXT, course_code TEXT, chapter_id INTEGER
+        )
+    ''')
+    conn.executemany('INSERT INTO chapters (id, name, code, level, parent_id) VALUES (?, ?, ?, ?, ?)',
+                     [(1, '科学', '科学', 1, None), (2, '物理知识', 'SC-002', 2, 1), (3, '化学知识', 'SC-003', 2, 1)])
+    conn.commit()
+    return conn
+
+
+def _records(text, fmt):
+    return list(iter_records(io.BytesIO(text.encode('utf-8')), fmt))
+
+
+def test_detect_format():
+    assert detect_format('a.jsonl') == 'ndjson'
+    assert detect_format('a.NDJSON') == 'ndjson'
+    assert detect_format('a.csv') == 'csv'
+    assert detect_format('a.json') == 'json'
+    assert detect_format(None) == 'json'
+
+
+def test_json_array_split_across_reads():
+    items = [{'title': f'标题{i}', 'content': '内容，带逗号和]括号', 'category': '物理'} for i in range(50)]
+    text = json.dumps(items, ensure_ascii=False)
+    original = knowledge_import.READ_SIZE
+    knowledge_import.READ_SIZE = 7  # 每个对象都会被分块截断
+    try:
+        assert _records(text, 'json') == items
+    finally:
+        knowledge_import.READ_SIZE = original
+
+
+def test_json_parser_errors():
+    for text in ('{"title": "a"}', '[{"title": "a"}'):
+        try:
+            _records(text, 'json')
+        except ValueError:
+            continue
+        raise AssertionError(f'没有报错: {text}')
+    assert _records('', 'json') == []
+    assert _records('\ufeff[]', 'json') == []
+
+
+def test_ndjson_and_csv():
+    assert _records('{"title": "a"}\n\n{"title": "b"}\n', 'ndjson') == [{'title': 'a'}, {'title': 'b'}]
+    rows = _records('\ufefftitle,content,category\n声音,"多行\n内容",物理\n', 'csv')
+    assert rows == [{'title': '声音', 'content': '多行\n内容', 'category': '物理'}]
+
+
+def test_import_validates_and_dedupes():
+    conn = _connect()
+    conn.execute("INSERT INTO knowledge (title, content, category, chapter_id) VALUES ('已有', 'x', '物理', 2)")
+    conn.commit()
+    records = [
+        {'title': '已有', 'content': '重复', 'category': '物理', 'chapter_id': 2},
+        {'title': '新的', 'content': '内容', 'category': '物理', 'chapter_id': 2},
+        {'title': '新的', 'content': '同一批重复', 'category': '物理', 'chapter_id': 2},
+        {'title': '新的', 'content': '其他章节不算重复', 'category': '化学', 'course_code': 'SC-003'},
+        {'title': '缺内容', 'category': '物理'},
+        {'title': '坏章节', 'content': '内容', 'category': '物理', 'chapter_id': 99},
+        {'title': '默认章节', 'content': '内容', 'category': '物理'},
+        ['不是对象']
+    ]
+    stream = io.BytesIO(json.dumps(records, ensure_ascii=False).encode('utf-8'))
+    result = import_knowledge(conn, stream, 'json', default_chapter_id=1, batch_size=3)
+
+    assert (result['total'], result['inserted'], result['duplicates'], result['invalid']) == (8, 3, 2, 3)
+    assert [error['row'] for error in result['errors']] == [5, 6, 8]
+    assert result['chapter_ids'] == [1, 2, 3]
+    rows = conn.execute('SELECT title, chapter_id FROM knowledge ORDER BY id').fetchall()
+    assert rows == [('已有', 2), ('新的', 2), ('新的', 3), ('默认章节', 1)]
+
+
+def test_import_custom_writer():
+    conn = _connect()
+    written = []
+    stream = io.BytesIO('{"title": "a", "content": "b", "category": "c", "chapter_id": 2}\n'.encode('utf-8'))
+    result = import_knowledge(conn, stream, 'ndjson', insert_rows=written.extend)
+    assert result['inserted'] == 1
+    assert written == [('a', 'b', 'c', '', None, 2)]
+    assert conn.execute('SELECT COUNT(*) FROM knowledge').fetchone()[0] == 0
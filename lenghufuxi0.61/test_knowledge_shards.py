@@ -0,0 +1,184 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from db_writer import DatabaseWriter
+from knowledge_shards import KnowledgeShards, knowledge_source
+from search_index import init_search_index
+
+# 知识点按课程分片：路由、跨库读取、新增/删除/批量写入到所属的库、章节移动后的rebalance、合并回主库
+
+# 课程1：章节11、12；课程2：章节21
+CHAPTERS = [(1, '科学', None), (2, '火箭', None), (11, '物理', 1), (12, '化学', 1), (21, '推进', 2)]
+
+
+def _create_database(path):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE chapters (id INTEGER PRIMARY KEY, name TEXT, code TEXT, level INTEGER, parent_id INTEGER)')
+    conn.execute('''
+        CREATE TABLE knowledge (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT, content TEXT, category TEXT, image TEXT, course_code TEXT, chapter_id INTEGER
+        )
+    ''')
+    conn.execute('CREATE TABLE science_encyclopedia (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, content TEXT)')
+    init_search_index(conn.cursor())
+    conn.executemany('INSERT INTO chapters (id, name, parent_id) VALUES (?, ?, ?)', CHAPTERS)
+    conn.executemany('INSERT INTO knowledge (title, content, category, chapter_id) VALUES (?, ?, ?, ?)',
+                     [(f'知识点{chapter_id}-{i}', '内容', '物理', chapter_id) for chapter_id in (11, 12, 21) for i in range(3)]
+                     + [('没有章节', '内容', '物理', None)])
+    conn.commit()
+    conn.close()
+
+
+class _ShardedDatabase:
+    def __enter__(self):
+        self.workdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.workdir, 'quiz_database.db')
+        _create_database(self.path)
+        self.writer = DatabaseWriter(self.path)
+        self.writer.start()
+        self.shards = KnowledgeShards(self.path, main_writer=self.writer)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        return self
+
+    def __exit__(self, *exc_info):
+        self.conn.close()
+        for writer in [self.writer] + list(self.shards.writers.values()):
+            writer.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    # 各库中的知识点ID {课程ID或'main': [ID]}
+    def placement(self):
+        cursor = self.conn.cursor()
+        result = {'main': sorted(row[0] for row in cursor.execute('SELECT id FROM main.knowledge'))}
+        for course_id in self.shards.sharded_courses():
+            schema = self.shards.schema(cursor, course_id)
+            result[course_id] = sorted(row[0] for row in cursor.execute(f'SELECT id FROM {schema}.knowledge'))
+        return result
+
+
+def test_split_routes_and_reads_across_databases():
+    with _ShardedDatabase() as db:
+        shards, cursor = db.shards, db.conn.cursor()
+        assert shards.view(cursor) == 'main.knowledge' and shards.route(cursor, 11) is None
+
+        assert shards.split(db.conn, 1) == [{'from': 'main', 'to': 1, 'rows': 6}]
+        assert db.placement() == {'main': [7, 8, 9, 10], 1: [1, 2, 3, 4, 5, 6]}
+        assert (shards.route(cursor, 11), shards.route(cursor, 12), shards.route(cursor, 21)) == (1, 1, None)
+        assert shards.route(cursor, None) is None and shards.route(cursor, 999) is None
+
+        assert [row['id'] for row in shards.chapter_knowledge(cursor, 12)] == [4, 5, 6]
+        assert [row['id'] for row in shards.course_knowledge(cursor, 1)] == [1, 2, 3, 4, 5, 6]
+        assert [row['id'] for row in shards.course_knowledge(cursor, 2)] == [7, 8, 9]
+        assert sorted(row['id'] for row in shards.all_knowledge(cursor)) == list(range(1, 11))
+        assert knowledge_source(cursor) == 'temp.all_knowledge'
+
+        status = shards.status(cursor)
+        assert status['main_rows'] == 4 and [(s['course_id'], s['rows']) for s in status['shards']] == [(1, 6)]
+
+        try:
+            shards.split(db.conn, 11)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('二级章节不能拆分')
+
+
+def test_writes_go_to_the_owning_database():
+    with _ShardedDatabase() as db:
+        shards, cursor = db.shards, db.conn.cursor()
+        shards.split(db.conn, 1)
+
+        new_id = shards.add(cursor, '新知识点', '分片内容', '物理', 11)
+        main_id = shards.add(cursor, '主库知识点', '主库内容', '物理', 21)
+        assert (new_id, main_id) == (11, 12)  # 分片的ID从主库的自增序列中预留，不会重复
+        assert new_id in db.placement()[1] and main_id in db.placement()['main']
+        indexed = {row[0] for row in db.conn.execute("SELECT ref_id FROM search_index WHERE source = 'knowledge'")}
+        assert {new_id, main_id} <= indexed
+
+        shards.insert_rows(cursor, [('批量1', '内容', '物理', '', None, 12), ('批量2', '内容', '物理', '', None, 21),
+                                    ('批量3', '内容', '物理', '', None, 11)])
+        placement = db.placement()
+        assert len(placement[1]) == 9 and len(placement['main']) == 6
+        assert len(set(placement[1]) | set(placement['main'])) == 15
+
+        assert shards.delete(cursor, new_id) == (11,)
+        assert shards.delete(cursor, main_id) == (21,)
+        assert shards.delete(cursor, 999) is None
+        assert new_id not in db.placement()[1]
+        indexed = {row[0] for row in db.conn.execute("SELECT ref_id FROM search_index WHERE source = 'knowledge'")}
+        assert not {new_id, main_id} & indexed
+
+
+# 写入分片失败时，预先编入的索引项被去掉，预留的ID不再使用
+def test_failed_shard_insert_removes_index_entry():
+    with _ShardedDatabase() as db:
+        shards, cursor = db.shards, db.conn.cursor()
+        shards.split(db.conn, 1)
+        shard = sqlite3.connect(shards.sharded_courses()[1])
+        shard.execute("CREATE TRIGGER reject BEFORE INSERT ON knowledge BEGIN SELECT RAISE(ABORT, '磁盘已满'); END")
+        shard.commit()
+        try:
+            shards.add(cursor, '写入失败', '内容', '物理', 11)
+        except sqlite3.IntegrityError:
+            pass
+        else:
+            raise AssertionError('写入分片失败时应抛出异常')
+        assert db.conn.execute("SELECT COUNT(*) FROM search_index WHERE ref_id = 11").fetchone()[0] == 0
+
+        shard.execute('DROP TRIGGER reject')
+        shard.commit()
+        shard.close()
+        assert shards.add(cursor, '写入成功', '内容', '物理', 11) == 12
+        assert db.conn.execute("SELECT COUNT(*) FROM search_index WHERE ref_id = 12").fetchone()[0] == 1
+
+
+# 脚本直接修改分片中的知识点后，同步按分片的修改记录更新索引
+def test_sync_search_follows_shard_edits():
+    with _ShardedDatabase() as db:
+        shards, conn = db.shards, db.conn
+        shards.split(conn, 1)
+        shards.sync_search(conn)
+        assert conn.execute("SELECT COUNT(*) FROM search_index WHERE source = 'knowledge'").fetchone()[0] == 10
+
+        schema = shards.schema(conn.cursor(), 1)
+        conn.execute(f"UPDATE {schema}.knowledge SET content = '火箭发动机' WHERE id = 2")
+        conn.execute(f'DELETE FROM {schema}.knowledge WHERE id = 3')
+        conn.commit()
+        assert shards.sync_search(conn) == {'knowledge': 2}
+        assert [row[0] for row in conn.execute("SELECT ref_id FROM search_index WHERE search_index MATCH '发动'")] == [2]
+        indexed = {row[0] for row in conn.execute("SELECT ref_id FROM search_index WHERE source = 'knowledge'")}
+        assert 3 not in indexed and len(indexed) == 9
+        assert shards.sync_search(conn) == {}
+
+
+def test_rebalance_after_chapter_moves_and_merge():
+    with _ShardedDatabase() as db:
+        shards, conn = db.shards, db.conn
+        shards.split(conn, 1)
+
+        # 章节21移到课程1下，章节12移到课程2下
+        conn.execute('UPDATE chapters SET parent_id = 1 WHERE id = 21')
+        conn.execute('UPDATE chapters SET parent_id = 2 WHERE id = 12')
+        conn.commit()
+        shards.invalidate()
+        moves = shards.rebalance(conn)
+        assert sorted(moves, key=str) == sorted([{'from': 'main', 'to': 1, 'rows': 3},
+                                                 {'from': 1, 'to': 'main', 'rows': 3}], key=str)
+        assert db.placement() == {'main': [4, 5, 6, 10], 1: [1, 2, 3, 7, 8, 9]}
+        assert shards.rebalance(conn) == []
+
+        path = shards.sharded_courses()[1]
+        assert shards.merge(conn, 1) == [{'from': 1, 'to': 'main', 'rows': 6}]
+        assert not os.path.exists(path) and shards.sharded_courses() == {}
+        assert db.placement() == {'main': list(range(1, 11))}
+
+        try:
+            shards.merge(conn, 1)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('没有拆分的课程不能合并')
@@ -0,0 +1,85 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import statements as sql
+from maintenance import init_maintenance_tables, expire_challenges, archive_challenges, ARCHIVE_AFTER
+
+# 维护任务：超时的挑战标记为expired，结束超过ARCHIVE_AFTER的挑战连同参与记录分批移到冷表
+
+NOW = datetime(2026, 10, 1, 12, 0)
+
+
+def _connect():
+    conn = sqlite3.connect(':memory:')
+    for statement in (sql.CREATE_PK_CHALLENGES_TABLE, sql.ADD_PK_QUESTION_SEED_COLUMN, sql.CREATE_BOSS_CHALLENGES_TABLE,
+                      sql.CREATE_BOSS_PARTICIPANTS_TABLE):
+        conn.execute(statement)
+    init_maintenance_tables(conn.cursor())
+    return conn
+
+
+def _ago(**kwargs):
+    return (NOW - timedelta(**kwargs)).isoformat()
+
+
+def _add_pk(conn, status, created_at, completed_at=None):
+    return conn.execute('INSERT INTO pk_challenges (challenger_id, opponent_id, status, created_at, completed_at) '
+                        'VALUES (1, 2, ?, ?, ?)', (status, created_at, completed_at)).lastrowid
+
+
+def _add_boss(conn, status, created_at, completed_at=None, participants=()):
+    boss_id = conn.execute('INSERT INTO boss_challenges (creator_id, boss_name, status, created_at, completed_at) '
+                           "VALUES (1, '黑洞', ?, ?, ?)", (status, created_at, completed_at)).lastrowid
+    conn.executemany('INSERT INTO boss_participants (boss_id, user_id) VALUES (?, ?)',
+                     [(boss_id, user_id) for user_id in participants])
+    return boss_id
+
+
+def _ids(conn, table):
+    return sorted(row[0] for row in conn.execute(f'SELECT id FROM {table}'))
+
+
+def test_expire_challenges():
+    conn = _connect()
+    stale_pending = _add_pk(conn, 'pending', _ago(minutes=11))
+    fresh_pending = _add_pk(conn, 'pending', _ago(minutes=5))
+    stale_active = _add_pk(conn, 'active', _ago(hours=3))
+    fresh_active = _add_pk(conn, 'active', _ago(hours=1))
+    stale_boss = _add_boss(conn, 'active', _ago(hours=25))
+    _add_boss(conn, 'active', _ago(hours=2))
+    conn.commit()
+
+    result = expire_challenges(conn, NOW)
+    assert sorted(result.pop('expired_pk_ids')) == [stale_pending, stale_active]
+    assert result == {'pk_pending': 1, 'pk_active': 1, 'boss_active': 1}
+    statuses = dict(conn.execute('SELECT id, status FROM pk_challenges'))
+    assert statuses == {stale_pending: 'expired', fresh_pending: 'pending', stale_active: 'expired',
+                        fresh_active: 'active'}
+    assert conn.execute('SELECT status, completed_at FROM boss_challenges WHERE id = ?', (stale_boss,)).fetchone() \
+        == ('expired', NOW.isoformat())
+
+    result = expire_challenges(conn, NOW)
+    assert result == {'expired_pk_ids': [], 'pk_pending': 0, 'pk_active': 0, 'boss_active': 0}
+
+
+def test_archive_moves_finished_challenges_with_participants():
+    conn = _connect()
+    old = ARCHIVE_AFTER + timedelta(days=1)
+    archived_pk = [_add_pk(conn, status, _ago(days=old.days + 1), _ago(days=old.days)) for status in
+                   ('completed', 'expired', 'completed')]
+    recent_pk = _add_pk(conn, 'completed', _ago(days=old.days + 1), _ago(days=1))  # 刚结束的留在热表
+    active_pk = _add_pk(conn, 'active', _ago(days=old.days))  # 未结束的不归档
+    archived_boss = _add_boss(conn, 'completed', _ago(days=old.days + 1), _ago(days=old.days), participants=(1, 2))
+    kept_boss = _add_boss(conn, 'active', _ago(hours=1), participants=(3,))
+    conn.commit()
+
+    # 每批1行，多批完成
+    assert archive_challenges(conn, NOW, batch_size=1) == {'pk_challenges': 3, 'boss_challenges': 1}
+    assert _ids(conn, 'pk_challenges') == [recent_pk, active_pk]
+    assert _ids(conn, 'pk_challenges_archive') == archived_pk
+    assert _ids(conn, 'boss_challenges') == [kept_boss] and _ids(conn, 'boss_challenges_archive') == [archived_boss]
+    assert [row[0] for row in conn.execute('SELECT boss_id FROM boss_participants')] == [kept_boss]
+    assert sorted(conn.execute('SELECT boss_id, user_id FROM boss_participants_archive')) \
+        == [(archived_boss, 1), (archived_boss, 2)]
+
+    assert archive_challenges(conn, NOW) == {'pk_challenges': 0, 'boss_challenges': 0}
@@ -0,0 +1,81 @@
+import random
+import sqlite3
+from collections import Counter
+
+from mastery import (init_mastery_table, record_answers, parse_knowledge_id, get_user_mastery, weight_for, AliasSampler,
+                     pick_weak_points, DECAY_ALPHA, PRIOR_ACCURACY, MIN_WEIGHT)
+
+# 知识点掌握程度：指数衰减的正确率、按薄弱程度加权的别名法抽样
+
+
+def _connect():
+    conn = sqlite3.connect(':memory:')
+    init_mastery_table(conn.cursor())
+    return conn
+
+
+def test_record_answers_decays_accuracy():
+    conn = _connect()
+    cursor = conn.cursor()
+    assert record_answers(cursor, 1, [{'knowledge_id': 10, 'correct': True}, {'knowledge_id': 10, 'correct': False},
+                                      {'knowledge_id': 11, 'correct': True}, {'correct': True}], now=100) == 2
+    record_answers(cursor, 1, [{'knowledge_id': 11, 'correct': True}], now=200)
+
+    expected_10 = (1 - DECAY_ALPHA) * ((1 - DECAY_ALPHA) * PRIOR_ACCURACY + DECAY_ALPHA)
+    expected_11 = (1 - DECAY_ALPHA) * ((1 - DECAY_ALPHA) * PRIOR_ACCURACY + DECAY_ALPHA) + DECAY_ALPHA
+    mastery = get_user_mastery(cursor, 1)
+    assert set(mastery) == {10, 11}
+    assert abs(mastery[10] - expected_10) < 1e-9 and abs(mastery[11] - expected_11) < 1e-9
+    assert cursor.execute('SELECT attempts, correct FROM knowledge_mastery WHERE knowledge_id = 11').fetchone() == (2, 2)
+    assert get_user_mastery(cursor, 2) == {}
+    assert record_answers(cursor, 1, None) == 0
+
+
+# 客户端提交的知识点ID无效时只跳过这一条
+def test_record_answers_skips_invalid_ids():
+    conn = _connect()
+    cursor = conn.cursor()
+    answers = [{'knowledge_id': 'abc', 'correct': True}, {'knowledge_id': True, 'correct': True},
+               {'knowledge_id': [1], 'correct': True}, {'knowledge_id': 2 ** 70, 'correct': True},
+               {'knowledge_id': float('inf'), 'correct': True}, 'not a record',
+               {'knowledge_id': '12', 'correct': True}, {'knowledge_id': 13, 'correct': False}]
+    assert record_answers(cursor, 1, answers, now=100) == 2
+    assert set(get_user_mastery(cursor, 1)) == {12, 13}
+    assert record_answers(cursor, 1, {'knowledge_id': 12}) == 0 and record_answers(cursor, 1, 5) == 0
+    assert (parse_knowledge_id(7), parse_knowledge_id(' 8 '), parse_knowledge_id(False), parse_knowledge_id(None)) \
+        == (7, 8, None, None)
+
+
+def test_weight_for():
+    assert weight_for(None) == weight_for(PRIOR_ACCURACY)
+    assert weight_for(1.0) == MIN_WEIGHT
+    assert weight_for(0.0) > weight_for(0.5) > weight_for(1.0)
+
+
+def test_alias_sampler_matches_weights():
+    weights = [1.0, 2.0, 3.0, 0.5]
+    sampler = AliasSampler(weights, random.Random(1))
+    draws = 60000
+    counts = Counter(sampler.draw() for _ in range(draws))
+    total = sum(weights)
+    for index, weight in enumerate(weights):
+        assert abs(counts[index] / draws - weight / total) < 0.01
+
+
+def test_pick_weak_points_prefers_weak_and_avoids_repeats():
+    points = [{'id': i} for i in range(1, 11)]
+    mastery = {i: 1.0 for i in range(2, 11)}  # 只有知识点1没有掌握
+    picks = Counter()
+    rng = random.Random(7)
+    for _ in range(2000):
+        picked = pick_weak_points(points, mastery, 1, rng)
+        picks[picked[0]['id']] += 1
+    assert picks.most_common(1)[0][0] == 1
+    assert picks[1] > 2000 * weight_for(None) / (weight_for(None) + 9 * MIN_WEIGHT) * 0.9
+
+    picked = pick_weak_points(points, {}, 5, random.Random(3))
+    assert len(picked) == 5 and len({kp['id'] for kp in picked}) >= 4
+
+    # 知识点不够时允许重复
+    assert len(pick_weak_points(points[:2], {}, 5, random.Random(3))) == 5
+    assert pick_weak_points([], {}, 5) == []
@@ -0,0 +1,94 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from merge_databases import merge_database
+from test_statements import _fresh_database
+
+# 合并数据库：按业务键判断同一行，引用列换成目标库的ID，内容不同的行保留目标库的版本并列入冲突
+
+
+def _fill_target(conn):
+    conn.execute("INSERT INTO users (username, password, name, totalScore) VALUES ('alice', 'p', '爱丽丝', 10)")
+    conn.execute("INSERT INTO chapters (name, code, level, parent_id) VALUES ('目标课程', 'T', 1, NULL)")
+    conn.execute("INSERT INTO knowledge (title, content, category, chapter_id) VALUES ('目标知识点', 'x', '化学', NULL)")
+    conn.execute("INSERT INTO rankings (name, score, correctCount, time, date) VALUES ('爱丽丝', 8, 8, 60, '2026-03-01')")
+    conn.commit()
+
+
+# 源库中的ID与目标库错开：用户、章节和知识点都会被换成目标库的ID
+def _fill_source(conn):
+    conn.executemany('INSERT INTO users (username, password, name, totalScore) VALUES (?, ?, ?, ?)',
+                     [('zed', 'p', '泽德', 1), ('bob', 'p', '鲍勃', 2), ('alice', 'p', '爱丽丝', 99)])
+    course_id = conn.execute("INSERT INTO chapters (name, code, level, parent_id) VALUES ('新课程', 'N', 1, NULL)").lastrowid
+    chapter_id = conn.execute("INSERT INTO chapters (name, code, level, parent_id) VALUES ('子章节', 'N-1', 2, ?)",
+                              (course_id,)).lastrowid
+    conn.execute("INSERT INTO knowledge (title, content, category, chapter_id) VALUES ('占位', 'x', '物理', NULL)")
+    knowledge_id = conn.execute("INSERT INTO knowledge (title, content, category, chapter_id) VALUES ('新知识点', '内容', '物理', ?)",
+                                (chapter_id,)).lastrowid
+    conn.execute("INSERT INTO user_course_permissions (user_id, chapter_id) VALUES (3, ?)", (chapter_id,))
+    conn.execute('INSERT INTO knowledge_mastery (user_id, knowledge_id, attempts, correct, accuracy, updated_at) '
+                 'VALUES (2, ?, 1, 1, 0.65, 0)', (knowledge_id,))
+    conn.executemany('INSERT INTO rankings (name, score, correctCount, time, date) VALUES (?, ?, ?, ?, ?)',
+                     [('爱丽丝', 8, 8, 60, '2026-03-01'), ('鲍勃', 5, 5, 90, '2026-03-02')])
+    conn.commit()
+
+
+class _Databases:
+    def __enter__(self):
+        self.workdir = tempfile.mkdtemp()
+        self.target = _fresh_database(self.workdir)
+        self.source = os.path.join(self.workdir, 'quiz.db')
+        shutil.copy(self.target, self.source)
+        with sqlite3.connect(self.target) as conn:
+            _fill_target(conn)
+        with sqlite3.connect(self.source) as conn:
+            _fill_source(conn)
+        self.conn = sqlite3.connect(self.target, isolation_level=None)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.conn.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def one(self, statement, parameters=()):
+        return self.conn.execute(statement, parameters).fetchone()
+
+
+def test_merge_remaps_ids():
+    with _Databases() as db:
+        report = merge_database(db.conn, db.source)
+        assert report['verified']
+        tables = report['tables']
+        assert (tables['users']['inserted'], tables['users']['conflicts']) == (2, 1)
+        assert tables['users']['conflict_samples'][0]['columns'] == ['totalScore']
+        assert (tables['rankings']['inserted'], tables['rankings']['identical']) == (1, 1)
+        assert tables['chapters']['inserted'] == 2 and tables['chapters']['unmapped'] == 0
+
+        # 冲突的行保留目标库的版本
+        assert db.one("SELECT id, totalScore FROM users WHERE name = '爱丽丝'") == (1, 10)
+        bob = db.one("SELECT id FROM users WHERE name = '鲍勃'")[0]
+
+        course = db.one("SELECT id FROM chapters WHERE name = '新课程'")[0]
+        chapter, parent = db.one("SELECT id, parent_id FROM chapters WHERE name = '子章节'")
+        assert parent == course and course != db.one("SELECT id FROM chapters WHERE name = '目标课程'")[0]
+        knowledge = db.one("SELECT id, chapter_id FROM knowledge WHERE title = '新知识点'")
+        assert knowledge == (3, chapter)
+
+        # 引用源库ID的行换成目标库的ID
+        assert db.one('SELECT user_id, chapter_id FROM user_course_permissions') == (1, chapter)
+        assert db.one('SELECT user_id, knowledge_id FROM knowledge_mastery') == (bob, knowledge[0]) and bob == 3
+
+        # 再合并一次没有新的行
+        again = merge_database(db.conn, db.source)
+        assert again['verified'] and all(result.get('inserted', 0) == 0 for result in again['tables'].values())
+
+
+def test_dry_run_writes_nothing():
+    with _Databases() as db:
+        before = db.one('SELECT (SELECT COUNT(*) FROM users), (SELECT COUNT(*) FROM chapters), (SELECT COUNT(*) FROM knowledge)')
+        report = merge_database(db.conn, db.source, dry_run=True)
+        assert report['verified'] and report['tables']['users']['inserted'] == 2
+        after = db.one('SELECT (SELECT COUNT(*) FROM users), (SELECT COUNT(*) FROM chapters), (SELECT COUNT(*) FROM knowledge)')
+        assert before == after
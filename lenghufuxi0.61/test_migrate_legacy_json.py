@@ -0,0 +1,116 @@
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+from migrate_legacy_json import iter_rankings, valid_record, migrate, LegacyFormatError, MIGRATED_SUFFIX
+
+# 旧版quiz_data.json的排行榜导入：分块流式解析、无效记录、数据库中已有的用户跳过、重复执行、导入后改名
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+RECORDS = [
+    {'name': '爱丽丝', 'score': 30, 'correctCount': 3, 'time': 60, 'date': '2024-05-01'},
+    {'name': '鲍勃', 'score': 20, 'correctCount': 2, 'time': 90, 'date': '2024-05-02'},
+    {'name': '', 'score': 10, 'correctCount': 1, 'time': 30, 'date': '2024-05-03'},
+    {'name': '卡罗尔', 'score': '10', 'correctCount': 1, 'time': 30, 'date': '2024-05-03'},
+    {'name': '卡罗尔', 'score': 10, 'correctCount': 1, 'time': 30, 'date': '2024-05-03'},
+    {'name': '卡罗尔', 'score': 5, 'correctCount': 1, 'time': 40, 'date': '2024-05-04'},
+]
+
+
+def _write_json(workdir, content):
+    path = os.path.join(workdir, 'quiz_data.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return path
+
+
+def _create_database(path):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, name TEXT, totalScore INTEGER DEFAULT 0)')
+    conn.execute('''
+        CREATE TABLE rankings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT, score INTEGER, correctCount INTEGER, time INTEGER, date TEXT
+        )
+    ''')
+    conn.executemany('INSERT INTO users (username, name, totalScore) VALUES (?, ?, ?)',
+                     [('alice', '爱丽丝', 7), ('carol', '卡罗尔', 0)])
+    # 爱丽丝在旧服务器上同时写过数据库
+    conn.execute("INSERT INTO rankings (name, score, correctCount, time, date) VALUES ('爱丽丝', 7, 1, 10, '2024-05-01')")
+    conn.commit()
+    return conn
+
+
+def test_iter_rankings_across_chunks():
+    workdir = tempfile.mkdtemp()
+    try:
+        content = json.dumps({'users': {'x': 1}, 'rankings': RECORDS}, ensure_ascii=False, indent=2)
+        path = _write_json(workdir, content)
+        for chunk_size in (1, 7, 64 * 1024):
+            assert list(iter_rankings(path, chunk_size)) == RECORDS
+        assert list(iter_rankings(_write_json(workdir, '{"rankings": []}'), 3)) == []
+
+        for broken in ('{"users": {}}', '{"rankings": [{"name": "a"}', '{"rankings": [{"name": }]}'):
+            path = _write_json(workdir, broken)
+            try:
+                list(iter_rankings(path, 4))
+            except LegacyFormatError:
+                continue
+            raise AssertionError(f'应当拒绝: {broken}')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def test_valid_record():
+    assert [valid_record(record) for record in RECORDS] == [True, True, False, False, True, True]
+    assert not valid_record(['爱丽丝', 30])
+    assert not valid_record({'name': '爱丽丝', 'score': 30})
+
+
+def test_migrate_skips_existing_users_and_is_idempotent():
+    workdir = tempfile.mkdtemp()
+    try:
+        path = _write_json(workdir, json.dumps({'rankings': RECORDS}, ensure_ascii=False))
+        conn = _create_database(os.path.join(workdir, 'quiz_database.db'))
+
+        report = migrate(conn, path, batch_size=2)
+        assert report['verified']
+        assert (report['read'], report['imported'], report['skipped'], report['invalid']) == (6, 3, 1, 2)
+        assert report['conflicts'] == [{'name': '爱丽丝', 'json_score': 30, 'db_score': 7}]
+        # 同一文件中卡罗尔的两条记录都导入，没有账号的鲍勃只写排行榜
+        assert report['imported_score'] == 35 and report['users_updated'] == 2 and report['users_score_delta'] == 15
+        assert conn.execute("SELECT totalScore FROM users WHERE name = '卡罗尔'").fetchone() == (15,)
+        assert conn.execute("SELECT totalScore FROM users WHERE name = '爱丽丝'").fetchone() == (7,)
+        assert (report['rankings_before'], report['rankings_after']) == (1, 4)
+
+        again = migrate(conn, path)
+        assert again['verified'] and (again['imported'], again['skipped'], again['invalid']) == (0, 4, 2)
+        assert conn.execute('SELECT COUNT(*) FROM rankings').fetchone() == (4,)
+        conn.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def test_command_line_renames_file():
+    workdir = tempfile.mkdtemp()
+    try:
+        path = _write_json(workdir, json.dumps({'rankings': RECORDS[:2]}, ensure_ascii=False))
+        database = os.path.join(workdir, 'quiz_database.db')
+        _create_database(database).close()
+        command = [sys.executable, os.path.join(SCRIPT_DIR, 'migrate_legacy_json.py'), '--json', path, '--db', database]
+
+        result = subprocess.run(command, capture_output=True, text=True, encoding='utf-8')
+        assert result.returncode == 0, result.stderr
+        assert json.loads(result.stdout)['status'] == 'success'
+        assert not os.path.exists(path) and os.path.exists(path + MIGRATED_SUFFIX)
+
+        # 文件已改名：再次执行直接跳过
+        result = subprocess.run(command, capture_output=True, text=True, encoding='utf-8')
+        assert result.returncode == 0 and json.loads(result.stdout)['status'] == 'skipped'
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,84 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from pk_sessions import PKSession, PKSessionStore
+
+# PK对战：会话存储的超时清理；同时接受同一个挑战时只开始一次对战，双方按题同步作答
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _session(challenge_id, now):
+    question_set = {'set_id': f's{challenge_id}', 'questions': [{}], 'answers': b'\x01'}
+    return PKSession(challenge_id, 10, 20, question_set, now=now)
+
+
+def test_store_drops_stale_sessions():
+    store = PKSessionStore(ttl=60)
+    store.add(_session(1, now=0))
+    assert store.get(1) is not None and len(store) == 1
+    store.add(_session(2, now=None))  # 添加时清理超时的对战
+    assert store.get(1) is None and store.get(2).set_id == 's2'
+    store.remove(2)
+    store.remove(3)
+    assert len(store) == 0
+
+
+# 在临时数据库上启动服务器：8个请求同时接受同一个挑战，然后双方作答
+ACCEPT_SCRIPT = '''
+import json, sqlite3, sys, threading
+from datetime import datetime
+sys.path.insert(0, %r)
+import server
+
+conn = sqlite3.connect('quiz_database.db')
+conn.executemany('INSERT INTO knowledge (title, content, category, chapter_id) VALUES (?, ?, ?, 1)',
+                 [(f'知识点{i}', f'知识点{i}的说明文字', '物理') for i in range(6)])
+conn.execute("INSERT INTO pk_challenges (challenger_id, opponent_id, status, total_questions, created_at) "
+             "VALUES (1, 2, 'pending', 2, ?)", (datetime.now().isoformat(),))
+conn.commit()
+
+emitted = []
+emit = server.socketio.emit
+server.socketio.emit = lambda event, *args, **kwargs: emitted.append(event) or emit(event, *args, **kwargs)
+
+results = []
+def accept():
+    response = server.app.test_client().post('/api/pk-challenges/1/accept')
+    results.append((response.status_code, response.get_json()['challenge']['set_id']))
+threads = [threading.Thread(target=accept) for _ in range(8)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+
+client = server.app.test_client()
+def answer(user_id, question_index):
+    return client.post('/api/pk-challenges/1/answer',
+                       json={'user_id': user_id, 'question_index': question_index, 'choice': 0}).status_code
+answers = [answer(1, 0), answer(1, 1), answer(2, 0), answer(1, 1), answer(2, 1)]
+status = conn.execute('SELECT status FROM pk_challenges WHERE id = 1').fetchone()[0]
+server.db_writer.stop()
+print(json.dumps({'results': results, 'started': emitted.count('pk_challenge_started'), 'answers': answers,
+                  'status': status}))
+''' % BASE_DIR
+
+
+def test_concurrent_accept_starts_once():
+    workdir = tempfile.mkdtemp()
+    try:
+        process = subprocess.run([sys.executable, '-c', ACCEPT_SCRIPT], cwd=workdir, check=True, capture_output=True,
+                                 text=True, env=dict(os.environ, LENGHU_DB=os.path.join(workdir, 'quiz_database.db')))
+        report = json.loads(process.stdout.strip().splitlines()[-1])
+        assert [status for status, _ in report['results']] == [200] * 8
+        assert len({set_id for _, set_id in report['results']}) == 1  # 所有请求拿到同一场对战
+        assert report['started'] == 1
+        # 对手还没答第1题时不能答第2题
+        assert report['answers'] == [200, 400, 200, 200, 200]
+        assert report['status'] == 'completed'
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,102 @@
+from question_sets import AnswerKeyStore, derive_seed, make_set_id, strip_answers
+from pk_sessions import PKSession
+
+# 服务器端判分：题目集的答案键（LRU + TTL）、每题只判一次、PK对战会话自带的答案键
+
+NOW = 1_800_000_000
+
+
+def test_set_id_is_deterministic():
+    assert make_set_id(42, 'knowledge', [1, 2, 3], 3) == make_set_id(42, 'knowledge', [1, 2, 3], 3)
+    assert make_set_id(42, 'knowledge', [1, 2, 3], 3) != make_set_id(43, 'knowledge', [1, 2, 3], 3)
+    assert make_set_id(42, 'knowledge', [1, 2, 3], 3) != make_set_id(42, 'science', [1, 2, 3], 3)
+
+
+def test_strip_answers():
+    questions = [{'question': 'q', 'options': ['a', 'b'], 'answer': 1, 'explanation': 'e', 'knowledge_id': 5}]
+    assert strip_answers(questions) == [{'question': 'q', 'options': ['a', 'b'], 'knowledge_id': 5}]
+    assert questions[0]['answer'] == 1
+
+
+def test_grade():
+    store = AnswerKeyStore()
+    store.put('s1', [2, 0, 3], now=NOW)
+    assert store.grade('s1', 0, 2) is True
+    assert store.grade('s1', 0, 1) is False
+    assert store.grade('s1', 3, 0) is False
+    assert store.grade('s1', -1, 3) is False
+    assert store.grade('s1', '0', 2) is False
+    assert store.grade('missing', 0, 0) is None
+
+
+def test_ttl_and_lru_eviction():
+    store = AnswerKeyStore(max_sets=2, ttl=60)
+    store.put('s1', [0], now=NOW)
+    store.put('s2', [1], now=NOW)
+    assert store.get('s1', now=NOW + 1) == bytes([0])  # s1变为最近使用
+    store.put('s3', [2], now=NOW + 1)
+    assert 's2' not in store and len(store) == 2
+    assert store.get('s1', now=NOW + 61) is None
+    assert store.get('s3', now=NOW + 61) == bytes([2])
+
+
+def test_claim_rejects_repeated_answers():
+    store = AnswerKeyStore()
+    store.put('s1', [1, 2], now=NOW)
+    assert store.claim('s1', 7, 0, now=NOW) is True
+    assert store.claim('s1', 7, 0, now=NOW) is False
+    assert store.claim('s1', 8, 0, now=NOW) is True
+    assert store.claim('s1', 7, 1, now=NOW) is True
+    assert store.claim('missing', 7, 0, now=NOW) is None
+
+    # 无效的题号不登记，也不会抛出TypeError
+    for question_index in ('0', 2, -1, True, [0], {'a': 1}, None, 0.0):
+        try:
+            store.claim('s1', 9, question_index, now=NOW)
+        except ValueError:
+            continue
+        raise AssertionError(f'应当拒绝题号: {question_index!r}')
+    assert store.claim('s1', 9, 0, now=NOW) is True
+
+    # 相同种子重新生成同一题目集时不能借此重新作答，答案不同时视为新的题目集
+    store.put('s1', [1, 2], now=NOW)
+    assert store.claim('s1', 7, 0, now=NOW) is False
+    store.put('s1', [3, 3], now=NOW)
+    assert store.claim('s1', 7, 0, now=NOW) is True
+
+
+def test_owner_and_derived_seed():
+    store = AnswerKeyStore()
+    store.put('s1', [1, 2], owner=('boss', 3, '7'), now=NOW)
+    store.put('s2', [0], now=NOW)
+    assert store.owner('s1', now=NOW) == ('boss', 3, '7')
+    assert store.owner('s2', now=NOW) is None and store.owner('missing', now=NOW) is None
+
+    # 归属不同时视为新的题目集，不沿用已作答记录
+    assert store.claim('s1', 7, 0, now=NOW) is True
+    store.put('s1', [1, 2], owner=('boss', 4, '7'), now=NOW)
+    assert store.claim('s1', 7, 0, now=NOW) is True
+
+    assert derive_seed('boss', 3, 7) == derive_seed('boss', 3, '7')
+    assert derive_seed('boss', 3, 7) != derive_seed('boss', 3, 8)
+    assert 1 <= derive_seed('boss', 3, 7) < 2 ** 31
+
+
+def test_pk_session_grades_and_syncs():
+    session = PKSession(1, 10, 20, {'set_id': 's1', 'questions': [{}, {}], 'answers': bytes([1, 0])}, now=NOW)
+    assert session.grade(0, 1) is True and session.grade(0, 0) is False
+    assert session.grade(5, 1) is False and session.grade(None, 1) is False
+
+    assert session.record(10, 0, True) is False
+    for user_id, question_index in ((10, 0), (10, 1), (30, 0)):
+        try:
+            session.record(user_id, question_index, True)
+        except ValueError:
+            continue
+        raise AssertionError(f'应当拒绝: 用户{user_id} 第{question_index}题')
+    assert session.record(20, 0, False) is True
+    assert session.current_question == 1
+    session.record(10, 1, True)
+    session.record(20, 1, True)
+    assert session.completed and (session.score(10), session.score(20)) == (2, 1)
+    assert 'answers' not in session.to_dict() and 'answer_key' not in session.to_dict()
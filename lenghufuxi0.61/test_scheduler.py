@@ -0,0 +1,92 @@
+import sqlite3
+
+from scheduler import (init_schedule_columns, quality_from_score, sm2_update, schedule_review, get_due_items,
+                       recompute_schedules, DAY_SECONDS, DEFAULT_EASE, MIN_EASE)
+
+# SM-2复习调度：回答质量、间隔和难度系数的更新、到期查询和旧记录的批量重算
+
+NOW = 1_800_000_000
+
+
+def _connect():
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.execute('CREATE TABLE chapters (id INTEGER PRIMARY KEY, name TEXT, parent_id INTEGER)')
+    conn.execute('''
+        CREATE TABLE user_quiz_times (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            chapter_id INTEGER,
+            last_quiz_time TEXT,
+            next_available_time TEXT,
+            interval_days INTEGER DEFAULT 1,
+            UNIQUE(user_id, chapter_id)
+        )
+    ''')
+    init_schedule_columns(conn.cursor())
+    conn.executemany('INSERT INTO chapters (id, name, parent_id) VALUES (?, ?, ?)', [(1, '科学', None), (2, '物理', 1)])
+    return conn
+
+
+def test_quality_from_score():
+    assert quality_from_score(0, 0) == 0
+    assert quality_from_score(0, 10) == 0
+    assert quality_from_score(6, 10) == 3
+    assert quality_from_score(10, 10) == 5
+    assert quality_from_score(12, 10) == 5
+
+
+def test_sm2_intervals_grow_on_good_answers():
+    ease, repetitions, interval = DEFAULT_EASE, 0, 0
+    intervals = []
+    for _ in range(4):
+        ease, repetitions, interval = sm2_update(ease, repetitions, interval, 5)
+        intervals.append(interval)
+    assert intervals[:2] == [1, 6]
+    assert intervals[2] == round(6 * 2.7) and intervals[3] > intervals[2]
+    assert repetitions == 4 and abs(ease - (DEFAULT_EASE + 0.4)) < 1e-9
+
+
+def test_sm2_failure_resets_and_ease_has_floor():
+    ease, repetitions, interval = sm2_update(2.0, 5, 30, 2)
+    assert (repetitions, interval) == (0, 1)
+    assert ease < 2.0
+    for _ in range(20):
+        ease, repetitions, interval = sm2_update(ease, repetitions, interval, 0)
+    assert ease == MIN_EASE
+
+
+def test_schedule_review_and_due_items():
+    conn = _connect()
+    cursor = conn.cursor()
+    due_at = schedule_review(cursor, 1, 2, 10, 10, now=NOW)
+    assert due_at == NOW + DAY_SECONDS
+    due_at = schedule_review(cursor, 1, 2, 10, 10, now=NOW + DAY_SECONDS)
+    assert due_at == NOW + 7 * DAY_SECONDS
+    assert conn.execute('SELECT COUNT(*) FROM user_quiz_times').fetchone()[0] == 1
+
+    assert get_due_items(cursor, 1, now=due_at - 1) == []
+    items = get_due_items(cursor, 1, now=due_at + 60)
+    assert [(item['chapter_id'], item['chapter_name'], item['overdue_seconds']) for item in items] == [(2, '物理', 60)]
+
+
+def test_recompute_fills_legacy_rows():
+    conn = _connect()
+    conn.executemany('''
+        INSERT INTO user_quiz_times (user_id, chapter_id, last_quiz_time, next_available_time, interval_days)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(1, chapter_id, '2026-01-01T08:00:00', '2026-01-04T08:00:00', 3) for chapter_id in range(1, 6)]
+         + [(2, 1, None, '2026-01-04T08:00:00', None)])
+    schedule_review(conn.cursor(), 3, 1, 10, 10, now=NOW)
+
+    seen = []
+    result = recompute_schedules(conn, chunk_size=2, progress=lambda total, updated: seen.append(total))
+    assert result == {'total': 7, 'updated': 6}
+    assert seen == [2, 4, 6, 7]
+    rows = conn.execute('SELECT due_at - last_quiz_at, ease, repetitions FROM user_quiz_times WHERE user_id = 1')
+    assert {tuple(row) for row in rows} == {(3 * DAY_SECONDS, DEFAULT_EASE, 0)}
+    legacy = conn.execute('SELECT last_quiz_at, interval_days, due_at FROM user_quiz_times WHERE user_id = 2').fetchone()
+    assert legacy['last_quiz_at'] is None and legacy['interval_days'] == 1 and legacy['due_at'] > 0
+
+    # 再次运行没有需要更新的记录
+    assert recompute_schedules(conn, chunk_size=2) == {'total': 7, 'updated': 0}
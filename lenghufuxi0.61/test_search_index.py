@@ -0,0 +1,59 @@
+import sqlite3
+
+from search_index import init_search_index, sync_search_index, search
+
+# 全文检索的修改记录：其他脚本直接新增、修改、删除原文后，同步按记录更新索引；已有数据库第一次建立触发器时重建
+
+
+def _create_database():
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.execute('CREATE TABLE knowledge (id INTEGER PRIMARY KEY, title TEXT, content TEXT, chapter_id INTEGER)')
+    conn.execute('CREATE TABLE science_encyclopedia (id INTEGER PRIMARY KEY, title TEXT, content TEXT, category TEXT)')
+    return conn
+
+
+def _titles(conn, query):
+    return sorted(result['title'] for result in search(conn.cursor(), query)[1])
+
+
+def test_sync_follows_direct_edits():
+    conn = _create_database()
+    init_search_index(conn.cursor())
+    conn.executemany('INSERT INTO knowledge (title, content, chapter_id) VALUES (?, ?, ?)',
+                     [('牛顿定律', '力和加速度', 1), ('光的折射', '光从空气进入水中', 1)])
+    conn.execute("INSERT INTO science_encyclopedia (title, content, category) VALUES ('行星', '围绕恒星运行', '天文')")
+    conn.commit()
+    assert sync_search_index(conn) == {'knowledge': 2, 'science': 1}
+    assert _titles(conn, '加速度') == ['牛顿定律']
+
+    # 只改内容，数量和最大ID都不变
+    conn.execute("UPDATE knowledge SET content = '惯性和质量' WHERE title = '牛顿定律'")
+    conn.execute("DELETE FROM knowledge WHERE title = '光的折射'")
+    conn.commit()
+    assert sync_search_index(conn) == {'knowledge': 2}
+    assert _titles(conn, '加速度') == [] and _titles(conn, '惯性') == ['牛顿定律']
+    assert _titles(conn, '折射') == []
+
+    # 修改记录处理后清空，不改列表中的列不产生记录
+    conn.execute("UPDATE science_encyclopedia SET category = '物理'")
+    conn.commit()
+    assert sync_search_index(conn) == {}
+    assert conn.execute('SELECT COUNT(*) FROM search_index_log').fetchone()[0] == 0
+
+
+def test_first_sync_rebuilds_existing_database():
+    conn = _create_database()
+    conn.execute("INSERT INTO knowledge (title, content, chapter_id) VALUES ('声音', '声波的传播', 2)")
+    conn.execute("INSERT INTO science_encyclopedia (title, content, category) VALUES ('黑洞', '引力极强', '天文')")
+    conn.commit()
+
+    # 触发器建立之前写入的数据没有修改记录，第一次同步重建
+    init_search_index(conn.cursor())
+    assert sync_search_index(conn) == {'knowledge': 1, 'science': 1}
+    assert _titles(conn, '声波') == ['声音'] and _titles(conn, '引力') == ['黑洞']
+
+    # 再次初始化不会重复重建
+    init_search_index(conn.cursor())
+    conn.commit()
+    assert sync_search_index(conn) == {}
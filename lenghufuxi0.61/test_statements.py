@@ -0,0 +1,93 @@
+import ast
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+import statements
+
+# 检查server.py中的SQL都来自statements.py的语句登记表，辅助模块执行的SQL都是模块顶部定义的常量，
+# 并且每条登记的语句和辅助模块列出的语句都能在当前表结构上编译
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# 建表、事务控制等语句可以直接写在调用处
+CONTROL_PREFIXES = ('CREATE', 'ALTER', 'DROP', 'PRAGMA', 'ATTACH', 'DETACH', 'SAVEPOINT', 'RELEASE', 'ROLLBACK',
+                    'BEGIN', 'ANALYZE', 'VACUUM')
+
+
+# 文件中所有execute/executemany调用的第一个参数
+def _execute_calls(filename='server.py'):
+    with open(os.path.join(BASE_DIR, filename), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr in ('execute', 'executemany') and node.args):
+            yield node.lineno, node.args[0]
+
+
+def test_server_uses_registry():
+    problems = []
+    for lineno, arg in _execute_calls():
+        if not (isinstance(arg, ast.Attribute) and isinstance(arg.value, ast.Name) and arg.value.id == 'sql'):
+            problems.append(f'server.py:{lineno} 没有使用 sql.常量')
+    # 传给写线程等其他地方的 sql.常量 也必须已登记
+    with open(os.path.join(BASE_DIR, 'server.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == 'sql'
+                and node.attr not in statements.REGISTRY):
+            problems.append(f'server.py:{node.lineno} sql.{node.attr} 不在登记表中')
+    assert not problems, '\n'.join(problems)
+
+
+# 在临时目录中启动一次server.py的建表流程，返回数据库路径
+def _fresh_database(workdir):
+    script = 'import sys; sys.path.insert(0, %r); import server' % BASE_DIR
+    path = os.path.join(workdir, 'quiz_database.db')
+    subprocess.run([sys.executable, '-c', script], cwd=workdir, check=True, capture_output=True,
+                   env=dict(os.environ, LENGHU_DB=path))
+    return path
+
+
+# 常量名、常量.format(...)、或以CONTROL_PREFIXES开头的字面量；
+# 名为statement的参数是转发调用方传入的常量
+def _helper_argument_ok(arg):
+    if isinstance(arg, ast.Call) and isinstance(arg.func, ast.Attribute) and arg.func.attr == 'format':
+        arg = arg.func.value
+    if isinstance(arg, ast.Name):
+        return arg.id.isupper() or arg.id == 'statement'
+    if isinstance(arg, ast.JoinedStr):
+        arg = arg.values[0] if arg.values else arg
+    return (isinstance(arg, ast.Constant) and isinstance(arg.value, str)
+            and arg.value.lstrip().upper().startswith(CONTROL_PREFIXES))
+
+
+def test_helper_modules_use_constants():
+    problems = []
+    for module in statements.HELPER_MODULES:
+        for lineno, arg in _execute_calls(f'{module}.py'):
+            if not _helper_argument_ok(arg):
+                problems.append(f'{module}.py:{lineno} 没有使用模块顶部定义的SQL常量')
+    assert not problems, '\n'.join(problems)
+
+
+def test_statements_prepare():
+    workdir = tempfile.mkdtemp()
+    try:
+        conn = sqlite3.connect(_fresh_database(workdir))
+        problems = []
+        for name, statement in sorted({**statements.REGISTRY, **statements.helper_statements()}.items()):
+            if name.startswith('ADD_'):
+                continue  # 迁移语句在建库时已执行过，再次编译会报列已存在
+            try:
+                conn.execute('EXPLAIN ' + statement, (None,) * statement.count('?'))
+            except sqlite3.Error as e:
+                problems.append(f'{name}: {e}')
+        conn.close()
+        assert not problems, '\n'.join(problems)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+
+from flask import Flask
+from werkzeug.http import http_date
+
+from static_cache import StaticCache
+
+# 静态文件缓存的响应：Range请求（206/416、If-Range）、条件请求（304）和压缩协商
+
+MTIME = 1_800_000_000
+DATA = ('冷湖复习系统 static cache test line\n' * 40).encode('utf-8')
+
+app = Flask(__name__)
+
+
+class _CachedFile:
+    def __enter__(self):
+        self.workdir = tempfile.mkdtemp()
+        path = os.path.join(self.workdir, 'page.txt')
+        with open(path, 'wb') as f:
+            f.write(DATA)
+        os.utime(path, (MTIME, MTIME))
+        self.cache = StaticCache()
+        self.cache.add_directory(self.workdir)
+        self.cache.load()
+        self.entry = self.cache.get(path)
+        return self
+
+    def __exit__(self, *exc_info):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def respond(self, **headers):
+        with app.test_request_context(headers=headers) as context:
+            return self.cache.respond(self.entry, context.request, 'no-cache')
+
+
+def test_range_requests():
+    with _CachedFile() as cached:
+        response = cached.respond(Range='bytes=0-9', **{'Accept-Encoding': 'gzip'})
+        assert response.status_code == 206 and response.get_data() == DATA[:10]
+        assert response.headers['Content-Range'] == f'bytes 0-9/{len(DATA)}'
+        assert 'Content-Encoding' not in response.headers  # Range只对未压缩的内容处理
+
+        response = cached.respond(Range='bytes=-5')
+        assert response.status_code == 206 and response.get_data() == DATA[-5:]
+
+        response = cached.respond(Range=f'bytes={len(DATA)}-')
+        assert response.status_code == 416 and response.headers['Content-Range'] == f'bytes */{len(DATA)}'
+
+
+def test_if_range_falls_back_to_full_content():
+    with _CachedFile() as cached:
+        etag = cached.entry.etag
+        assert cached.respond(Range='bytes=0-9', **{'If-Range': f'"{etag}"'}).status_code == 206
+        assert cached.respond(Range='bytes=0-9', **{'If-Range': '"changed"'}).status_code == 200
+        assert cached.respond(Range='bytes=0-9', **{'If-Range': http_date(MTIME)}).status_code == 206
+        assert cached.respond(Range='bytes=0-9', **{'If-Range': http_date(MTIME - 60)}).status_code == 200
+
+
+def test_conditional_requests_and_encoding():
+    with _CachedFile() as cached:
+        etag = cached.entry.etag
+        response = cached.respond(**{'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200 and response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['ETag'] == f'"{etag}-gzip"' and response.headers['Vary'] == 'Accept-Encoding'
+        assert len(response.get_data()) < len(DATA)
+
+        # 压缩版本和原文件的ETag都能命中
+        assert cached.respond(**{'If-None-Match': f'"{etag}-gzip"', 'Accept-Encoding': 'gzip'}).status_code == 304
+        assert cached.respond(**{'If-None-Match': f'"{etag}"'}).status_code == 304
+        assert cached.respond(**{'If-None-Match': '"other"'}).status_code == 200
+
+        assert cached.respond(**{'If-Modified-Since': http_date(MTIME)}).status_code == 304
+        assert cached.respond(**{'If-Modified-Since': http_date(MTIME - 60)}).status_code == 200
+        # 同时带有两者时以If-None-Match为准
+        assert cached.respond(**{'If-None-Match': '"other"', 'If-Modified-Since': http_date(MTIME)}).status_code == 200
+
+        responses = cached.cache.stats()['responses']
+        assert responses[304] == 3 and responses[200] == 4
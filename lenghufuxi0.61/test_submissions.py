@@ -0,0 +1,88 @@
+import sqlite3
+
+from submissions import init_submission_keys, apply_once, apply_batch, purge_submission_keys, KEY_TTL
+
+# 幂等提交：重复的键返回上次的结果、键过期后重新处理、批量提交中出错的记录只回滚自己
+
+NOW = 1_800_000_000
+
+
+def _connect():
+    conn = sqlite3.connect(':memory:', isolation_level=None)
+    init_submission_keys(conn.cursor())
+    conn.execute('CREATE TABLE rankings (name TEXT, score INTEGER)')
+    return conn
+
+
+# 写入一条排行榜记录，和服务器的处理函数一样返回 (结果, HTTP状态码)
+def _add_ranking(conn, data):
+    conn.execute('INSERT INTO rankings (name, score) VALUES (?, ?)', (data['name'], data['score']))
+    return {'status': 'success', 'score': data['score']}, 200
+
+
+def _fail_after_insert(conn, data):
+    _add_ranking(conn, data)
+    raise RuntimeError('处理失败')
+
+
+def _rankings(conn):
+    return conn.execute('SELECT name, score FROM rankings ORDER BY rowid').fetchall()
+
+
+def test_replay_returns_saved_result():
+    conn = _connect()
+    first = apply_once(conn, 'key-1', _add_ranking, {'name': '甲', 'score': 8}, now=NOW)
+    second = apply_once(conn, 'key-1', _add_ranking, {'name': '甲', 'score': 8}, now=NOW + 60)
+    assert first == ({'status': 'success', 'score': 8}, 200)
+    assert second == ({'status': 'success', 'score': 8, 'duplicate': True}, 200)
+    assert _rankings(conn) == [('甲', 8)]
+
+
+def test_error_results_are_replayed_too():
+    conn = _connect()
+
+    def reject(conn, data):
+        return {'status': 'error', 'message': '用户不存在'}, 404
+    apply_once(conn, 'key-1', reject, {}, now=NOW)
+    result, status_code = apply_once(conn, 'key-1', _add_ranking, {'name': '甲', 'score': 8}, now=NOW)
+    assert status_code == 404 and result['duplicate']
+    assert _rankings(conn) == []
+
+
+def test_expired_key_is_processed_again():
+    conn = _connect()
+    apply_once(conn, 'key-1', _add_ranking, {'name': '甲', 'score': 8}, now=NOW)
+    result, _ = apply_once(conn, 'key-1', _add_ranking, {'name': '甲', 'score': 8}, now=NOW + KEY_TTL + 1)
+    assert 'duplicate' not in result
+    assert _rankings(conn) == [('甲', 8), ('甲', 8)]
+
+
+def test_batch_rolls_back_only_the_failed_item():
+    conn = _connect()
+    conn.execute('BEGIN')
+    outcomes = apply_batch(conn, [
+        ('key-1', _add_ranking, {'name': '甲', 'score': 8}),
+        ('key-2', _fail_after_insert, {'name': '乙', 'score': 5}),
+        ('key-3', None, None),
+        ('key-1', _add_ranking, {'name': '甲', 'score': 8}),
+        ('key-4', _add_ranking, {'name': '丙', 'score': 6})
+    ], now=NOW)
+    conn.execute('COMMIT')
+
+    assert [status_code for _, status_code in outcomes] == [200, 500, 400, 200, 200]
+    assert outcomes[1][0]['message'] == '处理失败'
+    assert outcomes[3][0]['duplicate']
+    assert _rankings(conn) == [('甲', 8), ('丙', 6)]
+
+    # 失败的记录没有保存键，修好后重试可以正常处理
+    result, status_code = apply_once(conn, 'key-2', _add_ranking, {'name': '乙', 'score': 5}, now=NOW)
+    assert status_code == 200 and 'duplicate' not in result
+
+
+def test_purge_removes_only_expired_keys():
+    conn = _connect()
+    for i in range(5):
+        apply_once(conn, f'old-{i}', _add_ranking, {'name': '甲', 'score': i}, now=NOW)
+    apply_once(conn, 'new', _add_ranking, {'name': '乙', 'score': 1}, now=NOW + KEY_TTL)
+    assert purge_submission_keys(conn, now=NOW + KEY_TTL + 1, batch_size=2) == {'deleted': 5}
+    assert conn.execute('SELECT COUNT(*) FROM submission_dedupe').fetchone()[0] == 1